@@ -11,6 +11,7 @@ from app.config import Config
 from app.database import init_mongodb
 from app.utils.error_handlers import register_error_handlers
 from app.routes import register_routes
+from app.utils.startup_profile import StartupProfile
 
 
 def create_app(config_class=Config):
@@ -26,6 +27,8 @@ def create_app(config_class=Config):
     Returns:
         Flask: Configured Flask application instance
     """
+    profile = StartupProfile()
+    
     # Create Flask application instance
     app = Flask(__name__)
     
@@ -33,13 +36,15 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
     
     # Initialize database
-    init_mongodb(config_class)
+    with profile.step('database'):
+        init_mongodb(config_class)
     
     # Register error handlers
     register_error_handlers(app)
     
     # Register API routes
-    register_routes(app)
+    with profile.step('routes'):
+        register_routes(app)
     
     # Configure logging
     logging.basicConfig(
@@ -47,24 +52,51 @@ def create_app(config_class=Config):
         format='%(asctime)s %(levelname)s %(name)s: %(message)s'
     )
     
-    # Initialize encryption system
+    # Initialize encryption system (key material is derived lazily on first use)
     try:
-        from app.utils.encryption import initialize_encryption
-        initialize_encryption(
-            master_key=app.config.get('ENCRYPTION_MASTER_KEY'),
-            jwt_secret=app.config.get('JWT_SECRET_KEY')
-        )
+        with profile.step('encryption', 'import'):
+            from app.utils.encryption import initialize_encryption
+        with profile.step('encryption'):
+            initialize_encryption(
+                master_key=app.config.get('ENCRYPTION_MASTER_KEY'),
+                jwt_secret=app.config.get('JWT_SECRET_KEY'),
+                rsa_key_path=app.config.get('ENCRYPTION_RSA_KEY_PATH')
+            )
         logging.info("Encryption system initialized successfully")
     except Exception as e:
         logging.warning(f"Encryption system initialization failed: {e}")
     
     # Initialize SMS system
     try:
-        from app.utils.sms_init import initialize_sms_system
-        initialize_sms_system()
+        with profile.step('sms', 'import'):
+            from app.utils.sms_init import initialize_sms_system
+        with profile.step('sms'):
+            initialize_sms_system()
     except Exception as e:
         logging.warning(f"SMS system initialization failed: {e}")
     
+    # Build order statistics rollups from existing orders on first start
+    try:
+        with profile.step('order_stats'):
+            from app.models.order_stats import OrderStats
+            OrderStats.create_indexes()
+            if not OrderStats.has_rollups():
+                OrderStats.rebuild()
+    except Exception as e:
+        logging.warning(f"Order statistics initialization failed: {e}")
+    
+    # Index existing orders for the admin search box on first start
+    try:
+        with profile.step('order_search'):
+            from app.models.order_search import OrderSearchIndex
+            OrderSearchIndex.create_indexes()
+            if not OrderSearchIndex.is_backfilled():
+                OrderSearchIndex.backfill()
+    except Exception as e:
+        logging.warning(f"Order search initialization failed: {e}")
+    
+    app.extensions['startup_profile'] = profile.report()
+    logging.info(profile.format())
     logging.info("Flask application created successfully")
     
     # Return the configured app
@@ -56,15 +56,37 @@ class Config:
     SMSO_API_BASE_URL = os.environ.get('SMSO_API_BASE_URL')
     SMSO_WEBHOOK_URL = os.environ.get('SMSO_WEBHOOK_URL')
     
+    # Provider health monitoring and circuit breaking
+    SMS_HEALTH_CHECK_INTERVAL = int(os.environ.get('SMS_HEALTH_CHECK_INTERVAL', 60))
+    SMS_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('SMS_CIRCUIT_FAILURE_THRESHOLD', 3))
+    SMS_CIRCUIT_OPEN_SECONDS = int(os.environ.get('SMS_CIRCUIT_OPEN_SECONDS', 30))
+    SMS_CIRCUIT_ERROR_RATE = float(os.environ.get('SMS_CIRCUIT_ERROR_RATE', 0.5))
+    SMS_CIRCUIT_SLOW_CALL_SECONDS = float(os.environ.get('SMS_CIRCUIT_SLOW_CALL_SECONDS', 5))
+    SMS_HEDGE_ENABLED = os.environ.get('SMS_HEDGE_ENABLED', 'true').lower() == 'true'
+    SMS_HEDGE_MIN_DELAY = float(os.environ.get('SMS_HEDGE_MIN_DELAY', 0.5))
+    SMS_HEDGE_WORKERS = int(os.environ.get('SMS_HEDGE_WORKERS', 8))
+    
+    # SMS logs and provider counters are buffered and flushed in batches
+    SMS_TELEMETRY_FLUSH_SECONDS = float(os.environ.get('SMS_TELEMETRY_FLUSH_SECONDS', 2))
+    SMS_TELEMETRY_BATCH_SIZE = int(os.environ.get('SMS_TELEMETRY_BATCH_SIZE', 100))
+    
+    # Delivery report webhooks are acknowledged at once and applied in batches
+    SMS_WEBHOOK_FLUSH_SECONDS = float(os.environ.get('SMS_WEBHOOK_FLUSH_SECONDS', 1))
+    SMS_WEBHOOK_BATCH_SIZE = int(os.environ.get('SMS_WEBHOOK_BATCH_SIZE', 500))
+    
     # =============================================================================
     # AUTHENTICATION & SECURITY CONFIGURATION
     # =============================================================================
     
     ENCRYPTION_MASTER_KEY = os.environ.get('ENCRYPTION_MASTER_KEY')
+    ENCRYPTION_RSA_KEY_PATH = os.environ.get('ENCRYPTION_RSA_KEY_PATH')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'dev-jwt-secret-change-in-production'
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.environ.get('JWT_ACCESS_TOKEN_EXPIRES_HOURS', 2)))
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.environ.get('JWT_REFRESH_TOKEN_EXPIRES_DAYS', 30)))
     BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 8))
+    CHECKOUT_AUTH_DEBUG_SAMPLE_RATE = float(os.environ.get('CHECKOUT_AUTH_DEBUG_SAMPLE_RATE', 0.01))
     
     # =============================================================================
     # RATE LIMITING CONFIGURATION
@@ -92,6 +114,9 @@ class Config:
     SESSION_COOKIE_HTTPONLY = os.environ.get('SESSION_COOKIE_HTTPONLY', 'true').lower() == 'true'
     SESSION_COOKIE_SAMESITE = os.environ.get('SESSION_COOKIE_SAMESITE', 'Strict')
     
+    # Stored responses for Idempotency-Key replays
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+    
     # =============================================================================
     # CORS CONFIGURATION
     # =============================================================================
@@ -178,6 +203,10 @@ class TestingConfig(Config):
     MONGODB_DB_NAME = 'local_producer_app_test'
     SKIP_SMS_VERIFICATION = True
     BCRYPT_LOG_ROUNDS = 4  # Faster for testing
+    PASSWORD_HASH_WORKERS = 0  # Hash inline in tests
+    SMS_HEALTH_CHECK_INTERVAL = 0  # No background health thread in tests
+    SMS_TELEMETRY_FLUSH_SECONDS = 0  # Write SMS logs through in tests
+    SMS_WEBHOOK_FLUSH_SECONDS = 0  # Apply delivery reports inline in tests
     RATE_LIMIT_REQUESTS_PER_MINUTE = 1000  # No rate limiting in tests
 
 
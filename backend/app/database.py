@@ -230,9 +230,30 @@ def create_indexes():
                                      expireAfterSeconds=600,  # 10 minutes
                                      name="verification_code_ttl")
         
-        results['orders'] = "Indexes created: order_number (unique), customer_phone, status, created_at, verification_code (TTL)"
+        # Multikey indexes for admin order search (phone suffixes, name tokens/n-grams)
+        orders_collection.create_index("search.phone_suffixes", name="search_phone_suffix_index")
+        orders_collection.create_index("search.name_tokens", name="search_name_token_index")
+        orders_collection.create_index("search.name_ngrams", name="search_name_ngram_index")
+        
+        results['orders'] = "Indexes created: order_number (unique), customer_phone, status, created_at, verification_code (TTL), search (phone suffix, name token, name n-gram)"
         logging.info("Orders collection indexes created successfully")
         
+        # Order statistics rollups (one document per day and status)
+        order_stats_collection = database[Collections.ORDER_DAILY_STATS]
+        order_stats_collection.create_index([("day", 1), ("status", 1)], unique=True, name="day_status_unique")
+        
+        results['order_daily_stats'] = "Indexes created: day + status (unique)"
+        logging.info("Order statistics collection indexes created successfully")
+        
+        # Idempotency keys collection (stored responses expire at expires_at)
+        idempotency_collection = database[Collections.IDEMPOTENCY_KEYS]
+        idempotency_collection.create_index("expires_at",
+                                            expireAfterSeconds=0,
+                                            name="idempotency_expires_ttl")
+        
+        results['idempotency_keys'] = "Indexes created: expires_at (TTL)"
+        logging.info("Idempotency keys collection indexes created successfully")
+        
         # Cart sessions collection indexes
         cart_sessions_collection = database[Collections.CART_SESSIONS]
         
@@ -334,4 +355,5 @@ class Collections:
     PRODUCTS = 'products'
     CATEGORIES = 'categories'
     ORDERS = 'orders'
-    CART_SESSIONS = 'cart_sessions'
\ No newline at end of file
+    CART_SESSIONS = 'cart_sessions'
+    ORDER_DAILY_STATS = 'order_daily_stats'
\ No newline at end of file
@@ -7,13 +7,13 @@ for the simplified checkout flow.
 """
 
 import re
+import calendar
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List
 from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 from app.database import get_database
-from app.utils.validators import sanitize_string
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +35,12 @@ class CustomerPhone:
     POSTAL_CODE_PATTERN = re.compile(r'^[0-9]{6}$')
     MAX_ADDRESSES = 50
     
+    # Address ranking: default first, then most used, then oldest.
+    # Encoded in one integer so MongoDB can keep the array sorted by it.
+    DEFAULT_RANK_WEIGHT = 10 ** 17
+    USAGE_RANK_WEIGHT = 10 ** 10
+    ADDRESS_SORT = {'rank': -1}
+    
     # Romanian counties
     VALID_COUNTIES = [
         'Alba', 'Arad', 'Argeș', 'Bacău', 'Bihor', 'Bistrița-Năsăud', 'Botoșani',
@@ -175,19 +181,10 @@ class CustomerPhone:
             raise ValueError(f"Maximum {self.MAX_ADDRESSES} addresses allowed")
         
         # Create address with metadata
-        address_id = ObjectId()
-        new_address = {
-            '_id': address_id,
-            'street': sanitize_string(address['street']),
-            'city': sanitize_string(address['city']),
-            'county': address['county'],
-            'postal_code': address['postal_code'],
-            'notes': sanitize_string(address.get('notes', '')),
-            'is_default': address.get('is_default', len(self.addresses) == 0),
-            'usage_count': 0,
-            'created_at': datetime.utcnow(),
-            'last_used': None
-        }
+        new_address = self.build_address(
+            address, is_default=address.get('is_default', len(self.addresses) == 0)
+        )
+        address_id = new_address['_id']
         
         # If setting as default, unset others
         if new_address['is_default']:
@@ -195,8 +192,77 @@ class CustomerPhone:
                 addr['is_default'] = False
         
         self.addresses.append(new_address)
+        self.rank_addresses()
         return address_id
     
+    @staticmethod
+    def clean_address_text(text: str) -> str:
+        """
+        Normalize free-text address fields the way they are stored.
+        
+        Values are stored raw (only stripped), as the checkout routes always
+        did; escaping is left to the frontend when they are rendered.
+        """
+        return text.strip() if isinstance(text, str) else text
+    
+    @staticmethod
+    def build_address(address: Dict[str, Any], is_default: bool = False,
+                      usage_count: int = 0, last_used: datetime = None) -> Dict[str, Any]:
+        """Build a stored address subdocument from validated input"""
+        new_address = {
+            '_id': ObjectId(),
+            'street': CustomerPhone.clean_address_text(address['street']),
+            'city': CustomerPhone.clean_address_text(address['city']),
+            'county': address['county'],
+            'postal_code': address['postal_code'],
+            'notes': CustomerPhone.clean_address_text(address.get('notes', '')),
+            'is_default': is_default,
+            'usage_count': usage_count,
+            'created_at': datetime.utcnow(),
+            'last_used': last_used
+        }
+        new_address['rank'] = CustomerPhone.address_rank(new_address)
+        return new_address
+    
+    @classmethod
+    def address_rank(cls, address: Dict[str, Any]) -> int:
+        """
+        Compute the stored sort rank of an address (higher sorts first).
+        
+        rank = is_default * DEFAULT_RANK_WEIGHT
+             + usage_count * USAGE_RANK_WEIGHT
+             + (USAGE_RANK_WEIGHT - 1 - created_at epoch seconds)
+        
+        so a usage increment is a plain $inc of USAGE_RANK_WEIGHT.
+        """
+        created_at = address.get('created_at')
+        age_key = 0
+        if isinstance(created_at, datetime):
+            age_key = max(cls.USAGE_RANK_WEIGHT - 1 - calendar.timegm(created_at.utctimetuple()), 0)
+        
+        rank = address.get('usage_count', 0) * cls.USAGE_RANK_WEIGHT + age_key
+        if address.get('is_default'):
+            rank += cls.DEFAULT_RANK_WEIGHT
+        return rank
+    
+    def rank_addresses(self) -> None:
+        """Recompute address ranks and keep the list in rank order"""
+        for address in self.addresses:
+            address['rank'] = self.address_rank(address)
+        self.addresses.sort(key=lambda address: address['rank'], reverse=True)
+    
+    def find_matching_address(self, address: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Find a saved address with the same street, city and postal code"""
+        # Saved text went through clean_address_text; compare like with like
+        street = self.clean_address_text(address.get('street'))
+        city = self.clean_address_text(address.get('city'))
+        for addr in self.addresses:
+            if (addr['street'] == street and
+                addr['city'] == city and
+                addr['postal_code'] == address.get('postal_code')):
+                return addr
+        return None
+    
     def update_address(self, address_id: str, updates: Dict[str, Any]):
         """Update existing address"""
         address_id = ObjectId(address_id)
@@ -205,21 +271,23 @@ class CustomerPhone:
             if address['_id'] == address_id:
                 # Update allowed fields
                 if 'street' in updates:
-                    address['street'] = sanitize_string(updates['street'])
+                    address['street'] = self.clean_address_text(updates['street'])
                 if 'city' in updates:
-                    address['city'] = sanitize_string(updates['city'])
+                    address['city'] = self.clean_address_text(updates['city'])
                 if 'county' in updates and updates['county'] in self.VALID_COUNTIES:
                     address['county'] = updates['county']
                 if 'postal_code' in updates:
                     address['postal_code'] = updates['postal_code']
                 if 'notes' in updates:
-                    address['notes'] = sanitize_string(updates['notes'])
+                    address['notes'] = self.clean_address_text(updates['notes'])
                 if 'is_default' in updates and updates['is_default']:
                     # Unset other defaults
                     for addr in self.addresses:
                         addr['is_default'] = False
                     address['is_default'] = True
                 
+                address['updated_at'] = datetime.utcnow()
+                self.rank_addresses()
                 return True
         
         return False
@@ -234,10 +302,11 @@ class CustomerPhone:
             if addr['_id'] != address_id
         ]
         
-        # If deleted default, set first as default
+        # If deleted default, promote the highest ranked remaining address
         if len(self.addresses) > 0 and not any(addr['is_default'] for addr in self.addresses):
-            self.addresses[0]['is_default'] = True
+            max(self.addresses, key=lambda addr: addr.get('rank', 0))['is_default'] = True
         
+        self.rank_addresses()
         return len(self.addresses) < initial_count
     
     def mark_address_used(self, address_id: str):
@@ -248,6 +317,7 @@ class CustomerPhone:
             if address['_id'] == address_id:
                 address['usage_count'] = address.get('usage_count', 0) + 1
                 address['last_used'] = datetime.utcnow()
+                self.rank_addresses()
                 break
     
     def to_dict(self, include_sensitive: bool = False) -> Dict[str, Any]:
@@ -347,6 +417,145 @@ class CustomerPhone:
             logger.error(f"Error finding customer phone: {str(e)}")
             return None
     
+    @classmethod
+    def record_checkout(cls, phone: str, name: str = None, address_id: Any = None,
+                        new_address: Dict[str, Any] = None, create: bool = False) -> bool:
+        """
+        Record a placed order on the customer profile in one atomic write.
+        
+        Increments total_orders and, depending on the arguments, either bumps
+        usage of a saved address with positional $inc/$set or appends a new
+        address with $push guarded by the address limit. No document is read
+        or replaced, so concurrent checkouts cannot conflict.
+        
+        Args:
+            phone: Normalized customer phone
+            name: Customer name to store (optional)
+            address_id: Saved address used for the order
+            new_address: Address to append (already validated)
+            create: Upsert the customer if it does not exist yet
+            
+        Returns:
+            bool: True if the customer document was written
+        """
+        now = datetime.utcnow()
+        query = {'phone': phone}
+        update = {
+            '$inc': {'total_orders': 1, '__v': 1},
+            '$set': {'last_order_date': now, 'updated_at': now}
+        }
+        if name:
+            update['$set']['name'] = name
+        
+        if address_id is not None:
+            query['addresses._id'] = ObjectId(address_id)
+            update['$inc']['addresses.$.usage_count'] = 1
+            update['$inc']['addresses.$.rank'] = cls.USAGE_RANK_WEIGHT
+            update['$set']['addresses.$.last_used'] = now
+        elif new_address is not None:
+            address_doc = cls.build_address(
+                new_address, is_default=new_address.get('is_default', create),
+                usage_count=1, last_used=now
+            )
+            update['$push'] = {'addresses': {'$each': [address_doc], '$sort': cls.ADDRESS_SORT}}
+            if not create:
+                query['$expr'] = cls._address_limit_expr()
+        
+        if create:
+            update['$setOnInsert'] = {
+                'verification': {
+                    'last_code_sent': None,
+                    'attempts_today': 0,
+                    'blocked_until': None
+                },
+                'created_at': now
+            }
+        
+        try:
+            collection = get_database()[cls.COLLECTION_NAME]
+            try:
+                result = collection.update_one(query, update, upsert=create)
+            except DuplicateKeyError:
+                if not create:
+                    raise
+                # A concurrent first checkout created the profile - apply
+                # this order to it as an existing customer
+                if new_address is not None:
+                    address_doc = cls.build_address(
+                        new_address, is_default=new_address.get('is_default', False),
+                        usage_count=1, last_used=now
+                    )
+                    update['$push']['addresses']['$each'] = [address_doc]
+                    query['$expr'] = cls._address_limit_expr()
+                result = collection.update_one(query, update)
+            
+            if result.matched_count or result.upserted_id is not None:
+                return True
+            
+            # Address missing or limit reached - still count the order
+            logger.warning(f"Checkout address update skipped for ****{phone[-4:]}")
+            update.pop('$push', None)
+            update['$inc'] = {'total_orders': 1, '__v': 1}
+            update['$set'] = {k: v for k, v in update['$set'].items() if not k.startswith('addresses.')}
+            result = collection.update_one({'phone': phone}, update)
+            return result.matched_count > 0
+            
+        except Exception as e:
+            logger.error(f"Error recording checkout for customer: {str(e)}")
+            raise
+    
+    @classmethod
+    def _address_limit_expr(cls) -> Dict[str, Any]:
+        """Query guard for the address limit that needs no document read"""
+        return {'$lt': [{'$size': {'$ifNull': ['$addresses', []]}}, cls.MAX_ADDRESSES]}
+    
+    @classmethod
+    def find_ranked_addresses(cls, phone: str) -> Optional[Dict[str, Any]]:
+        """
+        Fetch a customer's addresses in rank order.
+        
+        Uses the unique phone index and a projection that leaves out
+        verification data. A checkout only bumps the used address's rank,
+        so the stored array may be out of order and is sorted here on the
+        precomputed ranks. Profiles written before ranks existed are ranked
+        and saved once.
+        
+        Returns:
+            dict: Customer document with name, total_orders and addresses
+        """
+        try:
+            db = get_database()
+            collection = db[cls.COLLECTION_NAME]
+            
+            normalized_phone = cls().normalize_phone(phone)
+            doc = collection.find_one(
+                {'phone': normalized_phone},
+                {'name': 1, 'total_orders': 1, 'addresses': 1, '__v': 1}
+            )
+            if not doc:
+                return None
+            
+            addresses = doc.get('addresses', [])
+            if any('rank' not in address for address in addresses):
+                customer = cls(doc)
+                customer.rank_addresses()
+                # Guarded on the version read: if a checkout changed the
+                # profile in between, skip the write rather than overwrite it
+                # (the ranks are saved on a later read)
+                collection.update_one(
+                    {'_id': doc['_id'], '__v': doc.get('__v')},
+                    {'$set': {'addresses': customer.addresses}, '$inc': {'__v': 1}}
+                )
+                doc['addresses'] = customer.addresses
+            else:
+                addresses.sort(key=lambda address: address['rank'], reverse=True)
+            
+            return doc
+            
+        except Exception as e:
+            logger.error(f"Error finding customer addresses: {str(e)}")
+            return None
+    
     @classmethod
     def create_or_update(cls, phone: str, name: str) -> 'CustomerPhone':
         """Create new or update existing customer"""
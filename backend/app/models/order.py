@@ -7,16 +7,26 @@ order lifecycle management, and item tracking.
 
 import re
 import logging
-from decimal import Decimal
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Union
 from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 from app.database import get_database
+from app.models.order_search import OrderSearchIndex
 from app.utils.error_handlers import DatabaseError, ValidationError
+from app.utils.money import to_bani, from_bani, price_line, sum_bani, money_fields, format_lei, MoneyError
 from app.utils.validators import sanitize_string, validate_phone_number
 
 
+def _invert_transitions(transitions: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """Invert a status transition table into target -> allowed source statuses."""
+    sources = {status: [] for status in transitions}
+    for source, targets in transitions.items():
+        for target in targets:
+            sources.setdefault(target, []).append(source)
+    return sources
+
+
 class Order:
     """
     Order model for managing customer orders, items, and order lifecycle.
@@ -34,13 +44,41 @@ class Order:
     STATUS_PREPARING = 'preparing'
     STATUS_READY = 'ready'
     STATUS_DELIVERED = 'delivered'
+    STATUS_COMPLETED = 'completed'
     STATUS_CANCELLED = 'cancelled'
     
     VALID_STATUSES = [
         STATUS_PENDING, STATUS_CONFIRMED, STATUS_PREPARING,
-        STATUS_READY, STATUS_DELIVERED, STATUS_CANCELLED
+        STATUS_READY, STATUS_DELIVERED, STATUS_COMPLETED, STATUS_CANCELLED
     ]
     
+    # Admin status workflow: allowed target statuses for each current status
+    ADMIN_STATUSES = [STATUS_PENDING, STATUS_CONFIRMED, STATUS_COMPLETED, STATUS_CANCELLED]
+    ADMIN_STATUS_TRANSITIONS = {
+        STATUS_PENDING: [STATUS_CONFIRMED, STATUS_CANCELLED],
+        STATUS_CONFIRMED: [STATUS_COMPLETED, STATUS_CANCELLED],
+        STATUS_COMPLETED: [],  # No further transitions allowed
+        STATUS_CANCELLED: []   # No further transitions allowed
+    }
+    
+    # Precomputed inverse table: statuses an order may be in to move to a target
+    ADMIN_TRANSITION_SOURCES = _invert_transitions(ADMIN_STATUS_TRANSITIONS)
+    
+    # Timestamp field set when an order reaches a status
+    STATUS_TIMESTAMP_FIELDS = {
+        STATUS_CONFIRMED: 'confirmed_at',
+        STATUS_READY: 'ready_at',
+        STATUS_DELIVERED: 'delivered_at',
+        STATUS_COMPLETED: 'completed_at',
+        STATUS_CANCELLED: 'cancelled_at'
+    }
+    
+    # Fields read back from a write to keep the statistics rollups in step
+    STATS_PROJECTION = {
+        'status': 1, 'created_at': 1, 'total': 1, 'total_bani': 1,
+        'total_amount': 1, 'total_amount_bani': 1
+    }
+    
     # Delivery type constants
     DELIVERY_PICKUP = 'pickup'
     DELIVERY_DELIVERY = 'delivery'
@@ -52,8 +90,8 @@ class Order:
     MAX_SPECIAL_INSTRUCTIONS_LENGTH = 500
     MIN_QUANTITY = 1
     MAX_QUANTITY = 100
-    MIN_PRICE = Decimal('0.01')
-    MAX_PRICE = Decimal('9999.99')
+    MIN_PRICE_BANI = 1
+    MAX_PRICE_BANI = 999999
     
     def __init__(self, data: Dict[str, Any] = None):
         """
@@ -71,8 +109,10 @@ class Order:
         self.customer_name = data.get('customer_name')
         self.status = data.get('status', self.STATUS_PENDING)
         self.items = data.get('items', [])
-        self.subtotal = self._convert_to_decimal(data.get('subtotal'))
-        self.total = self._convert_to_decimal(data.get('total'))
+        self.subtotal_bani = self._read_bani(data, 'subtotal')
+        self.total_bani = self._read_bani(data, 'total')
+        self.subtotal = from_bani(self.subtotal_bani) if self.subtotal_bani is not None else None
+        self.total = from_bani(self.total_bani) if self.total_bani is not None else None
         self.delivery_type = data.get('delivery_type', self.DELIVERY_PICKUP)
         self.delivery_address = data.get('delivery_address')
         self.delivery_phone = data.get('delivery_phone')
@@ -136,7 +176,7 @@ class Order:
                 validated_instructions = cls._validate_special_instructions(special_instructions)
             
             # Calculate totals
-            subtotal, total = cls._calculate_order_totals(validated_items)
+            subtotal_bani, total_bani = cls._calculate_order_totals(validated_items)
             
             # Generate unique order number
             order_number = cls._generate_unique_order_number()
@@ -149,8 +189,8 @@ class Order:
                 'customer_name': sanitize_string(customer_name.strip()),
                 'status': cls.STATUS_PENDING,
                 'items': validated_items,
-                'subtotal': subtotal,
-                'total': total,
+                **money_fields('subtotal', subtotal_bani),
+                **money_fields('total', total_bani),
                 'delivery_type': delivery_type,
                 'created_at': now,
                 'updated_at': now
@@ -166,6 +206,9 @@ class Order:
             if validated_instructions:
                 order_doc['special_instructions'] = validated_instructions
             
+            # Add admin search fields
+            OrderSearchIndex.apply(order_doc)
+            
             # Insert into database
             db = get_database()
             collection = db[cls.COLLECTION_NAME]
@@ -173,6 +216,10 @@ class Order:
             result = collection.insert_one(order_doc)
             order_doc['_id'] = result.inserted_id
             
+            # Count order in daily statistics rollups
+            from app.models.order_stats import OrderStats
+            OrderStats.record_order_created(now, cls.STATUS_PENDING, from_bani(total_bani))
+            
             # Create and return Order instance
             order = cls(order_doc)
             
@@ -379,6 +426,9 @@ class Order:
                 self._validate_customer_name(data['customer_name'])
                 update_data['customer_name'] = sanitize_string(data['customer_name'].strip())
                 self.customer_name = update_data['customer_name']
+                update_data[OrderSearchIndex.FIELD] = OrderSearchIndex.build_fields(
+                    self.customer_phone, self.customer_name
+                )
             
             if 'delivery_type' in data:
                 self._validate_delivery_type(data['delivery_type'])
@@ -423,13 +473,15 @@ class Order:
             
             if 'items' in data:
                 validated_items = self._validate_and_process_items(data['items'])
-                subtotal, total = self._calculate_order_totals(validated_items)
+                subtotal_bani, total_bani = self._calculate_order_totals(validated_items)
                 update_data['items'] = validated_items
-                update_data['subtotal'] = subtotal
-                update_data['total'] = total
+                update_data.update(money_fields('subtotal', subtotal_bani))
+                update_data.update(money_fields('total', total_bani))
                 self.items = validated_items
-                self.subtotal = subtotal
-                self.total = total
+                self.subtotal_bani = subtotal_bani
+                self.total_bani = total_bani
+                self.subtotal = update_data['subtotal']
+                self.total = update_data['total']
             
             # Always update timestamp
             update_data['updated_at'] = datetime.utcnow()
@@ -439,15 +491,36 @@ class Order:
             db = get_database()
             collection = db[self.COLLECTION_NAME]
             
-            result = collection.update_one(
+            if 'items' not in data:
+                result = collection.update_one(
+                    {'_id': self._id},
+                    {'$set': update_data}
+                )
+                
+                if result.modified_count > 0:
+                    logging.info(f"Order updated successfully: {self.order_number}")
+                    return True
+                return False
+            
+            # New items change the total; read the previous total in the
+            # same write so the rollup revenue moves by the exact delta
+            previous = collection.find_one_and_update(
                 {'_id': self._id},
-                {'$set': update_data}
+                {'$set': update_data},
+                projection=self.STATS_PROJECTION
+            )
+            if previous is None:
+                return False
+            
+            from app.models.order_stats import OrderStats
+            OrderStats.record_revenue_change(
+                previous.get('created_at'),
+                previous.get('status', self.STATUS_PENDING),
+                from_bani(self.total_bani) - OrderStats.order_revenue(previous)
             )
             
-            if result.modified_count > 0:
-                logging.info(f"Order updated successfully: {self.order_number}")
-                return True
-            return False
+            logging.info(f"Order updated successfully: {self.order_number}")
+            return True
             
         except Exception as e:
             if isinstance(e, (ValidationError, DatabaseError)):
@@ -491,17 +564,32 @@ class Order:
             db = get_database()
             collection = db[self.COLLECTION_NAME]
             
-            result = collection.update_one(
-                {'_id': self._id},
-                {'$set': update_data}
+            # Guard on the status this object was loaded with, so of two
+            # concurrent transitions only one moves the order out of it
+            previous = collection.find_one_and_update(
+                {'_id': self._id, 'status': self.status},
+                {'$set': update_data},
+                projection=self.STATS_PROJECTION
             )
             
-            if result.modified_count > 0:
-                self.status = new_status
-                self.updated_at = update_data['updated_at']
-                logging.info(f"Order status updated: {self.order_number} -> {new_status}")
-                return True
-            return False
+            if previous is None:
+                logging.warning(f"Order status changed concurrently: {self.order_number}")
+                return False
+            
+            self.status = new_status
+            self.updated_at = update_data['updated_at']
+            
+            # Move order between daily statistics rollups
+            from app.models.order_stats import OrderStats
+            OrderStats.record_status_change(
+                previous.get('created_at'),
+                previous.get('status', self.STATUS_PENDING),
+                new_status,
+                OrderStats.order_revenue(previous)
+            )
+            
+            logging.info(f"Order status updated: {self.order_number} -> {new_status}")
+            return True
             
         except Exception as e:
             if isinstance(e, ValidationError):
@@ -509,17 +597,17 @@ class Order:
             logging.error(f"Error updating order status: {str(e)}")
             raise DatabaseError("Failed to update order status", "DB_001")
     
-    def calculate_totals(self) -> tuple[Decimal, Decimal]:
+    def calculate_totals(self) -> tuple[int, int]:
         """
         Calculate order subtotal and total.
         
         Returns:
-            tuple: (subtotal, total)
+            tuple: (subtotal, total) in bani
         """
         return self._calculate_order_totals(self.items)
     
     def add_item(self, product_id: Union[str, ObjectId], product_name: str,
-                 quantity: int, unit_price: Union[str, float, Decimal]) -> bool:
+                 quantity: int, unit_price: Union[str, float, int]) -> bool:
         """
         Add item to order.
         
@@ -527,7 +615,7 @@ class Order:
             product_id (str|ObjectId): Product ID
             product_name (str): Product name
             quantity (int): Item quantity
-            unit_price (str|float|Decimal): Unit price
+            unit_price (str|float|int): Unit price in lei
             
         Returns:
             bool: True if item added successfully
@@ -536,16 +624,14 @@ class Order:
             # Validate item data
             validated_product_id = self._validate_object_id(product_id, "product_id")
             validated_quantity = self._validate_quantity(quantity)
-            validated_price = self._validate_price(unit_price)
-            total_price = validated_price * validated_quantity
+            validated_price_bani = self._validate_price(unit_price)
             
             # Create item
             item = {
                 'product_id': validated_product_id,
                 'product_name': sanitize_string(product_name.strip()),
                 'quantity': validated_quantity,
-                'unit_price': validated_price,
-                'total_price': total_price
+                **price_line(None, validated_quantity, unit_price_bani=validated_price_bani)
             }
             
             # Add to items list
@@ -578,8 +664,8 @@ class Order:
             'customer_name': self.customer_name,
             'status': self.status,
             'items': self.items,
-            'subtotal': float(self.subtotal) if self.subtotal else None,
-            'total': float(self.total) if self.total else None,
+            'subtotal': self.subtotal,
+            'total': self.total,
             'delivery_type': self.delivery_type,
             'delivery_address': self.delivery_address,
             'delivery_phone': self.delivery_phone,
@@ -708,28 +794,22 @@ class Order:
                     raise ValidationError(f"Item {i+1} missing required field: {field}")
             
             # Validate and convert item data
+            quantity = Order._validate_quantity(item['quantity'])
             validated_item = {
                 'product_id': Order._validate_object_id(item['product_id'], f"item {i+1} product_id"),
                 'product_name': sanitize_string(str(item['product_name']).strip()),
-                'quantity': Order._validate_quantity(item['quantity']),
-                'unit_price': Order._validate_price(item['unit_price'])
+                'quantity': quantity,
+                **price_line(None, quantity, unit_price_bani=Order._validate_price(item['unit_price']))
             }
             
-            # Calculate total price
-            validated_item['total_price'] = validated_item['unit_price'] * validated_item['quantity']
-            
             validated_items.append(validated_item)
         
         return validated_items
     
     @staticmethod
-    def _calculate_order_totals(items: List[Dict[str, Any]]) -> tuple[Decimal, Decimal]:
-        """Calculate order subtotal and total."""
-        subtotal = Decimal('0.00')
-        
-        for item in items:
-            if 'total_price' in item:
-                subtotal += Decimal(str(item['total_price']))
+    def _calculate_order_totals(items: List[Dict[str, Any]]) -> tuple[int, int]:
+        """Calculate order subtotal and total in bani."""
+        subtotal = sum_bani(item for item in items if 'total_price' in item or 'total_price_bani' in item)
         
         # For now, total equals subtotal (no tax/delivery fees)
         total = subtotal
@@ -754,29 +834,20 @@ class Order:
             raise ValidationError("Quantity must be an integer")
     
     @staticmethod
-    def _validate_price(price: Union[str, float, Decimal]) -> Decimal:
-        """Validate and convert price to Decimal."""
+    def _validate_price(price: Union[str, float, int]) -> int:
+        """Validate a price in lei and convert it to integer bani."""
         try:
-            if isinstance(price, str):
-                price = Decimal(price)
-            elif isinstance(price, float):
-                price = Decimal(str(price))
-            elif not isinstance(price, Decimal):
-                raise ValidationError("Price must be a number")
-            
-            # Round to 2 decimal places
-            price = price.quantize(Decimal('0.01'))
-            
-            if price < Order.MIN_PRICE:
-                raise ValidationError(f"Price must be at least ${Order.MIN_PRICE}")
-            
-            if price > Order.MAX_PRICE:
-                raise ValidationError(f"Price must not exceed ${Order.MAX_PRICE}")
-            
-            return price
-            
-        except (ValueError, TypeError):
+            price_bani = to_bani(price)
+        except MoneyError:
             raise ValidationError("Invalid price format")
+        
+        if price_bani < Order.MIN_PRICE_BANI:
+            raise ValidationError(f"Price must be at least {format_lei(Order.MIN_PRICE_BANI)} lei")
+        
+        if price_bani > Order.MAX_PRICE_BANI:
+            raise ValidationError(f"Price must not exceed {format_lei(Order.MAX_PRICE_BANI)} lei")
+        
+        return price_bani
     
     @staticmethod
     def _validate_object_id(obj_id: Union[str, ObjectId], field_name: str) -> ObjectId:
@@ -792,20 +863,17 @@ class Order:
             raise ValidationError(f"Invalid {field_name} format")
     
     @staticmethod
-    def _convert_to_decimal(value: Any) -> Optional[Decimal]:
-        """Convert value to Decimal, handling None."""
+    def _read_bani(data: Dict[str, Any], field: str) -> Optional[int]:
+        """Read an amount in bani, converting legacy float fields."""
+        bani = data.get(f'{field}_bani')
+        if bani is not None:
+            return bani
+        value = data.get(field)
         if value is None:
             return None
         try:
-            if isinstance(value, str):
-                return Decimal(value)
-            elif isinstance(value, (int, float)):
-                return Decimal(str(value))
-            elif isinstance(value, Decimal):
-                return value
-            else:
-                return None
-        except:
+            return to_bani(value)
+        except MoneyError:
             return None
     
     def __repr__(self) -> str:
@@ -0,0 +1,262 @@
+"""
+Order Search Index for Local Producer Web Application
+
+This module maintains normalized search fields on order documents so the
+admin order search box can match partial phone numbers and customer names
+through indexes instead of unanchored case-insensitive regexes.
+"""
+
+import re
+import logging
+import unicodedata
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+from pymongo import UpdateOne
+from app.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class OrderSearchIndex:
+    """
+    Search fields stored under the ``search`` key of each order.
+
+    - ``phone_suffixes``: every trailing digit run of the national phone
+      number (at least PHONE_SUFFIX_MIN_LENGTH digits), so "1111",
+      "0722111111" and "+40722111111" all hit the same indexed value.
+    - ``phone_national``: the national digits, matched with an anchored
+      (index-bounded) regex for prefix searches such as "0722".
+    - ``name_tokens``: accent-folded lowercase name words.
+    - ``name_ngrams``: trigrams of each name token for partial matches.
+    - ``name_folded``: folded full name used as a residual filter on the
+      documents selected by the n-gram index.
+    """
+
+    # Collection names in MongoDB
+    COLLECTION_NAME = 'orders'
+    STATE_COLLECTION_NAME = 'order_search_state'
+    BACKFILLED_MARKER_ID = 'backfilled'
+
+    # Search field configuration
+    FIELD = 'search'
+    PHONE_SUFFIX_MIN_LENGTH = 3
+    NATIONAL_LENGTH = 9
+    NGRAM_SIZE = 3
+    BACKFILL_BATCH_SIZE = 500
+
+    TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+    @staticmethod
+    def fold(text: Optional[str]) -> str:
+        """Lowercase text and strip diacritics (ă -> a, ș -> s)."""
+        if not text:
+            return ''
+        decomposed = unicodedata.normalize('NFKD', str(text))
+        stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+        return ' '.join(stripped.lower().split())
+
+    @staticmethod
+    def national_digits(phone: Optional[str]) -> str:
+        """Reduce a Romanian phone number in any format to its national digits."""
+        digits = re.sub(r'\D', '', phone or '')
+        if digits.startswith('40') and len(digits) == 11:
+            digits = digits[2:]
+        elif digits.startswith('0') and len(digits) == 10:
+            digits = digits[1:]
+        return digits
+
+    @classmethod
+    def phone_suffixes(cls, phone: Optional[str]) -> List[str]:
+        """Get all indexed trailing digit runs of a phone number."""
+        digits = cls.national_digits(phone)
+        return [digits[-n:] for n in range(cls.PHONE_SUFFIX_MIN_LENGTH, len(digits) + 1)]
+
+    @staticmethod
+    def national_prefix(digits: str) -> str:
+        """Strip the trunk or country code from the leading digits of a number."""
+        if digits.startswith('0'):
+            return digits[1:]
+        if digits.startswith('40'):
+            return digits[2:]
+        return digits
+
+    @classmethod
+    def name_tokens(cls, name: Optional[str]) -> List[str]:
+        """Split a name into folded lowercase tokens."""
+        return cls.TOKEN_PATTERN.findall(cls.fold(name))
+
+    @classmethod
+    def ngrams(cls, tokens: List[str]) -> List[str]:
+        """Get the distinct n-grams of a list of tokens."""
+        grams = []
+        seen = set()
+        for token in tokens:
+            for i in range(len(token) - cls.NGRAM_SIZE + 1):
+                gram = token[i:i + cls.NGRAM_SIZE]
+                if gram not in seen:
+                    seen.add(gram)
+                    grams.append(gram)
+        return grams
+
+    @classmethod
+    def build_fields(cls, customer_phone: Optional[str], customer_name: Optional[str]) -> Dict[str, Any]:
+        """
+        Build the search subdocument for an order.
+
+        Args:
+            customer_phone (str): Customer phone number
+            customer_name (str): Customer name
+
+        Returns:
+            dict: Search fields to store under ``search``
+        """
+        tokens = cls.name_tokens(customer_name)
+        return {
+            'phone_suffixes': cls.phone_suffixes(customer_phone),
+            'phone_national': cls.national_digits(customer_phone),
+            'name_tokens': tokens,
+            'name_ngrams': cls.ngrams(tokens),
+            'name_folded': ' '.join(tokens)
+        }
+
+    @classmethod
+    def apply(cls, order_doc: Dict[str, Any]) -> Dict[str, Any]:
+        """Add search fields to an order document before it is written."""
+        order_doc[cls.FIELD] = cls.build_fields(
+            order_doc.get('customer_phone'),
+            order_doc.get('customer_name')
+        )
+        return order_doc
+
+    @classmethod
+    def phone_query(cls, customer_phone: str) -> Dict[str, Any]:
+        """
+        Build an indexed query for a partial phone number.
+
+        A fragment matches numbers that end with it (suffix index) or start
+        with it (anchored regex on the national digits), so both "1234" and
+        "0722" find +40722111234. Digits in the middle of a number are not
+        matched.
+
+        Args:
+            customer_phone (str): Full number, or its leading or trailing digits
+
+        Returns:
+            dict: MongoDB query fragment
+        """
+        digits = cls.national_digits(customer_phone)
+        if not digits:
+            # Nothing to match on (e.g. "+" or "-") - no phone filter
+            return {}
+        if len(digits) < cls.PHONE_SUFFIX_MIN_LENGTH:
+            # Too short to be indexed - anchor on the end of the stored number
+            return {'customer_phone': {'$regex': re.escape(digits) + '$'}}
+
+        suffix_query = {f'{cls.FIELD}.phone_suffixes': digits}
+        prefix = cls.national_prefix(digits)
+        if not prefix or len(digits) >= cls.NATIONAL_LENGTH:
+            return suffix_query
+        return {'$or': [
+            suffix_query,
+            {f'{cls.FIELD}.phone_national': {'$regex': '^' + re.escape(prefix)}}
+        ]}
+
+    @classmethod
+    def name_query(cls, customer_name: str) -> Dict[str, Any]:
+        """
+        Build an indexed query for a partial customer name.
+
+        Args:
+            customer_name (str): Name fragment typed by the admin
+
+        Returns:
+            dict: MongoDB query fragment
+        """
+        tokens = cls.name_tokens(customer_name)
+        if not tokens:
+            return {}
+
+        grams = cls.ngrams(tokens)
+        folded = ' '.join(tokens)
+        if grams:
+            # N-gram index narrows candidates, folded regex confirms the substring
+            return {
+                f'{cls.FIELD}.name_ngrams': {'$all': grams},
+                f'{cls.FIELD}.name_folded': {'$regex': re.escape(folded)}
+            }
+
+        # Only short tokens - use anchored prefix matches on the token index
+        return {
+            '$and': [
+                {f'{cls.FIELD}.name_tokens': {'$regex': '^' + re.escape(token)}}
+                for token in tokens
+            ]
+        }
+
+    @classmethod
+    def is_backfilled(cls) -> bool:
+        """
+        Check whether every order written before the index has search fields.
+
+        Reads the marker written by backfill(), so startup does not have to
+        scan orders for missing fields.
+        """
+        db = get_database()
+        return db[cls.STATE_COLLECTION_NAME].find_one({'_id': cls.BACKFILLED_MARKER_ID}, {'_id': 1}) is not None
+
+    @classmethod
+    def backfill(cls, batch_size: int = None) -> int:
+        """
+        Populate search fields on orders written before the index existed
+        (or before their current fields were added).
+
+        Args:
+            batch_size (int): Number of orders updated per bulk_write
+
+        Returns:
+            int: Number of orders updated
+        """
+        batch_size = batch_size or cls.BACKFILL_BATCH_SIZE
+        db = get_database()
+        collection = db[cls.COLLECTION_NAME]
+
+        cursor = collection.find(
+            {f'{cls.FIELD}.phone_national': {'$exists': False}},
+            {'customer_phone': 1, 'customer_name': 1}
+        ).batch_size(batch_size)
+
+        updated = 0
+        operations = []
+        for doc in cursor:
+            operations.append(UpdateOne(
+                {'_id': doc['_id']},
+                {'$set': {cls.FIELD: cls.build_fields(doc.get('customer_phone'), doc.get('customer_name'))}}
+            ))
+            if len(operations) >= batch_size:
+                collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+
+        db[cls.STATE_COLLECTION_NAME].replace_one(
+            {'_id': cls.BACKFILLED_MARKER_ID},
+            {'_id': cls.BACKFILLED_MARKER_ID, 'backfilled_at': datetime.utcnow()},
+            upsert=True
+        )
+
+        logger.info(f"Order search fields backfilled for {updated} orders")
+        return updated
+
+    @classmethod
+    def create_indexes(cls):
+        """Create multikey indexes backing the admin order search"""
+        db = get_database()
+        collection = db[cls.COLLECTION_NAME]
+
+        collection.create_index(f'{cls.FIELD}.phone_suffixes', name='search_phone_suffix_index')
+        collection.create_index(f'{cls.FIELD}.phone_national', name='search_phone_national_index')
+        collection.create_index(f'{cls.FIELD}.name_tokens', name='search_name_token_index')
+        collection.create_index(f'{cls.FIELD}.name_ngrams', name='search_name_ngram_index')
@@ -0,0 +1,330 @@
+"""
+Order Statistics Rollup Model for Local Producer Web Application
+
+This module maintains per-day, per-status order counters so the admin
+dashboard can read a handful of small rollup documents instead of
+scanning every order on each request.
+"""
+
+import logging
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from pymongo import UpdateOne
+from app.database import get_database
+from app.utils.money import from_bani
+
+logger = logging.getLogger(__name__)
+
+
+class OrderStats:
+    """
+    Daily order statistics rollups keyed by (day, status).
+
+    Each rollup document holds the number of orders created on a UTC day
+    that currently have the given status, and the revenue of those orders.
+    Documents are updated incrementally with $inc when an order is created
+    or changes status, so reads are O(days) regardless of order volume.
+    """
+
+    # Collection name in MongoDB
+    COLLECTION_NAME = 'order_daily_stats'
+
+    # Marker document written once a full rebuild has completed
+    REBUILT_MARKER_ID = 'rebuilt'
+
+    @staticmethod
+    def day_of(moment: Optional[datetime]) -> datetime:
+        """Truncate a datetime to the start of its UTC day."""
+        if moment is None:
+            moment = datetime.utcnow()
+        return datetime(moment.year, moment.month, moment.day)
+
+    @staticmethod
+    def order_revenue(order: Dict[str, Any]) -> float:
+        """Get the revenue contributed by an order document."""
+        for field in ('total_bani', 'total_amount_bani'):
+            if order.get(field) is not None:
+                return from_bani(order[field])
+        total = order.get('total')
+        if total is None:
+            total = order.get('total_amount', 0)
+        try:
+            return float(total or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    @classmethod
+    def record_order_created(cls, created_at: Optional[datetime], status: str,
+                             revenue: float = 0) -> None:
+        """
+        Count a newly created order in its day/status rollup.
+
+        Args:
+            created_at (datetime): Order creation time
+            status (str): Initial order status
+            revenue (float): Order total
+        """
+        try:
+            db = get_database()
+            db[cls.COLLECTION_NAME].update_one(
+                {'day': cls.day_of(created_at), 'status': status},
+                {
+                    '$inc': {'count': 1, 'revenue': float(revenue or 0)},
+                    '$set': {'updated_at': datetime.utcnow()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record order statistics: {str(e)}")
+
+    @classmethod
+    def record_status_change(cls, created_at: Optional[datetime], old_status: str,
+                             new_status: str, revenue: float = 0) -> None:
+        """
+        Move an order from one status rollup to another.
+
+        Args:
+            created_at (datetime): Order creation time (selects the day bucket)
+            old_status (str): Status before the change
+            new_status (str): Status after the change
+            revenue (float): Order total
+        """
+        cls.record_status_changes([(created_at, old_status, new_status, revenue)])
+
+    @classmethod
+    def record_revenue_change(cls, created_at: Optional[datetime], status: str,
+                              delta: float) -> None:
+        """
+        Adjust a rollup's revenue when an order's total changes.
+
+        Args:
+            created_at (datetime): Order creation time (selects the day bucket)
+            status (str): Current order status
+            delta (float): New total minus old total
+        """
+        if not delta:
+            return
+        try:
+            db = get_database()
+            db[cls.COLLECTION_NAME].update_one(
+                {'day': cls.day_of(created_at), 'status': status},
+                {
+                    '$inc': {'revenue': float(delta)},
+                    '$set': {'updated_at': datetime.utcnow()}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.warning(f"Failed to record order revenue change: {str(e)}")
+
+    @classmethod
+    def record_status_changes(cls, changes: List[Tuple[Optional[datetime], str, str, float]]) -> None:
+        """
+        Apply many status changes to the rollups in one bulk_write.
+
+        Changes falling into the same day and status are coalesced into a
+        single $inc, so a batch of N transitions costs at most one write
+        per touched (day, status) rollup.
+
+        Args:
+            changes (list): (created_at, old_status, new_status, revenue) tuples
+        """
+        deltas = {}
+        for created_at, old_status, new_status, revenue in changes:
+            if old_status == new_status:
+                continue
+            day = cls.day_of(created_at)
+            revenue = float(revenue or 0)
+            for status, sign in ((old_status, -1), (new_status, 1)):
+                delta = deltas.setdefault((day, status), [0, 0.0])
+                delta[0] += sign
+                delta[1] += sign * revenue
+
+        if not deltas:
+            return
+
+        try:
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {'day': day, 'status': status},
+                    {'$inc': {'count': count, 'revenue': revenue}, '$set': {'updated_at': now}},
+                    upsert=True
+                )
+                for (day, status), (count, revenue) in deltas.items()
+                if count or revenue
+            ]
+            if operations:
+                db = get_database()
+                db[cls.COLLECTION_NAME].bulk_write(operations, ordered=False)
+        except Exception as e:
+            logger.warning(f"Failed to record order status change statistics: {str(e)}")
+
+    @classmethod
+    def get_summary(cls, start_date: datetime = None, end_date: datetime = None,
+                    status: str = None) -> Dict[str, Any]:
+        """
+        Summarize order statistics from the daily rollups.
+
+        Args:
+            start_date (datetime): Inclusive start day
+            end_date (datetime): Exclusive end day
+            status (str): Optional status filter
+
+        Returns:
+            dict: total_orders, total_revenue, avg_order_value, status_breakdown
+        """
+        query = {}
+        if start_date or end_date:
+            day_query = {}
+            if start_date:
+                day_query['$gte'] = cls.day_of(start_date)
+            if end_date:
+                day_query['$lt'] = end_date
+            query['day'] = day_query
+        if status:
+            query['status'] = status
+
+        db = get_database()
+        cursor = db[cls.COLLECTION_NAME].find(
+            query, {'_id': 0, 'status': 1, 'count': 1, 'revenue': 1}
+        )
+
+        status_breakdown = {}
+        total_orders = 0
+        total_revenue = 0.0
+        for doc in cursor:
+            count = doc.get('count', 0)
+            if count <= 0:
+                continue
+            status_breakdown[doc['status']] = status_breakdown.get(doc['status'], 0) + count
+            total_orders += count
+            total_revenue += doc.get('revenue', 0)
+
+        return cls._format_summary(total_orders, total_revenue, status_breakdown)
+
+    @classmethod
+    def aggregate_from_orders(cls, query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compute statistics directly from orders with a $group by status.
+
+        Used when the filters cannot be answered from the daily rollups
+        (e.g. customer or total filters). Produces one small document per
+        status instead of collecting every matching order.
+
+        Args:
+            query (dict): Orders match query
+
+        Returns:
+            dict: total_orders, total_revenue, avg_order_value, status_breakdown
+        """
+        pipeline = [
+            {'$match': query},
+            {
+                '$group': {
+                    '_id': '$status',
+                    'count': {'$sum': 1},
+                    'revenue': {'$sum': {'$ifNull': ['$total', '$total_amount']}}
+                }
+            }
+        ]
+
+        db = get_database()
+        status_breakdown = {}
+        total_orders = 0
+        total_revenue = 0.0
+        for doc in db.orders.aggregate(pipeline):
+            status_breakdown[doc['_id']] = doc['count']
+            total_orders += doc['count']
+            total_revenue += doc.get('revenue') or 0
+
+        return cls._format_summary(total_orders, total_revenue, status_breakdown)
+
+    @classmethod
+    def has_rollups(cls) -> bool:
+        """
+        Check whether the rollups cover every order.
+
+        Orders placed before the rollups existed are only counted once
+        rebuild() has run, so the presence of rollup documents alone is not
+        enough: the first order after a deploy creates one.
+        """
+        db = get_database()
+        return db[cls.COLLECTION_NAME].find_one({'_id': cls.REBUILT_MARKER_ID}, {'_id': 1}) is not None
+
+    @classmethod
+    def rebuild(cls, since: datetime = None) -> int:
+        """
+        Rebuild rollup documents from the orders collection.
+
+        Args:
+            since (datetime): Only rebuild days starting from this date
+
+        Returns:
+            int: Number of rollup documents written
+        """
+        db = get_database()
+        match_query = {}
+        rollup_query = {}
+        if since:
+            since = cls.day_of(since)
+            match_query['created_at'] = {'$gte': since}
+            rollup_query['day'] = {'$gte': since}
+
+        pipeline = [
+            {'$match': match_query},
+            {
+                '$group': {
+                    '_id': {
+                        'day': {'$dateTrunc': {'date': '$created_at', 'unit': 'day'}},
+                        'status': '$status'
+                    },
+                    'count': {'$sum': 1},
+                    'revenue': {'$sum': {'$ifNull': ['$total', '$total_amount']}}
+                }
+            }
+        ]
+
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'day': doc['_id']['day'], 'status': doc['_id']['status']},
+                {'$set': {'count': doc['count'], 'revenue': float(doc.get('revenue') or 0), 'updated_at': now}},
+                upsert=True
+            )
+            for doc in db.orders.aggregate(pipeline)
+        ]
+
+        collection = db[cls.COLLECTION_NAME]
+        collection.delete_many(rollup_query)
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+        if not since:
+            collection.replace_one(
+                {'_id': cls.REBUILT_MARKER_ID},
+                {'_id': cls.REBUILT_MARKER_ID, 'rebuilt_at': now},
+                upsert=True
+            )
+
+        logger.info(f"Order statistics rebuilt: {len(operations)} rollup documents")
+        return len(operations)
+
+    @classmethod
+    def create_indexes(cls):
+        """Create database indexes for order statistics rollups"""
+        db = get_database()
+        collection = db[cls.COLLECTION_NAME]
+
+        # One rollup per day and status
+        collection.create_index([('day', 1), ('status', 1)], unique=True, name='day_status_unique')
+
+    @staticmethod
+    def _format_summary(total_orders: int, total_revenue: float,
+                        status_breakdown: Dict[str, int]) -> Dict[str, Any]:
+        """Build the statistics dictionary returned to the admin dashboard."""
+        return {
+            'total_orders': total_orders,
+            'total_revenue': round(total_revenue, 2),
+            'avg_order_value': round(total_revenue / total_orders, 2) if total_orders else 0,
+            'status_breakdown': status_breakdown
+        }
@@ -3,9 +3,11 @@ SMS Log Model for tracking all SMS operations
 """
 
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple
 from bson import ObjectId
+from pymongo import UpdateOne
 from app.database import get_database
+from app.models.sms_stats import SmsStats
 
 class SmsLog:
     """
@@ -83,11 +85,8 @@ class SmsLog:
             'expires_at': self.expires_at
         }
     
-    def save(self) -> ObjectId:
-        """Save log to database"""
-        db = get_database()
-        collection = db.sms_logs
-        
+    def to_document(self) -> Dict[str, Any]:
+        """Prepare the document to store, filling in derived fields"""
         # Update timestamp
         self.updated_at = datetime.utcnow()
         
@@ -103,8 +102,15 @@ class SmsLog:
         if not self.expires_at:
             self.expires_at = datetime.utcnow() + timedelta(days=90)
         
+        return self.to_dict()
+    
+    def save(self) -> ObjectId:
+        """Save log to database"""
+        db = get_database()
+        collection = db.sms_logs
+        
         # Prepare document
-        doc = self.to_dict()
+        doc = self.to_document()
         
         if self._id:
             # Update existing
@@ -121,6 +127,23 @@ class SmsLog:
         
         return self._id
     
+    @classmethod
+    def insert_many(cls, documents: List[Dict[str, Any]]) -> int:
+        """
+        Insert prepared log documents in one unordered batch.
+        
+        Args:
+            documents: Documents from to_document(), with _id already assigned
+            
+        Returns:
+            Number of documents inserted
+        """
+        if not documents:
+            return 0
+        db = get_database()
+        result = db.sms_logs.insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    
     @classmethod
     def find_by_id(cls, log_id: ObjectId) -> Optional['SmsLog']:
         """Find log by ID"""
@@ -135,6 +158,55 @@ class SmsLog:
         doc = db.sms_logs.find_one({'response_token': token})
         return cls(doc) if doc else None
     
+    @classmethod
+    def find_by_response_tokens(cls, tokens: List[str]) -> List['SmsLog']:
+        """Find logs for several provider response tokens in one query"""
+        if not tokens:
+            return []
+        db = get_database()
+        return [cls(doc) for doc in db.sms_logs.find({'response_token': {'$in': tokens}})]
+    
+    @classmethod
+    def update_by_response_tokens(cls, updates: Dict[str, Tuple[str, Dict[str, Any]]]) -> Set[str]:
+        """
+        Move logs keyed by response token out of an expected status in one
+        unordered batch.
+        
+        Each update only matches while the log still has the status it was
+        read with, so when two workers apply the same report only one of
+        them writes it. bulk_write reports counts, not per-operation
+        results: if every update matched they are all ours, otherwise the
+        logs stamped with this batch's id are read back to tell which.
+        
+        Args:
+            updates: (expected current status, fields to $set), per response token
+            
+        Returns:
+            Response tokens whose log this call updated
+        """
+        if not updates:
+            return set()
+        batch_id = ObjectId()
+        db = get_database()
+        result = db.sms_logs.bulk_write(
+            [
+                UpdateOne(
+                    {'response_token': token, 'status': previous_status},
+                    {'$set': {**fields, 'status_batch': batch_id}}
+                )
+                for token, (previous_status, fields) in updates.items()
+            ],
+            ordered=False
+        )
+        if result.matched_count == len(updates):
+            return set(updates)
+        return {
+            doc['response_token'] for doc in db.sms_logs.find(
+                {'response_token': {'$in': list(updates)}, 'status_batch': batch_id},
+                {'response_token': 1}
+            )
+        }
+    
     @classmethod
     def get_logs(cls, filters: Dict[str, Any] = None, 
                  limit: int = 100, skip: int = 0) -> List['SmsLog']:
@@ -161,9 +233,12 @@ class SmsLog:
     def get_statistics(cls, provider: str = None, 
                       start_date: datetime = None,
                       end_date: datetime = None) -> Dict[str, Any]:
-        """Get SMS statistics for a provider and date range"""
-        db = get_database()
+        """
+        Get SMS statistics for a provider and date range.
         
+        Served from the hourly rollups once they exist, with only the
+        current hour grouped from the logs.
+        """
         # Build match query
         match_query = {}
         if provider:
@@ -177,59 +252,9 @@ class SmsLog:
                 date_query['$lte'] = end_date
             match_query['created_at'] = date_query
         
-        # Aggregation pipeline
-        pipeline = [
-            {'$match': match_query},
-            {
-                '$group': {
-                    '_id': {
-                        'provider': '$provider',
-                        'status': '$status'
-                    },
-                    'count': {'$sum': 1},
-                    'total_cost': {'$sum': '$cost'},
-                    'avg_delivery_time': {'$avg': '$delivery_time'}
-                }
-            },
-            {
-                '$group': {
-                    '_id': '$_id.provider',
-                    'stats': {
-                        '$push': {
-                            'status': '$_id.status',
-                            'count': '$count',
-                            'total_cost': '$total_cost',
-                            'avg_delivery_time': '$avg_delivery_time'
-                        }
-                    },
-                    'total_count': {'$sum': '$count'},
-                    'total_cost': {'$sum': '$total_cost'}
-                }
-            }
-        ]
-        
-        results = list(db.sms_logs.aggregate(pipeline))
-        
-        # Format results
-        statistics = {}
-        for result in results:
-            provider_name = result['_id']
-            stats_by_status = {
-                stat['status']: {
-                    'count': stat['count'],
-                    'cost': stat['total_cost'],
-                    'avg_delivery_time': stat['avg_delivery_time']
-                }
-                for stat in result['stats']
-            }
-            
-            statistics[provider_name] = {
-                'total_count': result['total_count'],
-                'total_cost': result['total_cost'],
-                'by_status': stats_by_status
-            }
-        
-        return statistics
+        if SmsStats.has_rollups():
+            return SmsStats.get_statistics(provider, start_date, end_date)
+        return SmsStats.aggregate_from_logs(match_query)
     
     @classmethod
     def create_indexes(cls):
@@ -241,7 +266,7 @@ class SmsLog:
         collection.create_index('phone_masked')  # For privacy-safe queries
         collection.create_index('provider')
         collection.create_index('status')
-        collection.create_index('response_token')
+        collection.create_index('response_token')  # Delivery report updates
         collection.create_index('message_type')
         
         # Date index for queries and sorting
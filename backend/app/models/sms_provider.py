@@ -5,6 +5,7 @@ SMS Provider Model for managing multiple SMS service providers
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Union
 from bson import ObjectId
+from pymongo import UpdateOne
 import json
 from app.database import get_database
 from app.utils.encryption import get_encryption_manager, get_sms_encryption_manager
@@ -20,6 +21,7 @@ class SmsProvider:
     PROVIDER_TWILIO = 'twilio'
     PROVIDER_VONAGE = 'vonage'
     PROVIDER_MOCK = 'mock'
+    PROVIDER_FAULT_INJECTION = 'fault_injection'  # Load tests only
     
     # Message types
     MSG_TYPE_OTP = 'otp'
@@ -147,6 +149,33 @@ class SmsProvider:
         self.usage_stats['total_cost'] += cost
         self.usage_stats['last_used'] = datetime.utcnow()
     
+    @classmethod
+    def increment_usage_stats(cls, counters: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Apply usage counters to several providers atomically.
+        
+        Uses $inc so concurrent writers never lose updates, and one
+        bulk_write for all providers.
+        
+        Args:
+            counters: Per provider slug, a dict with sent, delivered, failed,
+                cost and last_used
+        """
+        operations = []
+        for slug, counts in counters.items():
+            update = {'$inc': {
+                'usage_stats.total_sent': counts.get('sent', 0),
+                'usage_stats.total_delivered': counts.get('delivered', 0),
+                'usage_stats.total_failed': counts.get('failed', 0),
+                'usage_stats.total_cost': counts.get('cost', 0.0)
+            }}
+            if counts.get('last_used'):
+                update['$max'] = {'usage_stats.last_used': counts['last_used']}
+            operations.append(UpdateOne({'slug': slug}, update))
+        
+        if operations:
+            cls.get_collection().bulk_write(operations, ordered=False)
+    
     def update_health_status(self, is_healthy: bool, error_message: str = None) -> None:
         """Update health check status"""
         self.health_status['is_healthy'] = is_healthy
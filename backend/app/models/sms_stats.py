@@ -0,0 +1,339 @@
+"""
+SMS Statistics Rollup Model
+
+This module maintains per-hour, per-provider, per-status SMS counters so
+the provider dashboard reads a handful of small rollup documents instead
+of grouping every SMS log in the date range on each view.
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional, Tuple
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.database import get_database
+
+logger = logging.getLogger(__name__)
+
+# (provider, hour, status) -> counters
+RollupKey = Tuple[str, datetime, str]
+
+
+class SmsStats:
+    """
+    Hourly SMS statistics rollups keyed by (provider, hour, status).
+
+    Each rollup document holds the number of messages created in a UTC
+    hour through a provider that currently have the given status, their
+    cost, and the summed delivery time of those with one. Documents are
+    updated with $inc as logs are written and delivery reports move
+    messages between statuses; reads add the current, still changing hour
+    from the raw logs.
+    """
+
+    # Collection name in MongoDB
+    COLLECTION_NAME = 'sms_hourly_stats'
+
+    # State document holding the rebuild lock and the completed-rebuild marker
+    REBUILD_STATE_ID = 'rebuild'
+
+    # Seconds before a lock left by a crashed rebuild can be taken over
+    REBUILD_LOCK_SECONDS = 600
+
+    @staticmethod
+    def hour_of(moment: Optional[datetime]) -> datetime:
+        """Truncate a datetime to the start of its UTC hour."""
+        if moment is None:
+            moment = datetime.utcnow()
+        return moment.replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def add_delta(cls, deltas: Dict[RollupKey, Dict[str, float]], provider: str,
+                  created_at: Optional[datetime], status: str, cost: float = 0,
+                  delivery_time: Optional[float] = None, sign: int = 1) -> None:
+        """
+        Add (or with sign=-1 remove) one message to pending rollup deltas.
+
+        Args:
+            deltas: Pending deltas, updated in place
+            provider: Provider slug
+            created_at: Message creation time (selects the hour bucket)
+            status: Message status
+            cost: Message cost in eurocents
+            delivery_time: Seconds until delivery, if known
+            sign: 1 to add the message, -1 to remove it
+        """
+        delta = deltas.setdefault(
+            (provider, cls.hour_of(created_at), status),
+            {'count': 0, 'cost': 0.0, 'delivery_time': 0.0, 'delivery_count': 0}
+        )
+        delta['count'] += sign
+        delta['cost'] += sign * float(cost or 0)
+        if delivery_time is not None:
+            delta['delivery_time'] += sign * float(delivery_time)
+            delta['delivery_count'] += sign
+
+    @classmethod
+    def apply_deltas(cls, deltas: Dict[RollupKey, Dict[str, float]]) -> int:
+        """
+        Apply pending deltas with one bulk_write of $inc upserts.
+
+        Args:
+            deltas: Counters per (provider, hour, status)
+
+        Returns:
+            int: Number of rollup documents touched
+        """
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {'provider': provider, 'hour': hour, 'status': status},
+                {'$inc': delta, '$set': {'updated_at': now}},
+                upsert=True
+            )
+            for (provider, hour, status), delta in deltas.items()
+            if delta['count'] or delta['cost'] or delta['delivery_count']
+        ]
+        if operations:
+            db = get_database()
+            db[cls.COLLECTION_NAME].bulk_write(operations, ordered=False)
+        return len(operations)
+
+    @classmethod
+    def get_statistics(cls, provider: str = None, start_date: datetime = None,
+                       end_date: datetime = None) -> Dict[str, Any]:
+        """
+        Get SMS statistics from the rollups plus the current hour's logs.
+
+        Completed hours come from the rollups, so dates before the current
+        hour have hourly resolution; the current partial hour is grouped
+        from the raw logs.
+
+        Args:
+            provider (str): Optional provider slug
+            start_date (datetime): Inclusive start
+            end_date (datetime): Inclusive end
+
+        Returns:
+            dict: Per provider, total_count, total_cost and by_status
+        """
+        current_hour = cls.hour_of(datetime.utcnow())
+        totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+        hour_query = {'$lt': current_hour}
+        if start_date:
+            hour_query['$gte'] = cls.hour_of(start_date)
+        if end_date and end_date < current_hour:
+            hour_query['$lte'] = end_date
+        query = {'hour': hour_query}
+        if provider:
+            query['provider'] = provider
+
+        db = get_database()
+        for doc in db[cls.COLLECTION_NAME].find(query, {'_id': 0, 'hour': 0, 'updated_at': 0}):
+            cls._accumulate(totals, doc)
+
+        if end_date is None or end_date >= current_hour:
+            created_at = {'$gte': max(current_hour, start_date) if start_date else current_hour}
+            if end_date:
+                created_at['$lte'] = end_date
+            match_query = {'created_at': created_at}
+            if provider:
+                match_query['provider'] = provider
+            for doc in cls._group_logs(match_query):
+                cls._accumulate(totals, doc)
+
+        return cls._format_statistics(totals)
+
+    @classmethod
+    def aggregate_from_logs(cls, match_query: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compute statistics directly from the SMS logs.
+
+        Used until rollups have been built.
+
+        Args:
+            match_query (dict): SMS logs match query
+
+        Returns:
+            dict: Per provider, total_count, total_cost and by_status
+        """
+        totals: Dict[Tuple[str, str], Dict[str, float]] = {}
+        for doc in cls._group_logs(match_query):
+            cls._accumulate(totals, doc)
+        return cls._format_statistics(totals)
+
+    @classmethod
+    def has_rollups(cls) -> bool:
+        """
+        Check whether the rollups cover every SMS log.
+
+        Logs written before the rollups existed are only counted once a
+        full rebuild() has completed. The first telemetry flush after a
+        deploy creates rollup documents, so their presence is not enough.
+        """
+        db = get_database()
+        return db[cls.COLLECTION_NAME].find_one(
+            {'_id': cls.REBUILD_STATE_ID, 'rebuilt_at': {'$exists': True}}, {'_id': 1}
+        ) is not None
+
+    @classmethod
+    def rebuild(cls, since: datetime = None) -> int:
+        """
+        Rebuild rollup documents from the sms_logs collection.
+
+        Only one worker rebuilds at a time: the others see the lock on the
+        rebuild state document and return. Rollups are overwritten with
+        $set per key instead of being deleted first, so $inc deltas other
+        workers flush while the rebuild runs are not wiped. Rollups in the
+        range that no log maps to any more are zeroed, unless a delta
+        touched them after the rebuild started. Only a delta flushed in the
+        short gap between the aggregation and its $set can still be lost or
+        counted twice.
+
+        Args:
+            since (datetime): Only rebuild hours starting from this time
+
+        Returns:
+            int: Number of rollup documents written (0 if another worker
+            holds the rebuild lock)
+        """
+        db = get_database()
+        collection = db[cls.COLLECTION_NAME]
+        now = datetime.utcnow()
+
+        try:
+            collection.update_one(
+                {
+                    '_id': cls.REBUILD_STATE_ID,
+                    '$or': [{'locked_until': {'$exists': False}}, {'locked_until': {'$lt': now}}]
+                },
+                {'$set': {'locked_until': now + timedelta(seconds=cls.REBUILD_LOCK_SECONDS)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            logger.info("SMS statistics rebuild already running in another worker")
+            return 0
+
+        completed = False
+        try:
+            match_query = {}
+            rollup_query = {'hour': {'$exists': True}}
+            if since:
+                since = cls.hour_of(since)
+                match_query['created_at'] = {'$gte': since}
+                rollup_query['hour'] = {'$gte': since}
+
+            pipeline = [
+                {'$match': match_query},
+                {
+                    '$group': {
+                        '_id': {
+                            'provider': '$provider',
+                            'hour': {'$dateTrunc': {'date': '$created_at', 'unit': 'hour'}},
+                            'status': '$status'
+                        },
+                        **cls._group_fields()
+                    }
+                }
+            ]
+
+            operations = [
+                UpdateOne(
+                    {'provider': doc['_id']['provider'], 'hour': doc['_id']['hour'],
+                     'status': doc['_id']['status']},
+                    {'$set': {
+                        'count': doc['count'],
+                        'cost': float(doc.get('cost') or 0),
+                        'delivery_time': float(doc.get('delivery_time') or 0),
+                        'delivery_count': doc.get('delivery_count', 0),
+                        'updated_at': now
+                    }},
+                    upsert=True
+                )
+                for doc in db.sms_logs.aggregate(pipeline)
+            ]
+
+            if operations:
+                collection.bulk_write(operations, ordered=False)
+            # Leftover rollups: neither rebuilt above nor touched by a delta since
+            collection.update_many(
+                {**rollup_query, 'updated_at': {'$lt': now}},
+                {'$set': {'count': 0, 'cost': 0.0, 'delivery_time': 0.0, 'delivery_count': 0}}
+            )
+            completed = True
+        finally:
+            release = {'$unset': {'locked_until': ''}}
+            if completed and not since:
+                release['$set'] = {'rebuilt_at': now}
+            collection.update_one({'_id': cls.REBUILD_STATE_ID}, release)
+
+        logger.info(f"SMS statistics rebuilt: {len(operations)} rollup documents")
+        return len(operations)
+
+    @classmethod
+    def create_indexes(cls):
+        """Create database indexes for SMS statistics rollups"""
+        db = get_database()
+        collection = db[cls.COLLECTION_NAME]
+
+        # One rollup per provider, hour and status
+        collection.create_index(
+            [('provider', 1), ('hour', 1), ('status', 1)],
+            unique=True, name='provider_hour_status_unique'
+        )
+
+        # Dashboard reads across all providers by time range
+        collection.create_index([('hour', 1)])
+
+    @staticmethod
+    def _group_fields() -> Dict[str, Any]:
+        """$group accumulators shared by the raw-log aggregations"""
+        return {
+            'count': {'$sum': 1},
+            'cost': {'$sum': '$cost'},
+            'delivery_time': {'$sum': '$delivery_time'},
+            'delivery_count': {'$sum': {'$cond': [{'$gt': ['$delivery_time', None]}, 1, 0]}}
+        }
+
+    @classmethod
+    def _group_logs(cls, match_query: Dict[str, Any]):
+        """Group SMS logs by provider and status in one $group stage"""
+        pipeline = [
+            {'$match': match_query},
+            {'$group': {'_id': {'provider': '$provider', 'status': '$status'}, **cls._group_fields()}},
+            {'$project': {
+                '_id': 0, 'provider': '$_id.provider', 'status': '$_id.status',
+                'count': 1, 'cost': 1, 'delivery_time': 1, 'delivery_count': 1
+            }}
+        ]
+        db = get_database()
+        return db.sms_logs.aggregate(pipeline)
+
+    @staticmethod
+    def _accumulate(totals: Dict[Tuple[str, str], Dict[str, float]], doc: Dict[str, Any]) -> None:
+        """Add a rollup or grouped-log document to per (provider, status) totals"""
+        total = totals.setdefault(
+            (doc['provider'], doc['status']),
+            {'count': 0, 'cost': 0.0, 'delivery_time': 0.0, 'delivery_count': 0}
+        )
+        for field in total:
+            total[field] += doc.get(field) or 0
+
+    @staticmethod
+    def _format_statistics(totals: Dict[Tuple[str, str], Dict[str, float]]) -> Dict[str, Any]:
+        """Build the per-provider statistics returned to the dashboard."""
+        statistics = {}
+        for (provider, status), total in totals.items():
+            if total['count'] <= 0:
+                continue
+            entry = statistics.setdefault(provider, {'total_count': 0, 'total_cost': 0.0, 'by_status': {}})
+            entry['by_status'][status] = {
+                'count': total['count'],
+                'cost': total['cost'],
+                'avg_delivery_time': (total['delivery_time'] / total['delivery_count']
+                                      if total['delivery_count'] else None)
+            }
+            entry['total_count'] += total['count']
+            entry['total_cost'] += total['cost']
+        return statistics
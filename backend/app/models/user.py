@@ -7,12 +7,12 @@ password management, and phone verification functionality.
 
 import re
 import logging
-import bcrypt
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Union
 from bson import ObjectId
 from pymongo.errors import DuplicateKeyError
 from app.database import get_database
+from app.services.password_hasher import get_password_hasher, PasswordHasherBusy
 from app.utils.error_handlers import DatabaseError, ValidationError
 from app.utils.validators import validate_phone_number
 
@@ -33,9 +33,6 @@ class User:
     ROLE_ADMIN = 'admin'
     VALID_ROLES = [ROLE_CUSTOMER, ROLE_ADMIN]
     
-    # Password hashing configuration
-    BCRYPT_ROUNDS = 12
-    
     # Verification code configuration
     VERIFICATION_CODE_LENGTH = 6
     VERIFICATION_CODE_EXPIRY_MINUTES = 10
@@ -79,6 +76,7 @@ class User:
         Raises:
             ValidationError: If input validation fails
             DatabaseError: If user creation fails (e.g., duplicate phone)
+            PasswordHasherBusy: If the hashing queue is full
         """
         try:
             # Validate inputs
@@ -136,7 +134,7 @@ class User:
                 {"field": "phone_number", "value": phone_number}
             )
         except Exception as e:
-            if isinstance(e, (ValidationError, DatabaseError)):
+            if isinstance(e, (ValidationError, DatabaseError, PasswordHasherBusy)):
                 raise
             logging.error(f"Error creating user: {str(e)}")
             raise DatabaseError("Failed to create user", "DB_001")
@@ -232,6 +230,10 @@ class User:
                 update_data['role'] = data['role']
                 self.role = data['role']
             
+            if 'password_hash' in data:
+                update_data['password_hash'] = data['password_hash']
+                self.password_hash = data['password_hash']
+            
             if 'is_verified' in data:
                 update_data['is_verified'] = bool(data['is_verified'])
                 self.is_verified = bool(data['is_verified'])
@@ -273,6 +275,9 @@ class User:
             
         Returns:
             bool: True if password set successfully
+            
+        Raises:
+            PasswordHasherBusy: If the hashing queue is full
         """
         try:
             if len(password) < 8:
@@ -283,7 +288,7 @@ class User:
             return self.update({'password_hash': password_hash})
             
         except Exception as e:
-            if isinstance(e, ValidationError):
+            if isinstance(e, (ValidationError, PasswordHasherBusy)):
                 raise
             logging.error(f"Error setting password: {str(e)}")
             raise DatabaseError("Failed to set password", "DB_001")
@@ -297,16 +302,18 @@ class User:
             
         Returns:
             bool: True if password matches
+            
+        Raises:
+            PasswordHasherBusy: If the hashing queue is full
         """
         try:
             if not self.password_hash:
                 return False
             
-            return bcrypt.checkpw(
-                password.encode('utf-8'),
-                self.password_hash.encode('utf-8')
-            )
+            return get_password_hasher().verify(password, self.password_hash)
             
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             logging.error(f"Error verifying password: {str(e)}")
             return False
@@ -439,7 +446,7 @@ class User:
     @staticmethod
     def _hash_password(password: str) -> str:
         """
-        Hash password using bcrypt.
+        Hash password using bcrypt with the configured BCRYPT_LOG_ROUNDS.
         
         Args:
             password (str): Plain text password
@@ -447,9 +454,7 @@ class User:
         Returns:
             str: Hashed password
         """
-        salt = bcrypt.gensalt(rounds=User.BCRYPT_ROUNDS)
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        return get_password_hasher().hash(password)
     
     def __repr__(self) -> str:
         """String representation of User object."""
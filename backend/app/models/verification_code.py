@@ -0,0 +1,184 @@
+"""
+Verification Code Model
+
+This module is the one store for SMS verification codes (OTPs). Each phone
+has at most one document per purpose (account verification, checkout)
+holding a keyed hash of its current code, an attempt counter and an expiry
+covered by a TTL index, so codes are never stored in plain text and every
+guess is counted atomically before it is compared.
+"""
+
+import hmac
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from flask import current_app
+from pymongo import ReturnDocument
+from app.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+class VerificationCode:
+    """
+    Hashed, single-use verification codes keyed by phone number and purpose.
+
+    Issuing a code replaces the phone's document for that purpose, so a
+    checkout code never resets the account verification state. Verifying
+    first counts the attempt in one find_one_and_update guarded by the
+    attempt limit, so parallel guesses cannot all slip past the guard before
+    the counter moves, then compares the hash on the returned document. A
+    correct code is consumed by an update matching its hash, so two
+    concurrent verifies cannot both succeed.
+    """
+
+    # Collection name in MongoDB
+    COLLECTION_NAME = 'sms_verification_codes'
+
+    # Guesses allowed per issued code
+    MAX_ATTEMPTS = 5
+
+    # Code purposes
+    ACCOUNT = 'account'
+    CHECKOUT = 'checkout'
+
+    # Verify outcomes
+    VERIFIED = 'verified'
+    INVALID = 'invalid'
+    EXPIRED = 'expired'
+    NOT_FOUND = 'not_found'
+    TOO_MANY_ATTEMPTS = 'too_many_attempts'
+
+    @staticmethod
+    def hash_code(phone_number: str, code: str) -> str:
+        """
+        Hash a code for storage.
+
+        Six digits are trivial to brute force from a plain digest, so the
+        hash is keyed with the application secret and bound to the phone.
+        """
+        try:
+            secret = current_app.config.get('SECRET_KEY')
+        except RuntimeError:
+            # Outside an application context (scripts, tests)
+            secret = None
+        key = (secret or 'dev-secret-key').encode()
+        return hmac.new(key, f"{phone_number}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    @classmethod
+    def issue(cls, phone_number: str, code: str, ttl_seconds: int, purpose: str = ACCOUNT) -> datetime:
+        """
+        Store a new code for a phone, replacing any previous one for the purpose.
+
+        Args:
+            phone_number (str): Normalized phone number
+            code (str): Plain verification code (only its hash is stored)
+            ttl_seconds (int): Seconds until the code expires
+            purpose (str): ACCOUNT or CHECKOUT
+
+        Returns:
+            datetime: Expiry time of the code
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=ttl_seconds)
+
+        db = get_database()
+        db[cls.COLLECTION_NAME].replace_one(
+            {'phone_number': phone_number, 'purpose': purpose},
+            {
+                'phone_number': phone_number,
+                'purpose': purpose,
+                'code_hash': cls.hash_code(phone_number, code),
+                'attempts': 0,
+                'created_at': now,
+                'expires_at': expires_at,
+                'verified': False
+            },
+            upsert=True
+        )
+        return expires_at
+
+    @classmethod
+    def verify(cls, phone_number: str, code: str, purpose: str = ACCOUNT) -> str:
+        """
+        Verify and consume a code.
+
+        Args:
+            phone_number (str): Normalized phone number
+            code (str): Code entered by the user
+            purpose (str): ACCOUNT or CHECKOUT
+
+        Returns:
+            str: VERIFIED, INVALID, EXPIRED, NOT_FOUND or TOO_MANY_ATTEMPTS
+        """
+        now = datetime.utcnow()
+        collection = get_database()[cls.COLLECTION_NAME]
+        code_hash = cls.hash_code(phone_number, code)
+
+        # Count the guess before comparing it: the attempts guard and the
+        # increment are one atomic update, so parallel guesses are counted
+        # one by one and at most MAX_ATTEMPTS of them ever see the hash
+        pending = collection.find_one_and_update(
+            {
+                'phone_number': phone_number,
+                'purpose': purpose,
+                'code_hash': {'$exists': True},
+                'attempts': {'$lt': cls.MAX_ATTEMPTS}
+            },
+            {'$inc': {'attempts': 1}},
+            projection={'_id': 1, 'code_hash': 1, 'expires_at': 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if pending is None:
+            # No pending code, or its attempts are used up
+            exhausted = collection.find_one(
+                {'phone_number': phone_number, 'purpose': purpose, 'code_hash': {'$exists': True}},
+                {'_id': 0, 'expires_at': 1}
+            )
+            if exhausted is None:
+                return cls.NOT_FOUND
+            if exhausted['expires_at'] <= now:
+                return cls.EXPIRED
+            return cls.TOO_MANY_ATTEMPTS
+
+        if pending['expires_at'] <= now:
+            return cls.EXPIRED
+        if not hmac.compare_digest(pending['code_hash'], code_hash):
+            return cls.INVALID
+
+        # Consume the code; matching on the hash means only one of two
+        # concurrent correct verifies succeeds
+        consumed = collection.update_one(
+            {'_id': pending['_id'], 'code_hash': code_hash},
+            {
+                '$set': {'verified': True, 'verified_at': now},
+                '$unset': {'code_hash': ''}
+            }
+        )
+        if consumed.modified_count == 0:
+            return cls.NOT_FOUND
+        return cls.VERIFIED
+
+    @classmethod
+    def find_by_phone(cls, phone_number: str, purpose: str = ACCOUNT) -> Optional[dict]:
+        """Get the verification document for a phone and purpose, without its hash"""
+        db = get_database()
+        return db[cls.COLLECTION_NAME].find_one(
+            {'phone_number': phone_number, 'purpose': purpose}, {'code_hash': 0}
+        )
+
+    @classmethod
+    def create_indexes(cls):
+        """Create database indexes for verification codes"""
+        db = get_database()
+        collection = db[cls.COLLECTION_NAME]
+
+        # MongoDB removes codes once they expire
+        collection.create_index('expires_at', expireAfterSeconds=0)
+
+        # One code per phone and purpose; the old per-phone index would
+        # reject a checkout code for a phone with an account code
+        if 'phone_number_1' in collection.index_information():
+            collection.drop_index('phone_number_1')
+        collection.create_index([('phone_number', 1), ('purpose', 1)], unique=True)
@@ -7,4 +7,5 @@ admin_bp = Blueprint('admin', __name__, url_prefix='/api/admin')
 from .products import *
 from .categories import *
 from .orders import *
-from .images import *
\ No newline at end of file
+from .images import *
+from .sms import *
\ No newline at end of file
@@ -1,6 +1,8 @@
 from flask import request, jsonify
 from app.routes.admin import admin_bp
 from app.models.order import Order
+from app.models.order_stats import OrderStats
+from app.models.order_search import OrderSearchIndex
 from app.database import get_database
 from app.utils.auth_middleware import require_admin_auth as admin_required
 from bson import ObjectId
@@ -32,7 +34,7 @@ def get_admin_orders():
         if status:
             query['status'] = status
         if phone:
-            query['customer_phone'] = {'$regex': phone, '$options': 'i'}
+            query.update(OrderSearchIndex.phone_query(phone))
         if start_date or end_date:
             date_query = {}
             if start_date:
@@ -203,21 +205,29 @@ def update_admin_order_status(order_id):
         if new_status not in valid_statuses:
             return jsonify({'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
         
-        # Update order
+        # Update order, returning the previous document for statistics
         db = get_database()
-        result = db.orders.update_one(
+        previous = db.orders.find_one_and_update(
             {'_id': ObjectId(order_id)},
             {
                 '$set': {
                     'status': new_status,
                     'updatedAt': datetime.utcnow()
                 }
-            }
+            },
+            projection={'status': 1, 'created_at': 1, 'total': 1, 'total_amount': 1}
         )
         
-        if result.matched_count == 0:
+        if previous is None:
             return jsonify({'error': 'Order not found'}), 404
         
+        OrderStats.record_status_change(
+            previous.get('created_at'),
+            previous.get('status', 'pending'),
+            new_status,
+            OrderStats.order_revenue(previous)
+        )
+        
         # Log status change
         logger.info(f"Order {order_id} status updated to {new_status}")
         
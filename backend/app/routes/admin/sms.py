@@ -0,0 +1,18 @@
+from flask import jsonify
+from app.routes.admin import admin_bp
+from app.services.sms.sms_manager import get_sms_manager
+from app.utils.auth_middleware import require_admin_auth as admin_required
+import logging
+
+logger = logging.getLogger(__name__)
+
+@admin_bp.route('/sms/webhooks/stats', methods=['GET'])
+@admin_required
+def get_sms_webhook_stats():
+    """Get delivery report queue counters and processing lag"""
+    try:
+        return jsonify({'stats': get_sms_manager().webhook_queue.get_stats()})
+        
+    except Exception as e:
+        logger.error(f"Error fetching SMS webhook stats: {str(e)}")
+        return jsonify({'error': 'Failed to fetch SMS webhook stats'}), 500
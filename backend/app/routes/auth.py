@@ -6,13 +6,15 @@ login, phone verification, password management, and admin authentication.
 """
 
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from functools import wraps
 from flask import Blueprint, request, jsonify, session, current_app
 from app.models.user import User
 from app.services.sms_service import get_sms_service
 from app.services.auth_service import AuthService
+from app.services.password_hasher import PasswordHasherBusy
 from app.utils.validators import validate_json, USER_SCHEMA
+from app.utils.rate_limit_engine import get_rate_limit_engine
 from app.utils.error_handlers import (
     ValidationError, AuthenticationError, AuthorizationError, SMSError,
     success_response, create_error_response
@@ -24,9 +26,6 @@ auth_bp = Blueprint('auth', __name__)
 # Initialize admin authentication service
 admin_auth_service = AuthService()
 
-# Rate limiting storage (in-memory for demo)
-_rate_limit_storage = {}
-
 # Rate limiting constants
 LOGIN_RATE_LIMIT = 5
 LOGIN_RATE_WINDOW = 900  # 15 minutes
@@ -62,56 +61,26 @@ def require_auth(f):
     return decorated_function
 
 
-def check_rate_limit(limit_type: str, identifier: str, limit: int, window: int) -> bool:
-    """Check if request is rate limited."""
-    now = datetime.utcnow()
-    key = f"{limit_type}:{identifier}"
-    
-    # Clean up old entries
-    _cleanup_rate_limits(now, window)
-    
-    # Check current attempts
-    if key in _rate_limit_storage:
-        attempts = _rate_limit_storage[key]['attempts']
-        if len(attempts) >= limit:
-            return True
-    
-    return False
+def hasher_busy_response():
+    """Shed a request while password hashing is saturated (429 with Retry-After)."""
+    response, status = create_error_response(
+        "AUTH_019",
+        "Server is busy. Try again in a few seconds.",
+        429
+    )
+    response = jsonify(response)
+    response.headers['Retry-After'] = '1'
+    return response, status
 
 
-def track_rate_limit(limit_type: str, identifier: str, window: int):
-    """Track rate limit attempt."""
-    now = datetime.utcnow()
-    key = f"{limit_type}:{identifier}"
-    
-    if key not in _rate_limit_storage:
-        _rate_limit_storage[key] = {'attempts': []}
-    
-    _rate_limit_storage[key]['attempts'].append(now)
-    
-    # Keep only attempts within window
-    cutoff = now - timedelta(seconds=window)
-    _rate_limit_storage[key]['attempts'] = [
-        attempt for attempt in _rate_limit_storage[key]['attempts']
-        if attempt > cutoff
-    ]
+def check_rate_limit(limit_type: str, identifier: str, limit: int, window: int) -> bool:
+    """Check if request is rate limited (does not count the request)."""
+    return not get_rate_limit_engine().peek(f"auth:{limit_type}:{identifier}", limit, window).allowed
 
 
-def _cleanup_rate_limits(now: datetime, window: int):
-    """Clean up old rate limit entries."""
-    cutoff = now - timedelta(seconds=window)
-    to_remove = []
-    
-    for key, entry in _rate_limit_storage.items():
-        entry['attempts'] = [
-            attempt for attempt in entry['attempts']
-            if attempt > cutoff
-        ]
-        if not entry['attempts']:
-            to_remove.append(key)
-    
-    for key in to_remove:
-        del _rate_limit_storage[key]
+def track_rate_limit(limit_type: str, identifier: str, limit: int, window: int):
+    """Track rate limit attempt."""
+    get_rate_limit_engine().acquire(f"auth:{limit_type}:{identifier}", limit, window)
 
 
 @auth_bp.route('/register', methods=['POST'])
@@ -177,7 +146,7 @@ def register():
         sms_result = sms_service.send_verification_code(phone_number, verification_code)
         
         # Track rate limit
-        track_rate_limit('register', client_ip, REGISTER_RATE_WINDOW)
+        track_rate_limit('register', client_ip, REGISTER_RATE_LIMIT, REGISTER_RATE_WINDOW)
         
         # Log successful registration
         logging.info(f"User registered: {phone_number[-4:]} (SMS sent: {sms_result['code_sent']})")
@@ -201,6 +170,10 @@ def register():
         )
         return jsonify(response), status
         
+    except PasswordHasherBusy:
+        logging.warning("Registration shed, password hashing busy")
+        return hasher_busy_response()
+        
     except Exception as e:
         logging.error(f"Registration error: {str(e)}")
         response, status = create_error_response(
@@ -408,7 +381,7 @@ def login():
         user = User.find_by_phone(phone_number)
         if not user:
             # Track failed attempt
-            track_rate_limit('login', phone_number, LOGIN_RATE_WINDOW)
+            track_rate_limit('login', phone_number, LOGIN_RATE_LIMIT, LOGIN_RATE_WINDOW)
             response, status = create_error_response(
                 "AUTH_001",
                 "Invalid phone number or password",
@@ -428,7 +401,7 @@ def login():
         # Verify password
         if not user.verify_password(password):
             # Track failed attempt
-            track_rate_limit('login', phone_number, LOGIN_RATE_WINDOW)
+            track_rate_limit('login', phone_number, LOGIN_RATE_LIMIT, LOGIN_RATE_WINDOW)
             response, status = create_error_response(
                 "AUTH_001",
                 "Invalid phone number or password",
@@ -458,6 +431,10 @@ def login():
             'session_created': True
         }, "Login successful")), 200
         
+    except PasswordHasherBusy:
+        logging.warning("Login shed, password hashing busy")
+        return hasher_busy_response()
+        
     except Exception as e:
         logging.error(f"Login error: {str(e)}")
         response, status = create_error_response(
@@ -535,7 +512,7 @@ def change_password():
         # Verify current password
         if not user.verify_password(current_password):
             # Track failed attempt
-            track_rate_limit('password_change', user_id, PASSWORD_CHANGE_RATE_WINDOW)
+            track_rate_limit('password_change', user_id, PASSWORD_CHANGE_RATE_LIMIT, PASSWORD_CHANGE_RATE_WINDOW)
             response, status = create_error_response(
                 "AUTH_001",
                 "Current password is incorrect",
@@ -556,7 +533,7 @@ def change_password():
         user.set_password(new_password)
         
         # Track successful attempt
-        track_rate_limit('password_change', user_id, PASSWORD_CHANGE_RATE_WINDOW)
+        track_rate_limit('password_change', user_id, PASSWORD_CHANGE_RATE_LIMIT, PASSWORD_CHANGE_RATE_WINDOW)
         
         logging.info(f"Password changed: {user.phone_number[-4:]}")
         
@@ -564,6 +541,10 @@ def change_password():
             'password_changed': True
         }, "Password changed successfully")), 200
         
+    except PasswordHasherBusy:
+        logging.warning("Password change shed, password hashing busy")
+        return hasher_busy_response()
+        
     except Exception as e:
         logging.error(f"Password change error: {str(e)}")
         response, status = create_error_response(
@@ -728,9 +709,12 @@ def admin_login():
         response, status = create_error_response(
             e.error_code,
             e.message,
-            401 if e.error_code in ['AUTH_001', 'AUTH_002', 'AUTH_003'] else (429 if e.error_code == 'AUTH_015' else 500)
+            401 if e.error_code in ['AUTH_001', 'AUTH_002', 'AUTH_003'] else (429 if e.error_code in ['AUTH_015', 'AUTH_019'] else 500)
         )
-        return jsonify(response), status
+        response = jsonify(response)
+        if e.error_code == 'AUTH_019':
+            response.headers['Retry-After'] = '1'
+        return response, status
         
     except Exception as e:
         logging.error(f"Admin login error: {str(e)} for {data.get('username', 'unknown')} from IP {request.remote_addr}")
@@ -1110,13 +1094,16 @@ def admin_initial_setup():
         
     except AuthenticationError as e:
         logging.warning(f"Admin setup failed: {str(e)} from IP {request.remote_addr}")
-        status_code = 409 if e.error_code == 'AUTH_016' else 500
+        status_code = 409 if e.error_code == 'AUTH_016' else (429 if e.error_code == 'AUTH_019' else 500)
         response, status = create_error_response(
             e.error_code,
             e.message,
             status_code
         )
-        return jsonify(response), status
+        response = jsonify(response)
+        if e.error_code == 'AUTH_019':
+            response.headers['Retry-After'] = '1'
+        return response, status
         
     except Exception as e:
         logging.error(f"Admin setup error: {str(e)} from IP {request.remote_addr}")
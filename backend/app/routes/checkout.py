@@ -10,15 +10,18 @@ from flask import Blueprint, request, jsonify, current_app, g
 from datetime import datetime, timedelta
 import logging
 from app.models.customer_phone import CustomerPhone
+from app.models.verification_code import VerificationCode
 from app.services.sms.sms_manager import get_sms_manager
 from app.services.sms.provider_interface import SmsMessage
 from app.utils.checkout_rate_limiter import (
     get_checkout_rate_limiter,
     check_sms_limit_phone,
     check_sms_limit_ip,
+    acquire_verify_limit_ip,
     record_sms_sent
 )
 from app.utils.checkout_auth import checkout_auth_required, checkout_auth_optional
+from app.utils.idempotency import idempotent
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +66,7 @@ def get_client_ip():
 
 
 @checkout_bp.route('/phone/send-code', methods=['POST'])
+@idempotent('checkout_send_code')
 def send_verification_code():
     """
     Send SMS verification code to phone number.
@@ -70,6 +74,9 @@ def send_verification_code():
     Rate limits:
     - 3 SMS per phone per day
     - 5 SMS per IP per hour
+    
+    Retries sent with the same Idempotency-Key header replay the first
+    response without generating or sending another code.
     """
     logger.info(f"=== SEND VERIFICATION CODE START ===")
     logger.info(f"Request method: {request.method}")
@@ -154,13 +161,12 @@ def send_verification_code():
         if not customer:
             customer = CustomerPhone({'phone': normalized_phone})
         
-        # Store verification code
+        # Store the hashed code in the OTP store (valid 5 minutes)
+        VerificationCode.issue(normalized_phone, code, 300, VerificationCode.CHECKOUT)
+        
         if not customer.verification:
             customer.verification = {}
         
-        customer.verification['code'] = code
-        customer.verification['code_expires'] = datetime.utcnow() + timedelta(minutes=5)
-        customer.verification['attempts'] = 0
         customer.verification['last_code_sent'] = datetime.utcnow()
         
         # Update attempts today
@@ -241,7 +247,7 @@ def verify_code():
     """
     Verify SMS code and create session.
     
-    Rate limit: 5 attempts per code
+    Rate limit: 5 attempts per code, 30 verifications per IP per hour
     """
     try:
         data = request.get_json()
@@ -289,37 +295,29 @@ def verify_code():
         
         normalized_phone = temp_customer.normalize_phone(phone)
         
-        # Check rate limit for verification attempts
-        from app.utils.checkout_rate_limiter import check_verify_attempts, record_verify_attempt
-        allowed, info = check_verify_attempts(normalized_phone, code)
-        
-        if not allowed:
-            rate_limiter = get_checkout_rate_limiter()
-            error_info = rate_limiter.get_error_message('verify_attempts_per_code', info)
+        # Count the attempt against the IP before touching the code, so
+        # one client cannot spread guesses across many phones
+        ip_allowed, ip_info = acquire_verify_limit_ip(get_client_ip())
+        if not ip_allowed:
+            error_info = get_checkout_rate_limiter().get_error_message('verify_per_ip_per_hour', ip_info)
             return jsonify({
                 'success': False,
                 'error': error_info
             }), 429
         
-        # Find customer record
-        customer = CustomerPhone.find_by_phone(normalized_phone)
-        if not customer:
-            # Record failed attempt
-            record_verify_attempt(normalized_phone, code)
+        # Count the attempt and check the code atomically; the store
+        # allows 5 attempts per code
+        outcome = VerificationCode.verify(normalized_phone, str(code), VerificationCode.CHECKOUT)
+        
+        if outcome == VerificationCode.TOO_MANY_ATTEMPTS:
+            rate_limiter = get_checkout_rate_limiter()
+            error_info = rate_limiter.get_error_message('verify_attempts_per_code', {})
             return jsonify({
                 'success': False,
-                'error': {
-                    'code': 'INVALID_CODE',
-                    'message': 'Cod invalid sau expirat'
-                }
-            }), 400
-        
-        # Check if code matches and is not expired
-        stored_code = customer.verification.get('code')
-        code_expires = customer.verification.get('code_expires')
+                'error': error_info
+            }), 429
         
-        if not stored_code or not code_expires:
-            record_verify_attempt(normalized_phone, code)
+        if outcome == VerificationCode.NOT_FOUND:
             return jsonify({
                 'success': False,
                 'error': {
@@ -328,13 +326,7 @@ def verify_code():
                 }
             }), 400
         
-        # Check expiry
-        if isinstance(code_expires, str):
-            from dateutil import parser
-            code_expires = parser.parse(code_expires)
-        
-        if datetime.utcnow() > code_expires:
-            record_verify_attempt(normalized_phone, code)
+        if outcome == VerificationCode.EXPIRED:
             return jsonify({
                 'success': False,
                 'error': {
@@ -343,9 +335,7 @@ def verify_code():
                 }
             }), 400
         
-        # Verify code
-        if str(stored_code) != str(code):
-            record_verify_attempt(normalized_phone, code)
+        if outcome != VerificationCode.VERIFIED:
             return jsonify({
                 'success': False,
                 'error': {
@@ -354,12 +344,16 @@ def verify_code():
                 }
             }), 400
         
-        # Code is valid - clear verification data
-        customer.verification['code'] = None
-        customer.verification['code_expires'] = None
-        customer.verification['attempts'] = 0
-        customer.verification['verified_at'] = datetime.utcnow()
-        customer.save()
+        # Find customer record (created when the code was sent)
+        customer = CustomerPhone.find_by_phone(normalized_phone)
+        if not customer:
+            return jsonify({
+                'success': False,
+                'error': {
+                    'code': 'INVALID_CODE',
+                    'message': 'Cod invalid sau expirat'
+                }
+            }), 400
         
         # Generate JWT session token
         import jwt
@@ -420,14 +414,13 @@ def get_addresses():
     """
     Get customer's saved addresses.
     
-    Returns addresses sorted by:
-    1. Default address first
-    2. Most recently used
-    3. Most frequently used
+    Addresses are returned in rank order (default first, then most used,
+    then oldest), using the ranks maintained whenever an address is added,
+    updated or used.
     """
     try:
-        # Find customer by authenticated phone
-        customer = CustomerPhone.find_by_phone(g.customer_phone)
+        # Fetch addresses in rank order
+        customer = CustomerPhone.find_ranked_addresses(g.customer_phone)
         
         if not customer:
             logger.error(f"Customer not found for authenticated phone: {g.customer_phone}")
@@ -440,9 +433,8 @@ def get_addresses():
             }), 404
         
         # Format addresses for response
-        addresses = []
-        for addr in customer.addresses:
-            address_data = {
+        addresses = [
+            {
                 'id': str(addr['_id']),
                 'street': addr['street'],
                 'city': addr['city'],
@@ -454,14 +446,8 @@ def get_addresses():
                 'last_used': addr.get('last_used').isoformat() if addr.get('last_used') else None,
                 'created_at': addr.get('created_at').isoformat() if addr.get('created_at') else None
             }
-            addresses.append(address_data)
-        
-        # Sort addresses: default first, then by usage
-        addresses.sort(key=lambda x: (
-            not x['is_default'],  # Default comes first
-            -x['usage_count'],    # Higher usage count first
-            x['created_at'] or '' # Older addresses first if same usage
-        ))
+            for addr in customer.get('addresses', [])
+        ]
         
         # Log request
         logger.info(f"Retrieved {len(addresses)} addresses for customer {g.customer_phone[-4:]}")
@@ -472,8 +458,8 @@ def get_addresses():
             'count': len(addresses),
             'customer': {
                 'phone_masked': f"****{g.customer_phone[-4:]}",
-                'name': customer.name or '',
-                'has_ordered_before': customer.total_orders > 0
+                'name': customer.get('name') or '',
+                'has_ordered_before': customer.get('total_orders', 0) > 0
             }
         }), 200
         
@@ -551,29 +537,10 @@ def add_address():
                 }
             }), 400
         
-        # Create new address
-        from bson import ObjectId
-        new_address = {
-            '_id': ObjectId(),
-            'street': address_data['street'],
-            'city': address_data['city'],
-            'county': address_data['county'],
-            'postal_code': address_data['postal_code'],
-            'notes': address_data['notes'],
-            'is_default': len(customer.addresses) == 0,  # First address is default
-            'usage_count': 0,
-            'created_at': datetime.utcnow()
-        }
-        
-        # Check if setting as default
-        if data.get('set_as_default', False) and len(customer.addresses) > 0:
-            # Remove default from other addresses
-            for addr in customer.addresses:
-                addr['is_default'] = False
-            new_address['is_default'] = True
-        
-        # Add address
-        customer.addresses.append(new_address)
+        # Add address (first address is default) and re-rank the list
+        address_data['is_default'] = len(customer.addresses) == 0 or bool(data.get('set_as_default', False))
+        address_id = customer.add_address(address_data)
+        new_address = next(addr for addr in customer.addresses if addr['_id'] == address_id)
         
         # Save customer
         customer.save()
@@ -713,20 +680,10 @@ def update_address(address_id):
                 }
             }), 400
         
-        # Update address fields
-        for field, value in update_data.items():
-            customer.addresses[address_index][field] = value
-        
-        # Handle set_as_default
+        # Update address fields, default flag and rank
         if data.get('set_as_default', False):
-            # Remove default from all addresses
-            for addr in customer.addresses:
-                addr['is_default'] = False
-            # Set this one as default
-            customer.addresses[address_index]['is_default'] = True
-        
-        # Update timestamp
-        customer.addresses[address_index]['updated_at'] = datetime.utcnow()
+            update_data['is_default'] = True
+        customer.update_address(address_obj_id, update_data)
         
         # Save customer
         customer.save()
@@ -734,8 +691,8 @@ def update_address(address_id):
         # Log action
         logger.info(f"Address {address_id} updated for customer {g.customer_phone[-4:]}")
         
-        # Format response
-        updated_address = customer.addresses[address_index]
+        # Format response (the address dict is updated in place)
+        updated_address = existing_address
         response_address = {
             'id': str(updated_address['_id']),
             'street': updated_address['street'],
@@ -831,21 +788,10 @@ def delete_address(address_id):
                 }
             }), 404
         
-        # Check if deleting default address
-        was_default = address_to_delete.get('is_default', False)
-        
-        # Remove the address
-        customer.addresses.pop(address_index)
-        
-        # If we deleted the default address, set the first remaining as default
-        if was_default and customer.addresses:
-            # Find the address with highest usage, or just use the first one
-            best_address = max(customer.addresses, 
-                             key=lambda x: (x.get('usage_count', 0), 
-                                          x.get('created_at', datetime.min)))
-            best_address['is_default'] = True
-            
-            logger.info(f"Reassigned default to address {best_address['_id']}")
+        # Remove the address; a deleted default passes to the highest ranked address
+        customer.delete_address(address_obj_id)
+        if address_to_delete.get('is_default', False) and customer.addresses:
+            logger.info(f"Reassigned default to address {customer.addresses[0]['_id']}")
         
         # Save customer
         customer.save()
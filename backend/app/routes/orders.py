@@ -6,12 +6,17 @@ cart integration, SMS verification, and admin order management.
 Updated to support phone-based checkout without traditional user accounts.
 """
 
+import csv
+import io
+import json
 import logging
 import re
 from datetime import datetime, timedelta
-from flask import Blueprint, request, jsonify, session, g, current_app
+from flask import Blueprint, Response, request, jsonify, session, g, current_app, stream_with_context
 from bson import ObjectId
 from app.models.order import Order
+from app.models.order_stats import OrderStats
+from app.models.order_search import OrderSearchIndex
 from app.models.product import Product
 from app.models.user import User
 from app.models.customer_phone import CustomerPhone
@@ -19,13 +24,15 @@ from app.services.order_service import get_order_service, OrderValidationError,
 from app.services.sms_service import get_sms_service
 from app.services.sms_provider import SMSService
 from app.utils.validators import validate_json, validate_phone_number
+from app.utils.money import from_bani, money_fields, price_lines, sum_bani
 from app.utils.error_handlers import (
     ValidationError, AuthorizationError, NotFoundError, SMSError,
     success_response, create_error_response
 )
 from app.routes.auth import require_auth
 from app.utils.auth_middleware import require_admin_auth, log_admin_action
-from app.utils.checkout_auth import checkout_auth_optional, checkout_auth_required
+from app.utils.checkout_auth import checkout_auth_optional, checkout_auth_required, log_auth_debug
+from app.utils.idempotency import idempotent
 
 # Create orders blueprint
 orders_bp = Blueprint('orders', __name__)
@@ -105,6 +112,7 @@ ORDER_CREATE_SCHEMA = {
 
 @orders_bp.route('', methods=['POST'])
 @checkout_auth_optional
+@idempotent('orders_create')
 @validate_json(ORDER_CREATE_SCHEMA)
 def create_order():
     """
@@ -122,6 +130,9 @@ def create_order():
     - customer_info.phone_number: String (for guests)
     - customer_info.delivery_address: Object (for guests)
     
+    Optional header Idempotency-Key makes client retries return the
+    original response instead of creating a duplicate order.
+    
     Returns: Order confirmation with order number and details
     """
     try:
@@ -129,15 +140,12 @@ def create_order():
         cart_session_id = data['cart_session_id']
         customer_info = data['customer_info']
         
-        # DEBUG LOGGING
-        logger.info(f"=== ORDER CREATION DEBUG ===")
-        logger.info(f"g.is_authenticated: {getattr(g, 'is_authenticated', 'NOT SET')}")
-        logger.info(f"g.customer_phone: {getattr(g, 'customer_phone', 'NOT SET')}")
-        logger.info(f"g.customer_id: {getattr(g, 'customer_id', 'NOT SET')}")
-        logger.info(f"Request headers Authorization: {request.headers.get('Authorization', 'NOT SET')}")
-        logger.info(f"Cart session ID: {cart_session_id}")
-        logger.info(f"Customer info: {customer_info}")
-        logger.info(f"Address ID in data: {data.get('address_id', 'NOT PROVIDED')}")
+        # Sampled and masked: no token, customer details or full phone number
+        log_auth_debug(
+            f"Order creation: authenticated={getattr(g, 'is_authenticated', False)}, "
+            f"token={'Authorization' in request.headers}, address_id={'address_id' in data}, "
+            f"customer_info fields: {sorted(customer_info)}"
+        )
         
         # Determine checkout flow based on authentication
         if g.is_authenticated:
@@ -202,14 +210,11 @@ def create_order():
                 'notes': selected_address.get('notes', '')
             }
             
-            # Mark address as used
-            customer.mark_address_used(address_id)
-            customer.save()
+            # Address usage is recorded with the order count after the order is placed
+            checkout = {'address_id': address_obj_id}
             
         else:
             # Guest flow - validate provided info
-            logger.info(f"=== GUEST FLOW - NOT AUTHENTICATED ===")
-            logger.info(f"Phone number in customer_info: {customer_info.get('phone_number', 'NOT PROVIDED')}")
             if not customer_info.get('phone_number'):
                 return jsonify({
                     'success': False,
@@ -237,62 +242,24 @@ def create_order():
             temp_customer = CustomerPhone()
             order_phone = temp_customer.normalize_phone(order_phone)
             
-            # Create or update customer
+            # Reuse a matching saved address or append the new one
             customer = CustomerPhone.find_by_phone(order_phone)
             if customer:
-                # Update name if different
-                if customer.name != order_name:
-                    customer.name = order_name
-                
-                # Check if address already exists
-                address_exists = False
-                for addr in customer.addresses:
-                    if (addr['street'] == delivery_address['street'] and
-                        addr['city'] == delivery_address['city'] and
-                        addr['postal_code'] == delivery_address['postal_code']):
-                        address_exists = True
-                        addr['usage_count'] = addr.get('usage_count', 0) + 1
-                        addr['last_used'] = datetime.utcnow()
-                        break
-                
-                # Add new address if doesn't exist
-                if not address_exists and len(customer.addresses) < CustomerPhone.MAX_ADDRESSES:
-                    from bson import ObjectId
-                    new_address = {
-                        '_id': ObjectId(),
-                        'street': delivery_address['street'],
-                        'city': delivery_address['city'],
-                        'county': delivery_address['county'],
-                        'postal_code': delivery_address['postal_code'],
-                        'notes': delivery_address.get('notes', ''),
-                        'is_default': len(customer.addresses) == 0,
-                        'usage_count': 1,
-                        'last_used': datetime.utcnow(),
-                        'created_at': datetime.utcnow()
+                checkout = {'name': order_name if customer.name != order_name else None}
+                existing_address = customer.find_matching_address(delivery_address)
+                if existing_address:
+                    checkout['address_id'] = existing_address['_id']
+                else:
+                    checkout['new_address'] = {
+                        **delivery_address,
+                        'is_default': len(customer.addresses) == 0
                     }
-                    customer.addresses.append(new_address)
-                
-                # Don't save here, will save after order creation
             else:
-                # Create new customer
-                from bson import ObjectId
-                customer = CustomerPhone({
-                    'phone': order_phone,
+                checkout = {
                     'name': order_name,
-                    'addresses': [{
-                        '_id': ObjectId(),
-                        'street': delivery_address['street'],
-                        'city': delivery_address['city'],
-                        'county': delivery_address['county'],
-                        'postal_code': delivery_address['postal_code'],
-                        'notes': delivery_address.get('notes', ''),
-                        'is_default': True,
-                        'usage_count': 1,
-                        'last_used': datetime.utcnow(),
-                        'created_at': datetime.utcnow()
-                    }]
-                })
-                # Don't save here, will save after order creation
+                    'new_address': {**delivery_address, 'is_default': True},
+                    'create': True
+                }
         
         # Get cart items (simplified - should use cart service)
         from app.database import get_database
@@ -308,8 +275,10 @@ def create_order():
                 }
             }), 400
         
-        # Calculate total
-        total_amount = sum(item['quantity'] * item.get('price', item.get('unit_price', 0)) for item in cart['items'])
+        # Calculate total in integer bani
+        order_items = price_lines(cart['items'])
+        total_amount_bani = sum_bani(order_items)
+        total_amount = from_bani(total_amount_bani)
         
         # Create order
         from bson import ObjectId
@@ -324,40 +293,23 @@ def create_order():
             'customer_phone': order_phone,
             'customer_name': order_name,
             'delivery_address': delivery_address,
-            'items': cart['items'],
-            'total_amount': total_amount,
+            'items': order_items,
+            **money_fields('total_amount', total_amount_bani),
             'status': 'pending',
             'special_instructions': customer_info.get('special_instructions', ''),
             'created_at': datetime.utcnow()
         }
+        OrderSearchIndex.apply(order_data)
         
         result = db.orders.insert_one(order_data)
         order_data['_id'] = result.inserted_id
+        OrderStats.record_order_created(order_data['created_at'], order_data['status'], total_amount)
         
-        # Update customer order count and save
-        customer.total_orders += 1
-        customer.last_order_date = datetime.utcnow()
-        
-        # Handle concurrent update with retry
-        for retry in range(3):
-            try:
-                customer.save()
-                break
-            except ValueError as e:
-                if "Concurrent update" in str(e) and retry < 2:
-                    # Reload customer and try again
-                    logger.warning(f"Concurrent update detected, retrying ({retry + 1}/3)")
-                    fresh_customer = CustomerPhone.find_by_phone(order_phone)
-                    if fresh_customer:
-                        fresh_customer.total_orders += 1
-                        fresh_customer.last_order_date = datetime.utcnow()
-                        customer = fresh_customer
-                    else:
-                        # Customer was deleted somehow, recreate
-                        customer.total_orders = 1
-                        customer.last_order_date = datetime.utcnow()
-                else:
-                    raise
+        # Count the order and record address usage in one atomic write
+        try:
+            CustomerPhone.record_checkout(order_phone, **checkout)
+        except Exception as e:
+            logger.warning(f"Failed to update customer profile after order: {str(e)}")
         
         # Clear cart
         db.carts.delete_one({'session_id': cart_session_id})
@@ -1063,6 +1015,143 @@ def update_order_status(order_id):
         return jsonify(response), status
 
 
+def _build_admin_orders_query(args):
+    """
+    Build the MongoDB query for admin order filters.
+    
+    Shared by the admin order listing and export endpoints so both apply
+    exactly the same filters.
+    
+    Args:
+        args: Request query arguments
+        
+    Returns:
+        tuple: (query, date_filter, error) where error is a
+        (response, status) tuple when a filter is invalid
+    """
+    status_filter = args.get('status')
+    customer_phone = args.get('customer_phone')
+    customer_name = args.get('customer_name')
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    min_total = args.get('min_total')
+    max_total = args.get('max_total')
+    
+    # Build query filters
+    query = {}
+    
+    # Filter by status
+    if status_filter:
+        valid_statuses = [Order.STATUS_PENDING, Order.STATUS_CONFIRMED, 
+                        Order.STATUS_COMPLETED, Order.STATUS_CANCELLED]
+        if status_filter in valid_statuses:
+            query['status'] = status_filter
+        else:
+            response, status = create_error_response(
+                "VAL_001",
+                f"Status invalid. Valori permise: {', '.join(valid_statuses)}",
+                400
+            )
+            return None, None, (response, status)
+    
+    # Filter by customer phone (full number or trailing digits, indexed)
+    if customer_phone:
+        query.update(OrderSearchIndex.phone_query(customer_phone))
+    
+    # Filter by customer name (partial, accent-insensitive, indexed)
+    if customer_name:
+        query.update(OrderSearchIndex.name_query(customer_name))
+    
+    # Filter by date range
+    date_filter = {}
+    if start_date:
+        try:
+            start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
+            date_filter['$gte'] = start_datetime
+        except ValueError:
+            response, status = create_error_response(
+                "VAL_001",
+                "Data de început invalidă. Folosiți formatul YYYY-MM-DD",
+                400
+            )
+            return None, None, (response, status)
+    
+    if end_date:
+        try:
+            end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
+            # Add one day to include the entire end date
+            end_datetime = end_datetime + timedelta(days=1)
+            date_filter['$lt'] = end_datetime
+        except ValueError:
+            response, status = create_error_response(
+                "VAL_001",
+                "Data de sfârșit invalidă. Folosiți formatul YYYY-MM-DD",
+                400
+            )
+            return None, None, (response, status)
+    
+    if date_filter:
+        query['created_at'] = date_filter
+    
+    # Filter by total amount range
+    total_filter = {}
+    if min_total:
+        try:
+            min_amount = float(min_total)
+            if min_amount < 0:
+                response, status = create_error_response(
+                    "VAL_001",
+                    "Suma minimă nu poate fi negativă",
+                    400
+                )
+                return None, None, (response, status)
+            total_filter['$gte'] = min_amount
+        except (ValueError, TypeError):
+            response, status = create_error_response(
+                "VAL_001",
+                "Suma minimă invalidă. Introduceți un număr valid",
+                400
+            )
+            return None, None, (response, status)
+    
+    if max_total:
+        try:
+            max_amount = float(max_total)
+            if max_amount < 0:
+                response, status = create_error_response(
+                    "VAL_001",
+                    "Suma maximă nu poate fi negativă",
+                    400
+                )
+                return None, None, (response, status)
+            total_filter['$lte'] = max_amount
+        except (ValueError, TypeError):
+            response, status = create_error_response(
+                "VAL_001",
+                "Suma maximă invalidă. Introduceți un număr valid",
+                400
+            )
+            return None, None, (response, status)
+    
+    if total_filter:
+        query['total'] = total_filter
+    
+    # Validate min/max total relationship
+    if min_total and max_total:
+        try:
+            if float(min_total) > float(max_total):
+                response, status = create_error_response(
+                    "VAL_001",
+                    "Suma minimă nu poate fi mai mare decât suma maximă",
+                    400
+                )
+                return None, None, (response, status)
+        except (ValueError, TypeError):
+            pass  # Already handled above
+    
+    return query, date_filter, None
+
+
 @orders_bp.route('/admin/orders', methods=['GET'])
 @require_admin_auth
 def get_admin_orders():
@@ -1110,117 +1199,10 @@ def get_admin_orders():
         sort_direction = -1 if sort_order == 'desc' else 1
         
         # Build query filters
-        query = {}
-        
-        # Filter by status
-        if status_filter:
-            valid_statuses = [Order.STATUS_PENDING, Order.STATUS_CONFIRMED, 
-                            Order.STATUS_COMPLETED, Order.STATUS_CANCELLED]
-            if status_filter in valid_statuses:
-                query['status'] = status_filter
-            else:
-                response, status = create_error_response(
-                    "VAL_001",
-                    f"Status invalid. Valori permise: {', '.join(valid_statuses)}",
-                    400
-                )
-                return jsonify(response), status
-        
-        # Filter by customer phone
-        if customer_phone:
-            # Support partial phone number matching
-            query['customer_phone'] = {'$regex': re.escape(customer_phone), '$options': 'i'}
-        
-        # Filter by customer name
-        if customer_name:
-            query['customer_name'] = {'$regex': re.escape(customer_name), '$options': 'i'}
-        
-        # Filter by date range
-        date_filter = {}
-        if start_date:
-            try:
-                start_datetime = datetime.strptime(start_date, '%Y-%m-%d')
-                date_filter['$gte'] = start_datetime
-            except ValueError:
-                response, status = create_error_response(
-                    "VAL_001",
-                    "Data de început invalidă. Folosiți formatul YYYY-MM-DD",
-                    400
-                )
-                return jsonify(response), status
-        
-        if end_date:
-            try:
-                end_datetime = datetime.strptime(end_date, '%Y-%m-%d')
-                # Add one day to include the entire end date
-                end_datetime = end_datetime + timedelta(days=1)
-                date_filter['$lt'] = end_datetime
-            except ValueError:
-                response, status = create_error_response(
-                    "VAL_001",
-                    "Data de sfârșit invalidă. Folosiți formatul YYYY-MM-DD",
-                    400
-                )
-                return jsonify(response), status
-        
-        if date_filter:
-            query['created_at'] = date_filter
-        
-        # Filter by total amount range
-        total_filter = {}
-        if min_total:
-            try:
-                min_amount = float(min_total)
-                if min_amount < 0:
-                    response, status = create_error_response(
-                        "VAL_001",
-                        "Suma minimă nu poate fi negativă",
-                        400
-                    )
-                    return jsonify(response), status
-                total_filter['$gte'] = min_amount
-            except (ValueError, TypeError):
-                response, status = create_error_response(
-                    "VAL_001",
-                    "Suma minimă invalidă. Introduceți un număr valid",
-                    400
-                )
-                return jsonify(response), status
-        
-        if max_total:
-            try:
-                max_amount = float(max_total)
-                if max_amount < 0:
-                    response, status = create_error_response(
-                        "VAL_001",
-                        "Suma maximă nu poate fi negativă",
-                        400
-                    )
-                    return jsonify(response), status
-                total_filter['$lte'] = max_amount
-            except (ValueError, TypeError):
-                response, status = create_error_response(
-                    "VAL_001",
-                    "Suma maximă invalidă. Introduceți un număr valid",
-                    400
-                )
-                return jsonify(response), status
-        
-        if total_filter:
-            query['total'] = total_filter
-        
-        # Validate min/max total relationship
-        if min_total and max_total:
-            try:
-                if float(min_total) > float(max_total):
-                    response, status = create_error_response(
-                        "VAL_001",
-                        "Suma minimă nu poate fi mai mare decât suma maximă",
-                        400
-                    )
-                    return jsonify(response), status
-            except (ValueError, TypeError):
-                pass  # Already handled above
+        query, date_filter, error = _build_admin_orders_query(request.args)
+        if error:
+            response, status = error
+            return jsonify(response), status
         
         # Build aggregation pipeline for efficient data retrieval
         pipeline = [
@@ -1234,18 +1216,6 @@ def get_admin_orders():
                     ],
                     'total_count': [
                         {'$count': 'count'}
-                    ],
-                    'statistics': [
-                        {
-                            '$group': {
-                                '_id': None,
-                                'total_revenue': {'$sum': '$total'},
-                                'avg_order_value': {'$avg': '$total'},
-                                'status_counts': {
-                                    '$push': '$status'
-                                }
-                            }
-                        }
                     ]
                 }
             }
@@ -1260,7 +1230,8 @@ def get_admin_orders():
         orders_data = result['orders']
         total_count = result['total_count'][0]['count'] if result['total_count'] else 0
         
-        # Process statistics
+        # Load statistics from daily rollups when only status/date filters apply,
+        # otherwise group the matching orders by status
         statistics = {
             'total_orders': total_count,
             'total_revenue': 0,
@@ -1268,16 +1239,22 @@ def get_admin_orders():
             'status_breakdown': {}
         }
         
-        if result['statistics']:
-            stats = result['statistics'][0]
-            statistics['total_revenue'] = stats.get('total_revenue', 0)
-            statistics['avg_order_value'] = stats.get('avg_order_value', 0)
+        try:
+            rollup_filters_only = not (customer_phone or customer_name or min_total or max_total)
+            if rollup_filters_only and OrderStats.has_rollups():
+                stats = OrderStats.get_summary(
+                    start_date=date_filter.get('$gte'),
+                    end_date=date_filter.get('$lt'),
+                    status=query.get('status')
+                )
+            else:
+                stats = OrderStats.aggregate_from_orders(query)
             
-            # Count status breakdown
-            status_counts = {}
-            for status in stats.get('status_counts', []):
-                status_counts[status] = status_counts.get(status, 0) + 1
-            statistics['status_breakdown'] = status_counts
+            statistics['total_revenue'] = stats['total_revenue']
+            statistics['avg_order_value'] = stats['avg_order_value']
+            statistics['status_breakdown'] = stats['status_breakdown']
+        except Exception as e:
+            logging.warning(f"Failed to load order statistics: {str(e)}")
         
         # Convert orders to dict format with enhanced information
         orders = []
@@ -1356,6 +1333,185 @@ def get_admin_orders():
         return jsonify(response), status
 
 
+# Admin order export configuration
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_COLUMNS = [
+    'order_number', 'created_at', 'status', 'customer_name', 'customer_phone',
+    'total', 'items_count', 'street', 'city', 'county', 'postal_code',
+    'special_instructions'
+]
+EXPORT_PROJECTION = {
+    '_id': 0,
+    'order_number': 1,
+    'created_at': 1,
+    'status': 1,
+    'customer_name': 1,
+    'customer_phone': 1,
+    'total': 1,
+    'total_amount': 1,
+    'items_count': {'$size': {'$ifNull': ['$items', []]}},
+    'delivery_address': 1,
+    'special_instructions': 1
+}
+
+# Customer-entered columns and the leading characters that make a
+# spreadsheet app evaluate a CSV cell as a formula
+EXPORT_TEXT_COLUMNS = ('customer_name', 'street', 'city', 'county', 'postal_code',
+                       'special_instructions')
+CSV_FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def _csv_safe_row(row):
+    """Neutralize customer text that a spreadsheet would run as a formula."""
+    for column in EXPORT_TEXT_COLUMNS:
+        value = row[column]
+        if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+            row[column] = "'" + value
+    return row
+
+
+def _export_row(order_doc):
+    """Flatten an exported order document into the export columns."""
+    address = order_doc.get('delivery_address')
+    if not isinstance(address, dict):
+        address = {}
+    created_at = order_doc.get('created_at')
+    total = order_doc.get('total')
+    if total is None:
+        total = order_doc.get('total_amount', 0)
+    
+    return {
+        'order_number': order_doc.get('order_number', ''),
+        'created_at': created_at.isoformat() + 'Z' if isinstance(created_at, datetime) else '',
+        'status': order_doc.get('status', ''),
+        'customer_name': order_doc.get('customer_name', ''),
+        'customer_phone': order_doc.get('customer_phone', ''),
+        'total': float(total or 0),
+        'items_count': order_doc.get('items_count', 0),
+        'street': address.get('street', ''),
+        'city': address.get('city', ''),
+        'county': address.get('county', ''),
+        'postal_code': address.get('postal_code', ''),
+        'special_instructions': order_doc.get('special_instructions') or ''
+    }
+
+
+def _generate_order_export(cursor, export_format):
+    """
+    Stream exported orders from a batched cursor.
+    
+    Rows are written into a small buffer that is flushed every
+    EXPORT_CHUNK_SIZE bytes, so memory stays constant regardless of
+    how many orders match.
+    """
+    buffer = io.StringIO()
+    writer = None
+    
+    try:
+        if export_format == 'csv':
+            # BOM so spreadsheet apps detect UTF-8 (Romanian diacritics)
+            buffer.write('\ufeff')
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+        
+        for order_doc in cursor:
+            row = _export_row(order_doc)
+            if writer:
+                writer.writerow(_csv_safe_row(row))
+            else:
+                buffer.write(json.dumps(row, ensure_ascii=False) + '\n')
+            
+            if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        
+        remainder = buffer.getvalue()
+        if remainder:
+            yield remainder
+    finally:
+        cursor.close()
+
+
+@orders_bp.route('/admin/orders/export', methods=['GET'])
+@require_admin_auth
+def export_admin_orders():
+    """
+    Stream all matching orders as CSV or NDJSON (admin only).
+    
+    Query Parameters:
+        - format (str): Export format (csv, ndjson) (default: csv)
+        - status, customer_phone, customer_name, start_date, end_date,
+          min_total, max_total: Same filters as the admin order listing
+    
+    Orders are read with a batched cursor and a projection and written
+    to the response as they arrive, so the full result set is never
+    held in memory.
+    """
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            response, status = create_error_response(
+                "VAL_001",
+                f"Format invalid. Formate permise: {', '.join(EXPORT_FORMATS)}",
+                400
+            )
+            return jsonify(response), status
+        
+        query, date_filter, error = _build_admin_orders_query(request.args)
+        if error:
+            response, status = error
+            return jsonify(response), status
+        
+        from app.database import get_database
+        db = get_database()
+        cursor = db[Order.COLLECTION_NAME].find(
+            query, EXPORT_PROJECTION
+        ).sort('created_at', -1).batch_size(EXPORT_BATCH_SIZE)
+        
+        log_admin_action(
+            "Comenzi exportate",
+            {
+                "format": export_format,
+                "filters_applied": bool(query)
+            }
+        )
+        
+        filename = f"comenzi-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.{export_format}"
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        
+        return Response(
+            stream_with_context(_generate_order_export(cursor, export_format)),
+            mimetype=f'{mimetype}; charset=utf-8',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'X-Accel-Buffering': 'no'
+            }
+        )
+        
+    except Exception as e:
+        logging.error(f"Error exporting admin orders: {str(e)}")
+        response, status = create_error_response(
+            "DB_001",
+            "Eroare la exportul comenzilor. Încercați din nou",
+            500
+        )
+        return jsonify(response), status
+
+
+# Customer SMS sent when an admin moves an order to a status
+ADMIN_STATUS_NOTIFICATIONS = {
+    Order.STATUS_CONFIRMED: "Comanda #{order_number} a fost confirmată! Vom începe să vă pregătim comanda.",
+    Order.STATUS_COMPLETED: "Comanda #{order_number} a fost finalizată cu succes. Mulțumim pentru încredere!",
+    Order.STATUS_CANCELLED: "Comanda #{order_number} a fost anulată. Pentru întrebări, vă rugăm să ne contactați."
+}
+
+# Maximum number of orders accepted by one batch status update
+BATCH_STATUS_MAX_ORDERS = 500
+
+
 @orders_bp.route('/admin/orders/<order_id>/status', methods=['PUT'])
 @require_admin_auth
 def update_admin_order_status(order_id):
@@ -1453,14 +1609,7 @@ def update_admin_order_status(order_id):
             )), 200
         
         # Validate status transitions based on business rules
-        transition_rules = {
-            Order.STATUS_PENDING: [Order.STATUS_CONFIRMED, Order.STATUS_CANCELLED],
-            Order.STATUS_CONFIRMED: [Order.STATUS_COMPLETED, Order.STATUS_CANCELLED],
-            Order.STATUS_COMPLETED: [],  # No further transitions allowed
-            Order.STATUS_CANCELLED: []   # No further transitions allowed
-        }
-        
-        allowed_transitions = transition_rules.get(old_status, [])
+        allowed_transitions = Order.ADMIN_STATUS_TRANSITIONS.get(old_status, [])
         if new_status not in allowed_transitions:
             old_desc = {
                 Order.STATUS_PENDING: "în așteptare",
@@ -1513,14 +1662,9 @@ def update_admin_order_status(order_id):
         # Send SMS notification to customer with Romanian messages
         try:
             sms_service = get_sms_service()
-            status_messages = {
-                Order.STATUS_CONFIRMED: f"Comanda #{order.order_number} a fost confirmată! Vom începe să vă pregătim comanda.",
-                Order.STATUS_COMPLETED: f"Comanda #{order.order_number} a fost finalizată cu succes. Mulțumim pentru încredere!",
-                Order.STATUS_CANCELLED: f"Comanda #{order.order_number} a fost anulată. Pentru întrebări, vă rugăm să ne contactați."
-            }
             
-            if new_status in status_messages:
-                message = status_messages[new_status]
+            if new_status in ADMIN_STATUS_NOTIFICATIONS:
+                message = ADMIN_STATUS_NOTIFICATIONS[new_status].format(order_number=order.order_number)
                 sms_service.send_notification(order.customer_phone, message)
                 logging.info(f"Status update SMS sent to {order.customer_phone[-4:]} for order {order.order_number}")
         except Exception as e:
@@ -1580,6 +1724,217 @@ def update_admin_order_status(order_id):
         return jsonify(response), status
 
 
+@orders_bp.route('/admin/orders/status:batch', methods=['PUT'])
+@require_admin_auth
+def batch_update_admin_order_status():
+    """
+    Update the status of many orders at once (admin only).
+    
+    Expects JSON:
+    {
+        "order_ids": ["<ObjectId or order number>", ...],
+        "status": "confirmed" | "completed" | "cancelled"
+    }
+    
+    Orders are loaded in one query, checked against the precomputed
+    transition table and written with one bulk_write. Each write is guarded
+    on the order's current status, so concurrent changes are never
+    overwritten. Customer notifications are queued in bulk and sent in
+    the background.
+    """
+    try:
+        from flask import g
+        from pymongo import UpdateMany
+        admin_user = g.current_admin_user
+        
+        # Validate request payload
+        data = request.get_json(silent=True) or {}
+        order_ids = data.get('order_ids')
+        new_status = (data.get('status') or '').strip()
+        
+        if not isinstance(order_ids, list) or not order_ids:
+            response, status = create_error_response(
+                "VAL_001",
+                "Lista de comenzi (order_ids) este obligatorie",
+                400
+            )
+            return jsonify(response), status
+        
+        if len(order_ids) > BATCH_STATUS_MAX_ORDERS:
+            response, status = create_error_response(
+                "VAL_001",
+                f"Se pot actualiza maxim {BATCH_STATUS_MAX_ORDERS} comenzi odată",
+                400
+            )
+            return jsonify(response), status
+        
+        if not all(isinstance(order_id, str) and order_id for order_id in order_ids):
+            response, status = create_error_response(
+                "VAL_001",
+                "Identificatorii comenzilor trebuie să fie texte nevide",
+                400
+            )
+            return jsonify(response), status
+        
+        if new_status not in Order.ADMIN_STATUSES:
+            response, status = create_error_response(
+                "VAL_001",
+                f"Status invalid. Statusuri permise: {', '.join(Order.ADMIN_STATUSES)}",
+                400
+            )
+            return jsonify(response), status
+        
+        # Remove duplicates while keeping request order
+        order_ids = list(dict.fromkeys(order_ids))
+        
+        # Load all requested orders in one query
+        object_ids = [ObjectId(order_id) for order_id in order_ids if re.match(r'^[0-9a-fA-F]{24}$', order_id)]
+        order_numbers = [order_id for order_id in order_ids if not re.match(r'^[0-9a-fA-F]{24}$', order_id)]
+        
+        lookup = []
+        if object_ids:
+            lookup.append({'_id': {'$in': object_ids}})
+        if order_numbers:
+            lookup.append({'order_number': {'$in': order_numbers}})
+        
+        from app.database import get_database
+        db = get_database()
+        collection = db[Order.COLLECTION_NAME]
+        
+        orders_by_key = {}
+        projection = {'order_number': 1, 'status': 1, 'customer_phone': 1,
+                      'created_at': 1, 'total': 1, 'total_amount': 1}
+        for order_doc in collection.find({'$or': lookup}, projection):
+            orders_by_key[str(order_doc['_id'])] = order_doc
+            if order_doc.get('order_number'):
+                orders_by_key[order_doc['order_number']] = order_doc
+        
+        # Validate transitions against the precomputed state table
+        allowed_sources = Order.ADMIN_TRANSITION_SOURCES.get(new_status, [])
+        results = []
+        candidates_by_status = {}
+        for order_id in order_ids:
+            order_doc = orders_by_key.get(order_id)
+            if not order_doc:
+                results.append({'order_id': order_id, 'result': 'not_found'})
+                continue
+            
+            result = {
+                'order_id': order_id,
+                'order_number': order_doc.get('order_number'),
+                'old_status': order_doc.get('status')
+            }
+            if order_doc.get('status') == new_status:
+                result['result'] = 'unchanged'
+            elif order_doc.get('status') not in allowed_sources:
+                result['result'] = 'invalid_transition'
+            else:
+                result['result'] = 'pending'
+                candidates_by_status.setdefault(order_doc['status'], []).append(order_doc)
+            results.append(result)
+        
+        # Apply all transitions in one bulk_write, guarded per current status
+        updated_ids = set()
+        if candidates_by_status:
+            now = datetime.utcnow()
+            update_fields = {'status': new_status, 'updated_at': now}
+            timestamp_field = Order.STATUS_TIMESTAMP_FIELDS.get(new_status)
+            if timestamp_field:
+                update_fields[timestamp_field] = now
+            
+            operations = [
+                UpdateMany(
+                    {'_id': {'$in': [doc['_id'] for doc in docs]}, 'status': old_status},
+                    {'$set': update_fields}
+                )
+                for old_status, docs in candidates_by_status.items()
+            ]
+            bulk_result = collection.bulk_write(operations, ordered=False)
+            
+            candidate_ids = [doc['_id'] for docs in candidates_by_status.values() for doc in docs]
+            if bulk_result.modified_count == len(candidate_ids):
+                updated_ids = set(candidate_ids)
+            else:
+                # Some orders changed concurrently - find the ones this write moved
+                updated_ids = {
+                    doc['_id'] for doc in collection.find(
+                        {'_id': {'$in': candidate_ids}, 'status': new_status, 'updated_at': now},
+                        {'_id': 1}
+                    )
+                }
+        
+        # Record results, statistics and notifications for updated orders
+        stats_changes = []
+        notifications = []
+        for result in results:
+            if result['result'] != 'pending':
+                continue
+            order_doc = orders_by_key[result['order_id']]
+            if order_doc['_id'] not in updated_ids:
+                result['result'] = 'conflict'
+                continue
+            
+            result['result'] = 'updated'
+            stats_changes.append((
+                order_doc.get('created_at'), order_doc['status'], new_status,
+                OrderStats.order_revenue(order_doc)
+            ))
+            if new_status in ADMIN_STATUS_NOTIFICATIONS and order_doc.get('customer_phone'):
+                notifications.append({
+                    'phone_number': order_doc['customer_phone'],
+                    'message': ADMIN_STATUS_NOTIFICATIONS[new_status].format(
+                        order_number=order_doc.get('order_number')
+                    )
+                })
+        
+        OrderStats.record_status_changes(stats_changes)
+        
+        notifications_queued = 0
+        if notifications:
+            try:
+                from app.services.notification_queue import get_notification_queue
+                notifications_queued = get_notification_queue().enqueue_many(notifications)
+            except Exception as e:
+                logging.warning(f"Failed to queue status update SMS notifications: {str(e)}")
+        
+        summary = {}
+        for result in results:
+            summary[result['result']] = summary.get(result['result'], 0) + 1
+        
+        log_admin_action(
+            "Status comenzi actualizat în lot",
+            {
+                "new_status": new_status,
+                "requested": len(order_ids),
+                "summary": summary
+            }
+        )
+        
+        logging.info(f"Batch order status update by admin {admin_user['phone_number'][-4:]}: "
+                     f"{summary.get('updated', 0)}/{len(order_ids)} orders -> {new_status}")
+        
+        return jsonify(success_response(
+            {
+                'status': new_status,
+                'requested': len(order_ids),
+                'updated': summary.get('updated', 0),
+                'summary': summary,
+                'notifications_queued': notifications_queued,
+                'results': results
+            },
+            f"Au fost actualizate {summary.get('updated', 0)} din {len(order_ids)} comenzi"
+        )), 200
+        
+    except Exception as e:
+        logging.error(f"Error in batch admin order status update: {str(e)}")
+        response, status = create_error_response(
+            "DB_001",
+            "Eroare neașteptată la actualizarea statusului comenzilor. Încercați din nou",
+            500
+        )
+        return jsonify(response), status
+
+
 @orders_bp.route('/<order_id>/admin', methods=['GET'])
 @require_admin
 def get_order_admin(order_id):
@@ -13,9 +13,11 @@ from datetime import datetime, timedelta
 from bson import ObjectId
 
 from app.services.sms_service import get_sms_service
+from app.services.sms.sms_manager import get_sms_manager
 from app.utils.validators import validate_json
 from app.utils.error_handlers import ValidationError, SMSError
 from app.utils.rate_limiter import rate_limit
+from app.utils.rate_limit_engine import get_rate_limit_engine
 from app.database import get_database
 
 
@@ -25,6 +27,10 @@ logger = logging.getLogger(__name__)
 # Create SMS blueprint
 sms_bp = Blueprint('sms', __name__)
 
+# Failed webhook authentications allowed per client IP per minute
+WEBHOOK_AUTH_FAILURE_LIMIT = 20
+WEBHOOK_AUTH_FAILURE_WINDOW = 60
+
 # JSON Schema for SMS verification request
 SMS_VERIFY_SCHEMA = {
     "type": "object",
@@ -521,6 +527,69 @@ def get_rate_limit_info(phone_number):
         return jsonify(error_response), 500
 
 
+@sms_bp.route('/webhook/<provider_slug>', methods=['POST'])
+def receive_delivery_report(provider_slug):
+    """
+    Receive a provider delivery report.
+    
+    The caller must pass the secret from the provider's webhook URL as the
+    ``token`` query parameter. The report is acknowledged as soon as it is
+    parsed; SMS logs are updated from the webhook queue in batches.
+    
+    Authenticated reports are never throttled: providers call back from a
+    few IPs, and the burst after a broadcast is exactly what the queue
+    absorbs. Only failed authentications are limited per IP, in memory.
+    
+    Args:
+        provider_slug: Provider that sent the report
+        
+    Returns:
+        200: Report accepted
+        400: Unknown provider or unrecognized payload
+        403: Missing or wrong webhook token
+        429: Too many failed authentications from this IP
+    """
+    manager = get_sms_manager()
+    engine = get_rate_limit_engine()
+    failure_key = f"sms_webhook_auth:{request.remote_addr}"
+    
+    if not engine.peek(failure_key, WEBHOOK_AUTH_FAILURE_LIMIT, WEBHOOK_AUTH_FAILURE_WINDOW).allowed:
+        response = jsonify({
+            'success': False,
+            'error': {
+                'code': 'RATE_LIMIT_EXCEEDED',
+                'message': 'Too many unauthorized webhook calls'
+            }
+        })
+        response.status_code = 429
+        response.headers['Retry-After'] = str(WEBHOOK_AUTH_FAILURE_WINDOW)
+        return response
+    
+    if not manager.verify_webhook(provider_slug, request.args.get('token')):
+        engine.acquire(failure_key, WEBHOOK_AUTH_FAILURE_LIMIT, WEBHOOK_AUTH_FAILURE_WINDOW)
+        logger.warning(f"Rejected unauthenticated {provider_slug} webhook from {request.remote_addr}")
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'SMS_WEBHOOK_002',
+                'message': 'Webhook not authorized'
+            }
+        }), 403
+    
+    data = request.get_json(silent=True) or request.form.to_dict()
+    
+    if not manager.handle_webhook(provider_slug, data):
+        return jsonify({
+            'success': False,
+            'error': {
+                'code': 'SMS_WEBHOOK_001',
+                'message': 'Delivery report not accepted'
+            }
+        }), 400
+    
+    return jsonify({'success': True}), 200
+
+
 # Error handlers for the SMS blueprint
 @sms_bp.errorhandler(400)
 def handle_bad_request(error):
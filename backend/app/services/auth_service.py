@@ -7,15 +7,36 @@ with Romanian localization for the local producer marketplace.
 """
 
 import os
+import time
+import uuid
 import logging
-import bcrypt
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, Union
 from jose import jwt, JWTError
 from app.models.user import User
+from app.services.password_hasher import get_password_hasher, PasswordHasherBusy
+from app.utils.cache import TokenCache, TokenDenylist
 from app.utils.error_handlers import AuthenticationError, ValidationError
 
 
+# Verified admin claims and revoked tokens are shared by every AuthService
+# instance (the middleware and the auth routes each create one), so a logout
+# through the routes is seen by the next request through the middleware.
+ADMIN_TOKEN_CACHE_SIZE = 1024
+_verified_tokens = TokenCache(max_size=ADMIN_TOKEN_CACHE_SIZE)
+_revoked_tokens = TokenDenylist()
+
+
+def get_admin_token_cache() -> TokenCache:
+    """Get the verified admin claims cache (for stats and tests)"""
+    return _verified_tokens
+
+
+def get_admin_token_denylist() -> TokenDenylist:
+    """Get the revoked admin token denylist (for stats and tests)"""
+    return _revoked_tokens
+
+
 class AuthService:
     """
     Admin authentication service for secure login and session management.
@@ -92,14 +113,25 @@ class AuthService:
                     "AUTH_002"
                 )
             
-            # Verify password
-            if not admin_user.verify_password(password):
+            # Verify password (sheds load with AUTH_019 when the hashing queue is full)
+            try:
+                password_valid = admin_user.verify_password(password)
+            except PasswordHasherBusy:
+                logging.warning(f"Admin login shed, password hashing queue full (IP {ip_address})")
+                raise AuthenticationError(
+                    "Serverul este ocupat. Încercați din nou în câteva secunde",
+                    "AUTH_019"
+                )
+            
+            if not password_valid:
                 self._record_failed_attempt(username, ip_address)
                 raise AuthenticationError(
                     "Datele de autentificare sunt incorecte",
                     "AUTH_001"
                 )
             
+            self._rehash_if_needed(admin_user, password)
+            
             # Check if account is verified
             if not admin_user.is_verified:
                 raise AuthenticationError(
@@ -174,6 +206,7 @@ class AuthService:
                 'role': admin_user.role,
                 'iat': datetime.utcnow(),  # Issued at
                 'exp': expires_at,  # Expiry
+                'jti': uuid.uuid4().hex,  # Unique id so logout revokes only this token
                 'iss': 'pe-foc-de-lemne-admin',  # Issuer
                 'aud': 'pe-foc-de-lemne-admin-panel'  # Audience
             }
@@ -213,6 +246,7 @@ class AuthService:
                 'token_type': 'refresh',
                 'iat': datetime.utcnow(),
                 'exp': expires_at,
+                'jti': uuid.uuid4().hex,
                 'iss': 'pe-foc-de-lemne-admin',
                 'aud': 'pe-foc-de-lemne-admin-panel'
             }
@@ -234,6 +268,10 @@ class AuthService:
         """
         Verify and decode JWT token.
         
+        Revoked tokens are rejected from the in-memory denylist. Verified
+        claims are cached until the token's exp, so the JWT is decoded once
+        per token rather than once per request.
+        
         Args:
             token (str): JWT token to verify
             
@@ -254,6 +292,19 @@ class AuthService:
             if token.startswith('Bearer '):
                 token = token[7:]
             
+            # Namespace by secret so a rotated key never serves stale claims
+            cache_key = f"{self.secret_key}:{token}"
+            
+            if _revoked_tokens.contains(cache_key):
+                raise AuthenticationError(
+                    "Sesiunea a fost închisă. Autentificați-vă din nou",
+                    "AUTH_018"
+                )
+            
+            payload = _verified_tokens.get(cache_key)
+            if payload is not None:
+                return payload
+            
             # Decode and verify token
             payload = jwt.decode(
                 token,
@@ -278,6 +329,7 @@ class AuthService:
                     "AUTH_008"
                 )
             
+            _verified_tokens.set(cache_key, payload)
             logging.debug(f"Token verified successfully for user: {payload.get('phone_number')}")
             return payload
             
@@ -373,14 +425,15 @@ class AuthService:
                     f"Parola trebuie să aibă cel puțin {self.MIN_PASSWORD_LENGTH} caractere"
                 )
             
-            # Generate salt and hash password
-            salt = bcrypt.gensalt(rounds=12)
-            hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-            
-            return hashed.decode('utf-8')
+            return get_password_hasher().hash(password)
             
         except ValidationError:
             raise
+        except PasswordHasherBusy:
+            raise AuthenticationError(
+                "Serverul este ocupat. Încercați din nou în câteva secunde",
+                "AUTH_019"
+            )
         except Exception as e:
             logging.error(f"Password hashing error: {str(e)}")
             raise AuthenticationError(
@@ -400,20 +453,37 @@ class AuthService:
             bool: True if password matches
         """
         try:
-            return bcrypt.checkpw(
-                password.encode('utf-8'),
-                hashed_password.encode('utf-8')
-            )
+            return get_password_hasher().verify(password, hashed_password)
         except Exception as e:
             logging.error(f"Password verification error: {str(e)}")
             return False
     
+    def _rehash_if_needed(self, admin_user: User, password: str) -> None:
+        """
+        Rehash a verified password when BCRYPT_LOG_ROUNDS has changed.
+        
+        Runs only after a successful login, when the plain password is known.
+        Failures are logged and never block the login.
+        """
+        hasher = get_password_hasher()
+        if not hasher.needs_rehash(admin_user.password_hash):
+            return
+        
+        try:
+            admin_user.update({'password_hash': hasher.hash(password)})
+            logging.info(f"Password rehashed with {hasher.rounds} rounds for admin: {admin_user.phone_number}")
+        except PasswordHasherBusy:
+            logging.debug("Password rehash skipped, hashing queue full")
+        except Exception as e:
+            logging.warning(f"Password rehash failed: {str(e)}")
+    
     def logout_admin(self, token: str) -> Dict[str, Any]:
         """
         Logout admin by invalidating token.
         
-        Note: In a production environment, you would typically maintain
-        a blacklist of invalidated tokens in Redis or database.
+        The token is added to the in-memory denylist until it expires and
+        its cached claims are dropped. The denylist is per process; a
+        multi-process deployment needs a shared store.
         
         Args:
             token (str): JWT token to invalidate
@@ -425,8 +495,13 @@ class AuthService:
             # Verify token first
             payload = self.verify_token(token)
             
-            # In production, add token to blacklist here
-            # For now, we just log the logout
+            if token.startswith('Bearer '):
+                token = token[7:]
+            cache_key = f"{self.secret_key}:{token}"
+            expires_at = payload.get('exp') or time.time() + self.REFRESH_TOKEN_EXPIRY_DAYS * 86400
+            _revoked_tokens.add(cache_key, expires_at)
+            _verified_tokens.invalidate(cache_key)
+            
             logging.info(f"Admin logged out: {payload.get('phone_number')}")
             
             return {
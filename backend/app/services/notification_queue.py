@@ -0,0 +1,168 @@
+"""
+Notification Queue Service for Local Producer Web Application
+
+This module provides a bounded in-process queue for customer SMS
+notifications. Request handlers enqueue notifications and return
+immediately; a background worker hands them to the SMS manager's
+dispatcher, where they are sent concurrently through the providers' async
+clients instead of one blocking request at a time.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationQueue:
+    """
+    Background dispatcher for order status notifications.
+
+    Notifications are (phone_number, message) pairs. The worker thread is
+    started lazily on the first enqueue, so importing this module has no
+    side effects. At most ``max_in_flight`` dispatched sends are pending at
+    once; the worker waits for a slot before dispatching the next one.
+    """
+
+    # Queue configuration
+    MAX_QUEUE_SIZE = 5000
+    MAX_IN_FLIGHT = 100
+
+    def __init__(self, sender=None, max_size: int = MAX_QUEUE_SIZE,
+                 max_in_flight: int = MAX_IN_FLIGHT):
+        """
+        Initialize notification queue.
+
+        Args:
+            sender: Callable (phone_number, message) used to send
+                synchronously; defaults to SmsManager.dispatch_sms
+            max_size: Maximum number of queued notifications
+            max_in_flight: Maximum dispatched sends awaiting a response
+        """
+        self._queue = queue.Queue(maxsize=max_size)
+        self._sender = sender
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'sent': 0, 'failed': 0, 'dropped': 0}
+
+    def enqueue(self, phone_number: str, message: str) -> bool:
+        """
+        Queue a single notification.
+
+        Returns:
+            bool: True if queued, False if the queue is full
+        """
+        return self.enqueue_many([{'phone_number': phone_number, 'message': message}]) == 1
+
+    def enqueue_many(self, notifications: List[Dict[str, str]]) -> int:
+        """
+        Queue many notifications at once.
+
+        Args:
+            notifications: List of dicts with phone_number and message
+
+        Returns:
+            int: Number of notifications queued
+        """
+        self._ensure_worker()
+
+        queued = 0
+        for notification in notifications:
+            try:
+                self._queue.put_nowait((notification['phone_number'], notification['message']))
+                queued += 1
+            except queue.Full:
+                self._stats['dropped'] += len(notifications) - queued
+                logger.warning(f"Notification queue full, dropped {len(notifications) - queued} notifications")
+                break
+
+        self._stats['enqueued'] += queued
+        return queued
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue statistics"""
+        return {
+            **self._stats,
+            'pending': self._queue.qsize(),
+            'worker_alive': bool(self._worker and self._worker.is_alive())
+        }
+
+    def _ensure_worker(self):
+        """Start the worker thread if it is not running."""
+        if self._worker and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker and self._worker.is_alive():
+                return
+            self._worker = threading.Thread(
+                target=self._run, name='notification-queue', daemon=True
+            )
+            self._worker.start()
+
+    def _dispatch(self, phone_number: str, message: str) -> Future:
+        """Queue one notification on the SMS dispatcher."""
+        from app.services.sms.sms_manager import get_sms_manager
+        from app.services.sms.provider_interface import SmsMessage
+        return get_sms_manager().dispatch_sms(
+            SmsMessage(to=phone_number, body=message, message_type='transactional')
+        )
+
+    def _run(self):
+        """Worker loop: dispatch queued notifications, or send them one by one with a custom sender."""
+        while True:
+            phone_number, message = self._queue.get()
+            if self._sender is not None:
+                try:
+                    self._sender(phone_number, message)
+                    self._record(phone_number, None)
+                except Exception as e:
+                    self._record(phone_number, str(e))
+                finally:
+                    self._queue.task_done()
+                continue
+
+            self._in_flight.acquire()
+            try:
+                future = self._dispatch(phone_number, message)
+            except Exception as e:
+                self._in_flight.release()
+                self._record(phone_number, str(e))
+                self._queue.task_done()
+                continue
+            future.add_done_callback(lambda f, phone=phone_number: self._on_dispatched(phone, f))
+
+    def _on_dispatched(self, phone_number: str, future: Future):
+        """Count a dispatched send once the provider has answered."""
+        try:
+            response = future.result()
+            self._record(phone_number, None if response.success else response.error_message or response.error_code)
+        except Exception as e:
+            self._record(phone_number, str(e))
+        finally:
+            self._in_flight.release()
+            self._queue.task_done()
+
+    def _record(self, phone_number: str, error: Optional[str]):
+        """Count one finished notification."""
+        if error is None:
+            self._stats['sent'] += 1
+            return
+        self._stats['failed'] += 1
+        logger.warning(f"Failed to send queued notification to {phone_number[-4:]}: {error}")
+
+
+# Global notification queue instance
+_notification_queue: Optional[NotificationQueue] = None
+
+
+def get_notification_queue() -> NotificationQueue:
+    """Get or create global notification queue instance."""
+    global _notification_queue
+    if _notification_queue is None:
+        _notification_queue = NotificationQueue()
+    return _notification_queue
@@ -8,15 +8,17 @@ SMS verification integration, and atomic order creation.
 
 import logging
 from datetime import datetime, timedelta
-from decimal import Decimal, ROUND_HALF_UP
 from typing import Dict, Any, List, Optional, Tuple
 from bson import ObjectId
 
 from app.database import get_database
 from app.models.cart import Cart
 from app.models.order import Order
+from app.models.order_stats import OrderStats
+from app.models.order_search import OrderSearchIndex
 from app.models.product import Product
 from app.utils.error_handlers import ValidationError
+from app.utils.money import to_bani, from_bani, apply_rate, price_line, sum_bani, money_fields
 
 
 logger = logging.getLogger(__name__)
@@ -51,10 +53,11 @@ class OrderService:
     atomic order creation with inventory management.
     """
     
-    # Tax and delivery configuration
-    TAX_RATE = Decimal('0.08')  # 8% tax rate
-    FREE_DELIVERY_THRESHOLD = Decimal('50.00')  # Free delivery over $50
-    DELIVERY_FEE = Decimal('5.00')  # Standard delivery fee
+    # Tax and delivery configuration (amounts in integer bani)
+    TAX_RATE_BASIS_POINTS = 800  # 8% tax rate
+    FREE_DELIVERY_THRESHOLD_BANI = 5000  # Free delivery over 50 lei
+    DELIVERY_FEE_BANI = 500  # Standard delivery fee
+    PRICE_TOLERANCE_BANI = 1  # Allowed cart/current price difference
     
     # Order status constants
     ORDER_STATUS_PENDING = 'pending'
@@ -366,11 +369,11 @@ class OrderService:
                     )
                 
                 # Verify pricing (security check against price tampering)
-                current_price = product.price
-                cart_price = Decimal(str(cart_item.price))
+                current_price_bani = to_bani(product.price)
+                cart_price_bani = to_bani(cart_item.price)
                 
-                if abs(current_price - cart_price) > Decimal('0.01'):  # Allow 1 cent tolerance
-                    logger.warning(f"Price mismatch for {product.name}: cart={cart_price}, current={current_price}")
+                if abs(current_price_bani - cart_price_bani) > self.PRICE_TOLERANCE_BANI:
+                    logger.warning(f"Price mismatch for {product.name}: cart={cart_price_bani}, current={current_price_bani} bani")
                     # Use current price from database
                 
                 # Create validated item with current pricing
@@ -378,8 +381,7 @@ class OrderService:
                     'product_id': str(product._id),
                     'product_name': product.name,
                     'quantity': cart_item.quantity,
-                    'unit_price': float(current_price),
-                    'total_price': float(current_price * cart_item.quantity)
+                    **price_line(None, cart_item.quantity, unit_price_bani=current_price_bani)
                 }
                 
                 validated_items.append(validated_item)
@@ -407,24 +409,24 @@ class OrderService:
             dict: Order totals breakdown
         """
         # Calculate subtotal
-        subtotal = sum(Decimal(str(item['total_price'])) for item in items)
+        subtotal = sum_bani(items)
         
         # Calculate tax
-        tax = (subtotal * self.TAX_RATE).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        tax = apply_rate(subtotal, self.TAX_RATE_BASIS_POINTS)
         
         # Calculate delivery fee
-        delivery_fee = Decimal('0.00') if subtotal >= self.FREE_DELIVERY_THRESHOLD else self.DELIVERY_FEE
+        delivery_fee = 0 if subtotal >= self.FREE_DELIVERY_THRESHOLD_BANI else self.DELIVERY_FEE_BANI
         
         # Calculate total
-        total = (subtotal + tax + delivery_fee).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        total = subtotal + tax + delivery_fee
         
         totals = {
-            'subtotal': float(subtotal),
-            'tax': float(tax),
-            'delivery_fee': float(delivery_fee),
-            'total': float(total),
-            'tax_rate': float(self.TAX_RATE),
-            'free_delivery_threshold': float(self.FREE_DELIVERY_THRESHOLD)
+            **money_fields('subtotal', subtotal),
+            **money_fields('tax', tax),
+            **money_fields('delivery_fee', delivery_fee),
+            **money_fields('total', total),
+            'tax_rate': self.TAX_RATE_BASIS_POINTS / 10000,
+            'free_delivery_threshold': from_bani(self.FREE_DELIVERY_THRESHOLD_BANI)
         }
         
         logger.info(f"Order totals calculated: subtotal=${totals['subtotal']}, total=${totals['total']}")
@@ -497,7 +499,9 @@ class OrderService:
                 'status': self.ORDER_STATUS_PENDING,
                 'items': items,
                 'subtotal': totals['subtotal'],
+                'subtotal_bani': totals['subtotal_bani'],
                 'total': totals['total'],
+                'total_bani': totals['total_bani'],
                 'totals': totals,  # Include detailed totals breakdown
                 'delivery_type': 'pickup',  # Default to pickup
                 'verification_session_id': verification_session_id,
@@ -512,6 +516,9 @@ class OrderService:
             if customer_info.get('special_instructions'):
                 order_data['special_instructions'] = customer_info['special_instructions']
             
+            # Add admin search fields
+            OrderSearchIndex.apply(order_data)
+            
             # Start MongoDB transaction for atomic operations
             with self.db.client.start_session() as session:
                 with session.start_transaction():
@@ -556,6 +563,10 @@ class OrderService:
                         # Commit transaction
                         session.commit_transaction()
                         
+                        OrderStats.record_order_created(
+                            order_data['created_at'], order_data['status'], order_data['total']
+                        )
+                        
                         logger.info(f"Order created atomically: {order_number} (ID: {order_id})")
                         return order_id
                         
@@ -649,9 +660,11 @@ class OrderService:
             with self.db.client.start_session() as session:
                 with session.start_transaction():
                     try:
-                        # 1. Update order status
-                        self.orders_collection.update_one(
-                            {'order_number': order_number},
+                        # 1. Update order status, guarded on the status read
+                        # above so a concurrent cancel or status change cannot
+                        # restore stock or move the rollups a second time
+                        previous = self.orders_collection.find_one_and_update(
+                            {'order_number': order_number, 'status': order.status},
                             {
                                 '$set': {
                                     'status': self.ORDER_STATUS_CANCELLED,
@@ -660,11 +673,20 @@ class OrderService:
                                     'updated_at': datetime.utcnow()
                                 }
                             },
+                            projection={**Order.STATS_PROJECTION, 'items': 1},
                             session=session
                         )
                         
+                        if previous is None:
+                            session.abort_transaction()
+                            raise OrderValidationError(
+                                f"Order {order_number} changed status concurrently",
+                                "ORDER_025",
+                                {"current_status": order.status}
+                            )
+                        
                         # 2. Restore inventory
-                        for item in order.items:
+                        for item in previous.get('items', []):
                             self.products_collection.update_one(
                                 {'_id': ObjectId(item['product_id'])},
                                 {'$inc': {'stock_quantity': item['quantity']}},
@@ -673,6 +695,13 @@ class OrderService:
                         
                         session.commit_transaction()
                         
+                        OrderStats.record_status_change(
+                            previous.get('created_at'),
+                            previous.get('status', order.status),
+                            self.ORDER_STATUS_CANCELLED,
+                            OrderStats.order_revenue(previous)
+                        )
+                        
                         logger.info(f"Order cancelled successfully: {order_number}")
                         
                         return {
@@ -682,6 +711,8 @@ class OrderService:
                             'cancelled_at': datetime.utcnow().isoformat()
                         }
                         
+                    except OrderValidationError:
+                        raise
                     except Exception as e:
                         logger.error(f"Error cancelling order {order_number}: {str(e)}")
                         raise OrderCreationError(
@@ -0,0 +1,226 @@
+"""
+Password Hashing Service for Local Producer Web Application
+
+This module runs bcrypt hashing and verification in a dedicated process
+pool so a burst of login attempts cannot starve request threads of CPU.
+Admission is bounded: when every worker is busy and the waiting queue is
+full, new work is rejected immediately instead of queueing behind it.
+"""
+
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional
+
+import bcrypt
+from flask import current_app, has_app_context
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_LOG_ROUNDS = 12
+
+
+class PasswordHasherBusy(Exception):
+    """Exception raised when the hashing queue is full or too slow."""
+    pass
+
+
+def _hash_password(password: bytes, rounds: int) -> bytes:
+    """Hash a password in a worker process."""
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _check_password(password: bytes, hashed: bytes) -> bool:
+    """Check a password in a worker process."""
+    return bcrypt.checkpw(password, hashed)
+
+
+def _pool_context():
+    """
+    Get the start method for hashing workers.
+
+    Forking a threaded Flask process that already holds pymongo and
+    background-thread locks can leave children deadlocked on a lock that
+    was held at fork time, so workers start from a clean forkserver (or
+    spawn where forkserver is unavailable).
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('forkserver')
+    return multiprocessing.get_context('spawn')
+
+
+def hash_rounds(hashed: Any) -> Optional[int]:
+    """
+    Get the cost factor of a bcrypt hash.
+
+    Args:
+        hashed (str): Hash in modular crypt format ($2b$12$...)
+
+    Returns:
+        int: Log rounds, or None if the hash is not a bcrypt hash
+    """
+    if not isinstance(hashed, str):
+        return None
+    parts = hashed.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """
+    Bounded bcrypt worker pool.
+
+    The pool is created lazily on first use. With ``workers=0`` hashing runs
+    inline on the calling thread, still behind the admission limit.
+    """
+
+    def __init__(self, rounds: int = DEFAULT_LOG_ROUNDS, workers: int = 2,
+                 max_pending: int = 8, timeout: float = 10.0):
+        """
+        Initialize password hasher.
+
+        Args:
+            rounds: bcrypt log rounds for new hashes
+            workers: Number of worker processes (0 runs inline)
+            max_pending: Maximum hashes running or waiting at once
+            timeout: Seconds to wait for a worker result
+        """
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+        self._stats = {'completed': 0, 'rejected': 0, 'timeouts': 0, 'pool_restarts': 0}
+
+    def hash(self, password: str, rounds: Optional[int] = None) -> str:
+        """
+        Hash a password.
+
+        Raises:
+            PasswordHasherBusy: If the queue is full or the worker timed out
+        """
+        hashed = self._run(_hash_password, password.encode('utf-8'), rounds or self.rounds)
+        return hashed.decode('utf-8')
+
+    def verify(self, password: str, hashed: str) -> bool:
+        """
+        Check a password against a bcrypt hash.
+
+        Raises:
+            PasswordHasherBusy: If the queue is full or the worker timed out
+        """
+        if not hashed:
+            return False
+        return self._run(_check_password, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: Any) -> bool:
+        """Check whether a hash was made with a different cost than configured."""
+        rounds = hash_rounds(hashed)
+        return rounds is not None and rounds != self.rounds
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get hasher statistics."""
+        return {
+            **self._stats,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'rounds': self.rounds
+        }
+
+    def shutdown(self) -> None:
+        """Stop worker processes."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def _run(self, func, *args):
+        """Run a hashing function behind the admission limit."""
+        if not self._slots.acquire(blocking=False):
+            self._stats['rejected'] += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        if self.workers <= 0:
+            try:
+                result = func(*args)
+            finally:
+                self._slots.release()
+            self._stats['completed'] += 1
+            return result
+
+        pool = self._get_pool()
+        try:
+            future = pool.submit(func, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._pool_broken(pool)
+        except Exception:
+            self._slots.release()
+            raise
+
+        # The slot is held until the worker is done, even if we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            result = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._stats['timeouts'] += 1
+            raise PasswordHasherBusy("Password hashing timed out")
+        except BrokenProcessPool:
+            self._pool_broken(pool)
+        self._stats['completed'] += 1
+        return result
+
+    def _pool_broken(self, pool: ProcessPoolExecutor) -> None:
+        """
+        Drop a pool whose worker died and shed the call.
+
+        Running the call inline instead would bypass the worker count, so a
+        crashing pool would turn into unbounded hashing on request threads.
+
+        Raises:
+            PasswordHasherBusy: Always; the client retries after the restart
+        """
+        logger.error("Password hashing pool broken, restarting")
+        self._reset_pool(pool)
+        raise PasswordHasherBusy("Password hashing pool restarted")
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use."""
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+            return self._pool
+
+    def _reset_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Drop a broken worker pool unless another call already replaced it."""
+        with self._pool_lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+            self._stats['pool_restarts'] += 1
+        pool.shutdown(wait=False)
+
+
+# Global password hasher instance
+_password_hasher: Optional[PasswordHasher] = None
+
+
+def get_password_hasher() -> PasswordHasher:
+    """Get or create global password hasher instance."""
+    global _password_hasher
+    if _password_hasher is None:
+        config = current_app.config if has_app_context() else {}
+        _password_hasher = PasswordHasher(
+            rounds=int(config.get('BCRYPT_LOG_ROUNDS', os.environ.get('BCRYPT_LOG_ROUNDS', DEFAULT_LOG_ROUNDS))),
+            workers=int(config.get('PASSWORD_HASH_WORKERS', os.environ.get('PASSWORD_HASH_WORKERS', 2))),
+            max_pending=int(config.get('PASSWORD_HASH_QUEUE_SIZE', os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 8)))
+        )
+    return _password_hasher
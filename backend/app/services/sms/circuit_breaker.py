@@ -0,0 +1,178 @@
+"""
+Circuit Breaker - Per-provider send error and latency tracking
+
+Each SMS provider gets a breaker fed with the outcome and latency of every
+send. The breaker opens when the provider fails too often, too many times
+in a row, or answers too slowly, and probes it again after a cool-down.
+Its latency percentiles also tell the SMS manager when to hedge a send to
+a backup provider.
+"""
+
+import time
+import math
+import threading
+from collections import deque
+from typing import Dict, Any, Optional
+
+# Circuit breaker states
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker over a rolling window of sends.
+
+    While closed, the last ``window_size`` outcomes are kept. Once at least
+    ``min_calls`` are recorded the breaker opens if the failure rate or the
+    rate of calls slower than ``slow_call_seconds`` reaches its threshold;
+    ``failure_threshold`` consecutive failures open it regardless. An open
+    breaker rejects traffic for ``open_seconds`` and then admits a single
+    half-open probe whose outcome closes or reopens it.
+    """
+
+    def __init__(self, failure_threshold: int = 3, open_seconds: float = 30.0,
+                 window_size: int = 50, min_calls: int = 10,
+                 error_rate_threshold: float = 0.5, slow_call_seconds: float = 5.0,
+                 slow_rate_threshold: float = 0.5):
+        """
+        Initialize circuit breaker.
+
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            open_seconds: Seconds an open circuit rejects traffic
+            window_size: Number of recent sends kept for rates and percentiles
+            min_calls: Sends needed in the window before rates are evaluated
+            error_rate_threshold: Failure rate (0-1) that opens the circuit
+            slow_call_seconds: Latency above which a send counts as slow
+            slow_rate_threshold: Slow call rate (0-1) that opens the circuit
+        """
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_rate_threshold = slow_rate_threshold
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._outcomes = deque(maxlen=window_size)
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a send may go to this provider.
+
+        Moving from open to half-open reserves the single probe slot, so
+        only call this when the send will actually be made.
+        """
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN:
+                if time.monotonic() - self.opened_at < self.open_seconds:
+                    return False
+                self.state = CIRCUIT_HALF_OPEN
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def is_available(self) -> bool:
+        """Check whether allow_request would admit a send, without reserving it"""
+        with self._lock:
+            if self.state == CIRCUIT_CLOSED:
+                return True
+            if self.state == CIRCUIT_OPEN and time.monotonic() - self.opened_at < self.open_seconds:
+                return False
+            return not self._probe_in_flight
+
+    def record(self, success: Optional[bool], latency: Optional[float] = None) -> None:
+        """
+        Record the outcome of a send.
+
+        Args:
+            success: Whether the provider accepted the message; None for
+                outcomes that say nothing about the provider (invalid input),
+                which only release a half-open probe
+            latency: Seconds the send took (None if unknown, e.g. bulk sends)
+        """
+        with self._lock:
+            self._probe_in_flight = False
+            if success is None:
+                return
+
+            if self.state == CIRCUIT_HALF_OPEN:
+                if success and not self._is_slow(latency):
+                    self._close()
+                else:
+                    self._open()
+                return
+
+            self._outcomes.append((success, latency))
+            self.consecutive_failures = 0 if success else self.consecutive_failures + 1
+            if self.state == CIRCUIT_CLOSED and self._should_open():
+                self._open()
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        """
+        Get a latency percentile of recent successful sends.
+
+        Returns:
+            Seconds, or None until min_calls successful sends are recorded
+        """
+        with self._lock:
+            latencies = sorted(latency for success, latency in self._outcomes
+                               if success and latency is not None)
+        if len(latencies) < self.min_calls:
+            return None
+        index = max(0, math.ceil(percentile / 100.0 * len(latencies)) - 1)
+        return latencies[index]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get breaker state and window statistics"""
+        with self._lock:
+            outcomes = list(self._outcomes)
+            state = self.state
+            consecutive_failures = self.consecutive_failures
+        calls = len(outcomes)
+        failures = sum(1 for success, _ in outcomes if not success)
+        slow = sum(1 for _, latency in outcomes if self._is_slow(latency))
+        return {
+            'state': state,
+            'calls': calls,
+            'failure_rate': failures / calls if calls else 0.0,
+            'slow_call_rate': slow / calls if calls else 0.0,
+            'consecutive_failures': consecutive_failures,
+            'p50': self.latency_percentile(50),
+            'p95': self.latency_percentile(95)
+        }
+
+    def _should_open(self) -> bool:
+        """Check the trip conditions (caller holds the lock)"""
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for success, _ in self._outcomes if not success)
+        slow = sum(1 for _, latency in self._outcomes if self._is_slow(latency))
+        return (failures / calls >= self.error_rate_threshold
+                or slow / calls >= self.slow_rate_threshold)
+
+    def _is_slow(self, latency: Optional[float]) -> bool:
+        """Check whether a latency counts as a slow call"""
+        return latency is not None and latency >= self.slow_call_seconds
+
+    def _open(self) -> None:
+        """Trip the breaker (caller holds the lock)"""
+        self.state = CIRCUIT_OPEN
+        self.opened_at = time.monotonic()
+
+    def _close(self) -> None:
+        """Reset the breaker after a successful probe (caller holds the lock)"""
+        self.state = CIRCUIT_CLOSED
+        self.consecutive_failures = 0
+        self._outcomes.clear()
@@ -0,0 +1,115 @@
+"""
+SMS Dispatcher - Background event loop for asynchronous SMS sends
+
+Flask handles requests on worker threads, so async provider clients need a
+loop of their own. The dispatcher runs one asyncio loop on a daemon thread;
+sync code hands it coroutines and gets back concurrent futures, and
+hundreds of in-flight sends share that one thread and its connection pools.
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SmsDispatcher:
+    """Runs SMS coroutines on a background asyncio loop (one per process)"""
+
+    def __init__(self):
+        """Initialize dispatcher (the loop starts on first use)"""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Get the running dispatcher loop, starting it if needed"""
+        if self._is_running():
+            return self._loop
+        with self._lock:
+            if not self._is_running():
+                started = threading.Event()
+                loop = asyncio.new_event_loop()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(started.set)
+                    loop.run_forever()
+
+                self._loop = loop
+                self._thread = threading.Thread(target=run, name='sms-dispatcher', daemon=True)
+                self._thread_pid = os.getpid()
+                self._thread.start()
+                started.wait()
+        return self._loop
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Schedule a coroutine on the dispatcher loop.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Future resolved with the coroutine's result
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: float = None) -> Any:
+        """
+        Run a coroutine on the dispatcher loop and wait for its result.
+
+        Must not be called from the dispatcher loop itself.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Seconds to wait (None waits until done)
+
+        Returns:
+            The coroutine's result
+        """
+        return self.submit(coro).result(timeout)
+
+    def in_dispatcher(self) -> bool:
+        """Check whether the caller runs on the dispatcher loop"""
+        return self._thread is not None and threading.current_thread() is self._thread
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Stop the loop and wait for the thread to exit"""
+        with self._lock:
+            if not self._is_running():
+                return
+            loop, thread = self._loop, self._thread
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            if not thread.is_alive():
+                loop.close()
+            self._loop = None
+            self._thread = None
+
+    def _is_running(self) -> bool:
+        """Check that this process's loop thread is alive (a fork loses it)"""
+        return (self._thread is not None and self._thread_pid == os.getpid()
+                and self._thread.is_alive())
+
+
+# Global SMS dispatcher instance
+_sms_dispatcher = None
+
+def get_sms_dispatcher() -> SmsDispatcher:
+    """
+    Get SMS dispatcher instance (singleton pattern).
+    
+    Returns:
+        SmsDispatcher instance
+    """
+    global _sms_dispatcher
+    if _sms_dispatcher is None:
+        _sms_dispatcher = SmsDispatcher()
+    return _sms_dispatcher
@@ -0,0 +1,290 @@
+"""
+SMS Provider Health Monitor - Background health table for provider selection
+
+Health checks are expensive (for SMSO a live balance request), so they run
+on a background thread instead of in front of every send. Results are kept
+in an in-memory health table together with a circuit breaker per provider,
+and sending an SMS picks a provider from that table without any I/O.
+"""
+
+import os
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Tuple, Iterable
+from app.models.sms_provider import SmsProvider
+from app.services.sms.provider_interface import SmsProviderInterface
+from app.services.sms.circuit_breaker import CircuitBreaker, CIRCUIT_CLOSED
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ProviderHealth:
+    """Health table entry for one active provider"""
+    slug: str
+    name: str
+    provider: SmsProviderInterface
+    priority: int = 100
+    is_default: bool = False
+    is_healthy: bool = True
+    error_message: Optional[str] = None
+    last_check: Optional[datetime] = None
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+
+    @property
+    def circuit_state(self) -> str:
+        """Current circuit breaker state"""
+        return self.breaker.state
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary (without the provider instance)"""
+        return {
+            'slug': self.slug,
+            'name': self.name,
+            'priority': self.priority,
+            'is_default': self.is_default,
+            'is_healthy': self.is_healthy,
+            'error_message': self.error_message,
+            'last_check': self.last_check,
+            'circuit': self.breaker.get_stats()
+        }
+
+
+class ProviderHealthMonitor:
+    """
+    Polls active providers and answers "which provider should send now".
+
+    The table is rebuilt off the request path every ``interval`` seconds
+    (0 disables the thread; the table is then built on demand). Until the
+    first background check completes, selection uses provisional
+    "untested" entries built from the provider registry, and after a
+    configuration change the previous table keeps serving until the new
+    one is swapped in, so no send waits for a health check. Send outcomes
+    reported through ``record_send`` feed each provider's CircuitBreaker,
+    which keeps traffic away from a failing or slow provider until a
+    half-open probe succeeds.
+    """
+
+    def __init__(self, manager, interval: float = 60.0,
+                 breaker_options: Optional[Dict[str, Any]] = None):
+        """
+        Initialize health monitor.
+
+        Args:
+            manager: SmsManager used to build provider instances
+            interval: Seconds between background health checks (0 disables)
+            breaker_options: Keyword arguments for each provider's CircuitBreaker
+        """
+        self.manager = manager
+        self.interval = interval
+        self.breaker_options = breaker_options or {}
+        self._table: Dict[str, ProviderHealth] = {}
+        self._ranked: Tuple[ProviderHealth, ...] = ()
+        self._loaded = False
+        self._stale = False
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._provisional_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+
+    def start(self) -> None:
+        """Start the background thread (once per process)"""
+        if self.interval <= 0:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._thread_pid == os.getpid():
+                return
+            self._thread = threading.Thread(target=self._run, name='sms-health-monitor', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def invalidate(self) -> None:
+        """
+        Schedule a refresh after a provider configuration change.
+
+        The current table (and every circuit breaker in it) keeps serving
+        until the refresh swaps in a new one.
+        """
+        with self._lock:
+            self._stale = True
+        self._wakeup.set()
+
+    def select(self, exclude: Iterable[str] = (), reserve: bool = True) -> Optional[ProviderHealth]:
+        """
+        Pick the provider that should send the next message.
+
+        Providers are ranked default first, then by priority. The first one
+        that is healthy and whose circuit accepts traffic wins. A half-open
+        circuit's probe slot is reserved for the caller, which must report
+        the outcome through ``record_send``.
+
+        Args:
+            exclude: Provider slugs to skip
+            reserve: Reserve the probe slot; pass False when only asking
+                which provider would be used, not sending
+
+        Returns:
+            ProviderHealth entry, or None if no provider is usable
+        """
+        if self.interval <= 0:
+            if not self._loaded or self._stale:
+                self.refresh()
+        else:
+            self.start()
+            if not self._loaded:
+                self._load_provisional()
+
+        for entry in self._ranked:
+            if entry.slug in exclude or not entry.is_healthy:
+                continue
+            if entry.breaker.allow_request() if reserve else entry.breaker.is_available():
+                return entry
+        return None
+
+    def get(self, slug: str) -> Optional[ProviderHealth]:
+        """Get the health table entry of a provider"""
+        return self._table.get(slug)
+
+    def record_send(self, slug: str, success: Optional[bool], latency: Optional[float] = None) -> None:
+        """
+        Record the outcome of a send for a provider's circuit breaker.
+
+        Args:
+            slug: Provider slug
+            success: Whether the provider accepted the message (None if the
+                failure was caused by the message, not the provider)
+            latency: Seconds the send took (None if unknown)
+        """
+        entry = self._table.get(slug)
+        if entry is None:
+            return
+
+        previous_state = entry.breaker.state
+        entry.breaker.record(success, latency)
+        if entry.breaker.state != previous_state:
+            log = logger.info if entry.breaker.state == CIRCUIT_CLOSED else logger.warning
+            log(f"SMS provider {slug} circuit {previous_state} -> {entry.breaker.state}")
+
+    def refresh(self) -> Dict[str, ProviderHealth]:
+        """
+        Health check every active provider and swap in a new table.
+
+        The provider registry is reloaded first, so configuration changes
+        made by other processes reach this one within an interval. Circuit
+        state is carried over for providers that stay active, so a periodic
+        refresh does not close a circuit that sends have opened.
+
+        Returns:
+            The new health table keyed by slug
+        """
+        with self._refresh_lock:
+            with self._lock:
+                # Invalidations from here on need another refresh
+                self._stale = False
+            previous = self._table
+            table = {}
+
+            self.manager.registry.reload()
+            for registry_entry in self.manager.registry.get_active():
+                provider_model, provider = registry_entry.model, registry_entry.provider
+                if not provider:
+                    continue
+
+                try:
+                    is_healthy, error = provider.health_check()
+                except Exception as e:
+                    is_healthy, error = False, f"Health check failed: {str(e)}"
+
+                entry = ProviderHealth(
+                    slug=provider_model.slug,
+                    name=provider_model.name,
+                    provider=provider,
+                    priority=provider_model.priority,
+                    is_default=provider_model.is_default,
+                    is_healthy=is_healthy,
+                    error_message=error,
+                    last_check=datetime.utcnow(),
+                    breaker=previous[provider_model.slug].breaker if provider_model.slug in previous
+                    else CircuitBreaker(**self.breaker_options)
+                )
+
+                if not is_healthy:
+                    logger.warning(f"SMS provider {entry.name} unhealthy: {error}")
+                self._persist_health(provider_model, entry)
+                table[entry.slug] = entry
+
+            ranked = tuple(sorted(
+                table.values(),
+                key=lambda entry: (not entry.is_default, entry.priority, entry.name)
+            ))
+            with self._lock:
+                self._table = table
+                self._ranked = ranked
+                self._loaded = True
+            return table
+
+    def _load_provisional(self) -> None:
+        """
+        Build an untested table from the registry, without health checks.
+
+        Used until the background thread's first refresh completes; those
+        entries count as healthy and have no last_check.
+        """
+        with self._provisional_lock:
+            if self._loaded:
+                return
+            table = {}
+            for registry_entry in self.manager.registry.get_active():
+                if not registry_entry.provider:
+                    continue
+                provider_model = registry_entry.model
+                table[provider_model.slug] = ProviderHealth(
+                    slug=provider_model.slug,
+                    name=provider_model.name,
+                    provider=registry_entry.provider,
+                    priority=provider_model.priority,
+                    is_default=provider_model.is_default,
+                    breaker=CircuitBreaker(**self.breaker_options)
+                )
+            ranked = tuple(sorted(
+                table.values(),
+                key=lambda entry: (not entry.is_default, entry.priority, entry.name)
+            ))
+            with self._lock:
+                # The first real refresh may have finished meanwhile
+                if not self._loaded:
+                    self._table = table
+                    self._ranked = ranked
+                    self._loaded = True
+
+    def get_snapshot(self) -> List[Dict[str, Any]]:
+        """Get the health table in selection order"""
+        return [entry.to_dict() for entry in self._ranked]
+
+    def _persist_health(self, provider_model: SmsProvider, entry: ProviderHealth) -> None:
+        """Store the health check result on the provider document"""
+        try:
+            SmsProvider.get_collection().update_one(
+                {'_id': provider_model._id},
+                {'$set': {'health_status': {
+                    'is_healthy': entry.is_healthy,
+                    'last_check': entry.last_check,
+                    'error_message': entry.error_message
+                }}}
+            )
+        except Exception as e:
+            logger.warning(f"Failed to store health status for {entry.slug}: {e}")
+
+    def _run(self) -> None:
+        """Background loop: refresh now, then every interval or as soon as invalidated"""
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"SMS provider health refresh failed: {e}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
@@ -7,7 +7,7 @@ activation/deactivation, and secure storage of credentials.
 
 import logging
 from typing import Dict, Any, List, Optional, Tuple
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from bson import ObjectId
 
 from app.models.sms_provider import SmsProvider
@@ -411,8 +411,11 @@ class ProviderConfigService:
             if not provider:
                 return {'error': 'Provider not found'}
             
-            # Get stats from logs
-            stats = SmsLog.get_provider_stats(provider._id, days)
+            # Get stats from the hourly rollups (logs are keyed by slug)
+            stats = SmsLog.get_statistics(
+                provider=provider.slug,
+                start_date=datetime.utcnow() - timedelta(days=days)
+            ).get(provider.slug, {'total_count': 0, 'total_cost': 0.0, 'by_status': {}})
             
             return {
                 'provider': {
@@ -2,10 +2,14 @@
 SMS Provider Interface - Abstract base class for all SMS providers
 """
 
+import time
+import asyncio
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 from dataclasses import dataclass, field
+from app.utils.rate_limit_engine import get_rate_limit_engine
 
 @dataclass
 class SmsMessage:
@@ -93,6 +97,9 @@ class SmsProviderInterface(ABC):
     All SMS providers must implement this interface.
     """
     
+    # Concurrent sends used by the default send_bulk
+    DEFAULT_BULK_CONCURRENCY = 4
+    
     def __init__(self, config: Dict[str, Any]):
         """
         Initialize provider with configuration.
@@ -218,6 +225,19 @@ class SmsProviderInterface(ABC):
         # E.164 format: + followed by 1-15 digits
         return bool(re.match(r'^\+[1-9]\d{1,14}$', phone))
     
+    def verify_webhook(self, token: Optional[str]) -> bool:
+        """
+        Check the shared secret a provider webhook was called with.
+        Default implementation rejects every webhook (not supported).
+        
+        Args:
+            token: Secret from the webhook request
+            
+        Returns:
+            True if the webhook may be processed
+        """
+        return False
+    
     def handle_webhook(self, data: Dict[str, Any]) -> Optional[SmsStatus]:
         """
         Handle provider webhook for delivery reports.
@@ -231,6 +251,99 @@ class SmsProviderInterface(ABC):
         """
         return None
     
+    async def send_sms_async(self, message: SmsMessage) -> SmsResponse:
+        """
+        Send SMS message from an asyncio loop (the SMS dispatcher).
+        
+        Default implementation runs the blocking send_sms in the loop's
+        thread pool. Providers with an async client override it.
+        
+        Args:
+            message: SMS message to send
+            
+        Returns:
+            SmsResponse with send result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.send_sms, message)
+    
+    def send_bulk(self, messages: List[SmsMessage]) -> List[SmsResponse]:
+        """
+        Send many messages.
+        
+        Default implementation fans single sends out over a small thread
+        pool (``bulk_concurrency`` in the provider config), paced to the
+        provider's rate limits. Providers with a batch endpoint override it.
+        
+        Args:
+            messages: SMS messages to send
+            
+        Returns:
+            One SmsResponse per message, in input order
+        """
+        if not messages:
+            return []
+        
+        concurrency = int(self.config.get('bulk_concurrency', self.DEFAULT_BULK_CONCURRENCY))
+        concurrency = max(1, min(concurrency, len(messages)))
+        
+        def send_one(message: SmsMessage) -> SmsResponse:
+            self._acquire_send_slot()
+            try:
+                return self.send_sms(message)
+            except Exception as e:
+                return SmsResponse(
+                    success=False,
+                    error_code='PROVIDER_ERROR',
+                    error_message=f"Provider error: {str(e)}"
+                )
+        
+        if concurrency == 1:
+            return [send_one(message) for message in messages]
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='sms-bulk') as executor:
+            return list(executor.map(send_one, messages))
+    
+    def _acquire_send_slot(self) -> None:
+        """
+        Block until the provider's rate limits allow one more message.
+        
+        Pacing goes through the shared rate limit engine, so it holds across threads
+        (and across processes with Redis storage).
+        """
+        key, burst, window = self._send_slot_limit()
+        engine = get_rate_limit_engine()
+        while True:
+            decision = engine.acquire(key, burst, window)
+            if decision.allowed:
+                return
+            time.sleep(decision.retry_after)
+    
+    async def _acquire_send_slot_async(self) -> None:
+        """Wait without blocking the loop until the rate limits allow one more message"""
+        key, burst, window = self._send_slot_limit()
+        engine = get_rate_limit_engine()
+        while True:
+            decision = engine.acquire(key, burst, window)
+            if decision.allowed:
+                return
+            await asyncio.sleep(decision.retry_after)
+    
+    def _send_slot_limit(self) -> Tuple[str, int, float]:
+        """
+        Get the rate limit engine key, burst and window for sends.
+        
+        The per-second limit is the burst; the steady rate is the tightest
+        of the per-second, per-minute and per-hour limits.
+        """
+        limits = self.get_rate_limits()
+        burst = max(1, int(limits.get('per_second') or 1))
+        rate = min(
+            float(burst),
+            (limits.get('per_minute') or float('inf')) / 60.0,
+            (limits.get('per_hour') or float('inf')) / 3600.0
+        )
+        return f"sms_provider:{self.get_provider_name()}", burst, burst / rate
+    
     def get_rate_limits(self) -> Dict[str, int]:
         """
         Get provider rate limits.
@@ -0,0 +1,133 @@
+"""
+SMS Provider Registry - In-memory copy of the sms_providers collection
+
+Provider documents change only through the admin ProviderConfigService,
+yet the send path used to read them (and decrypt API keys) on every
+message. The registry loads all providers with one query, builds each
+provider instance once, and serves slug/active/default lookups from
+memory until it is invalidated or reloaded.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from app.models.sms_provider import SmsProvider
+from app.services.sms.provider_interface import SmsProviderInterface
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RegistryEntry:
+    """A provider document with its ready-to-use provider instance"""
+    model: SmsProvider
+    provider: Optional[SmsProviderInterface]
+
+    @property
+    def slug(self) -> str:
+        """Provider slug"""
+        return self.model.slug
+
+
+class ProviderRegistry:
+    """
+    Cached provider documents and instances, keyed by slug.
+
+    The registry loads lazily. ProviderConfigService invalidates it after
+    every configuration change in this process, and the health monitor
+    reloads it on each refresh so other processes pick up changes too.
+    A reload keeps an existing instance when its provider type and stored
+    config are unchanged, so API keys are decrypted once per config change.
+    """
+
+    def __init__(self, manager):
+        """
+        Initialize provider registry.
+
+        Args:
+            manager: SmsManager used to build provider instances
+        """
+        self.manager = manager
+        self._entries: Dict[str, RegistryEntry] = {}
+        self._loaded = False
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+
+    def get(self, slug: str) -> Optional[RegistryEntry]:
+        """Get a provider by slug (active or not)"""
+        return self._get_entries().get(slug)
+
+    def get_active(self) -> List[RegistryEntry]:
+        """Get active providers, default first, then by priority"""
+        return sorted(
+            (entry for entry in self._get_entries().values() if entry.model.is_active),
+            key=lambda entry: (not entry.model.is_default, entry.model.priority, entry.model.name)
+        )
+
+    def get_default(self) -> Optional[RegistryEntry]:
+        """Get the active default provider, or the best-ranked active one"""
+        active = self.get_active()
+        return active[0] if active else None
+
+    def get_instance(self, provider_model: SmsProvider) -> Optional[SmsProviderInterface]:
+        """
+        Get the provider instance for a provider document.
+
+        The cached instance is reused while the document's provider type and
+        config match the cached copy; otherwise a new one is built.
+        """
+        entry = self._get_entries().get(provider_model.slug)
+        if entry is not None and self._same_config(entry.model, provider_model):
+            return entry.provider
+        return self.manager._create_provider_instance(provider_model)
+
+    def reload(self) -> Dict[str, RegistryEntry]:
+        """
+        Load all provider documents and swap in a new registry.
+
+        Returns:
+            The new entries keyed by slug
+        """
+        with self._reload_lock:
+            generation = self._generation
+            previous = self._entries
+            entries = {}
+
+            for provider_model in SmsProvider.get_all_providers():
+                cached = previous.get(provider_model.slug)
+                if cached is not None and self._same_config(cached.model, provider_model):
+                    provider = cached.provider
+                else:
+                    provider = self.manager._create_provider_instance(provider_model)
+                entries[provider_model.slug] = RegistryEntry(provider_model, provider)
+
+            with self._lock:
+                # An invalidation during the load makes these entries stale
+                if generation == self._generation:
+                    self._entries = entries
+                    self._loaded = True
+            return entries
+
+    def invalidate(self) -> None:
+        """
+        Mark the cache stale after a configuration change.
+
+        The next lookup reloads the documents; instances of providers
+        whose config did not change are kept.
+        """
+        with self._lock:
+            self._loaded = False
+            self._generation += 1
+
+    def _get_entries(self) -> Dict[str, RegistryEntry]:
+        """Get the current entries, loading them on first use"""
+        if not self._loaded:
+            return self.reload()
+        return self._entries
+
+    @staticmethod
+    def _same_config(cached: SmsProvider, current: SmsProvider) -> bool:
+        """Check whether a cached instance was built from the same settings"""
+        return cached.provider_type == current.provider_type and cached.config == current.config
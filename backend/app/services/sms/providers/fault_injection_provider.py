@@ -0,0 +1,245 @@
+"""
+Fault-injection SMS provider for load tests
+
+MockProvider answers instantly and always the same way, so it cannot show
+how SmsManager's failover, hedging and circuit breakers behave when a
+provider is slow or failing. This provider samples a latency for every
+send from a configurable distribution and injects errors, timeouts and
+balance exhaustion at configurable rates.
+"""
+
+import re
+import math
+import time
+import uuid
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime
+from app.services.sms.providers.mock_provider import MockProvider
+from app.services.sms.provider_interface import (
+    SmsMessage,
+    SmsResponse,
+    SmsStatus,
+    ProviderBalance
+)
+
+logger = logging.getLogger(__name__)
+
+
+class FaultInjectionProvider(MockProvider):
+    """
+    Mock provider with latency distributions and injected failures.
+
+    Configuration (all optional):
+        latency_distribution: 'constant', 'uniform', 'normal', 'lognormal'
+            or 'exponential' (default 'constant')
+        latency_ms: Mean latency; the median for 'lognormal' (default 0)
+        latency_spread_ms: Half-width for 'uniform', std dev for 'normal'
+        latency_sigma: Shape of the 'lognormal' distribution (default 0.5)
+        latency_max_ms: Upper bound applied to every sample
+        error_rate: Fraction of sends answered with SMS_API_ERROR
+        timeout_rate: Fraction of sends that hang for timeout_seconds and
+            then fail with PROVIDER_TIMEOUT
+        timeout_seconds: How long an injected timeout blocks (default 10)
+        exhaust_after: Sends accepted before every send fails with
+            INSUFFICIENT_CREDIT
+        seed: Seed for reproducible runs
+
+    Sent messages are kept per instance, not in MockProvider's class-level
+    store, so concurrent load tests do not share or grow one dict.
+    """
+
+    LATENCY_DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+    # Sent messages kept for get_status and last_code_for
+    MAX_STORED_MESSAGES = 100000
+
+    def __init__(self, config: Dict[str, Any]):
+        """Initialize fault-injection provider"""
+        self.latency_distribution = config.get('latency_distribution', 'constant')
+        self.latency_ms = float(config.get('latency_ms', 0))
+        self.latency_spread_ms = float(config.get('latency_spread_ms', 0))
+        self.latency_sigma = float(config.get('latency_sigma', 0.5))
+        self.latency_max_ms = config.get('latency_max_ms')
+        self.error_rate = float(config.get('error_rate', 0))
+        self.timeout_rate = float(config.get('timeout_rate', 0))
+        self.timeout_seconds = float(config.get('timeout_seconds', 10))
+        self.exhaust_after = config.get('exhaust_after')
+        self._random = random.Random(config.get('seed'))
+        self._lock = threading.Lock()
+        self._messages: Dict[str, Dict[str, Any]] = {}
+        self._last_body_by_phone: Dict[str, str] = {}
+        self._stats = {'sent': 0, 'errors': 0, 'timeouts': 0, 'exhausted': 0, 'invalid': 0}
+
+        super().__init__({'log_messages': False, **config})
+
+    def _validate_config(self) -> None:
+        """Validate fault-injection configuration"""
+        super()._validate_config()
+
+        if self.latency_distribution not in self.LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency_distribution must be one of {', '.join(self.LATENCY_DISTRIBUTIONS)}")
+
+        if self.latency_ms < 0 or self.latency_spread_ms < 0 or self.latency_sigma < 0:
+            raise ValueError("latency settings must be non-negative")
+
+        for name in ('error_rate', 'timeout_rate'):
+            if not 0 <= getattr(self, name) <= 1:
+                raise ValueError(f"{name} must be between 0 and 1")
+
+        if self.error_rate + self.timeout_rate > 1:
+            raise ValueError("error_rate + timeout_rate must not exceed 1")
+
+    def send_sms(self, message: SmsMessage) -> SmsResponse:
+        """Send a message after the sampled latency, or fail as configured"""
+        delay, response = self._plan(message)
+        if delay > 0:
+            time.sleep(delay)
+        return response
+
+    async def send_sms_async(self, message: SmsMessage) -> SmsResponse:
+        """Send a message without blocking the dispatcher loop while waiting"""
+        delay, response = self._plan(message)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return response
+
+    def sample_latency(self) -> float:
+        """Draw one latency, in seconds, from the configured distribution"""
+        mean = self.latency_ms
+        distribution = self.latency_distribution
+
+        if distribution == 'uniform':
+            latency = self._random.uniform(mean - self.latency_spread_ms, mean + self.latency_spread_ms)
+        elif distribution == 'normal':
+            latency = self._random.gauss(mean, self.latency_spread_ms)
+        elif distribution == 'lognormal':
+            latency = self._random.lognormvariate(math.log(mean), self.latency_sigma) if mean > 0 else 0.0
+        elif distribution == 'exponential':
+            latency = self._random.expovariate(1 / mean) if mean > 0 else 0.0
+        else:
+            latency = mean
+
+        if self.latency_max_ms is not None:
+            latency = min(latency, float(self.latency_max_ms))
+        return max(latency, 0.0) / 1000
+
+    def _plan(self, message: SmsMessage) -> Tuple[float, SmsResponse]:
+        """
+        Decide how a send ends before waiting for it.
+
+        Returns:
+            Tuple of (seconds to wait, response to return afterwards)
+        """
+        errors = message.validate()
+        if errors:
+            with self._lock:
+                self._stats['invalid'] += 1
+            return 0.0, SmsResponse(
+                success=False,
+                error_code='INVALID_MESSAGE',
+                error_message='; '.join(errors)
+            )
+
+        latency = self.sample_latency()
+        cost = self.calculate_cost(message)
+        roll = self._random.random()
+
+        with self._lock:
+            exhausted = (self.exhaust_after is not None and self._stats['sent'] >= self.exhaust_after) \
+                or self.balance * 100 < cost
+            if exhausted:
+                self._stats['exhausted'] += 1
+                return latency, SmsResponse(
+                    success=False,
+                    error_code='INSUFFICIENT_CREDIT',
+                    error_message='Injected balance exhaustion'
+                )
+
+            if roll < self.timeout_rate:
+                self._stats['timeouts'] += 1
+                return self.timeout_seconds, SmsResponse(
+                    success=False,
+                    error_code='PROVIDER_TIMEOUT',
+                    error_message=f"Injected timeout after {self.timeout_seconds}s"
+                )
+
+            if roll < self.timeout_rate + self.error_rate:
+                self._stats['errors'] += 1
+                return latency, SmsResponse(
+                    success=False,
+                    error_code='SMS_API_ERROR',
+                    error_message='Injected provider error'
+                )
+
+            message_id = f"FAULT_{uuid.uuid4().hex[:12]}"
+            self.balance -= cost / 100  # Convert cents to euros
+            self._stats['sent'] += 1
+            if len(self._messages) >= self.MAX_STORED_MESSAGES:
+                self._messages.pop(next(iter(self._messages)))
+            self._messages[message_id] = {'to': message.to, 'sent_at': datetime.utcnow(), 'cost': cost}
+            self._last_body_by_phone[message.to] = message.body
+            balance = self.balance
+
+        return latency, SmsResponse(
+            success=True,
+            message_id=message_id,
+            status='sent',
+            cost=cost,
+            provider_response={'fault_injection': True, 'balance_remaining': balance}
+        )
+
+    def get_status(self, message_id: str) -> SmsStatus:
+        """Get delivery status of a message (accepted messages count as delivered)"""
+        msg_data = self._messages.get(message_id)
+        if not msg_data:
+            return SmsStatus(
+                message_id=message_id,
+                status='not_found',
+                error_code='MESSAGE_NOT_FOUND',
+                error_message='Message ID not found'
+            )
+
+        return SmsStatus(
+            message_id=message_id,
+            status='delivered',
+            delivered_at=msg_data['sent_at'],
+            provider_data={'fault_injection': True}
+        )
+
+    def get_balance(self) -> ProviderBalance:
+        """Get current account balance (zero once exhausted)"""
+        with self._lock:
+            exhausted = self.exhaust_after is not None and self._stats['sent'] >= self.exhaust_after
+            balance = 0.0 if exhausted else self.balance
+        return ProviderBalance(
+            balance=balance,
+            currency='EUR',
+            unit='money',
+            low_balance_threshold=10.0,
+            is_low=balance < 10.0
+        )
+
+    def health_check(self) -> Tuple[bool, Optional[str]]:
+        """Report unhealthy once the balance is exhausted"""
+        if self.get_balance().balance < 1.0:
+            return False, "Balance too low (< 1 EUR)"
+        return True, None
+
+    def get_provider_name(self) -> str:
+        """Get provider display name"""
+        return "Fault Injection Provider"
+
+    def last_code_for(self, phone: str) -> Optional[str]:
+        """Get the 6-digit code from the last message accepted for a phone"""
+        body = self._last_body_by_phone.get(phone)
+        match = re.search(r'\b\d{6}\b', body) if body else None
+        return match.group() if match else None
+
+    def get_fault_stats(self) -> Dict[str, int]:
+        """Get counts of accepted sends and of each injected failure"""
+        with self._lock:
+            return dict(self._stats)
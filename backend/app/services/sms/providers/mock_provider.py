@@ -189,6 +189,16 @@ class MockProvider(SmsProviderInterface):
         """Get provider display name"""
         return "Mock SMS Provider"
     
+    def get_rate_limits(self) -> Dict[str, int]:
+        """Get provider rate limits (configurable for load tests)"""
+        per_second = self.config.get('rate_limit_per_second', 100)
+        return {
+            'per_second': per_second,
+            'per_minute': per_second * 60,
+            'per_hour': per_second * 3600,
+            'per_day': per_second * 86400
+        }
+    
     def get_supported_features(self) -> List[str]:
         """Get list of supported features"""
         return [
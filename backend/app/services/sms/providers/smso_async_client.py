@@ -0,0 +1,246 @@
+"""
+SMSO.ro asyncio API client
+
+Non-blocking counterpart of SmsoClient for the SMS dispatcher loop. One
+httpx.AsyncClient keeps a pool of HTTP/1.1 keep-alive connections, so many
+sends can be in flight on a single thread. Every call has a deadline that
+covers all of its attempts, and transient failures are retried with
+full-jitter exponential backoff.
+"""
+
+import time
+import random
+import asyncio
+import logging
+from typing import Dict, Any, Optional
+from urllib.parse import urljoin
+import httpx
+from app.services.sms.providers.smso_client import SmsoClient, SmsoApiError
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSmsoClient:
+    """
+    Async client for SMSO.ro SMS API.
+
+    A send is not idempotent, so it is only retried when SMSO cannot have
+    accepted it: the connection failed before the request was written, or
+    SMSO answered 429/503. Status and balance reads are also retried after
+    read timeouts and gateway errors.
+    """
+
+    BASE_URL = SmsoClient.BASE_URL
+
+    # Responses that mean the request was rejected before being processed
+    RETRY_STATUS_CODES = (429, 503)
+    # Further responses that are safe to retry for reads
+    RETRY_STATUS_CODES_IDEMPOTENT = (429, 502, 503, 504)
+
+    def __init__(self, api_key: str, base_url: str = None, timeout: float = 10.0,
+                 max_connections: int = 100, max_keepalive: int = 20,
+                 retries: int = 2, backoff_base: float = 0.2, backoff_max: float = 2.0):
+        """
+        Initialize async SMSO client.
+
+        Args:
+            api_key: SMSO API key
+            base_url: Optional custom base URL
+            timeout: Default deadline in seconds for a call, retries included
+            max_connections: Maximum concurrent connections
+            max_keepalive: Idle keep-alive connections kept in the pool
+            retries: Retries after the first attempt
+            backoff_base: Backoff before the first retry (doubles per retry)
+            backoff_max: Upper bound for a single backoff
+        """
+        if not api_key:
+            raise ValueError("API key is required")
+
+        self.api_key = api_key
+        self.base_url = base_url or self.BASE_URL
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Get or create the pooled HTTP client (must be used from one event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={
+                    'X-Authorization': self.api_key,
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/json'
+                },
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive
+                ),
+                timeout=self.timeout
+            )
+        return self._client
+
+    async def _make_request(self, method: str, endpoint: str, data: Dict = None,
+                            params: Dict = None, deadline: float = None,
+                            idempotent: bool = True) -> Dict[str, Any]:
+        """
+        Make API request to SMSO, retrying transient failures.
+
+        Args:
+            method: HTTP method (GET, POST, etc.)
+            endpoint: API endpoint
+            data: Request body data
+            params: Query parameters
+            deadline: Seconds the whole call may take (defaults to timeout)
+            idempotent: Whether the request may be repeated after it was sent
+
+        Returns:
+            Response data as dictionary
+
+        Raises:
+            SmsoApiError: On API errors, or when the deadline passes
+        """
+        url = urljoin(self.base_url, endpoint)
+        expires_at = time.monotonic() + (deadline if deadline is not None else self.timeout)
+        retry_statuses = self.RETRY_STATUS_CODES_IDEMPOTENT if idempotent else self.RETRY_STATUS_CODES
+        attempt = 0
+
+        while True:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise SmsoApiError("Request timeout", status_code=408)
+
+            try:
+                response = await asyncio.wait_for(
+                    self.client.request(method, url, json=data, params=params, timeout=remaining),
+                    timeout=remaining
+                )
+            except (asyncio.TimeoutError, httpx.TimeoutException) as e:
+                # Connect and pool timeouts mean the request was never sent
+                sent = not isinstance(e, (httpx.ConnectTimeout, httpx.PoolTimeout))
+                error = SmsoApiError("Request timeout", status_code=408)
+                if (sent and not idempotent) or not await self._backoff(attempt, expires_at):
+                    raise error
+            except httpx.ConnectError:
+                if not await self._backoff(attempt, expires_at):
+                    raise SmsoApiError("Connection error", status_code=0)
+            except httpx.TransportError as e:
+                if not idempotent or not await self._backoff(attempt, expires_at):
+                    raise SmsoApiError(f"Request failed: {str(e)}", status_code=0)
+            else:
+                logger.debug(f"SMSO API {method} {url}: {response.status_code}")
+
+                try:
+                    response_data = response.json()
+                except ValueError:
+                    response_data = {'raw': response.text}
+
+                if response.status_code == SmsoClient.STATUS_OK:
+                    return response_data
+
+                error = SmsoApiError(
+                    SmsoClient._get_error_message(response.status_code, response_data),
+                    status_code=response.status_code,
+                    response_data=response_data
+                )
+                if response.status_code not in retry_statuses:
+                    logger.error(f"SMSO API error response: {response_data}")
+                    raise error
+                if not await self._backoff(attempt, expires_at, self._retry_after(response)):
+                    raise error
+
+            attempt += 1
+
+    async def _backoff(self, attempt: int, expires_at: float, minimum: float = 0.0) -> bool:
+        """
+        Sleep before a retry.
+
+        Full jitter: a random delay up to base * 2^attempt (capped), so
+        clients that failed together do not retry in lockstep.
+
+        Returns:
+            False if retries are exhausted or the deadline leaves no time
+        """
+        if attempt >= self.retries:
+            return False
+        delay = max(minimum, random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+        if time.monotonic() + delay >= expires_at:
+            return False
+        await asyncio.sleep(delay)
+        return True
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> float:
+        """Get the Retry-After delay of a response in seconds (0 if absent)"""
+        try:
+            return max(0.0, float(response.headers.get('Retry-After', 0)))
+        except ValueError:
+            return 0.0
+
+    async def send_sms(self, to: str, body: str, sender_id: str = None,
+                       message_type: str = 'transactional', webhook_url: str = None,
+                       deadline: float = None) -> Dict[str, Any]:
+        """
+        Send SMS message.
+
+        Args:
+            to: Phone number in E.164 format
+            body: Message content
+            sender_id: Sender ID (optional)
+            message_type: Type of message (transactional, marketing)
+            webhook_url: Webhook URL for delivery reports
+            deadline: Seconds the send may take, retries included
+
+        Returns:
+            Response with message ID and cost
+        """
+        data = SmsoClient.build_send_payload(to, body, sender_id, message_type, webhook_url)
+        response = await self._make_request('POST', 'send', data=data,
+                                            deadline=deadline, idempotent=False)
+        return SmsoClient.parse_send_response(response)
+
+    async def check_status(self, message_id: str, deadline: float = None) -> Dict[str, Any]:
+        """
+        Check message delivery status.
+
+        Args:
+            message_id: SMSO response token
+            deadline: Seconds the check may take, retries included
+
+        Returns:
+            Status information
+        """
+        response = await self._make_request('GET', 'status', params={'responseToken': message_id},
+                                            deadline=deadline)
+        return SmsoClient.parse_status_response(message_id, response)
+
+    async def check_balance(self, deadline: float = None) -> Dict[str, Any]:
+        """
+        Check account balance.
+
+        Args:
+            deadline: Seconds the check may take, retries included
+
+        Returns:
+            Balance information
+        """
+        response = await self._make_request('GET', 'credit-check', deadline=deadline)
+        return SmsoClient.parse_balance_response(response)
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self):
+        """Async context manager support"""
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Async context manager cleanup"""
+        await self.aclose()
@@ -4,6 +4,7 @@ SMSO.ro API Client for SMS operations
 
 import requests
 import logging
+from requests.adapters import HTTPAdapter
 from typing import Dict, Any, Optional
 from urllib.parse import urljoin
 
@@ -30,13 +31,24 @@ class SmsoClient:
     STATUS_UNAUTHORIZED = 401
     STATUS_INSUFFICIENT_CREDIT = 402
     
-    def __init__(self, api_key: str, base_url: str = None):
+    # SMSO delivery status -> our standard status
+    STATUS_MAP = {
+        'dispatched': 'sent',
+        'sent': 'sent',
+        'delivered': 'delivered',
+        'undelivered': 'failed',
+        'expired': 'expired',
+        'error': 'failed'
+    }
+    
+    def __init__(self, api_key: str, base_url: str = None, pool_size: int = 10):
         """
         Initialize SMSO client.
         
         Args:
             api_key: SMSO API key
             base_url: Optional custom base URL
+            pool_size: Keep-alive connections kept for concurrent sends
         """
         if not api_key:
             raise ValueError("API key is required")
@@ -44,8 +56,11 @@ class SmsoClient:
         self.api_key = api_key
         self.base_url = base_url or self.BASE_URL
         
-        # Session for connection pooling
+        # Session for connection pooling, sized for concurrent bulk sends
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.session.headers.update({
             'X-Authorization': self.api_key,
             'Content-Type': 'application/json',
@@ -108,12 +123,13 @@ class SmsoClient:
         except requests.exceptions.RequestException as e:
             raise SmsoApiError(f"Request failed: {str(e)}", status_code=0)
     
-    def _get_error_message(self, status_code: int, response_data: Dict) -> str:
+    @classmethod
+    def _get_error_message(cls, status_code: int, response_data: Dict) -> str:
         """Get user-friendly error message based on status code"""
         error_messages = {
-            self.STATUS_BAD_REQUEST: "Invalid request parameters",
-            self.STATUS_UNAUTHORIZED: "Invalid API key",
-            self.STATUS_INSUFFICIENT_CREDIT: "Insufficient credit balance"
+            cls.STATUS_BAD_REQUEST: "Invalid request parameters",
+            cls.STATUS_UNAUTHORIZED: "Invalid API key",
+            cls.STATUS_INSUFFICIENT_CREDIT: "Insufficient credit balance"
         }
         
         # Try to get message from response
@@ -142,7 +158,20 @@ class SmsoClient:
         Returns:
             Response with message ID and cost
         """
-        # Prepare request data
+        data = self.build_send_payload(to, body, sender_id, message_type, webhook_url)
+        
+        logger.info(f"SMSO API request data: {data}")
+        
+        # Send request
+        response = self._make_request('POST', 'send', data=data)
+        
+        return self.parse_send_response(response)
+    
+    @staticmethod
+    def build_send_payload(to: str, body: str, sender_id: str = None,
+                           message_type: str = 'transactional',
+                           webhook_url: str = None) -> Dict[str, Any]:
+        """Build the request body for the send endpoint"""
         data = {
             'to': to,
             'body': body,
@@ -158,13 +187,13 @@ class SmsoClient:
         # Additional options
         data['remove_special_chars'] = False  # Keep Romanian chars
         
-        logger.info(f"SMSO API request data: {data}")
-        
-        # Send request
-        response = self._make_request('POST', 'send', data=data)
-        
+        return data
+    
+    @classmethod
+    def parse_send_response(cls, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a send endpoint response to our result format"""
         return {
-            'success': response.get('status') == self.STATUS_OK,
+            'success': response.get('status') == cls.STATUS_OK,
             'message_id': response.get('responseToken'),
             'cost': response.get('transaction_cost', 0),  # in eurocents
             'response': response
@@ -184,20 +213,16 @@ class SmsoClient:
         
         response = self._make_request('GET', 'status', params=params)
         
-        # Map SMSO status to our standard status
+        return self.parse_status_response(message_id, response)
+    
+    @classmethod
+    def parse_status_response(cls, message_id: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a status endpoint response to our standard status"""
         smso_status = response.get('status', 'unknown')
-        status_map = {
-            'dispatched': 'sent',
-            'sent': 'sent',
-            'delivered': 'delivered',
-            'undelivered': 'failed',
-            'expired': 'expired',
-            'error': 'failed'
-        }
         
         return {
             'message_id': message_id,
-            'status': status_map.get(smso_status, smso_status),
+            'status': cls.STATUS_MAP.get(smso_status, smso_status),
             'smso_status': smso_status,
             'response': response
         }
@@ -211,6 +236,11 @@ class SmsoClient:
         """
         response = self._make_request('GET', 'credit-check')
         
+        return self.parse_balance_response(response)
+    
+    @staticmethod
+    def parse_balance_response(response: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a credit-check response to balance information"""
         # SMSO returns balance in euros
         balance = float(response.get('credit_value', 0))
         
@@ -2,9 +2,14 @@
 SMSO.ro SMS Provider implementation
 """
 
+import os
+import hmac
+import asyncio
 import logging
 from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+from flask import current_app
 from app.services.sms.provider_interface import (
     SmsProviderInterface,
     SmsMessage,
@@ -13,6 +18,7 @@ from app.services.sms.provider_interface import (
     ProviderBalance
 )
 from app.services.sms.providers.smso_client import SmsoClient, SmsoApiError
+from app.services.sms.dispatcher import get_sms_dispatcher
 
 logger = logging.getLogger(__name__)
 
@@ -22,17 +28,22 @@ class SmsoProvider(SmsProviderInterface):
     Provides SMS sending via SMSO.ro API.
     """
     
+    # Concurrent sends of an async bulk batch on the dispatcher loop
+    DEFAULT_ASYNC_CONCURRENCY = 50
+    
     def __init__(self, config: Dict[str, Any]):
         """Initialize SMSO provider"""
         # Initialize attributes first
         self.config = config
         self._client = None
+        self._async_client = None
+        self._async_client_loop = None
         
         # Extract configuration
         self.api_key = config.get('api_key')
         self.sender_id = config.get('sender_id', 'PeFocLemne')
         self.base_url = config.get('api_base_url')
-        self.webhook_url = config.get('webhook_url')
+        self.webhook_url = config.get('webhook_url') or self._default_webhook_url()
         
         # Cost configuration (eurocents)
         self.cost_per_sms_part = config.get('cost_per_sms_part', 3.5)
@@ -41,6 +52,23 @@ class SmsoProvider(SmsProviderInterface):
         # Now validate config
         self._validate_config()
     
+    @staticmethod
+    def _default_webhook_url() -> Optional[str]:
+        """
+        Get SMSO_WEBHOOK_URL from the app config, falling back to the environment.
+        
+        Providers are also built on the health monitor thread, which has no
+        application context.
+        """
+        try:
+            url = current_app.config.get('SMSO_WEBHOOK_URL')
+            if url:
+                return url
+        except RuntimeError:
+            # Outside of application context
+            pass
+        return os.environ.get('SMSO_WEBHOOK_URL')
+    
     def _validate_config(self) -> None:
         """Validate provider configuration"""
         if not self.api_key:
@@ -55,72 +83,64 @@ class SmsoProvider(SmsProviderInterface):
         if self._client is None:
             self._client = SmsoClient(
                 api_key=self.api_key,
-                base_url=self.base_url
+                base_url=self.base_url,
+                pool_size=max(10, int(self.config.get('bulk_concurrency', self.DEFAULT_BULK_CONCURRENCY)))
             )
         return self._client
     
+    @property
+    def async_client(self):
+        """
+        Get or create the async SMSO client for the running event loop.
+        
+        An httpx connection pool belongs to the loop that created it, so a
+        new client is made if the provider is used from another loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            from app.services.sms.providers.smso_async_client import AsyncSmsoClient
+            self._async_client = AsyncSmsoClient(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=float(self.config.get('timeout', 10)),
+                max_connections=int(self.config.get('async_concurrency', self.DEFAULT_ASYNC_CONCURRENCY)),
+                retries=int(self.config.get('retries', 2))
+            )
+            self._async_client_loop = loop
+        return self._async_client
+    
     def send_sms(self, message: SmsMessage) -> SmsResponse:
         """Send SMS message via SMSO"""
         try:
-            # Validate message
-            errors = message.validate()
-            if errors:
-                return SmsResponse(
-                    success=False,
-                    error_code='INVALID_MESSAGE',
-                    error_message='; '.join(errors)
-                )
-            
-            # Format phone number for SMSO
-            formatted_phone = self.format_phone_number(message.to)
-            
-            # Validate phone number
-            if not self.client.validate_phone_number(formatted_phone):
-                return SmsResponse(
-                    success=False,
-                    error_code='INVALID_PHONE',
-                    error_message='Invalid phone number format'
-                )
-            
-            # Determine sender ID
-            sender = message.sender_id or self.sender_id
+            prepared = self._prepare_send(message)
+            if isinstance(prepared, SmsResponse):
+                return prepared
             
             # Send via SMSO client
-            result = self.client.send_sms(
-                to=formatted_phone,
-                body=message.body,
-                sender_id=sender,
-                message_type=message.message_type,
-                webhook_url=self.webhook_url
-            )
-            
-            # Create response
-            return SmsResponse(
-                success=result['success'],
-                message_id=result.get('message_id'),
-                status='sent' if result['success'] else 'failed',
-                cost=result.get('cost', 0),
-                provider_response=result.get('response', {})
-            )
+            return self._build_send_response(self.client.send_sms(**prepared))
             
         except SmsoApiError as e:
-            logger.error(f"SMSO API error: {e}")
-            
-            # Map SMSO errors to our error codes
-            error_code = 'SMS_API_ERROR'
-            if e.status_code == 401:
-                error_code = 'INVALID_API_KEY'
-            elif e.status_code == 402:
-                error_code = 'INSUFFICIENT_CREDIT'
-            elif e.status_code == 400:
-                error_code = 'BAD_REQUEST'
+            return self._build_api_error_response(e)
             
+        except Exception as e:
+            logger.error(f"Unexpected error sending SMS: {e}")
             return SmsResponse(
                 success=False,
-                error_code=error_code,
-                error_message=str(e),
-                provider_response=e.response_data
+                error_code='PROVIDER_ERROR',
+                error_message=f"Provider error: {str(e)}"
             )
+    
+    async def send_sms_async(self, message: SmsMessage) -> SmsResponse:
+        """Send SMS message via the async SMSO client"""
+        try:
+            prepared = self._prepare_send(message)
+            if isinstance(prepared, SmsResponse):
+                return prepared
+            
+            return self._build_send_response(await self.async_client.send_sms(**prepared))
+            
+        except SmsoApiError as e:
+            return self._build_api_error_response(e)
             
         except Exception as e:
             logger.error(f"Unexpected error sending SMS: {e}")
@@ -130,6 +150,101 @@ class SmsoProvider(SmsProviderInterface):
                 error_message=f"Provider error: {str(e)}"
             )
     
+    def send_bulk(self, messages: List[SmsMessage]) -> List[SmsResponse]:
+        """
+        Send many messages concurrently on the SMS dispatcher loop.
+        
+        Up to ``async_concurrency`` sends are in flight at once over the
+        async client's keep-alive pool, paced to the provider rate limits.
+        """
+        if not messages:
+            return []
+        
+        dispatcher = get_sms_dispatcher()
+        if dispatcher.in_dispatcher():
+            # Waiting on the loop from inside it would deadlock
+            return super().send_bulk(messages)
+        return dispatcher.run(self._send_bulk_async(messages))
+    
+    async def _send_bulk_async(self, messages: List[SmsMessage]) -> List[SmsResponse]:
+        """Send a batch with bounded concurrency, keeping input order"""
+        semaphore = asyncio.Semaphore(
+            max(1, int(self.config.get('async_concurrency', self.DEFAULT_ASYNC_CONCURRENCY)))
+        )
+        
+        async def send_one(message: SmsMessage) -> SmsResponse:
+            async with semaphore:
+                await self._acquire_send_slot_async()
+                return await self.send_sms_async(message)
+        
+        return list(await asyncio.gather(*(send_one(message) for message in messages)))
+    
+    def _prepare_send(self, message: SmsMessage):
+        """
+        Validate a message and build the SMSO client arguments.
+        
+        Returns:
+            Keyword arguments for the client's send_sms, or an error SmsResponse
+        """
+        # Validate message
+        errors = message.validate()
+        if errors:
+            return SmsResponse(
+                success=False,
+                error_code='INVALID_MESSAGE',
+                error_message='; '.join(errors)
+            )
+        
+        # Format phone number for SMSO
+        formatted_phone = self.format_phone_number(message.to)
+        
+        # Validate phone number
+        if not self.client.validate_phone_number(formatted_phone):
+            return SmsResponse(
+                success=False,
+                error_code='INVALID_PHONE',
+                error_message='Invalid phone number format'
+            )
+        
+        return {
+            'to': formatted_phone,
+            'body': message.body,
+            'sender_id': message.sender_id or self.sender_id,
+            'message_type': message.message_type,
+            'webhook_url': self.webhook_url
+        }
+    
+    @staticmethod
+    def _build_send_response(result: Dict[str, Any]) -> SmsResponse:
+        """Create a response from an SMSO client send result"""
+        return SmsResponse(
+            success=result['success'],
+            message_id=result.get('message_id'),
+            status='sent' if result['success'] else 'failed',
+            cost=result.get('cost', 0),
+            provider_response=result.get('response', {})
+        )
+    
+    @staticmethod
+    def _build_api_error_response(e: SmsoApiError) -> SmsResponse:
+        """Map an SMSO API error to our error codes"""
+        logger.error(f"SMSO API error: {e}")
+        
+        error_code = 'SMS_API_ERROR'
+        if e.status_code == 401:
+            error_code = 'INVALID_API_KEY'
+        elif e.status_code == 402:
+            error_code = 'INSUFFICIENT_CREDIT'
+        elif e.status_code == 400:
+            error_code = 'BAD_REQUEST'
+        
+        return SmsResponse(
+            success=False,
+            error_code=error_code,
+            error_message=str(e),
+            provider_response=e.response_data
+        )
+    
     def get_status(self, message_id: str) -> SmsStatus:
         """Get delivery status from SMSO"""
         try:
@@ -288,6 +403,23 @@ class SmsoProvider(SmsProviderInterface):
         formatted = self.format_phone_number(phone)
         return self.client.validate_phone_number(formatted)
     
+    def verify_webhook(self, token: Optional[str]) -> bool:
+        """
+        Check the webhook token against the one in webhook_url.
+        
+        SMSO cannot sign its callbacks, so the secret travels in the URL it
+        calls, e.g. https://shop.example/api/sms/webhook/smso?token=<secret>.
+        Without a token in webhook_url no delivery report is accepted.
+        """
+        if not self.webhook_url or not token:
+            return False
+        
+        expected = parse_qs(urlparse(self.webhook_url).query).get('token', [None])[0]
+        if not expected:
+            return False
+        
+        return hmac.compare_digest(expected.encode(), token.encode())
+    
     def handle_webhook(self, data: Dict[str, Any]) -> Optional[SmsStatus]:
         """
         Handle SMSO webhook for delivery reports.
@@ -311,7 +443,10 @@ class SmsoProvider(SmsProviderInterface):
             'error': 'failed'
         }
         
-        status = status_map.get(smso_status, smso_status)
+        status = status_map.get(smso_status)
+        if not status:
+            logger.warning(f"Ignoring SMSO webhook with unknown status: {smso_status!r}")
+            return None
         
         # Parse timestamp if provided
         delivered_at = None
@@ -328,6 +463,7 @@ class SmsoProvider(SmsProviderInterface):
             message_id=data['responseToken'],
             status=status,
             delivered_at=delivered_at,
+            error_message=f"SMSO status: {smso_status}" if status == 'failed' else None,
             provider_data=data
         )
     
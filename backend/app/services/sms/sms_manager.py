@@ -3,13 +3,23 @@ SMS Manager - Orchestrates SMS sending through multiple providers
 """
 
 import os
+import time
+import asyncio
 import logging
 import importlib
-from typing import Dict, Any, Optional, Type
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, Optional, Type, Tuple, List
 from datetime import datetime
 from flask import current_app
 from app.models.sms_provider import SmsProvider
 from app.models.sms_log import SmsLog
+from app.models.sms_stats import SmsStats
+from app.services.sms.health_monitor import ProviderHealthMonitor
+from app.services.sms.provider_registry import ProviderRegistry
+from app.services.sms.telemetry import SmsTelemetry
+from app.services.sms.webhook_queue import WebhookQueue
+from app.services.sms.dispatcher import get_sms_dispatcher
 from app.services.sms.provider_interface import (
     SmsProviderInterface,
     SmsMessage,
@@ -20,13 +30,93 @@ from app.services.sms.provider_interface import (
 
 logger = logging.getLogger(__name__)
 
+
+class FailoverRace:
+    """
+    Failover and hedging decisions for one message.
+    
+    The primary attempt runs first. A backup is brought in once, when the
+    primary fails for a provider reason or, for hedged OTP sends, when it
+    has not answered within the hedge delay. The first success wins; a
+    client error (bad phone, bad message) ends the race at once. The sync
+    and async send paths drive the same race with futures or tasks.
+    """
+    
+    def __init__(self, manager: 'SmsManager', message: SmsMessage, slug: str):
+        """
+        Initialize race for a message whose primary provider is ``slug``.
+        
+        Args:
+            manager: SmsManager used to select a backup
+            message: Message being sent
+            slug: Primary provider slug
+        """
+        self.manager = manager
+        self.primary_slug = slug
+        self.hedge_delay = manager._get_hedge_delay(slug, message)
+        self.attempts: Dict[Any, Tuple[str, SmsProviderInterface]] = {}
+        self.backup_tried = False
+        self.result: Optional[Tuple[str, SmsProviderInterface, SmsResponse]] = None
+    
+    @property
+    def timeout(self) -> Optional[float]:
+        """Seconds to wait for an attempt before hedging (None waits until one is done)"""
+        return None if self.backup_tried else self.hedge_delay
+    
+    def settle(self, attempt, response: SmsResponse, pending) -> bool:
+        """
+        Take the response of a finished attempt.
+        
+        Args:
+            attempt: The attempt's future or task
+            response: Its response
+            pending: Attempts still running
+            
+        Returns:
+            True if the response decides the send (result is set)
+        """
+        self.result = self.attempts[attempt] + (response,)
+        if response.success:
+            for other in pending:
+                # Deduplicate: a late success is only counted as provider usage
+                other.add_done_callback(
+                    lambda f, s=self.attempts[other][0]: self.manager._count_hedge_duplicate(s, f)
+                )
+            return True
+        return response.error_code in self.manager.CLIENT_ERROR_CODES
+    
+    def next_backup(self, pending) -> Optional[Tuple[str, SmsProviderInterface]]:
+        """
+        Pick the backup provider, once per race.
+        
+        Args:
+            pending: Attempts still running (non-empty when hedging)
+            
+        Returns:
+            Tuple of (slug, provider), or None if there is none to try
+        """
+        if self.backup_tried:
+            return None
+        self.backup_tried = True
+        backup_slug, backup = self.manager._select_provider(exclude=(self.primary_slug,))
+        if not backup:
+            return None
+        if pending:
+            logger.info(f"Hedging SMS from {self.primary_slug} to {backup_slug} after {self.hedge_delay:.2f}s")
+        else:
+            logger.warning(f"SMS provider {self.primary_slug} failed ({self.result[2].error_code}), "
+                           f"failing over to {backup_slug}")
+        return backup_slug, backup
+
+
 class SmsManager:
     """
     Manages SMS sending through multiple providers.
     Handles provider selection, failover, and logging.
     """
     
-    # Provider class mapping
+    # Provider class mapping (load-test providers such as fault_injection
+    # are added per manager with register_provider_class)
     PROVIDER_CLASSES = {
         'mock': 'app.services.sms.providers.mock_provider.MockProvider',
         'smso': 'app.services.sms.providers.smso_provider.SmsoProvider',
@@ -34,11 +124,41 @@ class SmsManager:
         'vonage': 'app.services.sms.providers.vonage_provider.VonageProvider'
     }
     
+    # Error codes caused by the message itself; they say nothing about provider health
+    CLIENT_ERROR_CODES = ('INVALID_MESSAGE', 'INVALID_PHONE', 'BAD_REQUEST')
+    
+    # Statuses a delivery report may set on a log
+    WEBHOOK_STATUSES = (SmsLog.STATUS_SENT, SmsLog.STATUS_DELIVERED, SmsLog.STATUS_FAILED, SmsLog.STATUS_EXPIRED)
+    
     def __init__(self):
         """Initialize SMS manager"""
-        self._providers_cache: Dict[str, SmsProviderInterface] = {}
+        self.registry = ProviderRegistry(self)
+        self.provider_classes = dict(self.PROVIDER_CLASSES)
         self._default_provider = None
         self._is_development = self._check_development_mode()
+        self.health_monitor = ProviderHealthMonitor(
+            self,
+            interval=float(self._get_config('SMS_HEALTH_CHECK_INTERVAL', 60)),
+            breaker_options={
+                'failure_threshold': int(self._get_config('SMS_CIRCUIT_FAILURE_THRESHOLD', 3)),
+                'open_seconds': float(self._get_config('SMS_CIRCUIT_OPEN_SECONDS', 30)),
+                'error_rate_threshold': float(self._get_config('SMS_CIRCUIT_ERROR_RATE', 0.5)),
+                'slow_call_seconds': float(self._get_config('SMS_CIRCUIT_SLOW_CALL_SECONDS', 5))
+            }
+        )
+        self.telemetry = SmsTelemetry(
+            flush_interval=float(self._get_config('SMS_TELEMETRY_FLUSH_SECONDS', 2)),
+            batch_size=int(self._get_config('SMS_TELEMETRY_BATCH_SIZE', 100))
+        )
+        self.webhook_queue = WebhookQueue(
+            self,
+            flush_interval=float(self._get_config('SMS_WEBHOOK_FLUSH_SECONDS', 1)),
+            batch_size=int(self._get_config('SMS_WEBHOOK_BATCH_SIZE', 500))
+        )
+        self.hedge_enabled = str(self._get_config('SMS_HEDGE_ENABLED', 'true')).lower() in ('1', 'true', 'yes')
+        self.hedge_min_delay = float(self._get_config('SMS_HEDGE_MIN_DELAY', 0.5))
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_lock = threading.Lock()
         
         # Initialize indexes on startup
         self._ensure_indexes()
@@ -48,6 +168,7 @@ class SmsManager:
         try:
             SmsProvider.create_indexes()
             SmsLog.create_indexes()
+            SmsStats.create_indexes()
         except Exception as e:
             logger.warning(f"Failed to create indexes: {e}")
     
@@ -65,9 +186,29 @@ class SmsManager:
         env = os.environ.get('FLASK_ENV', os.environ.get('ENV', '')).lower()
         return env in ['development', 'dev']
     
+    def _get_config(self, key: str, default: Any) -> Any:
+        """Read a setting from the app config, falling back to the environment"""
+        try:
+            if current_app and key in current_app.config:
+                return current_app.config[key]
+        except RuntimeError:
+            # Outside of application context
+            pass
+        return os.environ.get(key, default)
+    
+    def register_provider_class(self, provider_type: str, class_path: str) -> None:
+        """
+        Make an extra provider type loadable by this manager.
+        
+        Used by load tests and fixtures for providers that must never be
+        configurable in production (e.g. fault_injection). Call clear_cache
+        afterwards if providers of that type were already looked up.
+        """
+        self.provider_classes[provider_type] = class_path
+    
     def _load_provider_class(self, provider_type: str) -> Optional[Type[SmsProviderInterface]]:
         """Dynamically load provider class"""
-        class_path = self.PROVIDER_CLASSES.get(provider_type)
+        class_path = self.provider_classes.get(provider_type)
         if not class_path:
             logger.error(f"Unknown provider type: {provider_type}")
             return None
@@ -82,12 +223,11 @@ class SmsManager:
             return None
     
     def _get_provider_instance(self, provider_model: SmsProvider) -> Optional[SmsProviderInterface]:
-        """Get or create provider instance"""
-        # Check cache
-        cache_key = str(provider_model._id)
-        if cache_key in self._providers_cache:
-            return self._providers_cache[cache_key]
-        
+        """Get provider instance (cached in the registry)"""
+        return self.registry.get_instance(provider_model)
+    
+    def _create_provider_instance(self, provider_model: SmsProvider) -> Optional[SmsProviderInterface]:
+        """Create provider instance, decrypting its credentials"""
         # Load provider class
         provider_class = self._load_provider_class(provider_model.provider_type)
         if not provider_class:
@@ -102,85 +242,110 @@ class SmsManager:
                 config['api_key'] = provider_model.get_api_key()
             
             # Create instance
-            instance = provider_class(config)
-            
-            # Cache it
-            self._providers_cache[cache_key] = instance
-            
-            return instance
+            return provider_class(config)
             
         except Exception as e:
             logger.error(f"Failed to create provider instance: {e}")
             return None
     
     def get_active_provider(self) -> Optional[SmsProviderInterface]:
-        """Get the active SMS provider"""
-        # Skip mock provider check - always use the configured provider
-        
-        # Get active provider from database
-        provider_model = SmsProvider.get_active_provider()
-        if not provider_model:
-            logger.warning("No active SMS provider configured")
-            # Fallback to mock in development
-            if self._is_development:
-                return self._get_mock_provider()
-            return None
+        """
+        Get the SMS provider that should send the next message.
         
-        # Get provider instance
-        provider = self._get_provider_instance(provider_model)
-        if not provider:
-            logger.error(f"Failed to load provider: {provider_model.name}")
-            return None
+        Nothing is sent, so no half-open probe slot is reserved.
+        """
+        _, provider = self._select_provider(reserve=False)
+        return provider
+    
+    def _select_provider(self, exclude: Tuple[str, ...] = (),
+                         reserve: bool = True) -> Tuple[Optional[str], Optional[SmsProviderInterface]]:
+        """
+        Pick a provider from the health table.
         
-        # Health check
-        is_healthy, error = provider.health_check()
-        if not is_healthy:
-            logger.warning(f"Provider {provider_model.name} unhealthy: {error}")
-            # Try to find backup provider
-            return self._get_backup_provider(exclude_id=provider_model._id)
+        The table is kept current by the health monitor, so this does no
+        database reads or provider health checks on the send path.
         
-        return provider
+        Args:
+            exclude: Provider slugs to skip
+            reserve: Reserve a half-open circuit's probe slot for a send
+        
+        Returns:
+            Tuple of (provider slug, provider instance)
+        """
+        entry = self.health_monitor.select(exclude=exclude, reserve=reserve)
+        if entry:
+            return entry.slug, entry.provider
+        
+        logger.warning("No healthy SMS provider available")
+        # Last resort: mock provider in development
+        if self._is_development and 'mock' not in exclude:
+            return 'mock', self._get_mock_provider()
+        return None, None
     
     def _get_mock_provider(self) -> Optional[SmsProviderInterface]:
         """Get mock provider for development"""
         # Check if mock provider exists in DB
-        mock_model = SmsProvider.find_by_slug('mock')
-        if not mock_model:
-            # Create default mock provider
-            mock_model = SmsProvider.seed_mock_provider()
+        entry = self.registry.get('mock')
+        if entry:
+            return entry.provider
         
+        # Create default mock provider
+        mock_model = SmsProvider.seed_mock_provider()
+        self.registry.invalidate()
         return self._get_provider_instance(mock_model)
     
-    def _get_backup_provider(self, exclude_id=None) -> Optional[SmsProviderInterface]:
-        """Get backup provider for failover"""
-        # Get all active providers
-        providers = SmsProvider.get_all_providers(active_only=True)
+    def send_sms(self, message: SmsMessage) -> SmsResponse:
+        """
+        Send SMS through active provider.
         
-        for provider_model in providers:
-            # Skip excluded provider
-            if exclude_id and provider_model._id == exclude_id:
-                continue
-            
-            # Try to get instance
-            provider = self._get_provider_instance(provider_model)
-            if not provider:
-                continue
+        A provider failure fails over to the next provider in the health
+        table. OTP messages are also hedged: if the primary has not answered
+        within its p95 latency, the same message goes to a backup provider
+        and the first success wins.
+        
+        Args:
+            message: SMS message to send
             
-            # Health check
-            is_healthy, _ = provider.health_check()
-            if is_healthy:
-                logger.info(f"Using backup provider: {provider_model.name}")
-                return provider
+        Returns:
+            SmsResponse with result
+        """
+        # Get provider
+        provider_slug, provider = self._select_provider()
+        if not provider:
+            return SmsResponse(
+                success=False,
+                error_code='NO_PROVIDER',
+                error_message='No SMS provider available'
+            )
         
-        # Last resort: mock provider in development
-        if self._is_development:
-            return self._get_mock_provider()
+        # Send SMS
+        created_at = datetime.utcnow()
+        provider_slug, provider, response = self._send_with_failover(message, provider_slug, provider)
         
-        return None
+        self._record_result(provider_slug, message, response, created_at)
+        return response
     
-    def send_sms(self, message: SmsMessage) -> SmsResponse:
+    def dispatch_sms(self, message: SmsMessage) -> Future:
         """
-        Send SMS through active provider.
+        Queue a send on the SMS dispatcher loop without blocking the caller.
+        
+        Sends from all threads are multiplexed on the dispatcher's single
+        event loop through the providers' async clients.
+        
+        Args:
+            message: SMS message to send
+            
+        Returns:
+            Future resolved with the SmsResponse
+        """
+        return get_sms_dispatcher().submit(self.send_sms_async(message))
+    
+    async def send_sms_async(self, message: SmsMessage) -> SmsResponse:
+        """
+        Send SMS through active provider from an asyncio loop.
+        
+        Same failover and OTP hedging as send_sms, with the attempts awaited
+        as tasks instead of occupying threads.
         
         Args:
             message: SMS message to send
@@ -188,8 +353,7 @@ class SmsManager:
         Returns:
             SmsResponse with result
         """
-        # Get provider
-        provider = self.get_active_provider()
+        provider_slug, provider = self._select_provider()
         if not provider:
             return SmsResponse(
                 success=False,
@@ -197,43 +361,251 @@ class SmsManager:
                 error_message='No SMS provider available'
             )
         
-        # Log attempt
+        created_at = datetime.utcnow()
+        provider_slug, provider, response = await self._send_with_failover_async(
+            message, provider_slug, provider
+        )
+        
+        self._record_result(provider_slug, message, response, created_at)
+        return response
+    
+    def send_bulk(self, messages: List[SmsMessage]) -> List[SmsResponse]:
+        """
+        Send many messages (e.g. order notifications to many customers).
+        
+        The whole batch goes through the provider's send_bulk, which uses a
+        batch endpoint or bounded concurrent sends within its rate limits.
+        Messages that fail for provider reasons are retried once as a batch
+        on the next healthy provider. Bulk messages are never hedged.
+        
+        Args:
+            messages: SMS messages to send
+            
+        Returns:
+            One SmsResponse per message, in input order
+        """
+        if not messages:
+            return []
+        
+        provider_slug, provider = self._select_provider()
+        if not provider:
+            return [
+                SmsResponse(
+                    success=False,
+                    error_code='NO_PROVIDER',
+                    error_message='No SMS provider available'
+                )
+                for _ in messages
+            ]
+        
+        created_at = datetime.utcnow()
+        slugs = [provider_slug] * len(messages)
+        responses = self._attempt_bulk(provider_slug, provider, messages)
+        
+        retry = [i for i, response in enumerate(responses)
+                 if not response.success and response.error_code not in self.CLIENT_ERROR_CODES]
+        if retry:
+            backup_slug, backup = self._select_provider(exclude=(provider_slug,))
+            if backup:
+                logger.warning(f"Retrying {len(retry)} bulk SMS from {provider_slug} on {backup_slug}")
+                retried = self._attempt_bulk(backup_slug, backup, [messages[i] for i in retry])
+                for i, response in zip(retry, retried):
+                    responses[i] = response
+                    slugs[i] = backup_slug
+        
+        for slug, message, response in zip(slugs, messages, responses):
+            self._record_result(slug, message, response, created_at)
+        return responses
+    
+    def _attempt_bulk(self, slug: str, provider: SmsProviderInterface,
+                      messages: List[SmsMessage]) -> List[SmsResponse]:
+        """Send a batch through one provider and feed outcomes to its circuit breaker"""
+        try:
+            responses = provider.send_bulk(messages)
+        except Exception as e:
+            logger.error(f"SMS provider {slug} bulk send raised: {e}")
+            responses = [
+                SmsResponse(
+                    success=False,
+                    error_code='PROVIDER_ERROR',
+                    error_message=f"Provider error: {str(e)}"
+                )
+                for _ in messages
+            ]
+        
+        for response in responses:
+            success = None if response.error_code in self.CLIENT_ERROR_CODES else response.success
+            self.health_monitor.record_send(slug, success)
+        return responses
+    
+    def _record_result(self, provider_slug: str, message: SmsMessage,
+                       response: SmsResponse, created_at: datetime) -> None:
+        """Log a sent message once, with its final status, and count it"""
         log = SmsLog({
-            'provider': provider.get_provider_name().lower(),
+            'provider': provider_slug,
             'phone_number': message.to,
             'message_type': message.message_type,
             'message': message.body,
-            'status': SmsLog.STATUS_PENDING,
-            'metadata': message.metadata
+            'status': SmsLog.STATUS_SENT if response.success else SmsLog.STATUS_FAILED,
+            'response_token': response.message_id,
+            'provider_response': response.provider_response,
+            'cost': response.cost or 0,
+            'error': response.error_message,
+            'metadata': message.metadata,
+            'created_at': created_at,
+            'sent_at': datetime.utcnow() if response.success else None
         })
-        log.save()
-        
-        # Send SMS
-        start_time = datetime.utcnow()
-        response = provider.send_sms(message)
-        
-        # Update log with result
-        log.status = SmsLog.STATUS_SENT if response.success else SmsLog.STATUS_FAILED
-        log.response_token = response.message_id
-        log.provider_response = response.provider_response
-        log.cost = response.cost or 0
-        log.error = response.error_message
+        self.telemetry.record_log(log)
         
         if response.success:
-            log.sent_at = datetime.utcnow()
             # Update provider usage stats
-            self._update_provider_stats(provider, sent=1, cost=response.cost)
+            self._update_provider_stats(provider_slug, sent=1, cost=response.cost)
         else:
             # Update provider failure stats
-            self._update_provider_stats(provider, failed=1)
-        
-        log.save()
+            self._update_provider_stats(provider_slug, failed=1)
         
         # Add log ID to response for tracking
         response.provider_response['log_id'] = str(log._id)
+    
+    def _send_with_failover(self, message: SmsMessage, slug: str,
+                            provider: SmsProviderInterface) -> Tuple[str, SmsProviderInterface, SmsResponse]:
+        """
+        Send through the primary provider, failing over or hedging to a backup.
         
+        Unhedged sends run inline on the calling thread; hedged ones run on
+        the hedge executor so the primary can be raced against a backup.
+        
+        Returns:
+            Tuple of (slug and provider that produced the response, response)
+        """
+        race = FailoverRace(self, message, slug)
+        
+        def launch(attempt_slug: str, attempt_provider: SmsProviderInterface) -> Future:
+            if race.hedge_delay is None:
+                future = Future()
+                future.set_result(self._attempt_send(attempt_slug, attempt_provider, message))
+            else:
+                future = self._get_hedge_executor().submit(self._attempt_send, attempt_slug, attempt_provider, message)
+            race.attempts[future] = (attempt_slug, attempt_provider)
+            return future
+        
+        pending = {launch(slug, provider)}
+        while pending:
+            done, pending = wait(pending, timeout=race.timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if race.settle(future, future.result(), pending):
+                    return race.result
+            backup = race.next_backup(pending)
+            if backup:
+                pending.add(launch(*backup))
+        
+        return race.result
+    
+    async def _send_with_failover_async(self, message: SmsMessage, slug: str,
+                                        provider: SmsProviderInterface) -> Tuple[str, SmsProviderInterface, SmsResponse]:
+        """
+        Async counterpart of _send_with_failover, with attempts awaited as tasks.
+        
+        Returns:
+            Tuple of (slug and provider that produced the response, response)
+        """
+        race = FailoverRace(self, message, slug)
+        
+        def launch(attempt_slug: str, attempt_provider: SmsProviderInterface) -> asyncio.Future:
+            task = asyncio.ensure_future(self._attempt_send_async(attempt_slug, attempt_provider, message))
+            race.attempts[task] = (attempt_slug, attempt_provider)
+            return task
+        
+        pending = {launch(slug, provider)}
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=race.timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if race.settle(task, task.result(), pending):
+                    return race.result
+            backup = race.next_backup(pending)
+            if backup:
+                pending.add(launch(*backup))
+        
+        return race.result
+    
+    async def _attempt_send_async(self, slug: str, provider: SmsProviderInterface,
+                                  message: SmsMessage) -> SmsResponse:
+        """Send through one provider's async path and feed the outcome to its circuit breaker"""
+        started = time.monotonic()
+        try:
+            response = await provider.send_sms_async(message)
+        except Exception as e:
+            logger.error(f"SMS provider {slug} raised: {e}")
+            response = SmsResponse(
+                success=False,
+                error_code='PROVIDER_ERROR',
+                error_message=f"Provider error: {str(e)}"
+            )
+        
+        success = None if response.error_code in self.CLIENT_ERROR_CODES else response.success
+        self.health_monitor.record_send(slug, success, time.monotonic() - started)
+        return response
+    
+    def _attempt_send(self, slug: str, provider: SmsProviderInterface,
+                      message: SmsMessage) -> SmsResponse:
+        """Send through one provider and feed the outcome to its circuit breaker"""
+        started = time.monotonic()
+        try:
+            response = provider.send_sms(message)
+        except Exception as e:
+            logger.error(f"SMS provider {slug} raised: {e}")
+            response = SmsResponse(
+                success=False,
+                error_code='PROVIDER_ERROR',
+                error_message=f"Provider error: {str(e)}"
+            )
+        
+        success = None if response.error_code in self.CLIENT_ERROR_CODES else response.success
+        self.health_monitor.record_send(slug, success, time.monotonic() - started)
         return response
     
+    def _get_hedge_delay(self, slug: str, message: SmsMessage) -> Optional[float]:
+        """
+        Get how long to wait for the primary before hedging.
+        
+        Only OTP messages are hedged, since a duplicate verification code is
+        harmless but a duplicate notification is not. Hedging starts once
+        the provider has enough latency history for a p95.
+        
+        Returns:
+            Seconds, or None to send without hedging
+        """
+        if not self.hedge_enabled or message.message_type != 'otp':
+            return None
+        entry = self.health_monitor.get(slug)
+        if entry is None:
+            return None
+        p95 = entry.breaker.latency_percentile(95)
+        if p95 is None:
+            return None
+        return max(p95, self.hedge_min_delay)
+    
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        """Create the thread pool for hedged sends on first use"""
+        with self._hedge_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=int(self._get_config('SMS_HEDGE_WORKERS', 8)),
+                    thread_name_prefix='sms-hedge'
+                )
+            return self._hedge_executor
+    
+    def _count_hedge_duplicate(self, provider_slug: str, future) -> None:
+        """Account for a hedged send that also succeeded after the winner"""
+        if future.cancelled():
+            return
+        try:
+            response = future.result()
+            if response.success:
+                self._update_provider_stats(provider_slug, sent=1, cost=response.cost)
+        except Exception as e:
+            logger.error(f"Failed to account for hedged SMS duplicate: {e}")
+    
     def get_message_status(self, message_id: str, provider_slug: str = None) -> SmsStatus:
         """
         Get message delivery status.
@@ -246,6 +618,7 @@ class SmsManager:
             SmsStatus with current status
         """
         # Find log by response token
+        self.telemetry.flush_pending_log(message_id)
         log = SmsLog.find_by_response_token(message_id)
         if not log:
             return SmsStatus(
@@ -256,22 +629,10 @@ class SmsManager:
             )
         
         # Get provider
-        if provider_slug:
-            provider_model = SmsProvider.find_by_slug(provider_slug)
-        else:
-            provider_model = SmsProvider.find_by_slug(log.provider)
-        
-        if not provider_model:
-            # Return status from log
-            return SmsStatus(
-                message_id=message_id,
-                status=log.status,
-                delivered_at=log.delivered_at
-            )
-        
-        # Get provider instance
-        provider = self._get_provider_instance(provider_model)
+        entry = self.registry.get(provider_slug or log.provider)
+        provider = entry.provider if entry else None
         if not provider:
+            # Return status from log
             return SmsStatus(
                 message_id=message_id,
                 status=log.status,
@@ -284,16 +645,18 @@ class SmsManager:
             
             # Update log if status changed
             if status.status != log.status:
+                previous_status, previous_delivery_time = log.status, log.delivery_time
                 log.status = status.status
                 if status.status == SmsLog.STATUS_DELIVERED:
                     log.delivered_at = status.delivered_at or datetime.utcnow()
                     log.delivery_time = log.calculate_delivery_time()
                     # Update provider delivery stats
-                    self._update_provider_stats(provider, delivered=1)
+                    self._update_provider_stats(entry.slug, delivered=1)
                 elif status.status == SmsLog.STATUS_FAILED:
                     log.error = status.error_message
                 
                 log.save()
+                self.telemetry.record_status_change(log, previous_status, previous_delivery_time)
             
             return status
             
@@ -309,16 +672,13 @@ class SmsManager:
     def get_provider_balance(self, provider_slug: str = None) -> Optional[ProviderBalance]:
         """Get provider balance"""
         if provider_slug:
-            provider_model = SmsProvider.find_by_slug(provider_slug)
+            entry = self.registry.get(provider_slug)
         else:
-            provider_model = SmsProvider.get_active_provider()
+            entry = self.registry.get_default()
         
-        if not provider_model:
-            return None
-        
-        provider = self._get_provider_instance(provider_model)
-        if not provider:
+        if not entry or not entry.provider:
             return None
+        provider = entry.provider
         
         try:
             return provider.get_balance()
@@ -326,45 +686,59 @@ class SmsManager:
             logger.error(f"Failed to get balance: {e}")
             return None
     
-    def _update_provider_stats(self, provider: SmsProviderInterface, 
+    def _update_provider_stats(self, provider_slug: str, 
                              sent: int = 0, delivered: int = 0, 
                              failed: int = 0, cost: float = 0):
-        """Update provider usage statistics"""
+        """Update provider usage statistics (coalesced and flushed with $inc)"""
         try:
-            # Find provider model
-            provider_name = provider.get_provider_name().lower()
-            provider_model = SmsProvider.find_by_slug(provider_name)
-            
-            if provider_model:
-                provider_model.update_usage_stats(
-                    sent=sent,
-                    delivered=delivered,
-                    failed=failed,
-                    cost=cost
-                )
-                provider_model.save()
-                
+            self.telemetry.record_usage(
+                provider_slug,
+                sent=sent,
+                delivered=delivered,
+                failed=failed,
+                cost=cost or 0
+            )
         except Exception as e:
             logger.error(f"Failed to update provider stats: {e}")
     
+    def verify_webhook(self, provider_slug: str, token: Optional[str]) -> bool:
+        """
+        Check that a webhook call really comes from the provider.
+        
+        Args:
+            provider_slug: Provider identifier
+            token: Shared secret from the webhook request
+            
+        Returns:
+            True if the provider accepts the token
+        """
+        entry = self.registry.get(provider_slug)
+        if not entry or not entry.provider:
+            return False
+        
+        return entry.provider.verify_webhook(token)
+    
     def handle_webhook(self, provider_slug: str, data: Dict[str, Any]) -> bool:
         """
-        Handle provider webhook for delivery reports.
+        Accept a provider webhook with a delivery report.
+        
+        The report is parsed here and queued; the webhook queue applies
+        queued reports to the logs in batches.
         
         Args:
             provider_slug: Provider identifier
             data: Webhook payload
             
         Returns:
-            True if webhook was processed
+            True if the report was accepted
         """
         # Get provider
-        provider_model = SmsProvider.find_by_slug(provider_slug)
-        if not provider_model:
+        entry = self.registry.get(provider_slug)
+        if not entry:
             logger.warning(f"Unknown provider for webhook: {provider_slug}")
             return False
         
-        provider = self._get_provider_instance(provider_model)
+        provider = entry.provider
         if not provider:
             return False
         
@@ -374,21 +748,11 @@ class SmsManager:
             if not status:
                 return False
             
-            # Update log
-            log = SmsLog.find_by_response_token(status.message_id)
-            if log:
-                log.status = status.status
-                if status.delivered_at:
-                    log.delivered_at = status.delivered_at
-                    log.delivery_time = log.calculate_delivery_time()
-                log.save()
-                
-                # Update provider stats
-                if status.status == SmsLog.STATUS_DELIVERED:
-                    self._update_provider_stats(provider, delivered=1)
-                elif status.status == SmsLog.STATUS_FAILED:
-                    self._update_provider_stats(provider, failed=1)
+            if status.status not in self.WEBHOOK_STATUSES:
+                logger.warning(f"Ignoring {provider_slug} webhook with status {status.status!r}")
+                return False
             
+            self.webhook_queue.enqueue(provider_slug, status)
             return True
             
         except Exception as e:
@@ -396,8 +760,9 @@ class SmsManager:
             return False
     
     def clear_cache(self):
-        """Clear provider instance cache"""
-        self._providers_cache.clear()
+        """Clear the provider registry and the health table built from it"""
+        self.registry.invalidate()
+        self.health_monitor.invalidate()
     
     @classmethod
     def generate_verification_code(cls) -> str:
@@ -0,0 +1,279 @@
+"""
+SMS Telemetry - Write-coalesced SMS logs, usage counters and stats rollups
+
+Sending an SMS used to cost four database operations (log insert, log
+update, provider read, provider save). The telemetry sink buffers each log
+once with its final status and coalesces provider counters and hourly
+statistics rollups in memory; a background thread flushes them every few
+seconds, as one unordered insert_many and bulk_writes of $inc updates.
+"""
+
+import os
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, Optional, List
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+from app.models.sms_log import SmsLog
+from app.models.sms_provider import SmsProvider
+from app.models.sms_stats import SmsStats
+
+logger = logging.getLogger(__name__)
+
+
+class SmsTelemetry:
+    """
+    Buffered sink for SMS logs, provider usage counters and stats rollups.
+
+    With ``flush_interval=0`` every call is written through immediately,
+    which keeps tests and one-off scripts free of background threads.
+
+    Buffered logs are the only write of an SMS log, so a failed flush puts
+    its logs, counters and rollup deltas back into the buffers for the next
+    one. At most ``max_buffered_logs`` logs are kept; beyond that the
+    oldest are dropped and counted in get_stats.
+    """
+
+    # Mongo error code of an insert whose _id is already stored
+    DUPLICATE_KEY_ERROR = 11000
+
+    def __init__(self, flush_interval: float = 2.0, batch_size: int = 100,
+                 max_buffered_logs: int = 10000):
+        """
+        Initialize telemetry sink.
+
+        Args:
+            flush_interval: Seconds between background flushes (0 writes through)
+            batch_size: Buffered logs that trigger an early flush
+            max_buffered_logs: Logs kept for retry while the database is unavailable
+        """
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_buffered_logs = max_buffered_logs
+        self._logs: List[Dict[str, Any]] = []
+        self._logs_by_token: Dict[str, Dict[str, Any]] = {}
+        self._counters: Dict[str, Dict[str, Any]] = {}
+        self._rollups: Dict[tuple, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stats = {
+            'logs_written': 0, 'counter_flushes': 0, 'rollup_flushes': 0,
+            'flush_errors': 0, 'logs_dropped': 0
+        }
+
+    def record_log(self, log: SmsLog) -> ObjectId:
+        """
+        Queue a log entry that already carries its final status.
+
+        The _id is assigned here, so callers can hand out the log ID before
+        the document is written.
+
+        Returns:
+            The log's ObjectId
+        """
+        if not log._id:
+            log._id = ObjectId()
+        document = log.to_document()
+
+        with self._lock:
+            self._logs.append(document)
+            if document.get('response_token'):
+                self._logs_by_token[document['response_token']] = document
+            SmsStats.add_delta(
+                self._rollups, document.get('provider'), document.get('created_at'),
+                document.get('status'), document.get('cost'), document.get('delivery_time')
+            )
+            pending = len(self._logs)
+
+        self._after_record(pending >= self.batch_size)
+        return log._id
+
+    def flush_pending_log(self, response_token: str) -> None:
+        """
+        Write buffered logs now if one of them has this response token.
+
+        Delivery reports can arrive before their log is flushed; flushing
+        first lets the report update the stored log instead of missing it.
+        """
+        if response_token and response_token in self._logs_by_token:
+            self.flush()
+
+    def record_status_change(self, log: SmsLog, previous_status: str,
+                             previous_delivery_time: Optional[float] = None) -> None:
+        """
+        Move a stored log between statistics rollups after a status update.
+        
+        Args:
+            log: Log with its new status (and delivery time, if delivered)
+            previous_status: Status the log was counted under
+            previous_delivery_time: Delivery time the log was counted with
+        """
+        if log.status == previous_status and log.delivery_time == previous_delivery_time:
+            return
+        
+        with self._lock:
+            SmsStats.add_delta(self._rollups, log.provider, log.created_at, previous_status,
+                               log.cost, previous_delivery_time, sign=-1)
+            SmsStats.add_delta(self._rollups, log.provider, log.created_at, log.status,
+                               log.cost, log.delivery_time)
+        
+        self._after_record(False)
+    
+    def record_usage(self, provider_slug: str, sent: int = 0, delivered: int = 0,
+                     failed: int = 0, cost: float = 0.0) -> None:
+        """
+        Add to a provider's usage counters.
+
+        Args:
+            provider_slug: Provider slug
+            sent: Messages accepted by the provider
+            delivered: Messages confirmed delivered
+            failed: Messages that failed
+            cost: Cost in eurocents
+        """
+        if not provider_slug:
+            return
+
+        with self._lock:
+            counters = self._counters.setdefault(
+                provider_slug,
+                {'sent': 0, 'delivered': 0, 'failed': 0, 'cost': 0.0, 'last_used': None}
+            )
+            counters['sent'] += sent
+            counters['delivered'] += delivered
+            counters['failed'] += failed
+            counters['cost'] += cost or 0.0
+            counters['last_used'] = datetime.utcnow()
+
+        self._after_record(False)
+
+    def flush(self) -> None:
+        """Write buffered logs, counters and rollups to the database"""
+        with self._flush_lock:
+            with self._lock:
+                logs, self._logs, self._logs_by_token = self._logs, [], {}
+                counters, self._counters = self._counters, {}
+                rollups, self._rollups = self._rollups, {}
+
+            if logs:
+                try:
+                    SmsLog.insert_many(logs)
+                    self._stats['logs_written'] += len(logs)
+                except BulkWriteError as e:
+                    # Logs whose _id already exists were written by an earlier attempt
+                    failed = [
+                        logs[error['index']] for error in e.details.get('writeErrors', [])
+                        if error.get('code') != self.DUPLICATE_KEY_ERROR
+                    ]
+                    self._stats['logs_written'] += e.details.get('nInserted', 0)
+                    if failed:
+                        self._stats['flush_errors'] += 1
+                        logger.error(f"Failed to write {len(failed)} of {len(logs)} SMS logs: {e}")
+                        self._requeue_logs(failed)
+                except Exception as e:
+                    self._stats['flush_errors'] += 1
+                    logger.error(f"Failed to write {len(logs)} SMS logs, keeping them for retry: {e}")
+                    self._requeue_logs(logs)
+
+            if counters:
+                try:
+                    SmsProvider.increment_usage_stats(counters)
+                    self._stats['counter_flushes'] += 1
+                except Exception as e:
+                    self._stats['flush_errors'] += 1
+                    logger.error(f"Failed to update SMS provider stats, keeping them for retry: {e}")
+                    self._requeue_counters(counters)
+            
+            if rollups:
+                try:
+                    SmsStats.apply_deltas(rollups)
+                    self._stats['rollup_flushes'] += 1
+                except Exception as e:
+                    self._stats['flush_errors'] += 1
+                    logger.error(f"Failed to update SMS statistics rollups, keeping them for retry: {e}")
+                    self._requeue_rollups(rollups)
+
+    def _requeue_logs(self, logs: List[Dict[str, Any]]) -> None:
+        """Put unwritten logs back ahead of newer ones, dropping the oldest past the cap"""
+        with self._lock:
+            merged = logs + self._logs
+            overflow = len(merged) - self.max_buffered_logs
+            if overflow > 0:
+                self._stats['logs_dropped'] += overflow
+                logger.error(f"SMS telemetry buffer full, dropping {overflow} oldest SMS logs")
+                merged = merged[overflow:]
+            self._logs = merged
+            self._logs_by_token = {
+                document['response_token']: document for document in merged if document.get('response_token')
+            }
+
+    def _requeue_counters(self, counters: Dict[str, Dict[str, Any]]) -> None:
+        """Add unwritten provider counters back to the buffered ones"""
+        with self._lock:
+            for slug, counts in counters.items():
+                pending = self._counters.setdefault(
+                    slug, {'sent': 0, 'delivered': 0, 'failed': 0, 'cost': 0.0, 'last_used': None}
+                )
+                for field in ('sent', 'delivered', 'failed', 'cost'):
+                    pending[field] += counts[field]
+                pending['last_used'] = max(
+                    (moment for moment in (pending['last_used'], counts['last_used']) if moment),
+                    default=None
+                )
+
+    def _requeue_rollups(self, rollups: Dict[tuple, Dict[str, float]]) -> None:
+        """Add unwritten rollup deltas back to the buffered ones"""
+        with self._lock:
+            for key, delta in rollups.items():
+                pending = self._rollups.setdefault(
+                    key, {'count': 0, 'cost': 0.0, 'delivery_time': 0.0, 'delivery_count': 0}
+                )
+                for field, value in delta.items():
+                    pending[field] += value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get sink statistics"""
+        with self._lock:
+            buffered_logs = len(self._logs)
+            buffered_providers = len(self._counters)
+        return {
+            **self._stats,
+            'buffered_logs': buffered_logs,
+            'buffered_providers': buffered_providers
+        }
+
+    def _after_record(self, batch_full: bool) -> None:
+        """Write through, or make sure the flusher runs"""
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._start()
+        if batch_full:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        """Start the background flusher (once per process)"""
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='sms-telemetry', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self) -> None:
+        """Background loop: flush every interval or when a batch fills up"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"SMS telemetry flush failed: {e}")
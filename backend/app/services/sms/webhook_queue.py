@@ -0,0 +1,246 @@
+"""
+SMS Webhook Queue - Batched ingestion of provider delivery reports
+
+Each delivery report used to cost a log read, a log update and a stats
+write inside the provider's callback, so the burst of reports that follows
+a broadcast turned into a burst of single-document writes. The webhook
+queue acknowledges a report as soon as it is parsed, coalesces reports per
+response token in memory, and a background thread applies them with one
+$in read and one unordered bulk_write keyed on response_token and guarded
+on the status that was read.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from app.models.sms_log import SmsLog
+from app.services.sms.provider_interface import SmsStatus
+
+logger = logging.getLogger(__name__)
+
+# response_token -> (provider slug, status, received timestamp)
+PendingReport = Tuple[str, SmsStatus, float]
+
+
+class WebhookQueue:
+    """
+    Buffered delivery reports applied to SMS logs in batches.
+
+    Processing lag (seconds from a report's arrival until its log update is
+    written) is tracked per batch and reported by get_stats. With
+    ``flush_interval=0`` every report is applied immediately, which keeps
+    tests and one-off scripts free of background threads.
+
+    A report can arrive while its log is still buffered in the telemetry
+    sink of another worker process. Reports without a log therefore stay
+    queued and are retried on later flushes for ``unmatched_retry_seconds``
+    before they are dropped as unmatched.
+    """
+
+    def __init__(self, manager, flush_interval: float = 1.0, batch_size: int = 500,
+                 unmatched_retry_seconds: float = 30.0):
+        """
+        Initialize webhook queue.
+
+        Args:
+            manager: SmsManager whose telemetry sink receives stats updates
+            flush_interval: Seconds between background flushes (0 applies inline)
+            batch_size: Pending reports that trigger an early flush
+            unmatched_retry_seconds: How long a report without a log is retried
+        """
+        self.manager = manager
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.unmatched_retry_seconds = unmatched_retry_seconds
+        self._pending: Dict[str, PendingReport] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._stats = {
+            'received': 0, 'coalesced': 0, 'applied': 0, 'unchanged': 0,
+            'unmatched': 0, 'batches': 0, 'flush_errors': 0
+        }
+        self._lag = {'last_batch_max': None, 'max': 0.0, 'total': 0.0, 'count': 0}
+
+    def enqueue(self, provider_slug: str, status: SmsStatus) -> None:
+        """
+        Queue a parsed delivery report.
+
+        A later report for the same message replaces the pending one, but
+        lag is still measured from the first report's arrival.
+
+        Args:
+            provider_slug: Provider that sent the report
+            status: Parsed delivery status
+        """
+        token = status.message_id
+        now = time.time()
+
+        with self._lock:
+            self._stats['received'] += 1
+            previous = self._pending.get(token)
+            if previous is not None:
+                self._stats['coalesced'] += 1
+                now = previous[2]
+            self._pending[token] = (provider_slug, status, now)
+            pending = len(self._pending)
+
+        self._after_record(pending >= self.batch_size)
+
+    def flush(self) -> int:
+        """
+        Apply pending reports to the SMS logs.
+
+        Returns:
+            Number of logs updated
+        """
+        with self._flush_lock:
+            with self._lock:
+                reports, self._pending = self._pending, {}
+            if not reports:
+                return 0
+
+            try:
+                applied, unmatched = self._apply(reports)
+            except Exception as e:
+                self._stats['flush_errors'] += 1
+                logger.error(f"Failed to apply {len(reports)} SMS delivery reports: {e}")
+                self._requeue(reports)
+                return 0
+
+            # Logs still buffered in another process may show up on a later flush
+            cutoff = time.time() - self.unmatched_retry_seconds
+            retry = {token: report for token, report in unmatched.items() if report[2] > cutoff}
+            self._stats['unmatched'] += len(unmatched) - len(retry)
+            self._requeue(retry)
+
+            self._record_lag([report for token, report in reports.items() if token not in unmatched])
+            return applied
+
+    def _requeue(self, reports: Dict[str, PendingReport]) -> None:
+        """Keep reports for the next flush unless newer ones arrived"""
+        with self._lock:
+            for token, report in reports.items():
+                self._pending.setdefault(token, report)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get queue counters and processing lag"""
+        with self._lock:
+            pending = len(self._pending)
+            oldest = min((report[2] for report in self._pending.values()), default=None)
+            lag = dict(self._lag)
+        return {
+            **self._stats,
+            'pending': pending,
+            'oldest_pending_seconds': round(time.time() - oldest, 3) if oldest else 0.0,
+            'lag_seconds': {
+                'last_batch_max': lag['last_batch_max'],
+                'avg': round(lag['total'] / lag['count'], 3) if lag['count'] else None,
+                'max': lag['max']
+            }
+        }
+
+    def _apply(self, reports: Dict[str, PendingReport]) -> Tuple[int, Dict[str, PendingReport]]:
+        """
+        Load the reported logs, write their new status and move their stats.
+
+        Returns:
+            Tuple of (logs updated, reports whose log was not found)
+        """
+        telemetry = self.manager.telemetry
+
+        # Reports can arrive before their log leaves the telemetry buffer
+        for token in reports:
+            telemetry.flush_pending_log(token)
+
+        logs = SmsLog.find_by_response_tokens(list(reports))
+        found = {log.response_token for log in logs}
+        now = datetime.utcnow()
+        updates = {}
+        changes = []
+        for log in logs:
+            provider_slug, status, _ = reports[log.response_token]
+            # Providers resend reports; a repeated status must not be counted twice
+            if status.status == log.status:
+                self._stats['unchanged'] += 1
+                continue
+
+            previous_status, previous_delivery_time = log.status, log.delivery_time
+            log.status = status.status
+            fields = {'status': log.status, 'updated_at': now}
+            if status.delivered_at:
+                log.delivered_at = status.delivered_at
+                log.delivery_time = log.calculate_delivery_time()
+                fields.update(delivered_at=log.delivered_at, delivery_time=log.delivery_time)
+            if log.status == SmsLog.STATUS_FAILED and status.error_message:
+                log.error = status.error_message
+                fields['error'] = log.error
+            updates[log.response_token] = (previous_status, fields)
+            changes.append((provider_slug, log, previous_status, previous_delivery_time))
+
+        # Guarded on the status read above: if another worker applied the
+        # same report first, its write wins and only it moves the stats
+        written = SmsLog.update_by_response_tokens(updates)
+        self._stats['unchanged'] += len(updates) - len(written)
+
+        for provider_slug, log, previous_status, previous_delivery_time in changes:
+            if log.response_token not in written:
+                continue
+            telemetry.record_status_change(log, previous_status, previous_delivery_time)
+            if log.status == SmsLog.STATUS_DELIVERED:
+                self.manager._update_provider_stats(provider_slug, delivered=1)
+            elif log.status == SmsLog.STATUS_FAILED:
+                self.manager._update_provider_stats(provider_slug, failed=1)
+
+        self._stats['applied'] += len(written)
+        self._stats['batches'] += 1
+        return len(written), {token: report for token, report in reports.items() if token not in found}
+
+    def _record_lag(self, reports: List[PendingReport]) -> None:
+        """Record how long the reports in an applied batch waited"""
+        if not reports:
+            return
+        now = time.time()
+        batch_max = max(now - report[2] for report in reports)
+        with self._lock:
+            self._lag['last_batch_max'] = round(batch_max, 3)
+            self._lag['max'] = round(max(self._lag['max'], batch_max), 3)
+            self._lag['total'] += sum(now - report[2] for report in reports)
+            self._lag['count'] += len(reports)
+
+    def _after_record(self, batch_full: bool) -> None:
+        """Apply inline, or make sure the flusher runs"""
+        if self.flush_interval <= 0:
+            self.flush()
+            return
+        self._start()
+        if batch_full:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        """Start the background flusher (once per process)"""
+        if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='sms-webhooks', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self) -> None:
+        """Background loop: flush every interval or when a batch fills up"""
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"SMS webhook flush failed: {e}")
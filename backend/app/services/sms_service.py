@@ -17,6 +17,7 @@ from pymongo.errors import PyMongoError
 from app.utils.error_handlers import SMSError, ValidationError
 from app.utils.validators import validate_phone_number
 from app.database import get_database
+from app.models.verification_code import VerificationCode
 
 
 class SMSService:
@@ -66,9 +67,9 @@ class SMSService:
                 background=True
             )
             
-            # Create unique index for phone number in verification codes
+            # Create unique index for phone number and purpose in verification codes
             self.verification_collection.create_index(
-                "phone_number", 
+                [("phone_number", 1), ("purpose", 1)],
                 unique=True,
                 background=True
             )
@@ -254,8 +255,9 @@ class SMSService:
         """
         Validate verification code against recently sent codes.
         
-        This method checks if the provided code matches any recently sent
-        verification codes for the phone number within the expiry window.
+        This method checks the provided code against the code most recently
+        sent to the phone number and consumes it on success. Each code allows
+        VerificationCode.MAX_ATTEMPTS wrong guesses.
         
         Args:
             phone_number (str): Phone number to validate
@@ -280,35 +282,27 @@ class SMSService:
             if not re.match(r'^\d{6}$', code):
                 raise ValidationError("Verification code must be 6 digits")
             
-            # Check against MongoDB stored codes
-            verification_record = self.verification_collection.find_one({
-                'phone_number': normalized_phone
-            })
+            # Verify and consume the stored code in one atomic update
+            outcome = VerificationCode.verify(normalized_phone, code)
             
-            if not verification_record:
+            if outcome == VerificationCode.VERIFIED:
+                self._log_verification_attempt(normalized_phone, code, True)
+                return True
+            
+            if outcome == VerificationCode.NOT_FOUND:
                 self._log_verification_attempt(normalized_phone, code, False, "No verification code found")
                 raise SMSError("No verification code found for this phone number", "SMS_002")
             
-            stored_code = verification_record.get('code')
-            expires_at = verification_record.get('expires_at')
-            
-            # Check if code has expired
-            if datetime.utcnow() > expires_at:
+            if outcome == VerificationCode.EXPIRED:
                 self._log_verification_attempt(normalized_phone, code, False, "Code expired")
                 raise SMSError("Verification code has expired", "SMS_003")
             
-            # Check if code matches
-            if code == stored_code:
-                # Mark as verified
-                self.verification_collection.update_one(
-                    {'phone_number': normalized_phone},
-                    {'$set': {'verified': True, 'verified_at': datetime.utcnow()}}
-                )
-                self._log_verification_attempt(normalized_phone, code, True)
-                return True
-            else:
-                self._log_verification_attempt(normalized_phone, code, False, "Code mismatch")
-                raise SMSError("Invalid verification code", "SMS_002")
+            if outcome == VerificationCode.TOO_MANY_ATTEMPTS:
+                self._log_verification_attempt(normalized_phone, code, False, "Too many attempts")
+                raise SMSError("Too many verification attempts. Request a new code.", "SMS_002")
+            
+            self._log_verification_attempt(normalized_phone, code, False, "Code mismatch")
+            raise SMSError("Invalid verification code", "SMS_002")
             
         except (ValidationError, SMSError):
             raise
@@ -527,24 +521,15 @@ class SMSService:
             logging.error(f"Error tracking SMS attempt: {str(e)}")
     
     def _store_verification_code(self, phone_number: str, code: str):
-        """Store verification code in MongoDB with TTL."""
+        """Store the hashed verification code in the OTP store."""
         try:
             normalized_phone = self._normalize_phone_number(phone_number)
-            expires_at = datetime.utcnow() + timedelta(minutes=self.VERIFICATION_CODE_EXPIRY_MINUTES)
             
-            verification_record = {
-                'phone_number': normalized_phone,
-                'code': code,
-                'created_at': datetime.utcnow(),
-                'expires_at': expires_at,
-                'verified': False
-            }
-            
-            # Use upsert to replace existing code for same phone number
-            self.verification_collection.replace_one(
-                {'phone_number': normalized_phone},
-                verification_record,
-                upsert=True
+            # Replaces any earlier code for the same phone number
+            VerificationCode.issue(
+                normalized_phone,
+                code,
+                self.VERIFICATION_CODE_EXPIRY_MINUTES * 60
             )
             
             logging.info(f"Verification code stored for phone number: {normalized_phone}")
@@ -620,6 +605,7 @@ class SMSService:
             
             verification_record = self.verification_collection.find_one({
                 'phone_number': normalized_phone,
+                'purpose': VerificationCode.ACCOUNT,
                 'verified': True
             })
             
@@ -643,7 +629,8 @@ class SMSService:
             normalized_phone = self._normalize_phone_number(phone_number)
             
             verification_record = self.verification_collection.find_one({
-                'phone_number': normalized_phone
+                'phone_number': normalized_phone,
+                'purpose': VerificationCode.ACCOUNT
             })
             
             if not verification_record:
@@ -99,6 +99,8 @@ def require_admin_auth(f):
                     error_message = "Token de autentificare invalid"
                 elif e.error_code == "AUTH_007":
                     error_message = "Token invalid pentru admin"
+                elif e.error_code == "AUTH_018":
+                    error_message = "Sesiunea a fost închisă. Autentificați-vă din nou"
                 else:
                     error_message = "Token expirat sau invalid"
                 
@@ -141,7 +143,10 @@ def require_admin_auth(f):
             }
             
             # Log successful authentication for security monitoring
-            logging.debug(f"Admin authentication successful for {payload.get('phone_number', 'unknown')} accessing {request.endpoint} from IP {request.remote_addr}")
+            logging.debug(
+                "Admin authentication successful for %s accessing %s from IP %s",
+                payload.get('phone_number', 'unknown'), request.endpoint, request.remote_addr
+            )
             
             # Call the protected function
             return f(*args, **kwargs)
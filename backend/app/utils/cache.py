@@ -4,6 +4,8 @@ Caching utilities for performance optimization
 import json
 import time
 import hashlib
+import threading
+from collections import OrderedDict
 from functools import wraps
 from typing import Any, Optional, Dict, Union
 from datetime import datetime, timedelta
@@ -375,4 +377,145 @@ _metrics_instance = CacheMetrics()
 
 def get_cache_metrics() -> CacheMetrics:
     """Get global cache metrics instance"""
-    return _metrics_instance
\ No newline at end of file
+    return _metrics_instance
+
+class TokenCache:
+    """
+    Bounded LRU cache of verified token payloads.
+    
+    Entries are keyed by a SHA-256 digest of the raw token (the token itself
+    is never stored) and expire at the token's own ``exp`` claim, so a cached
+    verification is never valid longer than the token is.
+    """
+    
+    def __init__(self, max_size: int = 1024, max_ttl: Optional[int] = None):
+        """
+        Initialize token cache
+        
+        Args:
+            max_size: Maximum number of cached tokens
+            max_ttl: Optional cap in seconds on how long an entry is trusted
+        """
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def digest(token: str) -> str:
+        """Get the cache key of a raw token"""
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+    
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Get the cached payload of a verified token.
+        
+        Returns:
+            Copy of the payload, or None if not cached or expired
+        """
+        key = self.digest(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, payload = entry
+            if now >= expires_at:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return dict(payload)
+    
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        """
+        Cache a verified token payload until its exp claim.
+        
+        Payloads without a numeric exp are not cached.
+        """
+        exp = payload.get('exp')
+        if not isinstance(exp, (int, float)):
+            return
+        expires_at = float(exp)
+        if self.max_ttl is not None:
+            expires_at = min(expires_at, time.time() + self.max_ttl)
+        if expires_at <= time.time():
+            return
+        
+        key = self.digest(token)
+        with self._lock:
+            self._entries[key] = (expires_at, dict(payload))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, token: str) -> None:
+        """Remove a token from the cache"""
+        with self._lock:
+            self._entries.pop(self.digest(token), None)
+    
+    def clear(self) -> None:
+        """Remove all cached tokens"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            'size': size,
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+class TokenDenylist:
+    """
+    In-memory set of revoked tokens.
+    
+    Tokens are stored by SHA-256 digest together with their ``exp`` claim and
+    are pruned once expired, since an expired token is rejected anyway.
+    """
+    
+    def __init__(self):
+        """Initialize empty denylist"""
+        self._entries: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def add(self, token: str, expires_at: float) -> None:
+        """
+        Revoke a token until its expiry.
+        
+        Args:
+            token: Raw token
+            expires_at: Token exp claim as a unix timestamp
+        """
+        now = time.time()
+        with self._lock:
+            self._entries[TokenCache.digest(token)] = float(expires_at)
+            expired = [key for key, exp in self._entries.items() if exp <= now]
+            for key in expired:
+                del self._entries[key]
+    
+    def contains(self, token: str) -> bool:
+        """Check whether a token has been revoked"""
+        with self._lock:
+            expires_at = self._entries.get(TokenCache.digest(token))
+        return expires_at is not None and expires_at > time.time()
+    
+    def clear(self) -> None:
+        """Remove all revoked tokens"""
+        with self._lock:
+            self._entries.clear()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
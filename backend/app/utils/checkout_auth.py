@@ -6,33 +6,68 @@ Provides JWT-based authentication for checkout flow without traditional user acc
 """
 
 import jwt
+import random
 import logging
 from functools import wraps
 from flask import request, jsonify, g, current_app
 from datetime import datetime
 from typing import Optional, Dict, Any, Callable
+from app.utils.cache import TokenCache
 
 logger = logging.getLogger(__name__)
 
+# Verified checkout tokens, keyed by token digest and expiring at their exp
+CHECKOUT_TOKEN_CACHE_SIZE = 4096
+_token_cache = TokenCache(max_size=CHECKOUT_TOKEN_CACHE_SIZE)
+
+# Fraction of requests that emit verbose auth diagnostics at DEBUG level
+DEFAULT_DEBUG_SAMPLE_RATE = 0.01
+
+
+def log_auth_debug(message: str) -> None:
+    """
+    Debug-sampled hook for verbose checkout auth diagnostics.
+    
+    Only emits when DEBUG logging is enabled, and then only for a sample of
+    requests (CHECKOUT_AUTH_DEBUG_SAMPLE_RATE), so hot paths stay quiet.
+    Messages must not contain token payloads or full phone numbers.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    sample_rate = current_app.config.get('CHECKOUT_AUTH_DEBUG_SAMPLE_RATE', DEFAULT_DEBUG_SAMPLE_RATE)
+    if random.random() < sample_rate:
+        logger.debug(message)
+
+
+def get_token_cache() -> TokenCache:
+    """Get the verified checkout token cache"""
+    return _token_cache
+
 
 def decode_checkout_token(token: str) -> Optional[Dict[str, Any]]:
     """
     Decode and validate checkout JWT token.
     
+    Tokens verified once are served from a bounded LRU cache until their
+    exp claim, so repeat requests in a session skip the signature check.
+    
     Returns:
         Decoded token payload or None if invalid
     """
     try:
         secret_key = current_app.config.get('SECRET_KEY', 'dev-secret-key')
-        logger.info(f"=== DECODING CHECKOUT TOKEN ===")
-        logger.info(f"Token (first 20 chars): {token[:20]}...")
+        
+        # Key the cache on the signing secret too, so a rotated secret
+        # never accepts a token verified under the old one
+        cache_key = f"{secret_key}:{token}"
+        payload = _token_cache.get(cache_key)
+        if payload is not None:
+            return payload
         
         payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-        logger.info(f"Decoded payload: {payload}")
         
         # Verify token type
         token_type = payload.get('type')
-        logger.info(f"Token type: {token_type}")
         if token_type != 'checkout_session':
             logger.warning(f"Invalid token type: expected 'checkout_session', got '{token_type}'")
             return None
@@ -42,9 +77,10 @@ def decode_checkout_token(token: str) -> Optional[Dict[str, Any]]:
         missing_fields = [field for field in required_fields if field not in payload]
         if missing_fields:
             logger.warning(f"Missing required token fields: {missing_fields}")
-            logger.warning(f"Token has fields: {list(payload.keys())}")
             return None
         
+        log_auth_debug(f"Checkout token verified, fields: {sorted(payload.keys())}")
+        _token_cache.set(cache_key, payload)
         return payload
         
     except jwt.ExpiredSignatureError:
@@ -119,7 +155,7 @@ def checkout_auth_required(f: Callable) -> Callable:
         
         # Log authenticated request
         masked_phone = f"****{payload['phone'][-4:]}" if len(payload['phone']) >= 4 else "****"
-        logger.info(f"Authenticated request from {masked_phone}")
+        log_auth_debug(f"Authenticated request from {masked_phone}")
         
         return f(*args, **kwargs)
         
@@ -147,13 +183,10 @@ def checkout_auth_optional(f: Callable) -> Callable:
         g.customer_id = None
         g.token_payload = None
         
-        logger.info(f"=== CHECKOUT AUTH OPTIONAL ===")
         token = get_auth_token()
-        logger.info(f"Token found: {bool(token)}")
         
         if token:
             payload = decode_checkout_token(token)
-            logger.info(f"Payload decoded: {bool(payload)}")
             
             if payload:
                 # Valid token - set authentication info
@@ -163,11 +196,11 @@ def checkout_auth_optional(f: Callable) -> Callable:
                 g.token_payload = payload
                 
                 masked_phone = f"****{payload['phone'][-4:]}" if len(payload['phone']) >= 4 else "****"
-                logger.info(f"Optional auth: authenticated request from {masked_phone}")
+                log_auth_debug(f"Optional auth: authenticated request from {masked_phone}")
             else:
-                logger.info("Optional auth: invalid token provided")
+                log_auth_debug("Optional auth: invalid token provided")
         else:
-            logger.info("Optional auth: no token provided")
+            log_auth_debug("Optional auth: no token provided")
         
         return f(*args, **kwargs)
         
@@ -7,27 +7,36 @@ Simple rate limiter for checkout flow with Redis support and in-memory fallback.
 
 import time
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Optional, Tuple
-from collections import defaultdict
 import redis
 import os
 
+from app.utils.rate_limit_engine import RateLimitEngine, RedisStorage, get_rate_limit_engine
+
 logger = logging.getLogger(__name__)
 
 
 class CheckoutRateLimiter:
-    """Rate limiter specifically for checkout flow operations"""
+    """
+    Rate limiter specifically for checkout flow operations.
+    
+    Limits are enforced by the shared GCRA engine: Redis storage when
+    Redis is reachable, otherwise the process-wide memory engine.
+    """
     
     def __init__(self):
         self.redis_client = self._init_redis()
-        self.memory_store: Dict[str, list] = defaultdict(list)
+        if self.redis_client is not None:
+            self.engine = RateLimitEngine(RedisStorage(self.redis_client))
+        else:
+            self.engine = get_rate_limit_engine()
         
         # Rate limit configurations (matching our architecture)
         self.limits = {
             'sms_per_phone_per_day': {'max': 3, 'window': 86400},
             'sms_per_ip_per_hour': {'max': 5, 'window': 3600},
-            'verify_attempts_per_code': {'max': 5, 'window': 300},
+            'verify_per_ip_per_hour': {'max': 30, 'window': 3600},
             'addresses_per_customer': {'max': 50, 'window': None}  # No time window
         }
     
@@ -45,23 +54,13 @@ class CheckoutRateLimiter:
     
     def _get_key(self, limit_type: str, identifier: str) -> str:
         """Generate key for rate limit storage"""
-        return f"checkout_rate:{limit_type}:{identifier}"
-    
-    def _clean_memory_store(self, key: str, window: int):
-        """Remove expired entries from memory store"""
-        if window is None:  # No expiry
-            return
-        
-        now = time.time()
-        cutoff = now - window
-        self.memory_store[key] = [
-            timestamp for timestamp in self.memory_store[key]
-            if timestamp > cutoff
-        ]
+        # GCRA state is a single timestamp; the prefix differs from the old
+        # sorted-set keys so leftover Redis entries are never misread
+        return f"checkout_rl:{limit_type}:{identifier}"
     
     def check_limit(self, limit_type: str, identifier: str) -> Tuple[bool, Dict[str, any]]:
         """
-        Check if action is within rate limit
+        Check if action is within rate limit (without counting it)
         
         Returns:
             Tuple of (allowed: bool, info: dict)
@@ -73,104 +72,62 @@ class CheckoutRateLimiter:
         config = self.limits[limit_type]
         max_requests = config['max']
         window = config['window']
-        key = self._get_key(limit_type, identifier)
-        now = time.time()
         
         try:
-            if self.redis_client:
-                # Redis implementation
-                if window is None:
-                    # For non-expiring limits (like address count)
-                    current_count = int(self.redis_client.get(key) or 0)
-                    
-                    if current_count >= max_requests:
-                        return False, {
-                            'remaining': 0,
-                            'limit': max_requests,
-                            'current': current_count
-                        }
-                    
-                    return True, {
-                        'remaining': max_requests - current_count,
-                        'limit': max_requests,
-                        'current': current_count
-                    }
-                
-                else:
-                    # For time-windowed limits
-                    pipe = self.redis_client.pipeline()
-                    pipe.zremrangebyscore(key, 0, now - window)
-                    pipe.zcard(key)
-                    results = pipe.execute()
-                    
-                    current_count = results[1]
-                    
-                    if current_count >= max_requests:
-                        # Get oldest timestamp for reset time
-                        oldest = self.redis_client.zrange(key, 0, 0, withscores=True)
-                        if oldest:
-                            reset_time = oldest[0][1] + window
-                        else:
-                            reset_time = now + window
-                        
-                        return False, {
-                            'remaining': 0,
-                            'reset_time': datetime.fromtimestamp(reset_time),
-                            'limit': max_requests,
-                            'window_hours': window / 3600
-                        }
-                    
-                    return True, {
-                        'remaining': max_requests - current_count,
-                        'limit': max_requests,
-                        'window_hours': window / 3600
-                    }
-            
-            else:
-                # In-memory fallback
-                if window is None:
-                    current_count = len(self.memory_store[key])
-                    
-                    if current_count >= max_requests:
-                        return False, {
-                            'remaining': 0,
-                            'limit': max_requests,
-                            'current': current_count
-                        }
-                    
-                    return True, {
-                        'remaining': max_requests - current_count,
-                        'limit': max_requests,
-                        'current': current_count
-                    }
-                
-                else:
-                    self._clean_memory_store(key, window)
-                    current_count = len(self.memory_store[key])
-                    
-                    if current_count >= max_requests:
-                        if self.memory_store[key]:
-                            reset_time = self.memory_store[key][0] + window
-                        else:
-                            reset_time = now + window
-                        
-                        return False, {
-                            'remaining': 0,
-                            'reset_time': datetime.fromtimestamp(reset_time),
-                            'limit': max_requests,
-                            'window_hours': window / 3600
-                        }
-                    
-                    return True, {
-                        'remaining': max_requests - current_count,
-                        'limit': max_requests,
-                        'window_hours': window / 3600
-                    }
-                
+            decision = self.engine.peek(self._get_key(limit_type, identifier), max_requests, window)
+        except Exception as e:
+            logger.error(f"Rate limiter error: {str(e)}")
+            # Allow request on error
+            return True, {'error': str(e)}
+        
+        return self._decision_info(decision, max_requests, window)
+    
+    def acquire(self, limit_type: str, identifier: str) -> Tuple[bool, Dict[str, any]]:
+        """
+        Check and count an action in one step
+        
+        Unlike check_limit followed by record_usage, parallel requests
+        cannot all pass the check before any of them is counted.
+        
+        Returns:
+            Tuple of (allowed: bool, info: dict)
+        """
+        if limit_type not in self.limits:
+            logger.warning(f"Unknown rate limit type: {limit_type}")
+            return True, {'error': 'Unknown limit type'}
+        
+        config = self.limits[limit_type]
+        
+        try:
+            decision = self.engine.acquire(
+                self._get_key(limit_type, identifier), config['max'], config['window']
+            )
         except Exception as e:
             logger.error(f"Rate limiter error: {str(e)}")
             # Allow request on error
             return True, {'error': str(e)}
+        
+        return self._decision_info(decision, config['max'], config['window'])
+    
+    def _decision_info(self, decision, max_requests: int,
+                       window: Optional[int]) -> Tuple[bool, Dict[str, any]]:
+        """Build the (allowed, info) pair returned by check_limit and acquire"""
+        if window is None:
+            # For non-expiring limits (like address count)
+            return decision.allowed, {
+                'remaining': decision.remaining,
+                'limit': max_requests,
+                'current': decision.used
+            }
+        
+        info = {
+            'remaining': decision.remaining,
+            'limit': max_requests,
+            'window_hours': window / 3600
+        }
+        if not decision.allowed:
+            info['reset_time'] = datetime.fromtimestamp(time.time() + decision.retry_after)
+        return decision.allowed, info
     
     def record_usage(self, limit_type: str, identifier: str, increment: int = 1):
         """Record usage for rate limiting"""
@@ -178,28 +135,14 @@ class CheckoutRateLimiter:
             return
         
         config = self.limits[limit_type]
-        window = config['window']
-        key = self._get_key(limit_type, identifier)
-        now = time.time()
         
         try:
-            if self.redis_client:
-                if window is None:
-                    # For non-expiring limits
-                    self.redis_client.incrby(key, increment)
-                else:
-                    # For time-windowed limits
-                    self.redis_client.zadd(key, {str(now): now})
-                    self.redis_client.expire(key, window)
-            else:
-                # In-memory fallback
-                if window is None:
-                    # Just append for counting
-                    for _ in range(increment):
-                        self.memory_store[key].append(now)
-                else:
-                    self.memory_store[key].append(now)
-        
+            self.engine.acquire(
+                self._get_key(limit_type, identifier),
+                config['max'],
+                config['window'],
+                cost=increment
+            )
         except Exception as e:
             logger.error(f"Error recording usage: {str(e)}")
     
@@ -215,6 +158,10 @@ class CheckoutRateLimiter:
                 'code': 'IP_LIMIT_EXCEEDED',
                 'message': "Prea multe cereri de la această adresă. Încercați din nou într-o oră."
             },
+            'verify_per_ip_per_hour': {
+                'code': 'VERIFY_LIMIT_EXCEEDED',
+                'message': "Prea multe încercări de verificare de la această adresă. Încercați din nou mai târziu."
+            },
             'verify_attempts_per_code': {
                 'code': 'INVALID_VERIFICATION_CODE',
                 'message': "Prea multe încercări. Solicitați un cod nou."
@@ -246,12 +193,7 @@ class CheckoutRateLimiter:
     
     def reset_limit(self, limit_type: str, identifier: str):
         """Reset rate limit for testing purposes"""
-        key = self._get_key(limit_type, identifier)
-        
-        if self.redis_client:
-            self.redis_client.delete(key)
-        else:
-            self.memory_store[key] = []
+        self.engine.reset(self._get_key(limit_type, identifier))
         
         logger.info(f"Reset rate limit {limit_type} for {identifier}")
 
@@ -281,10 +223,10 @@ def check_sms_limit_ip(ip: str) -> Tuple[bool, Dict[str, any]]:
     return limiter.check_limit('sms_per_ip_per_hour', ip)
 
 
-def check_verify_attempts(phone: str, code: str) -> Tuple[bool, Dict[str, any]]:
-    """Check verification attempts for code"""
+def acquire_verify_limit_ip(ip: str) -> Tuple[bool, Dict[str, any]]:
+    """Count a code verification against the hourly limit for IP"""
     limiter = get_checkout_rate_limiter()
-    return limiter.check_limit('verify_attempts_per_code', f"{phone}:{code}")
+    return limiter.acquire('verify_per_ip_per_hour', ip)
 
 
 def record_sms_sent(phone: str, ip: str):
@@ -292,9 +234,3 @@ def record_sms_sent(phone: str, ip: str):
     limiter = get_checkout_rate_limiter()
     limiter.record_usage('sms_per_phone_per_day', phone)
     limiter.record_usage('sms_per_ip_per_hour', ip)
-
-
-def record_verify_attempt(phone: str, code: str):
-    """Record verification attempt"""
-    limiter = get_checkout_rate_limiter()
-    limiter.record_usage('verify_attempts_per_code', f"{phone}:{code}")
\ No newline at end of file
@@ -8,8 +8,13 @@ including personal information, payment details, and communications.
 import os
 import base64
 import hashlib
+import logging
 import secrets
-from typing import Dict, Any, Optional, Union
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Union
 from datetime import datetime, timezone, timedelta
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes, serialization
@@ -18,49 +23,148 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 import jwt
 
+logger = logging.getLogger(__name__)
+
+
+KDF_SALT = b'romanian_producers_salt'  # In production, use random salt stored securely
+KDF_ITERATIONS = 100000
+
+# Fields of an address document that are encrypted at rest
+ADDRESS_SENSITIVE_FIELDS = ('street', 'city', 'county', 'postal_code')
+
+
+@lru_cache(maxsize=4)
+def _derive_fernet_key(master_key: str) -> bytes:
+    """Derive the Fernet key from the master key (once per process per key)"""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=KDF_SALT,
+        iterations=KDF_ITERATIONS,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(master_key.encode()))
+
 
 class EncryptionManager:
-    """Centralized encryption management for the application"""
+    """
+    Centralized encryption management for the application.
+    
+    Key material is created on first use rather than at construction: the
+    PBKDF2 derivation runs when data is first encrypted or decrypted, and
+    the RSA key pair is loaded from ``ENCRYPTION_RSA_KEY_PATH`` (or
+    generated once and written there) when it is first needed.
+    """
+    
+    # Batches smaller than this are never fanned out to threads
+    PARALLEL_MIN_BATCH = 256
     
-    def __init__(self, master_key: str = None):
+    def __init__(self, master_key: str = None, rsa_key_path: str = None):
         """
         Initialize encryption manager with master key.
         
         Args:
             master_key (str): Master encryption key (from environment variable)
+            rsa_key_path (str): PEM file holding the RSA private key
         """
         self.master_key = master_key or os.environ.get('ENCRYPTION_MASTER_KEY')
         if not self.master_key:
             raise ValueError("ENCRYPTION_MASTER_KEY environment variable must be set")
         
-        # Initialize Fernet cipher for symmetric encryption
-        self.fernet = self._initialize_fernet()
+        self.rsa_key_path = rsa_key_path or os.environ.get('ENCRYPTION_RSA_KEY_PATH')
         
-        # Initialize RSA keys for asymmetric encryption
-        self.rsa_private_key, self.rsa_public_key = self._initialize_rsa_keys()
+        self._fernet = None
+        self._rsa_keys = None
+        self._lock = threading.Lock()
+    
+    @property
+    def fernet(self) -> Fernet:
+        """Fernet cipher for symmetric encryption, derived on first use"""
+        if self._fernet is None:
+            self._fernet = self._initialize_fernet()
+        return self._fernet
+    
+    @property
+    def rsa_private_key(self):
+        """RSA private key, loaded or generated on first use"""
+        return self._get_rsa_keys()[0]
+    
+    @property
+    def rsa_public_key(self):
+        """RSA public key, loaded or generated on first use"""
+        return self._get_rsa_keys()[1]
     
     def _initialize_fernet(self) -> Fernet:
         """Initialize Fernet symmetric encryption"""
-        # Derive key from master key
-        salt = b'romanian_producers_salt'  # In production, use random salt stored securely
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(self.master_key.encode()))
-        return Fernet(key)
+        return Fernet(_derive_fernet_key(self.master_key))
+    
+    def _get_rsa_keys(self):
+        """Get the RSA key pair, initializing it once"""
+        if self._rsa_keys is None:
+            with self._lock:
+                if self._rsa_keys is None:
+                    self._rsa_keys = self._initialize_rsa_keys()
+        return self._rsa_keys
     
     def _initialize_rsa_keys(self):
-        """Initialize RSA key pair for asymmetric encryption"""
-        # In production, load keys from secure storage
+        """
+        Initialize RSA key pair for asymmetric encryption.
+        
+        Loads the private key from rsa_key_path when it exists; otherwise a
+        new key is generated and, if a path is configured, persisted there so
+        later processes reuse it. Without a path the key is per process.
+        """
+        if self.rsa_key_path and os.path.exists(self.rsa_key_path):
+            private_key = self._load_rsa_key()
+            return private_key, private_key.public_key()
+        
         private_key = rsa.generate_private_key(
             public_exponent=65537,
             key_size=2048,
         )
-        public_key = private_key.public_key()
-        return private_key, public_key
+        
+        if self.rsa_key_path and not self._save_rsa_key(private_key):
+            # Another worker persisted its key first - share that one
+            private_key = self._load_rsa_key()
+        
+        return private_key, private_key.public_key()
+    
+    def _load_rsa_key(self, attempts: int = 5):
+        """Load the RSA private key, waiting briefly for a concurrent writer"""
+        for attempt in range(attempts):
+            try:
+                with open(self.rsa_key_path, 'rb') as key_file:
+                    return serialization.load_pem_private_key(
+                        key_file.read(),
+                        password=self.master_key.encode()
+                    )
+            except ValueError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.05)
+    
+    def _save_rsa_key(self, private_key) -> bool:
+        """
+        Persist the RSA private key encrypted with the master key.
+        
+        Returns:
+            bool: False if the key file already exists
+        """
+        pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.BestAvailableEncryption(self.master_key.encode())
+        )
+        try:
+            fd = os.open(self.rsa_key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            return False
+        except OSError as e:
+            logger.warning(f"Could not persist RSA key to {self.rsa_key_path}: {e}")
+            return True
+        with os.fdopen(fd, 'wb') as key_file:
+            key_file.write(pem)
+        logger.info(f"Generated RSA key pair saved to {self.rsa_key_path}")
+        return True
     
     def encrypt_sensitive_data(self, data: str) -> str:
         """
@@ -151,6 +255,106 @@ class EncryptionManager:
         """
         return self.decrypt_sensitive_data(encrypted_email)
     
+    def encrypt_many(self, values: Iterable[str], max_workers: int = 0) -> List[str]:
+        """
+        Encrypt many values with one cipher and one timestamp.
+        
+        Produces the same format as encrypt_sensitive_data. Empty values
+        map to "".
+        
+        Args:
+            values: Plain text values
+            max_workers: Threads for batches of PARALLEL_MIN_BATCH or more
+                (0 encrypts on the calling thread)
+            
+        Returns:
+            list: Encrypted values in input order
+        """
+        values = values if isinstance(values, list) else list(values)
+        if max_workers > 1 and len(values) >= self.PARALLEL_MIN_BATCH:
+            return self._fan_out(self.encrypt_many, values, max_workers)
+        
+        encrypt_at_time = self.fernet.encrypt_at_time
+        b64encode = base64.urlsafe_b64encode
+        now = int(time.time())
+        return [
+            b64encode(encrypt_at_time(value.encode('utf-8'), now)).decode('ascii') if value else ""
+            for value in values
+        ]
+    
+    def decrypt_many(self, values: Iterable[str], max_workers: int = 0) -> List[str]:
+        """
+        Decrypt many values with one cipher.
+        
+        Args:
+            values: Values produced by encrypt_sensitive_data or encrypt_many
+            max_workers: Threads for batches of PARALLEL_MIN_BATCH or more
+                (0 decrypts on the calling thread)
+            
+        Returns:
+            list: Decrypted values in input order
+            
+        Raises:
+            ValueError: If any value cannot be decrypted
+        """
+        values = values if isinstance(values, list) else list(values)
+        if max_workers > 1 and len(values) >= self.PARALLEL_MIN_BATCH:
+            return self._fan_out(self.decrypt_many, values, max_workers)
+        
+        decrypt = self.fernet.decrypt
+        b64decode = base64.urlsafe_b64decode
+        decrypted = []
+        for value in values:
+            if not value:
+                decrypted.append("")
+                continue
+            try:
+                decrypted.append(decrypt(b64decode(value)).decode('utf-8'))
+            except Exception:
+                raise ValueError("Failed to decrypt data")
+        return decrypted
+    
+    def _fan_out(self, func, values: List[str], max_workers: int) -> List[str]:
+        """Split a batch into one chunk per thread and join results in order"""
+        chunk_size = -(-len(values) // max_workers)
+        chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            results = executor.map(func, chunks)
+        return [value for chunk in results for value in chunk]
+    
+    def encrypt_phone_numbers(self, phone_numbers: Iterable[str], max_workers: int = 0) -> List[str]:
+        """
+        Encrypt many Romanian phone numbers (see encrypt_phone_number).
+        
+        Args:
+            phone_numbers: Phone numbers to encrypt
+            max_workers: Threads for large batches
+            
+        Returns:
+            list: Encrypted phone numbers
+        """
+        normalized = [
+            phone.replace('+40', '').replace(' ', '').replace('-', '')
+            for phone in phone_numbers
+        ]
+        return self.encrypt_many(normalized, max_workers)
+    
+    def decrypt_phone_numbers(self, encrypted_phones: Iterable[str], max_workers: int = 0) -> List[str]:
+        """
+        Decrypt many phone numbers to +40 format (see decrypt_phone_number).
+        
+        Args:
+            encrypted_phones: Encrypted phone numbers
+            max_workers: Threads for large batches
+            
+        Returns:
+            list: Decrypted phone numbers
+        """
+        return [
+            phone if not phone or phone.startswith('+40') else '+40' + phone
+            for phone in self.decrypt_many(encrypted_phones, max_workers)
+        ]
+    
     def encrypt_address(self, address_data: Dict[str, str]) -> Dict[str, str]:
         """
         Encrypt address data for storage.
@@ -161,16 +365,7 @@ class EncryptionManager:
         Returns:
             dict: Encrypted address data
         """
-        encrypted_address = {}
-        sensitive_fields = ['street', 'city', 'county', 'postal_code']
-        
-        for key, value in address_data.items():
-            if key in sensitive_fields and value:
-                encrypted_address[key] = self.encrypt_sensitive_data(str(value))
-            else:
-                encrypted_address[key] = value
-        
-        return encrypted_address
+        return self.encrypt_addresses([address_data])[0]
     
     def decrypt_address(self, encrypted_address: Dict[str, str]) -> Dict[str, str]:
         """
@@ -182,16 +377,54 @@ class EncryptionManager:
         Returns:
             dict: Decrypted address data
         """
-        decrypted_address = {}
-        sensitive_fields = ['street', 'city', 'county', 'postal_code']
+        return self.decrypt_addresses([encrypted_address])[0]
+    
+    def encrypt_addresses(self, addresses: List[Dict[str, Any]], max_workers: int = 0) -> List[Dict[str, Any]]:
+        """
+        Encrypt the sensitive fields of many addresses in one batch.
         
-        for key, value in encrypted_address.items():
-            if key in sensitive_fields and value:
-                decrypted_address[key] = self.decrypt_sensitive_data(value)
-            else:
-                decrypted_address[key] = value
+        Args:
+            addresses: Address documents
+            max_workers: Threads for large batches
+            
+        Returns:
+            list: Copies of the addresses with sensitive fields encrypted
+        """
+        return self._map_address_fields(
+            addresses,
+            lambda values: self.encrypt_many([str(value) for value in values], max_workers)
+        )
+    
+    def decrypt_addresses(self, addresses: List[Dict[str, Any]], max_workers: int = 0) -> List[Dict[str, Any]]:
+        """
+        Decrypt the sensitive fields of many addresses in one batch.
         
-        return decrypted_address
+        Args:
+            addresses: Encrypted address documents (e.g. one per order row)
+            max_workers: Threads for large batches
+            
+        Returns:
+            list: Copies of the addresses with sensitive fields decrypted
+        """
+        return self._map_address_fields(
+            addresses,
+            lambda values: self.decrypt_many(values, max_workers)
+        )
+    
+    @staticmethod
+    def _map_address_fields(addresses: List[Dict[str, Any]], transform) -> List[Dict[str, Any]]:
+        """Apply a batch transform to every non-empty sensitive address field"""
+        results = [dict(address) for address in addresses]
+        positions = [
+            (index, field)
+            for index, address in enumerate(results)
+            for field in ADDRESS_SENSITIVE_FIELDS
+            if address.get(field)
+        ]
+        transformed = transform([results[index][field] for index, field in positions])
+        for (index, field), value in zip(positions, transformed):
+            results[index][field] = value
+        return results
 
 
 class TokenManager:
@@ -481,11 +714,15 @@ class DataMasking:
 encryption_manager = None
 token_manager = None
 
-def initialize_encryption(master_key: str = None, jwt_secret: str = None):
-    """Initialize global encryption managers"""
+def initialize_encryption(master_key: str = None, jwt_secret: str = None, rsa_key_path: str = None):
+    """
+    Initialize global encryption managers.
+    
+    Cheap: key derivation and RSA key loading are deferred to first use.
+    """
     global encryption_manager, token_manager
     
-    encryption_manager = EncryptionManager(master_key)
+    encryption_manager = EncryptionManager(master_key, rsa_key_path)
     token_manager = TokenManager(jwt_secret)
 
 def get_encryption_manager() -> EncryptionManager:
@@ -0,0 +1,228 @@
+"""
+Idempotency Key Middleware for Local Producer Web Application
+
+This module lets clients safely retry non-idempotent requests (order
+creation, SMS verification sends) by sending an ``Idempotency-Key`` header.
+The first request with a key runs normally and its final response is stored
+in a TTL collection; replays within the window get the stored response back
+without running the endpoint again.
+"""
+
+import re
+import json
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Dict, Any, Callable
+from flask import request, jsonify, g, make_response, current_app
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.database import get_database
+
+logger = logging.getLogger(__name__)
+
+
+# Header names
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+# Storage configuration
+COLLECTION_NAME = 'idempotency_keys'
+DEFAULT_TTL_SECONDS = 86400  # 24 hours
+PROCESSING_TIMEOUT_SECONDS = 60  # Lock held by an in-flight request
+KEY_PATTERN = re.compile(r'^[A-Za-z0-9_\-:.]{8,255}$')
+
+# Responses that describe a transient condition and must not be replayed
+NON_STORED_STATUS_CODES = {408, 409, 425, 429}
+
+STATE_PROCESSING = 'processing'
+STATE_COMPLETED = 'completed'
+
+
+def _error(code: str, message: str, status: int):
+    """Build an error response in the checkout error format."""
+    return jsonify({
+        'success': False,
+        'error': {
+            'code': code,
+            'message': message
+        }
+    }), status
+
+
+def request_fingerprint() -> str:
+    """
+    Hash the parts of the request that define its meaning.
+
+    Includes method, path and the JSON body in canonical key order so the
+    same payload serialized differently by a client still matches.
+    """
+    body = request.get_json(silent=True)
+    if body is None:
+        canonical_body = request.get_data(as_text=True)
+    else:
+        canonical_body = json.dumps(body, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b'\n')
+    digest.update(request.path.encode())
+    digest.update(b'\n')
+    digest.update(canonical_body.encode())
+    return digest.hexdigest()
+
+
+def _storage_key(scope: str, key: str) -> str:
+    """Namespace a client key by endpoint scope and checkout identity."""
+    owner = getattr(g, 'customer_phone', None) or 'anonymous'
+    return f"{scope}:{owner}:{key}"
+
+
+def _replay(record: Dict[str, Any]):
+    """Rebuild the stored response of a completed request."""
+    response = make_response(record['body'], record['status_code'])
+    response.mimetype = record.get('mimetype') or 'application/json'
+    response.headers[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def _acquire(collection, storage_key: str, fingerprint: str, now: datetime):
+    """
+    Claim an idempotency key for this request.
+
+    Returns:
+        tuple: (acquired: bool, existing record or None)
+    """
+    try:
+        collection.insert_one({
+            '_id': storage_key,
+            'state': STATE_PROCESSING,
+            'request_hash': fingerprint,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=PROCESSING_TIMEOUT_SECONDS)
+        })
+        return True, None
+    except DuplicateKeyError:
+        pass
+
+    # Take over a processing lock abandoned by a crashed request
+    takeover = collection.update_one(
+        {'_id': storage_key, 'state': STATE_PROCESSING, 'expires_at': {'$lt': now}},
+        {'$set': {
+            'request_hash': fingerprint,
+            'created_at': now,
+            'expires_at': now + timedelta(seconds=PROCESSING_TIMEOUT_SECONDS)
+        }}
+    )
+    if takeover.modified_count:
+        return True, None
+
+    return False, collection.find_one({'_id': storage_key})
+
+
+def idempotent(scope: str) -> Callable:
+    """
+    Make a POST endpoint replay-safe with the Idempotency-Key header.
+
+    Requests without the header are processed normally. Successful and
+    client-error responses are stored for the TTL window; server errors
+    and transient statuses release the key so the client can retry.
+
+    Args:
+        scope (str): Endpoint name used to namespace keys
+
+    Usage:
+        @checkout_bp.route('/phone/send-code', methods=['POST'])
+        @idempotent('checkout_send_code')
+        def send_verification_code():
+            ...
+    """
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return f(*args, **kwargs)
+
+            key = key.strip()
+            if not KEY_PATTERN.match(key):
+                return _error(
+                    'IDEMPOTENCY_KEY_INVALID',
+                    'Cheia de idempotență trebuie să aibă între 8 și 255 de caractere alfanumerice',
+                    400
+                )
+
+            storage_key = _storage_key(scope, key)
+            fingerprint = request_fingerprint()
+            now = datetime.utcnow()
+
+            try:
+                collection = get_database()[COLLECTION_NAME]
+                acquired, record = _acquire(collection, storage_key, fingerprint, now)
+            except PyMongoError as e:
+                # Idempotency storage is best effort - never block the request
+                logger.warning(f"Idempotency storage unavailable, processing without key: {str(e)}")
+                return f(*args, **kwargs)
+
+            if not acquired:
+                if record is None:
+                    # Record expired between insert and lookup - treat as new request
+                    return f(*args, **kwargs)
+                if record.get('request_hash') != fingerprint:
+                    return _error(
+                        'IDEMPOTENCY_KEY_REUSED',
+                        'Cheia de idempotență a fost folosită pentru o altă cerere',
+                        422
+                    )
+                if record.get('state') == STATE_COMPLETED:
+                    logger.info(f"Replaying stored response for idempotency key in scope {scope}")
+                    return _replay(record)
+                response, status = _error(
+                    'IDEMPOTENCY_IN_PROGRESS',
+                    'Cererea este deja în curs de procesare. Încercați din nou în câteva secunde',
+                    409
+                )
+                response.headers['Retry-After'] = '1'
+                return response, status
+
+            try:
+                response = make_response(f(*args, **kwargs))
+            except Exception:
+                _release(collection, storage_key)
+                raise
+
+            if response.status_code >= 500 or response.status_code in NON_STORED_STATUS_CODES \
+                    or response.is_streamed:
+                _release(collection, storage_key)
+                return response
+
+            ttl = current_app.config.get('IDEMPOTENCY_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+            try:
+                collection.update_one(
+                    {'_id': storage_key},
+                    {'$set': {
+                        'state': STATE_COMPLETED,
+                        'status_code': response.status_code,
+                        'mimetype': response.mimetype,
+                        'body': response.get_data(as_text=True),
+                        'completed_at': datetime.utcnow(),
+                        'expires_at': now + timedelta(seconds=ttl)
+                    }}
+                )
+            except PyMongoError as e:
+                logger.warning(f"Failed to store idempotent response: {str(e)}")
+
+            return response
+
+        return decorated_function
+    return decorator
+
+
+def _release(collection, storage_key: str) -> None:
+    """Drop a processing lock so the client can retry the request."""
+    try:
+        collection.delete_one({'_id': storage_key, 'state': STATE_PROCESSING})
+    except PyMongoError as e:
+        logger.warning(f"Failed to release idempotency key: {str(e)}")
+
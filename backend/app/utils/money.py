@@ -0,0 +1,167 @@
+"""
+Money Utilities for Local Producer Web Application
+
+This module represents monetary amounts as integer bani (1 RON = 100 bani).
+Amounts are converted to bani once at the boundary (request payloads,
+product prices, legacy float documents) and all arithmetic on order lines,
+totals and tax is plain integer arithmetic, so stored totals never drift.
+"""
+
+import re
+from decimal import Decimal, ROUND_HALF_UP
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional
+
+
+BANI_PER_LEU = 100
+BASIS_POINTS = 10000
+
+AMOUNT_PATTERN = re.compile(r'^\s*([+-])?(\d*)(?:\.(\d*))?\s*$')
+
+
+class MoneyError(ValueError):
+    """Exception raised for amounts that cannot be converted to bani."""
+    pass
+
+
+def to_bani(amount: Any) -> int:
+    """
+    Convert an amount in lei to integer bani, rounding half up.
+
+    Args:
+        amount (int|float|str|Decimal): Amount in lei
+
+    Returns:
+        int: Amount in bani
+
+    Raises:
+        MoneyError: If the amount is not a number
+    """
+    if isinstance(amount, bool) or amount is None:
+        raise MoneyError(f"Invalid amount: {amount!r}")
+
+    if isinstance(amount, int):
+        return amount * BANI_PER_LEU
+
+    if isinstance(amount, float):
+        if amount != amount or amount in (float('inf'), float('-inf')):
+            raise MoneyError(f"Invalid amount: {amount!r}")
+        # Snap representation noise (1.005 * 100 == 100.49999999999999)
+        # before rounding half away from zero
+        scaled = round(amount * BANI_PER_LEU, 6)
+        return int(scaled + 0.5) if scaled >= 0 else -int(-scaled + 0.5)
+
+    if isinstance(amount, Decimal):
+        if not amount.is_finite():
+            raise MoneyError(f"Invalid amount: {amount!r}")
+        return int(amount.scaleb(2).to_integral_value(rounding=ROUND_HALF_UP))
+
+    if isinstance(amount, str):
+        match = AMOUNT_PATTERN.match(amount)
+        if not match or not (match.group(2) or match.group(3)):
+            raise MoneyError(f"Invalid amount: {amount!r}")
+        sign, whole, fraction = match.group(1), match.group(2) or '0', match.group(3) or ''
+        fraction = fraction.ljust(3, '0')
+        bani = int(whole) * BANI_PER_LEU + int(fraction[:2])
+        if fraction[2] >= '5':
+            bani += 1
+        return -bani if sign == '-' else bani
+
+    raise MoneyError(f"Invalid amount type: {type(amount).__name__}")
+
+
+def from_bani(bani: int) -> float:
+    """Convert integer bani to lei for JSON responses and legacy fields."""
+    return bani / BANI_PER_LEU
+
+
+def format_lei(bani: int) -> str:
+    """Format integer bani as a lei string (e.g. 1234 -> '12.34')."""
+    sign = '-' if bani < 0 else ''
+    whole, fraction = divmod(abs(bani), BANI_PER_LEU)
+    return f"{sign}{whole}.{fraction:02d}"
+
+
+def apply_rate(bani: int, basis_points: int) -> int:
+    """
+    Apply a rate expressed in basis points, rounding half up.
+
+    Args:
+        bani (int): Base amount in bani
+        basis_points (int): Rate in basis points (800 = 8%)
+
+    Returns:
+        int: Rounded amount in bani
+    """
+    return (bani * basis_points + BASIS_POINTS // 2) // BASIS_POINTS
+
+
+def line_total(unit_price_bani: int, quantity: int) -> int:
+    """Get the total of an order line in bani."""
+    return unit_price_bani * quantity
+
+
+def item_bani(item: Dict[str, Any], field: str = 'total_price') -> int:
+    """
+    Get a line item amount in bani.
+
+    Uses the stored ``<field>_bani`` integer when present and falls back to
+    converting the legacy float field for documents written before it.
+    """
+    bani = item.get(f'{field}_bani')
+    if bani is not None:
+        return bani
+    return to_bani(item.get(field) or 0)
+
+
+def sum_bani(items: Iterable[Dict[str, Any]], field: str = 'total_price') -> int:
+    """
+    Sum a bani field over line items.
+
+    Items that already carry ``<field>_bani`` are summed in a single
+    ``sum(map(itemgetter(...)))`` pass; only legacy items are converted.
+
+    Args:
+        items (iterable): Order line items
+        field (str): Amount field name without the ``_bani`` suffix
+
+    Returns:
+        int: Sum in bani
+    """
+    items = items if isinstance(items, list) else list(items)
+    key = f'{field}_bani'
+    if all(key in item for item in items):
+        return sum(map(itemgetter(key), items))
+    return sum(item_bani(item, field) for item in items)
+
+
+def money_fields(field: str, bani: int) -> Dict[str, Any]:
+    """Build the ``<field>_bani`` integer and its lei float for a document."""
+    return {f'{field}_bani': bani, field: from_bani(bani)}
+
+
+def price_line(unit_price: Any, quantity: int, unit_price_bani: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Build the monetary fields of an order line.
+
+    Args:
+        unit_price: Unit price in lei (ignored when unit_price_bani is given)
+        quantity (int): Quantity ordered
+        unit_price_bani (int): Unit price already in bani
+
+    Returns:
+        dict: unit_price(_bani) and total_price(_bani) fields
+    """
+    if unit_price_bani is None:
+        unit_price_bani = to_bani(unit_price)
+    fields = money_fields('unit_price', unit_price_bani)
+    fields.update(money_fields('total_price', line_total(unit_price_bani, quantity)))
+    return fields
+
+
+def price_lines(items: List[Dict[str, Any]], price_field: str = 'price') -> List[Dict[str, Any]]:
+    """Add monetary fields to cart-style items that carry a lei unit price."""
+    for item in items:
+        unit_price = item.get(price_field, item.get('unit_price', 0))
+        item.update(price_line(unit_price, int(item.get('quantity', 0))))
+    return items
@@ -0,0 +1,262 @@
+"""
+Rate Limit Engine for Local Producer Web Application
+
+This module provides the limiter shared by every in-process rate limiting
+code path (checkout SMS limits, auth route limits, the security middleware
+and the fallback of the MongoDB API limiter).
+
+Limits are enforced with GCRA (the generic cell rate algorithm), the
+timestamp form of a token bucket: each key stores a single "theoretical
+arrival time" instead of a list of request timestamps, so a check is O(1)
+in time and memory. A limit of N per window allows a burst of N and then
+refills at N per window.
+
+State lives in a pluggable storage: a lock-striped in-memory dict with
+periodic eviction of idle keys, or Redis (one atomic Lua script per check)
+when several processes must share limits.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+import zlib
+from collections import namedtuple
+from typing import Dict, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+# Windows of None (non-expiring limits such as saved addresses) are modelled
+# as a window long enough that the bucket never meaningfully refills
+NO_EXPIRY_WINDOW = 10 * 365 * 86400
+
+
+Decision = namedtuple('Decision', ['allowed', 'limit', 'remaining', 'used', 'retry_after', 'reset_after'])
+Decision.__doc__ = """
+Outcome of a rate limit check.
+
+allowed: whether the request fits (and was counted unless peeking)
+limit: requests allowed per window
+remaining: requests that would still fit right now
+used: requests currently counted against the window
+retry_after: seconds until the next request fits (0 if allowed)
+reset_after: seconds until the bucket is completely full again
+"""
+
+
+class MemoryStorage:
+    """
+    Lock-striped in-memory GCRA state.
+
+    Keys are spread over ``stripes`` dicts, each with its own lock, so
+    concurrent checks on different keys rarely contend. Keys whose bucket
+    has fully refilled carry no information and are evicted by a sweep
+    that runs at most every ``sweep_interval`` seconds.
+    """
+
+    def __init__(self, stripes: int = 16, sweep_interval: float = 60.0):
+        """
+        Initialize memory storage.
+
+        Args:
+            stripes: Number of independently locked partitions
+            sweep_interval: Minimum seconds between idle-key sweeps
+        """
+        self._stripes = [({}, threading.Lock()) for _ in range(stripes)]
+        self.sweep_interval = sweep_interval
+        self._next_sweep = time.monotonic() + sweep_interval
+        self._sweep_lock = threading.Lock()
+
+    def _stripe(self, key: str) -> Tuple[Dict[str, float], threading.Lock]:
+        """Get the partition that owns a key."""
+        return self._stripes[zlib.crc32(key.encode('utf-8')) % len(self._stripes)]
+
+    def apply(self, key: str, now: float, interval: float, window: float,
+              cost: int, peek: bool) -> Tuple[bool, float]:
+        """
+        Run one GCRA step for a key.
+
+        Returns:
+            tuple: (allowed, theoretical arrival time after the step)
+        """
+        self._maybe_sweep(now)
+        entries, lock = self._stripe(key)
+        with lock:
+            tat = max(entries.get(key, now), now)
+            new_tat = tat + interval * cost
+            allowed = new_tat - now <= window
+            if allowed and not peek:
+                entries[key] = new_tat
+                return True, new_tat
+            return allowed, new_tat if allowed else tat
+
+    def reset(self, key: str) -> None:
+        """Forget the state of a key."""
+        entries, lock = self._stripe(key)
+        with lock:
+            entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries, _ in self._stripes)
+
+    def _maybe_sweep(self, now: float) -> None:
+        """Evict idle keys if the sweep interval has passed."""
+        monotonic_now = time.monotonic()
+        if monotonic_now < self._next_sweep or not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = monotonic_now + self.sweep_interval
+            evicted = 0
+            for entries, lock in self._stripes:
+                with lock:
+                    idle = [key for key, tat in entries.items() if tat <= now]
+                    for key in idle:
+                        del entries[key]
+                    evicted += len(idle)
+            if evicted:
+                logger.debug(f"Rate limit engine evicted {evicted} idle keys")
+        finally:
+            self._sweep_lock.release()
+
+
+class RedisStorage:
+    """
+    Redis-backed GCRA state shared across processes.
+
+    Each check is one EVALSHA of a Lua script that reads and updates the
+    key atomically. Keys expire once their bucket has fully refilled.
+    """
+
+    # KEYS[1] = key; ARGV = now, interval, window, cost, peek
+    GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local window = tonumber(ARGV[3])
+local cost = tonumber(ARGV[4])
+local peek = ARGV[5] == '1'
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+if new_tat - now > window then
+    return {0, tostring(tat)}
+end
+if not peek then
+    redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.max(1, math.ceil((new_tat - now) * 1000)))
+end
+return {1, tostring(new_tat)}
+"""
+
+    def __init__(self, client):
+        """
+        Initialize Redis storage.
+
+        Args:
+            client: redis.Redis client
+        """
+        self.client = client
+        self._script = client.register_script(self.GCRA_SCRIPT)
+
+    def apply(self, key: str, now: float, interval: float, window: float,
+              cost: int, peek: bool) -> Tuple[bool, float]:
+        """Run one GCRA step for a key atomically in Redis."""
+        allowed, tat = self._script(keys=[key], args=[now, interval, window, cost, '1' if peek else '0'])
+        return bool(int(allowed)), float(tat)
+
+    def reset(self, key: str) -> None:
+        """Forget the state of a key."""
+        self.client.delete(key)
+
+
+class RateLimitEngine:
+    """GCRA rate limiter over a pluggable storage."""
+
+    def __init__(self, storage=None):
+        """
+        Initialize engine.
+
+        Args:
+            storage: MemoryStorage or RedisStorage (default: MemoryStorage)
+        """
+        self.storage = storage if storage is not None else MemoryStorage()
+
+    def acquire(self, key: str, limit: int, window: Optional[float],
+                cost: int = 1, peek: bool = False) -> Decision:
+        """
+        Check a request against a limit and count it if it fits.
+
+        Args:
+            key: Namespaced rate limit key
+            limit: Requests allowed per window
+            window: Window in seconds (None for a non-expiring limit)
+            cost: Requests this call counts for
+            peek: Only check whether the request would fit; count nothing
+
+        Returns:
+            Decision
+        """
+        window = window or NO_EXPIRY_WINDOW
+        if limit <= 0:
+            return Decision(False, limit, 0, 0, float(window), float(window))
+
+        interval = window / limit
+        now = time.time()
+        allowed, tat = self.storage.apply(key, now, interval, window, cost, peek)
+
+        # Seconds of backlog currently counted against the key; a peek that
+        # fits reports the hypothetical tat, so take its own cost back out
+        backlog = max(0.0, tat - now)
+        if peek and allowed:
+            backlog = max(0.0, backlog - interval * cost)
+
+        used = min(limit, int(math.ceil(backlog / interval - 1e-9)))
+        remaining = max(0, int((window - backlog) / interval + 1e-9))
+        retry_after = 0.0 if allowed else max(0.0, backlog + interval * cost - window)
+
+        return Decision(allowed, limit, remaining, used, retry_after, backlog)
+
+    def peek(self, key: str, limit: int, window: Optional[float], cost: int = 1) -> Decision:
+        """Check whether a request would fit without counting it."""
+        return self.acquire(key, limit, window, cost, peek=True)
+
+    def reset(self, key: str) -> None:
+        """Clear the state of a key."""
+        self.storage.reset(key)
+
+
+def _create_storage():
+    """Create the storage selected by RATE_LIMIT_STORAGE ('memory' or 'redis')."""
+    try:
+        from flask import current_app, has_app_context
+        config = current_app.config if has_app_context() else {}
+    except ImportError:
+        config = {}
+
+    backend = config.get('RATE_LIMIT_STORAGE') or os.environ.get('RATE_LIMIT_STORAGE', 'memory')
+    if backend == 'redis':
+        try:
+            import redis
+            client = redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0'))
+            client.ping()
+            logger.info("Rate limit engine using Redis storage")
+            return RedisStorage(client)
+        except Exception as e:
+            logger.warning(f"Redis not available for rate limiting, using memory: {str(e)}")
+    return MemoryStorage()
+
+
+# Global rate limit engine instance
+_rate_limit_engine: Optional[RateLimitEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_rate_limit_engine() -> RateLimitEngine:
+    """Get or create global rate limit engine instance."""
+    global _rate_limit_engine
+    if _rate_limit_engine is None:
+        with _engine_lock:
+            if _rate_limit_engine is None:
+                _rate_limit_engine = RateLimitEngine(_create_storage())
+    return _rate_limit_engine
@@ -4,18 +4,28 @@ Rate Limiting Middleware for Local Producer Web Application
 This module provides flexible rate limiting middleware that can be applied
 to any endpoint with configurable limits and time windows. Uses MongoDB
 for distributed rate limiting with automatic TTL cleanup.
+
+Limits use a sliding-window counter: each (key, endpoint) pair is a single
+document holding the request count of the current fixed window and of the
+previous one. The request rate is estimated as the previous count weighted
+by how much of it still overlaps the sliding window, plus the current
+count. A check is one atomic findOneAndUpdate upsert.
 """
 
 import logging
+import math
 import re
+import time
 from datetime import datetime, timedelta
 from functools import wraps
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, Optional, Callable, Tuple
 from flask import request, jsonify, current_app
+from pymongo import ReturnDocument
 from pymongo.collection import Collection
 from pymongo.errors import PyMongoError
 
 from app.database import get_database
+from app.utils.rate_limit_engine import get_rate_limit_engine
 from app.utils.error_handlers import ValidationError
 
 
@@ -27,8 +37,8 @@ class RateLimiter:
     Flexible rate limiting service for API endpoints.
     
     Supports different rate limits for different endpoints with MongoDB
-    storage and automatic TTL cleanup. Uses sliding window algorithm
-    for accurate rate limiting.
+    storage and automatic TTL cleanup. Uses a sliding-window counter with
+    O(1) storage per key and one round trip per check.
     """
     
     # Default rate limit configurations
@@ -63,18 +73,13 @@ class RateLimiter:
             self.rate_limit_collection = self.db.api_rate_limits
             
             # Create TTL index for automatic cleanup
+            # (counters are looked up by _id, so no other index is needed)
             self.rate_limit_collection.create_index(
                 "expires_at", 
                 expireAfterSeconds=0,
                 background=True
             )
             
-            # Create compound index for efficient queries
-            self.rate_limit_collection.create_index(
-                [("key", 1), ("endpoint", 1)],
-                background=True
-            )
-            
             logger.info("Rate limiter MongoDB collections initialized successfully")
             
         except Exception as e:
@@ -187,9 +192,118 @@ class RateLimiter:
             
         return config
     
+    @staticmethod
+    def _counter_id(key: str, endpoint: str) -> str:
+        """Get the counter document id of a key on an endpoint."""
+        return f"{endpoint}|{key}"
+    
+    @staticmethod
+    def _window_start(now: float, window_seconds: int) -> int:
+        """Get the start (epoch seconds) of the fixed window containing now."""
+        return int(now // window_seconds) * window_seconds
+    
+    def _increment_pipeline(self, key: str, endpoint: str, window_start: int,
+                            window_seconds: int, increment: int,
+                            limit: Optional[int] = None, elapsed: float = 0.0) -> list:
+        """
+        Build the update pipeline that counts a request.
+        
+        Rolls the counter over when a new window starts: the last window's
+        count becomes prev_count (or 0 if more than one window has passed).
+        With a limit, the request is only counted if the weighted count
+        stays within it, and ``counted`` records whether it was.
+        """
+        same_window = {'$eq': ['$window', window_start]}
+        previous_window = {'$eq': ['$window', window_start - window_seconds]}
+        if limit is None:
+            counted = {'$literal': True}
+        else:
+            # Same estimate as _weighted_count, evaluated on the rolled-over counts
+            counted = {'$lte': [
+                {'$add': [
+                    {'$multiply': ['$prev_count', 1 - elapsed / window_seconds]},
+                    '$count',
+                    increment
+                ]},
+                limit
+            ]}
+        return [
+            {'$set': {
+                'key': {'$literal': key},
+                'endpoint': {'$literal': endpoint},
+                'prev_count': {'$cond': [
+                    same_window,
+                    {'$ifNull': ['$prev_count', 0]},
+                    {'$cond': [previous_window, '$count', 0]}
+                ]},
+                'count': {'$cond': [same_window, '$count', 0]},
+                'window': window_start,
+                'expires_at': datetime.utcfromtimestamp(window_start + 2 * window_seconds)
+            }},
+            {'$set': {'counted': counted}},
+            {'$set': {'count': {'$cond': ['$counted', {'$add': ['$count', increment]}, '$count']}}}
+        ]
+    
+    @staticmethod
+    def _window_counts(doc: Optional[Dict[str, Any]], window_start: int,
+                       window_seconds: int) -> Tuple[int, int]:
+        """Get (previous, current) window counts of a counter document as of window_start."""
+        if not doc:
+            return 0, 0
+        if doc.get('window') == window_start:
+            return doc.get('prev_count', 0), doc.get('count', 0)
+        if doc.get('window') == window_start - window_seconds:
+            return doc.get('count', 0), 0
+        return 0, 0
+    
+    @staticmethod
+    def _weighted_count(previous: int, current: int, elapsed: float, window_seconds: int) -> float:
+        """Estimate requests in the sliding window ending now."""
+        return previous * (1 - elapsed / window_seconds) + current
+    
+    @staticmethod
+    def _retry_after(previous: int, current: int, elapsed: float, limit: int,
+                     window_seconds: int) -> float:
+        """Get seconds until one more request fits within the limit."""
+        if limit <= 0:
+            return 2 * window_seconds
+        
+        # Still in this window: wait for the previous window's weight to decay
+        if current + 1 <= limit:
+            if previous == 0:
+                return 0.0
+            wait = window_seconds * (1 - (limit - current - 1) / previous) - elapsed
+            if wait < window_seconds - elapsed:
+                return max(0.0, wait)
+        
+        # Next window: this window's count becomes the decaying previous count
+        until_next = window_seconds - elapsed
+        if current == 0 or current + 1 <= limit:
+            return until_next
+        return until_next + window_seconds * (1 - (limit - 1) / current)
+    
+    def _limit_exceeded(self, count: float, limit: int, window_seconds: int,
+                        retry_after: float, now: float) -> Dict[str, Any]:
+        """Build a rate-limit-exceeded result."""
+        reset_in_seconds = int(math.ceil(retry_after))
+        return {
+            'allowed': False,
+            'current_count': int(math.ceil(count)),
+            'limit': limit,
+            'window_seconds': window_seconds,
+            'reset_at': datetime.utcfromtimestamp(now + reset_in_seconds).isoformat() + 'Z',
+            'reset_in_seconds': reset_in_seconds,
+            'reset_in_minutes': int(reset_in_seconds / 60),
+            'reason': 'rate_limit_exceeded'
+        }
+    
     def check_rate_limit(self, key: str, endpoint: str, limit: int, window_seconds: int) -> Dict[str, Any]:
         """
-        Check if request is within rate limit.
+        Check if request is within rate limit and count it if it is.
+        
+        The limit is checked and the request counted by one atomic upsert.
+        A rejected request is never counted, so clients retrying while
+        limited do not extend their own lockout.
         
         Args:
             key: Rate limit key (phone number, IP, etc.)
@@ -202,54 +316,39 @@ class RateLimiter:
         """
         try:
             if self.rate_limit_collection is None:
-                # Database unavailable, allow request
-                return {
-                    'allowed': True,
-                    'reason': 'rate_limiter_unavailable'
-                }
+                # Database unavailable, enforce the limit per process instead
+                return self._check_local(key, endpoint, limit, window_seconds)
+            
+            now = time.time()
+            window_start = self._window_start(now, window_seconds)
+            elapsed = now - window_start
+            counter_id = self._counter_id(key, endpoint)
+            
+            doc = self.rate_limit_collection.find_one_and_update(
+                {'_id': counter_id},
+                self._increment_pipeline(key, endpoint, window_start, window_seconds, 1,
+                                         limit=limit, elapsed=elapsed),
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
             
-            # Calculate window start time
-            window_start = datetime.utcnow() - timedelta(seconds=window_seconds)
-            
-            # Count requests in current window
-            current_count = self.rate_limit_collection.count_documents({
-                'key': key,
-                'endpoint': endpoint,
-                'created_at': {'$gte': window_start}
-            })
-            
-            # Check if limit exceeded
-            if current_count >= limit:
-                # Get oldest request for reset time calculation
-                oldest_request = self.rate_limit_collection.find_one({
-                    'key': key,
-                    'endpoint': endpoint,
-                    'created_at': {'$gte': window_start}
-                }, sort=[('created_at', 1)])
-                
-                if oldest_request:
-                    reset_time = oldest_request['created_at'] + timedelta(seconds=window_seconds)
-                    reset_in_seconds = max(0, (reset_time - datetime.utcnow()).total_seconds())
-                else:
-                    reset_time = datetime.utcnow() + timedelta(seconds=window_seconds)
-                    reset_in_seconds = window_seconds
-                
-                return {
-                    'allowed': False,
-                    'current_count': current_count,
-                    'limit': limit,
-                    'window_seconds': window_seconds,
-                    'reset_at': reset_time.isoformat() + 'Z',
-                    'reset_in_seconds': int(reset_in_seconds),
-                    'reset_in_minutes': int(reset_in_seconds / 60),
-                    'reason': 'rate_limit_exceeded'
-                }
+            previous, current = self._window_counts(doc, window_start, window_seconds)
+            
+            # Limit exceeded: the pipeline left the counter unchanged
+            if not doc.get('counted'):
+                prior_count = self._weighted_count(previous, current, elapsed, window_seconds)
+                retry_after = self._retry_after(previous, current, elapsed, limit, window_seconds)
+                return self._limit_exceeded(prior_count, limit, window_seconds, retry_after, now)
+            
+            # Requests in the sliding window before this one
+            prior_count = self._weighted_count(previous, current - 1, elapsed, window_seconds)
             
+            current_count = int(math.ceil(prior_count))
             return {
                 'allowed': True,
                 'current_count': current_count,
                 'limit': limit,
-                'remaining': limit - current_count,
+                'remaining': max(0, limit - current_count - 1),
                 'window_seconds': window_seconds
             }
             
@@ -262,9 +361,30 @@ class RateLimiter:
                 'reason': 'rate_limiter_error'
             }
     
+    def _check_local(self, key: str, endpoint: str, limit: int, window_seconds: int) -> Dict[str, Any]:
+        """Check and count a request with the in-process rate limit engine."""
+        decision = get_rate_limit_engine().acquire(f"api:{self._counter_id(key, endpoint)}", limit, window_seconds)
+        if not decision.allowed:
+            result = self._limit_exceeded(decision.used, limit, window_seconds, decision.retry_after, time.time())
+        else:
+            result = {
+                'allowed': True,
+                'current_count': decision.used - 1,
+                'limit': limit,
+                'remaining': decision.remaining,
+                'window_seconds': window_seconds
+            }
+        result['backend'] = 'memory'
+        if result['allowed']:
+            result['reason'] = 'rate_limiter_unavailable'
+        return result
+    
     def record_request(self, key: str, endpoint: str, window_seconds: int):
         """
-        Record a request for rate limiting tracking.
+        Count a request without checking the limit.
+        
+        check_rate_limit already counts allowed requests; this is for
+        callers that track usage without enforcing a limit.
         
         Args:
             key: Rate limit key
@@ -274,18 +394,13 @@ class RateLimiter:
         try:
             if self.rate_limit_collection is None:
                 return
-                
-            now = datetime.utcnow()
-            
-            # Create rate limit record with TTL
-            record = {
-                'key': key,
-                'endpoint': endpoint,
-                'created_at': now,
-                'expires_at': now + timedelta(seconds=window_seconds)
-            }
             
-            self.rate_limit_collection.insert_one(record)
+            window_start = self._window_start(time.time(), window_seconds)
+            self.rate_limit_collection.update_one(
+                {'_id': self._counter_id(key, endpoint)},
+                self._increment_pipeline(key, endpoint, window_start, window_seconds, 1),
+                upsert=True
+            )
             
         except Exception as e:
             logger.error(f"Error recording rate limit request: {str(e)}")
@@ -316,35 +431,37 @@ class RateLimiter:
                     'is_rate_limited': False
                 }
             
-            # Calculate window start time
-            window_start = datetime.utcnow() - timedelta(seconds=window_seconds)
-            
-            # Get all requests in current window
-            requests = list(self.rate_limit_collection.find({
-                'key': key,
-                'endpoint': endpoint,
-                'created_at': {'$gte': window_start}
-            }).sort('created_at', 1))
-            
-            attempts_count = len(requests)
-            
-            if requests:
-                oldest_request = requests[0]['created_at']
-                reset_time = oldest_request + timedelta(seconds=window_seconds)
-                reset_in_seconds = max(0, (reset_time - datetime.utcnow()).total_seconds())
+            now = time.time()
+            window_start = self._window_start(now, window_seconds)
+            elapsed = now - window_start
+            
+            doc = self.rate_limit_collection.find_one({'_id': self._counter_id(key, endpoint)})
+            previous, current = self._window_counts(doc, window_start, window_seconds)
+            count = self._weighted_count(previous, current, elapsed, window_seconds)
+            is_rate_limited = count + 1 > limit
+            
+            if is_rate_limited:
+                reset_in_seconds = self._retry_after(previous, current, elapsed, limit, window_seconds)
+            elif current:
+                # Time until this window's requests have fully left the sliding window
+                reset_in_seconds = 2 * window_seconds - elapsed
+            elif previous:
+                reset_in_seconds = window_seconds - elapsed
             else:
-                reset_time = None
                 reset_in_seconds = 0
             
+            reset_in_seconds = int(math.ceil(reset_in_seconds))
+            reset_time = datetime.utcfromtimestamp(now + reset_in_seconds) if reset_in_seconds else None
+            
             return {
-                'attempts_count': attempts_count,
+                'attempts_count': int(math.ceil(count)),
                 'rate_limit': limit,
                 'window_seconds': window_seconds,
                 'window_hours': window_seconds / 3600,
                 'reset_at': reset_time.isoformat() + 'Z' if reset_time else None,
-                'reset_in_seconds': int(reset_in_seconds),
+                'reset_in_seconds': reset_in_seconds,
                 'reset_in_minutes': int(reset_in_seconds / 60),
-                'is_rate_limited': attempts_count >= limit
+                'is_rate_limited': is_rate_limited
             }
             
         except Exception as e:
@@ -409,7 +526,7 @@ def rate_limit(endpoint: str, limit: Optional[int] = None, window_seconds: Optio
             # Generate rate limit key
             rate_limit_key = limiter._get_rate_limit_key(request_data, endpoint)
             
-            # Check rate limit
+            # Check and count this request (one round trip)
             check_result = limiter.check_rate_limit(
                 rate_limit_key, 
                 endpoint, 
@@ -427,28 +544,23 @@ def rate_limit(endpoint: str, limit: Optional[int] = None, window_seconds: Optio
                 
                 logger.warning(f"Rate limit exceeded for {masked_key} on endpoint {endpoint}")
                 
-                # Get detailed rate limit info
-                rate_info = limiter.get_rate_limit_info(
-                    rate_limit_key,
-                    endpoint,
-                    config['limit'],
-                    config['window_seconds']
-                )
+                reset_in_seconds = check_result.get('reset_in_seconds', config['window_seconds'])
+                reset_in_minutes = check_result.get('reset_in_minutes', int(reset_in_seconds / 60))
                 
                 # Return rate limit error response
                 error_response = {
                     'success': False,
                     'error': {
                         'code': 'RATE_LIMIT_EXCEEDED',
-                        'message': f"Rate limit exceeded. Try again in {rate_info['reset_in_minutes']} minutes.",
+                        'message': f"Rate limit exceeded. Try again in {reset_in_minutes} minutes.",
                         'details': {
                             'endpoint': endpoint,
                             'limit': config['limit'],
                             'window_hours': config['window_seconds'] / 3600,
-                            'attempts_count': rate_info['attempts_count'],
-                            'reset_in_seconds': rate_info['reset_in_seconds'],
-                            'reset_in_minutes': rate_info['reset_in_minutes'],
-                            'reset_at': rate_info['reset_at']
+                            'attempts_count': check_result.get('current_count', config['limit']),
+                            'reset_in_seconds': reset_in_seconds,
+                            'reset_in_minutes': reset_in_minutes,
+                            'reset_at': check_result.get('reset_at')
                         }
                     }
                 }
@@ -458,18 +570,11 @@ def rate_limit(endpoint: str, limit: Optional[int] = None, window_seconds: Optio
                 response.status_code = 429
                 response.headers['X-RateLimit-Limit'] = str(config['limit'])
                 response.headers['X-RateLimit-Remaining'] = '0'
-                response.headers['X-RateLimit-Reset'] = str(rate_info['reset_in_seconds'])
-                response.headers['Retry-After'] = str(rate_info['reset_in_seconds'])
+                response.headers['X-RateLimit-Reset'] = str(reset_in_seconds)
+                response.headers['Retry-After'] = str(reset_in_seconds)
                 
                 return response
             
-            # Record this request for rate limiting
-            limiter.record_request(
-                rate_limit_key,
-                endpoint,
-                config['window_seconds']
-            )
-            
             # Add rate limit headers to successful responses
             result = f(*args, **kwargs)
             
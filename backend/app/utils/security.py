@@ -7,6 +7,7 @@ sanitization, encryption, and Romanian GDPR compliance measures.
 
 import re
 import html
+import math
 import hashlib
 import secrets
 import logging
@@ -16,6 +17,8 @@ from werkzeug.security import check_password_hash, generate_password_hash
 import bleach
 from email_validator import validate_email, EmailNotValidError
 
+from app.utils.rate_limit_engine import get_rate_limit_engine
+
 
 # Romanian phone number regex
 ROMANIAN_PHONE_REGEX = re.compile(r'^(\+4|0040|0)([0-9]{9})$')
@@ -461,16 +464,21 @@ class SecurityLogger:
 
 
 class RateLimiter:
-    """Rate limiting for API endpoints"""
+    """Rate limiting for API endpoints (backed by the shared rate limit engine)"""
+    
+    def __init__(self, engine=None):
+        self._engine = engine
     
-    def __init__(self):
-        self.requests = {}  # In-memory storage (use Redis in production)
-        self.cleanup_interval = 3600  # 1 hour
-        self.last_cleanup = datetime.now(timezone.utc)
+    @property
+    def engine(self):
+        """Shared GCRA engine, resolved on first use"""
+        if self._engine is None:
+            self._engine = get_rate_limit_engine()
+        return self._engine
     
     def is_allowed(self, identifier: str, limit: int, window: int) -> Dict[str, Any]:
         """
-        Check if request is allowed based on rate limit.
+        Check if request is allowed based on rate limit and count it.
         
         Args:
             identifier (str): Unique identifier (IP, user ID, etc.)
@@ -480,57 +488,24 @@ class RateLimiter:
         Returns:
             Dict with allowed status and metadata
         """
-        now = datetime.now(timezone.utc)
-        
-        # Cleanup old entries periodically
-        if (now - self.last_cleanup).seconds > self.cleanup_interval:
-            self._cleanup_old_entries()
-            self.last_cleanup = now
-        
-        # Get request history for identifier
-        if identifier not in self.requests:
-            self.requests[identifier] = []
-        
-        request_times = self.requests[identifier]
+        decision = self.engine.acquire(f"security:{window}:{identifier}", limit, window)
         
-        # Remove requests outside the window
-        cutoff_time = now - timedelta(seconds=window)
-        request_times = [t for t in request_times if t > cutoff_time]
-        self.requests[identifier] = request_times
-        
-        # Check if limit exceeded
-        if len(request_times) >= limit:
+        if not decision.allowed:
             return {
                 'allowed': False,
-                'requests_made': len(request_times),
+                'requests_made': decision.used,
                 'limit': limit,
                 'window': window,
-                'retry_after': window
+                'retry_after': max(1, int(math.ceil(decision.retry_after)))
             }
         
-        # Record this request
-        request_times.append(now)
-        
         return {
             'allowed': True,
-            'requests_made': len(request_times),
+            'requests_made': decision.used,
             'limit': limit,
             'window': window,
-            'remaining': limit - len(request_times)
+            'remaining': decision.remaining
         }
-    
-    def _cleanup_old_entries(self):
-        """Remove old rate limit entries"""
-        cutoff_time = datetime.now(timezone.utc) - timedelta(hours=24)
-        
-        for identifier in list(self.requests.keys()):
-            self.requests[identifier] = [
-                t for t in self.requests[identifier] if t > cutoff_time
-            ]
-            
-            # Remove empty entries
-            if not self.requests[identifier]:
-                del self.requests[identifier]
 
 
 # Global rate limiter instance
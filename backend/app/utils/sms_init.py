@@ -4,6 +4,8 @@ SMS System Initialization
 
 import logging
 from app.models.sms_provider import SmsProvider
+from app.models.sms_stats import SmsStats
+from app.models.verification_code import VerificationCode
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,14 @@ def initialize_sms_system():
             logger.info("Creating mock SMS provider for development")
             SmsProvider.seed_mock_provider()
         
+        # Build SMS statistics rollups from existing logs on first start
+        SmsStats.create_indexes()
+        if not SmsStats.has_rollups():
+            SmsStats.rebuild()
+        
+        # Hashed OTPs expire through a TTL index
+        VerificationCode.create_indexes()
+        
         # In production, check for real providers
         # This is where you'd add SMSO configuration
         
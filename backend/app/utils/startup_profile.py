@@ -0,0 +1,56 @@
+"""
+Startup Profiling for Local Producer Web Application
+
+This module records how long each subsystem takes to import and initialize
+while the app factory runs, so slow worker boots can be traced to a step.
+The report is logged once and kept in ``app.extensions['startup_profile']``.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List
+
+
+class StartupProfile:
+    """Wall-clock timings of app factory steps."""
+
+    def __init__(self):
+        """Start the startup clock."""
+        self._started = time.perf_counter()
+        self.steps: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def step(self, subsystem: str, phase: str = 'init'):
+        """
+        Time one step of startup.
+
+        Args:
+            subsystem: Subsystem name (e.g. 'database', 'encryption')
+            phase: 'import' or 'init'
+
+        Usage:
+            with profile.step('sms', 'import'):
+                from app.utils.sms_init import initialize_sms_system
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append({
+                'subsystem': subsystem,
+                'phase': phase,
+                'ms': round((time.perf_counter() - started) * 1000, 2)
+            })
+
+    def report(self) -> Dict[str, Any]:
+        """Get step timings and the total since the profile started."""
+        return {
+            'total_ms': round((time.perf_counter() - self._started) * 1000, 2),
+            'steps': list(self.steps)
+        }
+
+    def format(self) -> str:
+        """Format the report as a single log line."""
+        report = self.report()
+        parts = [f"{step['subsystem']}.{step['phase']}={step['ms']}ms" for step in report['steps']]
+        return f"Startup profile: total={report['total_ms']}ms " + ' '.join(parts)
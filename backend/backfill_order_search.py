@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Create admin order search indexes and backfill search fields
+on orders written before the search index existed.
+
+The app runs the same backfill on its first start; this script is for
+running it ahead of a deploy.
+"""
+
+import sys
+import os
+
+# Add the backend directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import init_mongodb
+from app.config import DevelopmentConfig
+from app.models.order_search import OrderSearchIndex
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def backfill_order_search():
+    """Create search indexes and populate missing search fields"""
+    try:
+        # Initialize database connection
+        init_mongodb(DevelopmentConfig)
+        
+        logger.info("Creating order search indexes...")
+        OrderSearchIndex.create_indexes()
+        logger.info("✓ Created phone suffix, phone prefix, name token and name n-gram indexes")
+        
+        updated = OrderSearchIndex.backfill()
+        logger.info(f"✓ Backfilled search fields on {updated} orders")
+        
+        return True
+        
+    except Exception as e:
+        logger.error(f"Error backfilling order search: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    success = backfill_order_search()
+    if success:
+        print("\n✅ Order search index ready!")
+    else:
+        print("\n❌ Failed to backfill order search")
+        sys.exit(1)
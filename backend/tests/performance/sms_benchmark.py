@@ -0,0 +1,333 @@
+"""
+SMS Load Test for the checkout phone verification flow
+
+This module drives concurrent checkout send-code / verify-code flows
+through the Flask app in-process, with SMS sent by a FaultInjectionProvider
+so latency, errors, timeouts and balance exhaustion can be dialled in.
+It reports throughput, p50/p95/p99 latency per step and the number of
+MongoDB commands issued per SMS (counted with a pymongo command listener).
+
+Requires a MongoDB server. The run uses its own database
+(MONGODB_DB_NAME + '_sms_bench'), which is dropped afterwards unless
+--keep-data is given.
+
+Usage:
+    python tests/performance/sms_benchmark.py --flows 500 --concurrency 50 \\
+        --latency-distribution lognormal --latency-ms 80 --error-rate 0.02
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import logging
+import threading
+import statistics
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional
+from pymongo import monitoring
+
+# Add the backend directory to the Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts MongoDB commands by name (registered before the client exists)"""
+
+    def __init__(self):
+        """Initialize with no commands counted"""
+        self.commands = Counter()
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        """Count a command as it is sent"""
+        with self._lock:
+            self.commands[event.command_name] += 1
+
+    def succeeded(self, event):
+        """Completed commands were counted when started"""
+
+    def failed(self, event):
+        """Failed commands were counted when started"""
+
+    def reset(self):
+        """Forget counts from setup"""
+        with self._lock:
+            self.commands.clear()
+
+    def snapshot(self) -> Dict[str, int]:
+        """Get counts by command name"""
+        with self._lock:
+            return dict(self.commands)
+
+
+class SmsBenchmarkMetrics:
+    """Per-step latencies and outcomes of the benchmark flows"""
+
+    def __init__(self):
+        """Initialize empty metrics"""
+        self.latencies = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.flows_completed = 0
+        self._lock = threading.Lock()
+
+    def add_step(self, step: str, response_time: float, outcome: str):
+        """Record one request (response_time in ms)"""
+        with self._lock:
+            self.latencies[step].append(response_time)
+            self.outcomes[step][outcome] += 1
+
+    def add_flow(self, completed: bool):
+        """Record whether a send-code / verify-code flow verified the phone"""
+        if completed:
+            with self._lock:
+                self.flows_completed += 1
+
+    def calculate_statistics(self) -> Dict[str, Any]:
+        """Calculate latency percentiles and outcome counts per step"""
+        stats = {}
+        for step, times in self.latencies.items():
+            stats[step] = {
+                'count': len(times),
+                'avg_response_time': statistics.mean(times),
+                'p50_response_time': self._percentile(times, 50),
+                'p95_response_time': self._percentile(times, 95),
+                'p99_response_time': self._percentile(times, 99),
+                'max_response_time': max(times),
+                'outcomes': dict(self.outcomes[step])
+            }
+        return stats
+
+    @staticmethod
+    def _percentile(data: List[float], percentile: int) -> float:
+        """Calculate percentile (nearest rank)"""
+        if not data:
+            return 0
+        sorted_data = sorted(data)
+        index = int((percentile / 100) * len(sorted_data))
+        return sorted_data[min(index, len(sorted_data) - 1)]
+
+
+class SmsBenchmark:
+    """Runs checkout verification flows against a fault-injection provider"""
+
+    PROVIDER_SLUG = 'fault'
+
+    def __init__(self, args: argparse.Namespace, counter: CommandCounter):
+        """Initialize benchmark from parsed options"""
+        self.args = args
+        self.counter = counter
+        self.metrics = SmsBenchmarkMetrics()
+        self.app = None
+        self.provider = None
+        # Fresh numbers per run keep the per-phone daily SMS limit out of the way
+        self.phone_offset = random.randrange(10 ** 8)
+
+    def setup(self):
+        """Create the app on the benchmark database and install the provider"""
+        from app import create_app
+        from app.config import Config
+        from app.models.sms_provider import SmsProvider
+        from app.services.sms.sms_manager import get_sms_manager
+
+        class SmsBenchmarkConfig(Config):
+            MONGODB_DB_NAME = f"{Config.MONGODB_DB_NAME}_sms_bench"
+            DEBUG = False
+
+        self.app = create_app(SmsBenchmarkConfig)
+
+        with self.app.app_context():
+            SmsProvider({
+                'name': 'Fault Injection',
+                'slug': self.PROVIDER_SLUG,
+                'provider_type': SmsProvider.PROVIDER_FAULT_INJECTION,
+                'is_active': True,
+                'is_default': True,
+                'priority': 1,
+                'config': self.provider_config()
+            }).save()
+
+            # Only the fault-injection provider may send
+            mock = SmsProvider.find_by_slug('mock')
+            if mock:
+                mock.is_active = False
+                mock.is_default = False
+                mock.save()
+
+            # The load-test provider is not in the production provider map
+            manager = get_sms_manager()
+            manager.register_provider_class(
+                SmsProvider.PROVIDER_FAULT_INJECTION,
+                'app.services.sms.providers.fault_injection_provider.FaultInjectionProvider'
+            )
+            manager.clear_cache()
+            self.provider = manager.registry.get(self.PROVIDER_SLUG).provider
+
+    def provider_config(self) -> Dict[str, Any]:
+        """Provider config from the command line"""
+        args = self.args
+        config = {
+            'latency_distribution': args.latency_distribution,
+            'latency_ms': args.latency_ms,
+            'latency_spread_ms': args.latency_spread_ms,
+            'latency_sigma': args.latency_sigma,
+            'error_rate': args.error_rate,
+            'timeout_rate': args.timeout_rate,
+            'timeout_seconds': args.timeout_seconds,
+            'rate_limit_per_second': args.rate_limit,
+            'cost_per_sms': 3.5
+        }
+        if args.latency_max_ms is not None:
+            config['latency_max_ms'] = args.latency_max_ms
+        if args.exhaust_after is not None:
+            config['exhaust_after'] = args.exhaust_after
+        if args.seed is not None:
+            config['seed'] = args.seed
+        return config
+
+    def run(self) -> Dict[str, Any]:
+        """Run all flows and collect the report"""
+        from app.services.sms.sms_manager import get_sms_manager
+
+        self.counter.reset()
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+            list(executor.map(self.run_flow, range(self.args.flows)))
+
+        # Buffered logs, counters and delivery reports belong to this run
+        with self.app.app_context():
+            manager = get_sms_manager()
+            manager.telemetry.flush()
+            manager.webhook_queue.flush()
+            telemetry_stats = manager.telemetry.get_stats()
+
+        duration = time.perf_counter() - started
+        commands = self.counter.snapshot()
+        fault_stats = self.provider.get_fault_stats()
+        sms_sent = fault_stats['sent']
+
+        return {
+            'config': {
+                'flows': self.args.flows,
+                'concurrency': self.args.concurrency,
+                'provider': self.provider_config()
+            },
+            'duration': duration,
+            'flows_completed': self.metrics.flows_completed,
+            'throughput': {
+                'flows_per_second': self.args.flows / duration if duration else 0,
+                'sms_per_second': sms_sent / duration if duration else 0
+            },
+            'steps': self.metrics.calculate_statistics(),
+            'provider': fault_stats,
+            'db_operations': {
+                'total': sum(commands.values()),
+                'per_sms': sum(commands.values()) / sms_sent if sms_sent else None,
+                'by_command': commands
+            },
+            'telemetry': telemetry_stats
+        }
+
+    def run_flow(self, index: int):
+        """Send a code to a new phone, then verify it"""
+        phone = f"07{(self.phone_offset + index) % 10 ** 8:08d}"
+        headers = {'X-Forwarded-For': f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}"}
+        client = self.app.test_client()
+
+        status, body = self.request(client, 'send_code', '/api/checkout/phone/send-code',
+                                    {'phone': phone}, headers)
+        if status != 200:
+            self.metrics.add_flow(False)
+            return
+
+        code = self.provider.last_code_for('+4' + phone)
+        status, body = self.request(client, 'verify_code', '/api/checkout/phone/verify-code',
+                                    {'phone': phone, 'code': code or '000000'}, headers)
+        self.metrics.add_flow(status == 200)
+
+    def request(self, client, step: str, url: str, data: Dict[str, Any],
+                headers: Dict[str, str]):
+        """Make a request and record its latency and outcome"""
+        start_time = time.perf_counter()
+        response = client.post(url, json=data, headers=headers)
+        response_time = (time.perf_counter() - start_time) * 1000
+
+        body = response.get_json(silent=True) or {}
+        outcome = 'ok' if response.status_code == 200 else \
+            (body.get('error') or {}).get('code') or f"HTTP {response.status_code}"
+        self.metrics.add_step(step, response_time, outcome)
+        return response.status_code, body
+
+    def teardown(self):
+        """Stop background work and drop the benchmark database"""
+        from app.database import get_client, get_database, close_connection
+        from app.services.sms.dispatcher import get_sms_dispatcher
+
+        get_sms_dispatcher().shutdown()
+        if not self.args.keep_data:
+            get_client().drop_database(get_database().name)
+        close_connection()
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse benchmark options"""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--flows', type=int, default=200, help='send/verify flows to run')
+    parser.add_argument('--concurrency', type=int, default=20, help='flows in flight at once')
+    parser.add_argument('--latency-distribution', default='lognormal',
+                        choices=['constant', 'uniform', 'normal', 'lognormal', 'exponential'])
+    parser.add_argument('--latency-ms', type=float, default=80.0)
+    parser.add_argument('--latency-spread-ms', type=float, default=20.0)
+    parser.add_argument('--latency-sigma', type=float, default=0.5)
+    parser.add_argument('--latency-max-ms', type=float, default=None)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-rate', type=float, default=0.0)
+    parser.add_argument('--timeout-seconds', type=float, default=10.0)
+    parser.add_argument('--exhaust-after', type=int, default=None,
+                        help='sends accepted before the balance runs out')
+    parser.add_argument('--rate-limit', type=int, default=1000, help='provider sends per second')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--keep-data', action='store_true', help='keep the benchmark database')
+    return parser.parse_args(argv)
+
+
+def run_sms_benchmark(argv: Optional[List[str]] = None) -> int:
+    """Run the SMS benchmark and print its report"""
+    args = parse_args(argv)
+
+    # The listener must exist before the app creates its MongoClient
+    counter = CommandCounter()
+    monitoring.register(counter)
+
+    benchmark = SmsBenchmark(args, counter)
+    benchmark.setup()
+    try:
+        report = benchmark.run()
+    finally:
+        benchmark.teardown()
+
+    print(json.dumps(report, indent=2, default=str))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+    for step, stats in report['steps'].items():
+        logger.warning(
+            f"{step}: p50 {stats['p50_response_time']:.1f}ms, p95 {stats['p95_response_time']:.1f}ms, "
+            f"p99 {stats['p99_response_time']:.1f}ms"
+        )
+    logger.warning(f"Throughput: {report['throughput']['flows_per_second']:.1f} flows/s, "
+                   f"DB operations per SMS: {report['db_operations']['per_sms']}")
+    return 0 if report['flows_completed'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(run_sms_benchmark())
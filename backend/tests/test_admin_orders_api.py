@@ -21,6 +21,35 @@ from app.models.user import User
 from app.services.auth_service import AuthService
 
 
+class TestOrderExportRows:
+    """Unit tests for export row formatting (no app or database needed)."""
+    
+    def test_export_csv_neutralizes_formulas(self):
+        """Test customer text starting with a formula character is quoted in CSV only."""
+        from app.routes.orders import _generate_order_export
+        
+        order_doc = {
+            'order_number': 'ORD-2025-009999',
+            'customer_name': '=HYPERLINK("http://evil.example","click")',
+            'customer_phone': '+40722111234',
+            'delivery_address': {'street': '+Str. Lunga 1', 'city': 'Brasov'},
+            'special_instructions': '@SUM(A1:A2)'
+        }
+        
+        csv_cursor = MagicMock()
+        csv_cursor.__iter__.return_value = iter([dict(order_doc)])
+        csv_text = ''.join(_generate_order_export(csv_cursor, 'csv'))
+        assert "'=HYPERLINK(" in csv_text
+        assert "'+Str. Lunga 1" in csv_text
+        assert "'@SUM(A1:A2)" in csv_text
+        assert '+40722111234' in csv_text and "'+40722111234" not in csv_text
+        
+        ndjson_cursor = MagicMock()
+        ndjson_cursor.__iter__.return_value = iter([dict(order_doc)])
+        row = json.loads(''.join(_generate_order_export(ndjson_cursor, 'ndjson')))
+        assert row['customer_name'] == order_doc['customer_name']
+
+
 class TestAdminOrdersAPI:
     """Integration tests for admin orders API endpoints."""
     
@@ -705,6 +734,135 @@ class TestAdminOrdersAPI:
         assert 'Au fost găsite' in response_data['message']
         assert 'comenzi' in response_data['message']
     
+    # === ORDER EXPORT TESTS ===
+    
+    @patch('app.utils.auth_middleware.verify_jwt_token')
+    @patch('app.models.user.User.find_by_phone')
+    def test_export_orders_invalid_format(self, mock_user_find, mock_verify_jwt):
+        """Test order export with unsupported format."""
+        mock_verify_jwt.return_value = self.admin_user_data
+        mock_user_find.return_value = User(self.admin_user_data)
+        
+        response = self.client.get(
+            '/api/orders/admin/orders/export?format=xlsx',
+            headers=self.auth_headers
+        )
+        
+        assert response.status_code == 400
+        response_data = json.loads(response.data)
+        assert 'Format invalid' in response_data['error']['message']
+    
+    @patch('app.utils.auth_middleware.verify_jwt_token')
+    @patch('app.models.user.User.find_by_phone')
+    @patch('app.database.get_database')
+    @patch('app.utils.auth_middleware.log_admin_action')
+    def test_export_orders_csv_stream(self, mock_log_action, mock_get_db, mock_user_find, mock_verify_jwt):
+        """Test CSV export streams rows from a batched, projected cursor."""
+        mock_verify_jwt.return_value = self.admin_user_data
+        mock_user_find.return_value = User(self.admin_user_data)
+        
+        export_docs = [
+            {**order, 'items_count': len(order['items'])} for order in self.test_orders
+        ]
+        mock_cursor = MagicMock()
+        mock_cursor.sort.return_value = mock_cursor
+        mock_cursor.batch_size.return_value = mock_cursor
+        mock_cursor.__iter__.return_value = iter(export_docs)
+        
+        mock_collection = Mock()
+        mock_collection.find.return_value = mock_cursor
+        mock_db = Mock()
+        mock_db.__getitem__ = Mock(return_value=mock_collection)
+        mock_get_db.return_value = mock_db
+        
+        response = self.client.get(
+            '/api/orders/admin/orders/export?format=csv&status=pending',
+            headers=self.auth_headers
+        )
+        
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert 'attachment' in response.headers['Content-Disposition']
+        
+        lines = response.get_data(as_text=True).lstrip('\ufeff').strip().splitlines()
+        assert lines[0].startswith('order_number,created_at,status')
+        assert len(lines) == len(export_docs) + 1
+        assert 'ORD-2025-001234' in lines[1]
+        
+        query, projection = mock_collection.find.call_args[0]
+        assert query['status'] == 'pending'
+        assert 'items' not in projection
+        mock_cursor.batch_size.assert_called_once()
+        mock_cursor.close.assert_called_once()
+    
+    # === BATCH STATUS UPDATE TESTS ===
+    
+    @patch('app.utils.auth_middleware.verify_jwt_token')
+    @patch('app.models.user.User.find_by_phone')
+    def test_batch_update_status_requires_order_ids(self, mock_user_find, mock_verify_jwt):
+        """Test batch status update without order IDs."""
+        mock_verify_jwt.return_value = self.admin_user_data
+        mock_user_find.return_value = User(self.admin_user_data)
+        
+        response = self.client.put(
+            '/api/orders/admin/orders/status:batch',
+            data=json.dumps({'status': 'confirmed'}),
+            headers=self.auth_headers
+        )
+        
+        assert response.status_code == 400
+        response_data = json.loads(response.data)
+        assert 'VAL_001' in response_data['error']['code']
+    
+    @patch('app.utils.auth_middleware.verify_jwt_token')
+    @patch('app.models.user.User.find_by_phone')
+    @patch('app.database.get_database')
+    @patch('app.services.notification_queue.get_notification_queue')
+    @patch('app.models.order_stats.OrderStats.record_status_changes')
+    @patch('app.routes.orders.log_admin_action')
+    def test_batch_update_status_success(self, mock_log_action, mock_record_stats, mock_get_queue,
+                                         mock_get_db, mock_user_find, mock_verify_jwt):
+        """Test batch status update validates transitions and writes once."""
+        mock_verify_jwt.return_value = self.admin_user_data
+        mock_user_find.return_value = User(self.admin_user_data)
+        
+        pending_order, confirmed_order = self.test_orders[0], self.test_orders[1]
+        mock_collection = Mock()
+        mock_collection.find.return_value = [pending_order, confirmed_order]
+        mock_collection.bulk_write.return_value = Mock(modified_count=1)
+        mock_db = Mock()
+        mock_db.__getitem__ = Mock(return_value=mock_collection)
+        mock_get_db.return_value = mock_db
+        mock_get_queue.return_value.enqueue_many.return_value = 1
+        
+        response = self.client.put(
+            '/api/orders/admin/orders/status:batch',
+            data=json.dumps({
+                'order_ids': [
+                    str(pending_order['_id']),
+                    confirmed_order['order_number'],
+                    'ORD-MISSING'
+                ],
+                'status': 'confirmed'
+            }),
+            headers=self.auth_headers
+        )
+        
+        assert response.status_code == 200
+        response_data = json.loads(response.data)['data']
+        assert response_data['updated'] == 1
+        assert response_data['summary'] == {'updated': 1, 'unchanged': 1, 'not_found': 1}
+        
+        # One bulk_write guarded on the current status
+        operations = mock_collection.bulk_write.call_args[0][0]
+        assert len(operations) == 1
+        assert operations[0]._filter['status'] == 'pending'
+        
+        notifications = mock_get_queue.return_value.enqueue_many.call_args[0][0]
+        assert len(notifications) == 1
+        assert notifications[0]['phone_number'] == pending_order['customer_phone']
+        mock_record_stats.assert_called_once()
+    
     # === EDGE CASES AND BOUNDARY CONDITIONS ===
     
     @patch('app.utils.auth_middleware.verify_jwt_token')
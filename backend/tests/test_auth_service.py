@@ -13,7 +13,7 @@ from unittest.mock import patch, MagicMock, Mock
 from datetime import datetime, timedelta
 from jose import jwt
 
-from app.services.auth_service import AuthService
+from app.services.auth_service import AuthService, get_admin_token_cache, get_admin_token_denylist
 from app.models.user import User
 from app.utils.error_handlers import AuthenticationError, ValidationError
 
@@ -644,4 +644,79 @@ class TestAuthenticationIntegration:
         
         # Step 5: Logout
         logout_result = self.auth_service.logout_admin(new_access_token)
-        assert logout_result['success'] is True
\ No newline at end of file
+        assert logout_result['success'] is True
+
+class TestVerifiedTokenCache:
+    """Test verified-claims caching and logout revocation."""
+    
+    def setup_method(self):
+        """Setup test environment before each test."""
+        self.auth_service = AuthService()
+        self.auth_service.secret_key = 'test-secret-key'
+        get_admin_token_cache().clear()
+        get_admin_token_denylist().clear()
+        
+        self.mock_admin = Mock()
+        self.mock_admin._id = '507f1f77bcf86cd799439011'
+        self.mock_admin.phone_number = '+40722123456'
+        self.mock_admin.name = 'Test Admin'
+        self.mock_admin.role = User.ROLE_ADMIN
+    
+    def test_token_decoded_once(self):
+        """Test that repeated verification is served from the claims cache."""
+        token = self.auth_service.generate_token(self.mock_admin)
+        
+        with patch('app.services.auth_service.jwt.decode', wraps=jwt.decode) as mock_decode:
+            first = self.auth_service.verify_token(token)
+            second = self.auth_service.verify_token(f'Bearer {token}')
+        
+        assert mock_decode.call_count == 1
+        assert first == second
+    
+    def test_cache_shared_between_instances(self):
+        """Test that the middleware and route services share verified claims."""
+        token = self.auth_service.generate_token(self.mock_admin)
+        self.auth_service.verify_token(token)
+        
+        other = AuthService()
+        other.secret_key = 'test-secret-key'
+        with patch('app.services.auth_service.jwt.decode') as mock_decode:
+            payload = other.verify_token(token)
+        
+        mock_decode.assert_not_called()
+        assert payload['phone_number'] == '+40722123456'
+    
+    def test_cache_keyed_by_secret(self):
+        """Test that a rotated secret does not reuse claims verified with the old one."""
+        token = self.auth_service.generate_token(self.mock_admin)
+        self.auth_service.verify_token(token)
+        
+        self.auth_service.secret_key = 'rotated-secret-key'
+        with pytest.raises(AuthenticationError) as exc_info:
+            self.auth_service.verify_token(token)
+        
+        assert exc_info.value.error_code == "AUTH_009"
+    
+    def test_logout_revokes_token(self):
+        """Test that a logged out token is rejected by every service instance."""
+        token = self.auth_service.generate_token(self.mock_admin)
+        self.auth_service.verify_token(token)
+        
+        self.auth_service.logout_admin(token)
+        
+        other = AuthService()
+        other.secret_key = 'test-secret-key'
+        with pytest.raises(AuthenticationError) as exc_info:
+            other.verify_token(token)
+        
+        assert exc_info.value.error_code == "AUTH_018"
+    
+    def test_logout_keeps_other_sessions(self):
+        """Test that revoking one token leaves other tokens of the same admin valid."""
+        token = self.auth_service.generate_token(self.mock_admin)
+        other_token = self.auth_service.generate_token(self.mock_admin)
+        
+        self.auth_service.logout_admin(token)
+        
+        assert other_token != token
+        assert self.auth_service.verify_token(other_token)['user_id'] == '507f1f77bcf86cd799439011'
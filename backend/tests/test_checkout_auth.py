@@ -0,0 +1,139 @@
+"""
+Unit tests for checkout token verification.
+
+This module tests the verified-token LRU cache used by the checkout
+authentication middleware: cache hits skip jwt.decode, entries expire at
+the token's exp claim, and the cache stays bounded. It also checks that
+order creation does not log tokens or customer details.
+"""
+
+import jwt
+import json
+import time
+import logging
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from flask import Flask
+
+from app.utils.cache import TokenCache
+from app.utils.checkout_auth import decode_checkout_token, get_token_cache
+
+
+class TestTokenCache:
+    """Test the bounded verified-token cache."""
+
+    def test_entry_expires_at_token_exp(self):
+        """Test that cached payloads are dropped once exp has passed."""
+        cache = TokenCache(max_size=10)
+        cache.set('token-a', {'phone': '+40722111111', 'exp': time.time() + 0.05})
+
+        assert cache.get('token-a')['phone'] == '+40722111111'
+        time.sleep(0.06)
+        assert cache.get('token-a') is None
+
+    def test_lru_eviction(self):
+        """Test that the least recently used token is evicted first."""
+        cache = TokenCache(max_size=2)
+        exp = time.time() + 60
+        cache.set('token-a', {'exp': exp})
+        cache.set('token-b', {'exp': exp})
+        cache.get('token-a')
+        cache.set('token-c', {'exp': exp})
+
+        assert cache.get('token-a') is not None
+        assert cache.get('token-b') is None
+        assert cache.get_stats()['size'] == 2
+
+    def test_tokens_without_exp_not_cached(self):
+        """Test that payloads without exp are never cached."""
+        cache = TokenCache()
+        cache.set('token-a', {'phone': '+40722111111'})
+
+        assert cache.get('token-a') is None
+
+    def test_raw_token_not_stored(self):
+        """Test that entries are keyed by digest, not the raw token."""
+        cache = TokenCache()
+        cache.set('secret-token', {'exp': time.time() + 60})
+
+        assert 'secret-token' not in cache._entries
+
+
+class TestDecodeCheckoutToken:
+    """Test cached checkout token decoding."""
+
+    def setup_method(self):
+        """Setup app context and a valid checkout token."""
+        self.app = Flask(__name__)
+        self.app.config['SECRET_KEY'] = 'test-secret'
+        get_token_cache().clear()
+        self.token = jwt.encode({
+            'phone': '+40722111111',
+            'customer_id': 'customer_1',
+            'type': 'checkout_session',
+            'exp': datetime.utcnow() + timedelta(hours=1)
+        }, 'test-secret', algorithm='HS256')
+
+    def test_repeat_requests_skip_signature_check(self):
+        """Test that only the first decode of a token runs jwt.decode."""
+        with self.app.app_context():
+            with patch('app.utils.checkout_auth.jwt.decode', wraps=jwt.decode) as mock_decode:
+                first = decode_checkout_token(self.token)
+                second = decode_checkout_token(self.token)
+
+        assert first['phone'] == second['phone'] == '+40722111111'
+        assert mock_decode.call_count == 1
+
+    def test_rotated_secret_rejects_cached_token(self):
+        """Test that a token verified under an old secret is not trusted after rotation."""
+        with self.app.app_context():
+            assert decode_checkout_token(self.token) is not None
+            self.app.config['SECRET_KEY'] = 'rotated-secret'
+            assert decode_checkout_token(self.token) is None
+
+    def test_wrong_token_type_not_cached(self):
+        """Test that rejected tokens are not cached."""
+        token = jwt.encode({
+            'phone': '+40722111111', 'customer_id': 'c', 'type': 'admin',
+            'exp': datetime.utcnow() + timedelta(hours=1)
+        }, 'test-secret', algorithm='HS256')
+
+        with self.app.app_context():
+            assert decode_checkout_token(token) is None
+
+        assert get_token_cache().get_stats()['size'] == 0
+
+
+class TestOrderCreationLogging:
+    """Test that order creation keeps tokens and customer details out of logs."""
+
+    def test_create_order_does_not_log_token_or_customer_info(self, caplog):
+        """Test that the Authorization header, phone and name never reach INFO logs."""
+        from app.routes.orders import orders_bp
+
+        app = Flask(__name__)
+        app.config['JWT_SECRET_KEY'] = 'test-secret'
+        app.register_blueprint(orders_bp, url_prefix='/api/orders')
+        payload = {
+            'cart_session_id': 'cart-1',
+            'customer_info': {
+                'customer_name': 'Ion Popescu',
+                'phone_number': '0722111234',
+                'delivery_address': {
+                    'street': 'Strada Florilor 12', 'city': 'Cluj-Napoca',
+                    'county': 'Cluj', 'postal_code': '400001'
+                }
+            }
+        }
+
+        with caplog.at_level(logging.INFO), \
+                patch('app.routes.orders.get_order_service', side_effect=RuntimeError('no database')):
+            app.test_client().post(
+                '/api/orders', data=json.dumps(payload), content_type='application/json',
+                headers={'Authorization': 'Bearer secret-token-value'}
+            )
+
+        assert 'secret-token-value' not in caplog.text
+        assert '0722111234' not in caplog.text
+        assert 'Ion Popescu' not in caplog.text
@@ -0,0 +1,248 @@
+"""
+Unit tests for the customer phone profile model.
+
+This module tests the atomic checkout updates on customer_phones:
+positional address usage updates, guarded address appends,
+customer creation on first order, precomputed address ranks and
+matching order addresses against saved ones, and raw address text.
+"""
+
+import pytest
+from datetime import datetime
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from unittest.mock import patch, MagicMock
+
+from app.models.customer_phone import CustomerPhone
+
+
+class TestRecordCheckout:
+    """Test atomic profile updates after an order is placed."""
+
+    def setup_method(self):
+        """Setup mocked customer_phones collection."""
+        self.collection = MagicMock()
+        self.collection.update_one.return_value = MagicMock(matched_count=1, upserted_id=None)
+        self.db_patcher = patch('app.models.customer_phone.get_database')
+        self.db_patcher.start().return_value = {CustomerPhone.COLLECTION_NAME: self.collection}
+        self.address = {
+            'street': 'Strada Florilor 12',
+            'city': 'Cluj-Napoca',
+            'county': 'Cluj',
+            'postal_code': '400001'
+        }
+
+    def teardown_method(self):
+        """Stop database patching."""
+        self.db_patcher.stop()
+
+    def test_saved_address_uses_positional_update(self):
+        """Test that reusing an address bumps its usage in the same write as total_orders."""
+        address_id = ObjectId()
+
+        CustomerPhone.record_checkout('+40722111111', address_id=address_id)
+
+        self.collection.update_one.assert_called_once()
+        query, update = self.collection.update_one.call_args[0]
+        assert query == {'phone': '+40722111111', 'addresses._id': address_id}
+        assert update['$inc'] == {
+            'total_orders': 1, '__v': 1,
+            'addresses.$.usage_count': 1,
+            'addresses.$.rank': CustomerPhone.USAGE_RANK_WEIGHT
+        }
+        assert 'addresses.$.last_used' in update['$set']
+
+    def test_new_address_push_is_size_guarded(self):
+        """Test that new addresses are appended with $push behind the address limit."""
+        CustomerPhone.record_checkout('+40722111111', name='Ion Popescu', new_address=self.address)
+
+        self.collection.update_one.assert_called_once()
+        query, update = self.collection.update_one.call_args[0]
+        assert query['$expr']['$lt'][1] == CustomerPhone.MAX_ADDRESSES
+        assert update['$push']['addresses']['$sort'] == {'rank': -1}
+        pushed = update['$push']['addresses']['$each'][0]
+        assert pushed['street'] == 'Strada Florilor 12'
+        assert pushed['usage_count'] == 1
+        assert update['$set']['name'] == 'Ion Popescu'
+        assert self.collection.update_one.call_args[1]['upsert'] is False
+
+    def test_address_limit_still_counts_order(self):
+        """Test that a full address book falls back to counting the order only."""
+        self.collection.update_one.side_effect = [
+            MagicMock(matched_count=0, upserted_id=None),
+            MagicMock(matched_count=1, upserted_id=None)
+        ]
+
+        assert CustomerPhone.record_checkout('+40722111111', new_address=self.address) is True
+
+        query, update = self.collection.update_one.call_args_list[1][0]
+        assert query == {'phone': '+40722111111'}
+        assert '$push' not in update
+        assert update['$inc'] == {'total_orders': 1, '__v': 1}
+
+    def test_first_order_creates_customer(self):
+        """Test that a guest's first order upserts the customer profile."""
+        CustomerPhone.record_checkout(
+            '+40722111111', name='Ion Popescu', new_address=self.address, create=True
+        )
+
+        query, update = self.collection.update_one.call_args[0]
+        assert query == {'phone': '+40722111111'}
+        assert '$setOnInsert' in update
+        assert update['$push']['addresses']['$each'][0]['is_default'] is True
+        assert self.collection.update_one.call_args[1]['upsert'] is True
+
+    def test_concurrent_first_order_retries_without_upsert(self):
+        """Test that losing the upsert race applies the order to the new profile."""
+        self.collection.update_one.side_effect = [
+            DuplicateKeyError('E11000 duplicate key error'),
+            MagicMock(matched_count=1, upserted_id=None)
+        ]
+
+        assert CustomerPhone.record_checkout(
+            '+40722111111', name='Ion Popescu', new_address=self.address, create=True
+        ) is True
+
+        assert self.collection.update_one.call_count == 2
+        query, update = self.collection.update_one.call_args_list[1][0]
+        assert query['phone'] == '+40722111111'
+        assert query['$expr']['$lt'][1] == CustomerPhone.MAX_ADDRESSES
+        assert update['$inc']['total_orders'] == 1
+        assert update['$push']['addresses']['$each'][0]['is_default'] is False
+        assert self.collection.update_one.call_args_list[1][1].get('upsert', False) is False
+
+
+class TestAddressRanking:
+    """Test precomputed address ordering."""
+
+    def make_address(self, usage_count=0, is_default=False, created_at=None):
+        """Build an address subdocument for ranking tests."""
+        return {
+            '_id': ObjectId(),
+            'street': 'Strada Florilor 12',
+            'city': 'Cluj-Napoca',
+            'county': 'Cluj',
+            'postal_code': '400001',
+            'is_default': is_default,
+            'usage_count': usage_count,
+            'created_at': created_at or datetime(2025, 1, 1)
+        }
+
+    def test_rank_orders_default_usage_then_age(self):
+        """Test that default beats usage and usage beats age."""
+        default = self.make_address(is_default=True)
+        frequent = self.make_address(usage_count=5)
+        older = self.make_address(usage_count=1, created_at=datetime(2024, 1, 1))
+        newer = self.make_address(usage_count=1, created_at=datetime(2025, 6, 1))
+
+        customer = CustomerPhone({'phone': '+40722111111', 'addresses': [newer, older, frequent, default]})
+        customer.rank_addresses()
+
+        assert customer.addresses == [default, frequent, older, newer]
+
+    def test_usage_increment_matches_rank_weight(self):
+        """Test that one use raises the rank by exactly USAGE_RANK_WEIGHT."""
+        address = self.make_address(usage_count=2)
+        before = CustomerPhone.address_rank(address)
+        address['usage_count'] += 1
+
+        assert CustomerPhone.address_rank(address) - before == CustomerPhone.USAGE_RANK_WEIGHT
+
+    def test_mark_address_used_reorders(self):
+        """Test that using an address moves it ahead of less used ones."""
+        first = self.make_address(usage_count=1)
+        second = self.make_address(usage_count=1, created_at=datetime(2025, 2, 1))
+        customer = CustomerPhone({'phone': '+40722111111', 'addresses': [first, second]})
+
+        customer.mark_address_used(str(second['_id']))
+
+        assert customer.addresses[0] is second
+
+    @patch('app.models.customer_phone.get_database')
+    def test_find_ranked_addresses_sorts_on_read(self, mock_get_db):
+        """Test that addresses stored out of order are returned by rank without a write."""
+        used = self.make_address(usage_count=2)
+        unused = self.make_address()
+        for address in (used, unused):
+            address['rank'] = CustomerPhone.address_rank(address)
+        collection = MagicMock()
+        collection.find_one.return_value = {'_id': ObjectId(), 'addresses': [unused, used]}
+        mock_get_db.return_value = {CustomerPhone.COLLECTION_NAME: collection}
+
+        doc = CustomerPhone.find_ranked_addresses('+40722111111')
+
+        assert doc['addresses'] == [used, unused]
+        collection.update_one.assert_not_called()
+
+    @patch('app.models.customer_phone.get_database')
+    def test_rank_migration_is_version_guarded(self, mock_get_db):
+        """Test that unranked profiles are saved only if unchanged since the read."""
+        used = self.make_address(usage_count=2)
+        unused = self.make_address()
+        collection = MagicMock()
+        collection.find_one.return_value = {'_id': 1, '__v': 4, 'addresses': [unused, used]}
+        mock_get_db.return_value = {CustomerPhone.COLLECTION_NAME: collection}
+
+        doc = CustomerPhone.find_ranked_addresses('+40722111111')
+
+        assert doc['addresses'] == [used, unused]
+        query, update = collection.update_one.call_args[0]
+        assert query == {'_id': 1, '__v': 4}
+        assert update['$inc'] == {'__v': 1}
+
+    def test_delete_default_promotes_highest_rank(self):
+        """Test that deleting the default promotes the best ranked address, wherever it is stored."""
+        default = self.make_address(is_default=True)
+        unused = self.make_address()
+        used = self.make_address(usage_count=3)
+        customer = CustomerPhone({'phone': '+40722111111', 'addresses': [default, unused, used]})
+        customer.rank_addresses()
+        customer.addresses = [default, unused, used]
+
+        customer.delete_address(str(default['_id']))
+
+        assert used['is_default'] is True
+        assert customer.addresses == [used, unused]
+
+
+class TestFindMatchingAddress:
+    """Test matching an order address against saved addresses."""
+
+    def test_matches_address_with_special_characters(self):
+        """Test that a saved address with an apostrophe matches the same raw input again."""
+        raw = {
+            'street': " Str. D'Arc 3 ",
+            'city': 'Cluj-Napoca',
+            'county': 'Cluj',
+            'postal_code': '400001'
+        }
+        saved = CustomerPhone.build_address(raw)
+        customer = CustomerPhone({'phone': '+40722111111', 'addresses': [saved]})
+
+        assert customer.find_matching_address(raw) is saved
+
+    def test_different_street_does_not_match(self):
+        """Test that a different street is treated as a new address."""
+        saved = CustomerPhone.build_address({
+            'street': 'Strada Florilor 12', 'city': 'Cluj-Napoca',
+            'county': 'Cluj', 'postal_code': '400001'
+        })
+        customer = CustomerPhone({'phone': '+40722111111', 'addresses': [saved]})
+
+        assert customer.find_matching_address({
+            'street': 'Strada Florilor 14', 'city': 'Cluj-Napoca', 'postal_code': '400001'
+        }) is None
+
+
+class TestAddressText:
+    """Test that address text is stored raw."""
+
+    def test_build_address_stores_raw_text(self):
+        """Test that street, city and notes are only stripped, not html-escaped."""
+        saved = CustomerPhone.build_address({
+            'street': ' Str. A&B 3 ', 'city': "Sf. Gheorghe", 'county': 'Covasna',
+            'postal_code': '520001', 'notes': 'Interfon <12>'
+        })
+
+        assert saved['street'] == 'Str. A&B 3'
+        assert saved['notes'] == 'Interfon <12>'
@@ -0,0 +1,113 @@
+"""
+Unit tests for the encryption manager.
+
+This module tests lazy key material: constructing a manager does no key
+derivation or RSA generation, the derived Fernet key is cached per master
+key, and the RSA key pair is persisted to and reloaded from a PEM file.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+
+from app.utils import encryption
+from app.utils.encryption import EncryptionManager
+
+
+class TestLazyKeyMaterial:
+    """Test deferred key derivation and RSA key persistence."""
+
+    def setup_method(self):
+        """Clear the derived key cache between tests."""
+        encryption._derive_fernet_key.cache_clear()
+
+    def test_construction_derives_nothing(self):
+        """Test that creating a manager skips PBKDF2 and RSA generation."""
+        with patch('app.utils.encryption.PBKDF2HMAC') as mock_kdf, \
+                patch('app.utils.encryption.rsa.generate_private_key') as mock_generate:
+            EncryptionManager('test-master-key')
+
+        mock_kdf.assert_not_called()
+        mock_generate.assert_not_called()
+
+    def test_fernet_key_derived_once_per_master_key(self):
+        """Test that managers sharing a master key reuse the derived key."""
+        first = EncryptionManager('test-master-key')
+        encrypted = first.encrypt_sensitive_data('Strada Florilor 12')
+
+        with patch('app.utils.encryption.PBKDF2HMAC') as mock_kdf:
+            second = EncryptionManager('test-master-key')
+            decrypted = second.decrypt_sensitive_data(encrypted)
+
+        mock_kdf.assert_not_called()
+        assert decrypted == 'Strada Florilor 12'
+
+    def test_rsa_key_persisted_and_reloaded(self, tmp_path):
+        """Test that the RSA key is generated once and reused from the PEM file."""
+        key_path = str(tmp_path / 'rsa_key.pem')
+
+        first = EncryptionManager('test-master-key', rsa_key_path=key_path)
+        public_numbers = first.rsa_public_key.public_numbers()
+
+        assert os.path.exists(key_path)
+        assert oct(os.stat(key_path).st_mode & 0o777) == '0o600'
+
+        with patch('app.utils.encryption.rsa.generate_private_key') as mock_generate:
+            second = EncryptionManager('test-master-key', rsa_key_path=key_path)
+            assert second.rsa_public_key.public_numbers() == public_numbers
+
+        mock_generate.assert_not_called()
+
+
+class TestBatchEncryption:
+    """Test encrypt_many/decrypt_many and batched address handling."""
+
+    def setup_method(self):
+        """Create a manager with a test master key."""
+        self.manager = EncryptionManager('test-master-key')
+
+    def test_batch_format_matches_single_value(self):
+        """Test that batch and single-value APIs decrypt each other's output."""
+        encrypted = self.manager.encrypt_many(['Cluj-Napoca', '', 'Cluj'])
+
+        assert encrypted[1] == ""
+        assert self.manager.decrypt_sensitive_data(encrypted[0]) == 'Cluj-Napoca'
+        single = self.manager.encrypt_sensitive_data('Cluj')
+        assert self.manager.decrypt_many([single, encrypted[2]]) == ['Cluj', 'Cluj']
+
+    def test_thread_fan_out_preserves_order(self):
+        """Test that large batches split across threads keep input order."""
+        values = [f'Strada {i}' for i in range(EncryptionManager.PARALLEL_MIN_BATCH + 3)]
+
+        encrypted = self.manager.encrypt_many(values, max_workers=4)
+
+        assert self.manager.decrypt_many(encrypted, max_workers=4) == values
+
+    def test_decrypt_addresses_in_one_batch(self):
+        """Test that address rows are decrypted with a single decrypt_many call."""
+        addresses = self.manager.encrypt_addresses([
+            {'street': 'Strada Florilor 12', 'city': 'Cluj-Napoca', 'county': 'Cluj', 'postal_code': '400001'},
+            {'street': 'Bulevardul Unirii 5', 'city': 'București', 'county': '', 'notes': 'Interfon 3'}
+        ])
+        assert addresses[1]['notes'] == 'Interfon 3'
+        assert addresses[1]['county'] == ''
+
+        with patch.object(self.manager, 'decrypt_many', wraps=self.manager.decrypt_many) as mock_decrypt:
+            decrypted = self.manager.decrypt_addresses(addresses)
+
+        assert mock_decrypt.call_count == 1
+        assert decrypted[0]['street'] == 'Strada Florilor 12'
+        assert decrypted[1]['city'] == 'București'
+
+    def test_phone_numbers_round_trip(self):
+        """Test batched phone encryption normalizes and restores the +40 prefix."""
+        encrypted = self.manager.encrypt_phone_numbers(['+40 722-111-111', '+40722222222'])
+
+        assert self.manager.decrypt_phone_numbers(encrypted) == ['+40722111111', '+40722222222']
+
+    def test_tampered_value_raises(self):
+        """Test that one corrupted value fails the batch with ValueError."""
+        encrypted = self.manager.encrypt_many(['Cluj'])
+
+        with pytest.raises(ValueError):
+            self.manager.decrypt_many([encrypted[0][:-4] + 'AAAA'])
@@ -0,0 +1,104 @@
+"""
+Unit tests for the fault-injection SMS provider.
+
+This module tests config validation, latency sampling, injected errors,
+timeouts and balance exhaustion, and the async send path.
+"""
+
+import time
+import asyncio
+import pytest
+
+from app.services.sms.provider_interface import SmsMessage
+from app.services.sms.providers.fault_injection_provider import FaultInjectionProvider
+
+
+def make_message(phone='+40722123456', code='123456'):
+    """Build an OTP message."""
+    return SmsMessage(to=phone, body=f"Codul dvs. de verificare este: {code}", message_type='otp')
+
+
+class TestFaultInjectionProvider:
+    """Test FaultInjectionProvider behaviour."""
+
+    def test_invalid_config_rejected(self):
+        """Test that unknown distributions and impossible rates are rejected."""
+        with pytest.raises(ValueError):
+            FaultInjectionProvider({'latency_distribution': 'pareto'})
+        with pytest.raises(ValueError):
+            FaultInjectionProvider({'error_rate': 0.7, 'timeout_rate': 0.5})
+
+    @pytest.mark.parametrize('distribution', ['constant', 'uniform', 'normal', 'lognormal', 'exponential'])
+    def test_latency_distributions(self, distribution):
+        """Test that every distribution samples non-negative latencies around the mean."""
+        provider = FaultInjectionProvider({'latency_distribution': distribution, 'latency_ms': 50,
+                                           'latency_spread_ms': 10, 'seed': 7})
+
+        samples = [provider.sample_latency() for _ in range(2000)]
+
+        assert min(samples) >= 0
+        assert 0.045 < sum(samples) / len(samples) < 0.06
+
+    def test_latency_cap(self):
+        """Test that latency_max_ms bounds every sample."""
+        provider = FaultInjectionProvider({'latency_distribution': 'exponential', 'latency_ms': 50,
+                                           'latency_max_ms': 60, 'seed': 7})
+
+        assert max(provider.sample_latency() for _ in range(1000)) <= 0.06
+
+    def test_send_waits_for_latency(self):
+        """Test that a send takes the sampled latency and records the code."""
+        provider = FaultInjectionProvider({'latency_ms': 30})
+
+        started = time.monotonic()
+        response = provider.send_sms(make_message())
+
+        assert response.success is True
+        assert time.monotonic() - started >= 0.03
+        assert provider.last_code_for('+40722123456') == '123456'
+        assert provider.get_status(response.message_id).status == 'delivered'
+
+    def test_error_rate(self):
+        """Test that the configured fraction of sends fails with a provider error."""
+        provider = FaultInjectionProvider({'error_rate': 0.25, 'seed': 3})
+
+        responses = [provider.send_sms(make_message()) for _ in range(2000)]
+
+        errors = [r for r in responses if not r.success]
+        assert all(r.error_code == 'SMS_API_ERROR' for r in errors)
+        assert 400 < len(errors) < 600
+        assert provider.get_fault_stats()['errors'] == len(errors)
+
+    def test_timeout(self):
+        """Test that an injected timeout blocks for timeout_seconds, then fails."""
+        provider = FaultInjectionProvider({'timeout_rate': 1.0, 'timeout_seconds': 0.05})
+
+        started = time.monotonic()
+        response = provider.send_sms(make_message())
+
+        assert response.error_code == 'PROVIDER_TIMEOUT'
+        assert time.monotonic() - started >= 0.05
+
+    def test_balance_exhaustion(self):
+        """Test that sends fail with INSUFFICIENT_CREDIT once the balance runs out."""
+        provider = FaultInjectionProvider({'exhaust_after': 2})
+
+        responses = [provider.send_sms(make_message()) for _ in range(4)]
+
+        assert [r.success for r in responses] == [True, True, False, False]
+        assert responses[-1].error_code == 'INSUFFICIENT_CREDIT'
+        assert provider.get_balance().balance == 0
+        assert provider.health_check()[0] is False
+
+    def test_async_send(self):
+        """Test that async sends overlap their latency instead of queueing."""
+        provider = FaultInjectionProvider({'latency_ms': 50})
+
+        async def send_many():
+            return await asyncio.gather(*(provider.send_sms_async(make_message()) for _ in range(20)))
+
+        started = time.monotonic()
+        responses = asyncio.run(send_many())
+
+        assert all(r.success for r in responses)
+        assert time.monotonic() - started < 0.5
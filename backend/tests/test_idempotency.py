@@ -0,0 +1,123 @@
+"""
+Unit tests for idempotency key middleware.
+
+This module tests that retried requests carrying the same Idempotency-Key
+replay the stored response without running the endpoint again, and that
+failures release the key so the client can retry.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from flask import Flask, jsonify
+from pymongo.errors import DuplicateKeyError
+
+from app.utils.idempotency import idempotent, STATE_COMPLETED, STATE_PROCESSING
+
+
+class TestIdempotentDecorator:
+    """Test the @idempotent decorator."""
+
+    def setup_method(self):
+        """Setup a minimal app with an idempotent endpoint."""
+        self.app = Flask(__name__)
+        self.calls = []
+        self.status_code = 201
+
+        @self.app.route('/orders', methods=['POST'])
+        @idempotent('test_orders')
+        def create():
+            self.calls.append(1)
+            return jsonify({'success': True, 'order_number': '10001'}), self.status_code
+
+        self.client = self.app.test_client()
+        self.collection = MagicMock()
+        self.db_patcher = patch('app.utils.idempotency.get_database')
+        mock_get_db = self.db_patcher.start()
+        mock_get_db.return_value = {'idempotency_keys': self.collection}
+
+    def teardown_method(self):
+        """Stop database patching."""
+        self.db_patcher.stop()
+
+    def post(self, payload=None, key='retry-key-0001'):
+        """Post to the idempotent endpoint."""
+        headers = {'Idempotency-Key': key} if key else {}
+        return self.client.post('/orders', json=payload or {'cart_session_id': 'abc'}, headers=headers)
+
+    def test_request_without_key_is_not_tracked(self):
+        """Test that requests without the header skip idempotency storage."""
+        response = self.post(key=None)
+
+        assert response.status_code == 201
+        assert len(self.calls) == 1
+        self.collection.insert_one.assert_not_called()
+
+    def test_first_request_stores_response(self):
+        """Test that the first request runs and stores its final response."""
+        response = self.post()
+
+        assert response.status_code == 201
+        assert len(self.calls) == 1
+        stored = self.collection.update_one.call_args[0][1]['$set']
+        assert stored['state'] == STATE_COMPLETED
+        assert stored['status_code'] == 201
+        assert '10001' in stored['body']
+
+    def test_replay_returns_stored_response(self):
+        """Test that a retry returns the stored response without running the endpoint."""
+        self.post()
+        stored = self.collection.update_one.call_args[0][1]['$set']
+        request_hash = self.collection.insert_one.call_args[0][0]['request_hash']
+
+        self.collection.insert_one.side_effect = DuplicateKeyError('duplicate')
+        self.collection.update_one.return_value = MagicMock(modified_count=0)
+        self.collection.find_one.return_value = {**stored, 'request_hash': request_hash}
+
+        response = self.post()
+
+        assert response.status_code == 201
+        assert response.headers['Idempotent-Replayed'] == 'true'
+        assert response.get_json()['order_number'] == '10001'
+        assert len(self.calls) == 1
+
+    def test_key_reused_with_different_payload(self):
+        """Test that reusing a key for a different request is rejected."""
+        self.collection.insert_one.side_effect = DuplicateKeyError('duplicate')
+        self.collection.update_one.return_value = MagicMock(modified_count=0)
+        self.collection.find_one.return_value = {'state': STATE_COMPLETED, 'request_hash': 'other'}
+
+        response = self.post()
+
+        assert response.status_code == 422
+        assert response.get_json()['error']['code'] == 'IDEMPOTENCY_KEY_REUSED'
+        assert self.calls == []
+
+    def test_concurrent_retry_gets_conflict(self):
+        """Test that a retry while the first request is in flight returns 409."""
+        self.collection.insert_one.side_effect = DuplicateKeyError('duplicate')
+        self.collection.update_one.return_value = MagicMock(modified_count=0)
+        self.collection.find_one.return_value = {'state': STATE_PROCESSING, 'request_hash': 'hash-1'}
+
+        with patch('app.utils.idempotency.request_fingerprint', return_value='hash-1'):
+            response = self.post()
+
+        assert response.status_code == 409
+        assert response.headers['Retry-After'] == '1'
+        assert self.calls == []
+
+    def test_server_error_releases_key(self):
+        """Test that 5xx responses are not stored and the key is released."""
+        self.status_code = 500
+
+        response = self.post()
+
+        assert response.status_code == 500
+        self.collection.update_one.assert_not_called()
+        self.collection.delete_one.assert_called_once()
+
+    def test_invalid_key_rejected(self):
+        """Test that malformed keys are rejected before processing."""
+        response = self.post(key='short')
+
+        assert response.status_code == 400
+        assert self.calls == []
@@ -0,0 +1,72 @@
+"""
+Unit tests for integer bani money utilities.
+
+This module tests conversion of lei amounts to bani, rate rounding and
+line item summation used by order totals.
+"""
+
+import pytest
+from decimal import Decimal
+
+from app.utils.money import (
+    to_bani, from_bani, format_lei, apply_rate, sum_bani, price_line, MoneyError
+)
+
+
+class TestToBani:
+    """Test conversion of lei amounts to integer bani."""
+
+    def test_converts_all_input_types(self):
+        """Test that floats, strings, Decimals and ints convert the same way."""
+        assert to_bani(4.99) == 499
+        assert to_bani('4.99') == 499
+        assert to_bani(Decimal('4.99')) == 499
+        assert to_bani(5) == 500
+
+    def test_rounds_half_up(self):
+        """Test that amounts with more than two decimals round half up."""
+        assert to_bani(1.005) == 101
+        assert to_bani('1.005') == 101
+        assert to_bani('1.004') == 100
+        assert to_bani(9.996) == 1000
+
+    def test_float_drift_does_not_leak(self):
+        """Test that float representation noise is removed."""
+        assert to_bani(0.1 + 0.2) == 30
+
+    def test_invalid_amounts_raise(self):
+        """Test that non-numeric amounts are rejected."""
+        for value in ('abc', '', '.', None, True, float('nan'), [1]):
+            with pytest.raises(MoneyError):
+                to_bani(value)
+
+
+class TestBaniArithmetic:
+    """Test integer arithmetic helpers."""
+
+    def test_apply_rate_rounds_half_up(self):
+        """Test tax rounding in basis points."""
+        assert apply_rate(2548, 800) == 204  # 2.0384 lei
+        assert apply_rate(5500, 800) == 440
+        assert apply_rate(1, 5000) == 1  # 0.005 rounds up
+
+    def test_sum_bani_prefers_stored_integers(self):
+        """Test that stored bani fields are summed and legacy floats converted."""
+        assert sum_bani([{'total_price_bani': 998}, {'total_price_bani': 1550}]) == 2548
+        assert sum_bani([{'total_price_bani': 998}, {'total_price': 15.5}]) == 2548
+        assert sum_bani([]) == 0
+
+    def test_price_line(self):
+        """Test that line fields carry both bani and lei values."""
+        line = price_line('4.99', 3)
+
+        assert line == {
+            'unit_price_bani': 499, 'unit_price': 4.99,
+            'total_price_bani': 1497, 'total_price': 14.97
+        }
+
+    def test_formatting(self):
+        """Test lei formatting and float conversion."""
+        assert format_lei(1234) == '12.34'
+        assert format_lei(-5) == '-0.05'
+        assert from_bani(1497) == 14.97
@@ -0,0 +1,101 @@
+"""
+Unit tests for the notification queue.
+
+This module tests dispatching through the SMS manager, the in-flight
+bound, failure counting and the synchronous custom-sender path.
+"""
+
+import threading
+from concurrent.futures import Future
+from unittest.mock import patch
+
+from app.services.notification_queue import NotificationQueue
+from app.services.sms.provider_interface import SmsResponse
+
+
+class TestNotificationQueue:
+    """Test NotificationQueue dispatching."""
+
+    def setup_method(self):
+        """Set up a mocked SMS manager."""
+        self.manager_patcher = patch('app.services.sms.sms_manager.get_sms_manager')
+        self.mock_get_manager = self.manager_patcher.start()
+        self.futures = []
+        self.mock_get_manager.return_value.dispatch_sms.side_effect = self._dispatch
+
+    def teardown_method(self):
+        """Stop patchers."""
+        self.manager_patcher.stop()
+
+    def _dispatch(self, message):
+        """Return a pending future for each dispatched message."""
+        future = Future()
+        self.futures.append((message, future))
+        return future
+
+    def test_notifications_dispatched_as_transactional(self):
+        """Test that notifications are dispatched without waiting for each response."""
+        notification_queue = NotificationQueue()
+
+        assert notification_queue.enqueue_many([
+            {'phone_number': '+40722000001', 'message': 'Comanda confirmata'},
+            {'phone_number': '+40722000002', 'message': 'Comanda livrata'}
+        ]) == 2
+
+        for _ in range(100):
+            if len(self.futures) == 2:
+                break
+            threading.Event().wait(0.01)
+
+        # Both are in flight before either provider has answered
+        assert [message.to for message, _ in self.futures] == ['+40722000001', '+40722000002']
+        assert all(message.message_type == 'transactional' for message, _ in self.futures)
+
+        self.futures[0][1].set_result(SmsResponse(success=True, message_id='m1'))
+        self.futures[1][1].set_result(SmsResponse(success=False, error_code='SMS_API_ERROR',
+                                                  error_message='Provider down'))
+        notification_queue._queue.join()
+
+        stats = notification_queue.get_stats()
+        assert stats['sent'] == 1
+        assert stats['failed'] == 1
+        assert stats['pending'] == 0
+
+    def test_in_flight_bound(self):
+        """Test that the worker waits for a slot once max_in_flight sends are pending."""
+        notification_queue = NotificationQueue(max_in_flight=1)
+
+        notification_queue.enqueue('+40722000001', 'Prima')
+        notification_queue.enqueue('+40722000002', 'A doua')
+        threading.Event().wait(0.1)
+
+        assert len(self.futures) == 1
+
+        self.futures[0][1].set_result(SmsResponse(success=True))
+        for _ in range(100):
+            if len(self.futures) == 2:
+                break
+            threading.Event().wait(0.01)
+        assert len(self.futures) == 2
+
+        self.futures[1][1].set_result(SmsResponse(success=True))
+        notification_queue._queue.join()
+        assert notification_queue.get_stats()['sent'] == 2
+
+    def test_custom_sender_runs_synchronously(self):
+        """Test that a custom sender is called directly and its errors are counted."""
+        sent = []
+
+        def sender(phone_number, message):
+            if message == 'fail':
+                raise RuntimeError('boom')
+            sent.append(phone_number)
+
+        notification_queue = NotificationQueue(sender=sender)
+        notification_queue.enqueue('+40722000001', 'ok')
+        notification_queue.enqueue('+40722000002', 'fail')
+        notification_queue._queue.join()
+
+        assert sent == ['+40722000001']
+        assert notification_queue.get_stats()['failed'] == 1
+        self.mock_get_manager.return_value.dispatch_sms.assert_not_called()
@@ -0,0 +1,152 @@
+"""
+Unit tests for the admin order search index.
+
+This module tests phone and name normalization, the search fields stored
+on orders, and the indexed queries built for the admin search box.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from app.models.order import Order
+from app.models.order_search import OrderSearchIndex
+
+
+class TestOrderSearchFields:
+    """Test search fields stored on order documents."""
+
+    def test_phone_formats_share_national_digits(self):
+        """Test that all Romanian phone formats normalize the same way."""
+        assert OrderSearchIndex.national_digits('+40722111234') == '722111234'
+        assert OrderSearchIndex.national_digits('0722 111 234') == '722111234'
+        assert OrderSearchIndex.national_digits('722111234') == '722111234'
+
+    def test_phone_suffixes_cover_trailing_digits(self):
+        """Test that every trailing digit run is indexed."""
+        suffixes = OrderSearchIndex.phone_suffixes('+40722111234')
+
+        assert suffixes[0] == '234'
+        assert '1234' in suffixes
+        assert suffixes[-1] == '722111234'
+        assert '72' not in suffixes
+
+    def test_name_fields_are_folded(self):
+        """Test that names are lowercased and stripped of diacritics."""
+        fields = OrderSearchIndex.build_fields('+40722111234', 'Ștefan Ionescu-Țepeș')
+
+        assert fields['name_tokens'] == ['stefan', 'ionescu', 'tepes']
+        assert fields['name_folded'] == 'stefan ionescu tepes'
+        assert 'tep' in fields['name_ngrams']
+        assert len(fields['name_ngrams']) == len(set(fields['name_ngrams']))
+
+    def test_apply_adds_search_subdocument(self):
+        """Test that order documents get search fields before insert."""
+        order_doc = {'customer_phone': '+40722111234', 'customer_name': 'Ion Popescu'}
+
+        OrderSearchIndex.apply(order_doc)
+
+        assert order_doc['search']['name_tokens'] == ['ion', 'popescu']
+        assert '1234' in order_doc['search']['phone_suffixes']
+
+
+class TestOrderSearchQueries:
+    """Test indexed queries for the admin search box."""
+
+    def test_phone_query_uses_suffix_index(self):
+        """Test that full phone numbers hit the suffix index alone."""
+        assert OrderSearchIndex.phone_query('0722111234') == {'search.phone_suffixes': '722111234'}
+        assert OrderSearchIndex.phone_query('+40722111234') == {'search.phone_suffixes': '722111234'}
+
+    def test_partial_phone_query_matches_suffix_or_prefix(self):
+        """Test that fragments match the end or the start of the number."""
+        query = OrderSearchIndex.phone_query('1234')
+
+        assert query == {'$or': [
+            {'search.phone_suffixes': '1234'},
+            {'search.phone_national': {'$regex': '^1234'}}
+        ]}
+
+    def test_phone_prefix_query_drops_trunk_and_country_code(self):
+        """Test that "0722" and "+40722" both match numbers starting with 722."""
+        for fragment in ('0722', '+40722', '722'):
+            query = OrderSearchIndex.phone_query(fragment)
+            assert {'search.phone_national': {'$regex': '^722'}} in query['$or']
+
+    def test_phone_national_field_stored(self):
+        """Test that the national digits are stored for prefix matches."""
+        fields = OrderSearchIndex.build_fields('+40722111234', 'Ion Popescu')
+
+        assert fields['phone_national'] == '722111234'
+
+    def test_short_phone_query_falls_back_to_anchored_regex(self):
+        """Test that very short fragments anchor on the end of the number."""
+        query = OrderSearchIndex.phone_query('34')
+
+        assert query == {'customer_phone': {'$regex': '34$'}}
+
+    def test_phone_query_without_digits_adds_no_filter(self):
+        """Test that input with no digits does not turn into a match-all regex."""
+        assert OrderSearchIndex.phone_query('+') == {}
+        assert OrderSearchIndex.phone_query(' - ') == {}
+
+    def test_name_query_uses_ngram_index(self):
+        """Test that name fragments use n-grams with a folded residual filter."""
+        query = OrderSearchIndex.name_query('Popesc')
+
+        assert query['search.name_ngrams'] == {'$all': ['pop', 'ope', 'pes', 'esc']}
+        assert query['search.name_folded'] == {'$regex': 'popesc'}
+
+    def test_short_name_query_uses_token_prefixes(self):
+        """Test that fragments shorter than an n-gram use anchored token prefixes."""
+        query = OrderSearchIndex.name_query('Io')
+
+        assert query == {'$and': [{'search.name_tokens': {'$regex': '^io'}}]}
+
+    def test_empty_name_query(self):
+        """Test that punctuation-only input adds no filter."""
+        assert OrderSearchIndex.name_query('--') == {}
+
+
+class TestOrderSearchMaintenance:
+    """Test that stored search fields follow order edits and the backfill marker."""
+
+    @patch('app.models.order.get_database')
+    def test_name_update_refreshes_search_fields(self, mock_get_database):
+        """Test that renaming a customer rewrites search fields in the same $set."""
+        collection = MagicMock()
+        mock_get_database.return_value = {Order.COLLECTION_NAME: collection}
+        collection.update_one.return_value = MagicMock(modified_count=1)
+        order = Order({'_id': 'order-1', 'customer_phone': '+40722111234', 'customer_name': 'Ion Popescu'})
+
+        assert order.update({'customer_name': 'Maria Ionescu'}) is True
+
+        update = collection.update_one.call_args[0][1]
+        assert update['$set']['search']['name_tokens'] == ['maria', 'ionescu']
+        assert update['$set']['search']['phone_national'] == '722111234'
+
+    @patch('app.models.order_search.get_database')
+    def test_backfill_writes_marker(self, mock_get_database):
+        """Test that a completed backfill is remembered so startup skips it."""
+        orders, state = MagicMock(), MagicMock()
+        mock_get_database.return_value = {
+            OrderSearchIndex.COLLECTION_NAME: orders,
+            OrderSearchIndex.STATE_COLLECTION_NAME: state
+        }
+        orders.find.return_value.batch_size.return_value = [
+            {'_id': 1, 'customer_phone': '+40722111234', 'customer_name': 'Ion Popescu'}
+        ]
+
+        assert OrderSearchIndex.backfill() == 1
+
+        assert state.replace_one.call_args[0][0] == {'_id': OrderSearchIndex.BACKFILLED_MARKER_ID}
+        state.find_one.return_value = {'_id': OrderSearchIndex.BACKFILLED_MARKER_ID}
+        assert OrderSearchIndex.is_backfilled() is True
+
+    @patch('app.models.order_search.get_database')
+    def test_missing_marker_means_not_backfilled(self, mock_get_database):
+        """Test that startup backfills until the marker exists."""
+        state = MagicMock()
+        state.find_one.return_value = None
+        mock_get_database.return_value = {OrderSearchIndex.STATE_COLLECTION_NAME: state}
+
+        assert OrderSearchIndex.is_backfilled() is False
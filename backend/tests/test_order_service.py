@@ -42,9 +42,9 @@ class TestOrderServiceInitialization:
         """Test service constants are properly configured."""
         service = OrderService()
         
-        assert service.TAX_RATE == Decimal('0.08')
-        assert service.FREE_DELIVERY_THRESHOLD == Decimal('50.00')
-        assert service.DELIVERY_FEE == Decimal('5.00')
+        assert service.TAX_RATE_BASIS_POINTS == 800
+        assert service.FREE_DELIVERY_THRESHOLD_BANI == 5000
+        assert service.DELIVERY_FEE_BANI == 500
         assert service.ORDER_STATUS_PENDING == 'pending'
         assert service.ORDER_STATUS_CONFIRMED == 'confirmed'
         assert service.ORDER_STATUS_CANCELLED == 'cancelled'
@@ -366,6 +366,8 @@ class TestProductAndInventoryValidation:
         assert validated_item['quantity'] == 2
         assert validated_item['unit_price'] == 4.99
         assert validated_item['total_price'] == 9.98
+        assert validated_item['unit_price_bani'] == 499
+        assert validated_item['total_price_bani'] == 998
         
         mock_product_class.find_by_id.assert_called_once_with('product_123')
     
@@ -530,6 +532,7 @@ class TestPricingCalculations:
         
         # Check that rounding is consistent
         assert result['total'] == result['subtotal'] + result['tax'] + result['delivery_fee']
+        assert result['total_bani'] == result['subtotal_bani'] + result['tax_bani'] + result['delivery_fee_bani']
 
 
 class TestOrderNumberGeneration:
@@ -0,0 +1,281 @@
+"""
+Unit tests for order statistics rollups.
+
+This module tests the OrderStats model including incremental rollup
+updates on order creation and status changes, dashboard summaries
+read from rollups, the $group-by-status fallback, the rebuild marker, and
+the guarded order writes that feed the rollups.
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock
+
+from app.models.order import Order
+from app.models.order_stats import OrderStats
+from app.services.order_service import OrderService, OrderValidationError
+
+
+class TestOrderStatsRollupUpdates:
+    """Test incremental rollup maintenance."""
+
+    @patch('app.models.order_stats.get_database')
+    def test_record_order_created_increments_day_bucket(self, mock_get_database):
+        """Test that a new order increments its day/status rollup."""
+        mock_collection = MagicMock()
+        mock_get_database.return_value = {OrderStats.COLLECTION_NAME: mock_collection}
+
+        OrderStats.record_order_created(datetime(2025, 6, 23, 17, 45), 'pending', 125.5)
+
+        query, update = mock_collection.update_one.call_args[0]
+        assert query == {'day': datetime(2025, 6, 23), 'status': 'pending'}
+        assert update['$inc'] == {'count': 1, 'revenue': 125.5}
+        assert mock_collection.update_one.call_args[1]['upsert'] is True
+
+    @patch('app.models.order_stats.get_database')
+    def test_record_status_change_moves_order_between_buckets(self, mock_get_database):
+        """Test that a status change decrements the old and increments the new rollup."""
+        mock_collection = MagicMock()
+        mock_get_database.return_value = {OrderStats.COLLECTION_NAME: mock_collection}
+
+        OrderStats.record_status_change(datetime(2025, 6, 23, 9, 0), 'pending', 'confirmed', 40)
+
+        operations = mock_collection.bulk_write.call_args[0][0]
+        assert len(operations) == 2
+        assert operations[0]._filter == {'day': datetime(2025, 6, 23), 'status': 'pending'}
+        assert operations[0]._doc['$inc'] == {'count': -1, 'revenue': -40.0}
+        assert operations[1]._filter == {'day': datetime(2025, 6, 23), 'status': 'confirmed'}
+        assert operations[1]._doc['$inc'] == {'count': 1, 'revenue': 40.0}
+
+    @patch('app.models.order_stats.get_database')
+    def test_record_status_change_same_status_is_noop(self, mock_get_database):
+        """Test that unchanged status does not touch the rollups."""
+        OrderStats.record_status_change(datetime.utcnow(), 'pending', 'pending', 10)
+
+        mock_get_database.assert_not_called()
+
+    @patch('app.models.order_stats.get_database')
+    def test_rollup_failure_does_not_raise(self, mock_get_database):
+        """Test that statistics failures never break order processing."""
+        mock_get_database.side_effect = RuntimeError("Database not initialized")
+
+        OrderStats.record_order_created(datetime.utcnow(), 'pending', 10)
+
+
+class TestOrderStatsSummary:
+    """Test dashboard statistics summaries."""
+
+    @patch('app.models.order_stats.get_database')
+    def test_get_summary_merges_daily_rollups(self, mock_get_database):
+        """Test that rollups across days are merged per status."""
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = [
+            {'status': 'pending', 'count': 2, 'revenue': 50.0},
+            {'status': 'pending', 'count': 1, 'revenue': 25.0},
+            {'status': 'confirmed', 'count': 1, 'revenue': 25.0},
+            {'status': 'cancelled', 'count': 0, 'revenue': 0.0}
+        ]
+        mock_get_database.return_value = {OrderStats.COLLECTION_NAME: mock_collection}
+
+        summary = OrderStats.get_summary(
+            start_date=datetime(2025, 6, 1),
+            end_date=datetime(2025, 7, 1)
+        )
+
+        assert summary['total_orders'] == 4
+        assert summary['total_revenue'] == 100.0
+        assert summary['avg_order_value'] == 25.0
+        assert summary['status_breakdown'] == {'pending': 3, 'confirmed': 1}
+
+        query = mock_collection.find.call_args[0][0]
+        assert query['day'] == {'$gte': datetime(2025, 6, 1), '$lt': datetime(2025, 7, 1)}
+
+    @patch('app.models.order_stats.get_database')
+    def test_aggregate_from_orders_groups_by_status(self, mock_get_database):
+        """Test the $group fallback used for customer and total filters."""
+        mock_db = MagicMock()
+        mock_db.orders.aggregate.return_value = [
+            {'_id': 'pending', 'count': 3, 'revenue': 90.0},
+            {'_id': 'confirmed', 'count': 1, 'revenue': 10.0}
+        ]
+        mock_get_database.return_value = mock_db
+
+        summary = OrderStats.aggregate_from_orders({'customer_name': 'Ion'})
+
+        pipeline = mock_db.orders.aggregate.call_args[0][0]
+        assert pipeline[0] == {'$match': {'customer_name': 'Ion'}}
+        assert pipeline[1]['$group']['_id'] == '$status'
+        assert summary['total_orders'] == 4
+        assert summary['status_breakdown'] == {'pending': 3, 'confirmed': 1}
+        assert summary['avg_order_value'] == 25.0
+
+    def test_summary_with_no_orders(self):
+        """Test empty summary does not divide by zero."""
+        summary = OrderStats._format_summary(0, 0.0, {})
+
+        assert summary['avg_order_value'] == 0
+        assert summary['total_orders'] == 0
+
+
+class TestOrderStatsBatchChanges:
+    """Test coalesced rollup updates for batch status transitions."""
+
+    @patch('app.models.order_stats.get_database')
+    def test_record_status_changes_coalesces_same_day(self, mock_get_database):
+        """Test that many transitions on the same day produce one $inc per rollup."""
+        mock_collection = MagicMock()
+        mock_get_database.return_value = {OrderStats.COLLECTION_NAME: mock_collection}
+        day = datetime(2025, 6, 23, 10, 0)
+
+        OrderStats.record_status_changes([
+            (day, 'pending', 'confirmed', 10),
+            (day, 'pending', 'confirmed', 20),
+            (day, 'pending', 'confirmed', 30)
+        ])
+
+        operations = mock_collection.bulk_write.call_args[0][0]
+        assert len(operations) == 2
+        assert operations[0]._doc['$inc'] == {'count': -3, 'revenue': -60.0}
+        assert operations[1]._doc['$inc'] == {'count': 3, 'revenue': 60.0}
+
+
+class TestOrderStatsRebuild:
+    """Test that rollups are only trusted after a full rebuild."""
+
+    @patch('app.models.order_stats.get_database')
+    def test_rollups_without_marker_are_not_trusted(self, mock_get_database):
+        """Test that a rollup created by a post-deploy order does not count as built."""
+        mock_collection = MagicMock()
+        mock_collection.find_one.return_value = None
+        mock_get_database.return_value = {OrderStats.COLLECTION_NAME: mock_collection}
+
+        assert OrderStats.has_rollups() is False
+        assert mock_collection.find_one.call_args[0][0] == {'_id': OrderStats.REBUILT_MARKER_ID}
+
+    @patch('app.models.order_stats.get_database')
+    def test_full_rebuild_writes_marker(self, mock_get_database):
+        """Test that only a full rebuild marks the rollups as complete."""
+        mock_collection = MagicMock()
+        mock_db = MagicMock()
+        mock_db.__getitem__.return_value = mock_collection
+        mock_db.orders.aggregate.return_value = [
+            {'_id': {'day': datetime(2025, 6, 23), 'status': 'pending'}, 'count': 2, 'revenue': 50}
+        ]
+        mock_get_database.return_value = mock_db
+
+        OrderStats.rebuild(since=datetime(2025, 6, 1))
+        mock_collection.replace_one.assert_not_called()
+
+        assert OrderStats.rebuild() == 1
+        marker = mock_collection.replace_one.call_args[0][1]
+        assert marker['_id'] == OrderStats.REBUILT_MARKER_ID
+
+
+class TestOrderRollupWrites:
+    """Test that order writes feed the rollups the state they replaced."""
+
+    def setup_method(self):
+        """Patch the orders collection."""
+        self.collection = MagicMock()
+        self.patcher = patch('app.models.order.get_database',
+                             return_value={Order.COLLECTION_NAME: self.collection})
+        self.patcher.start()
+        self.order = Order({
+            '_id': 'order-1', 'order_number': 'ORD-1', 'status': 'pending',
+            'total_bani': 4000, 'created_at': datetime(2025, 6, 23, 9, 0)
+        })
+
+    def teardown_method(self):
+        """Stop the database patcher."""
+        self.patcher.stop()
+
+    @patch('app.models.order_stats.OrderStats.record_status_change')
+    def test_status_update_is_guarded_on_loaded_status(self, mock_record):
+        """Test that the transition matches the loaded status and uses the returned document."""
+        self.collection.find_one_and_update.return_value = {
+            'status': 'pending', 'created_at': datetime(2025, 6, 23, 9, 0), 'total_bani': 4000
+        }
+
+        assert self.order.update_status('confirmed') is True
+
+        query = self.collection.find_one_and_update.call_args[0][0]
+        assert query == {'_id': 'order-1', 'status': 'pending'}
+        mock_record.assert_called_once_with(datetime(2025, 6, 23, 9, 0), 'pending', 'confirmed', 40.0)
+
+    @patch('app.models.order_stats.OrderStats.record_status_change')
+    def test_concurrent_status_update_not_counted(self, mock_record):
+        """Test that losing a concurrent transition leaves the rollups alone."""
+        self.collection.find_one_and_update.return_value = None
+
+        assert self.order.update_status('cancelled') is False
+        assert self.order.status == 'pending'
+        mock_record.assert_not_called()
+
+    @patch('app.models.order_stats.OrderStats.record_revenue_change')
+    def test_item_update_moves_rollup_revenue(self, mock_record):
+        """Test that changing items records the revenue delta against the previous total."""
+        self.collection.find_one_and_update.return_value = {
+            'status': 'confirmed', 'created_at': datetime(2025, 6, 23, 9, 0), 'total_bani': 4000
+        }
+        items = [{'product_id': 'p', 'quantity': 1}]
+        with patch.object(Order, '_validate_and_process_items', return_value=items), \
+                patch.object(Order, '_calculate_order_totals', return_value=(5500, 5500)):
+            assert self.order.update({'items': items}) is True
+
+        mock_record.assert_called_once_with(datetime(2025, 6, 23, 9, 0), 'confirmed', 15.0)
+
+    @patch('app.models.order_stats.get_database')
+    def test_record_revenue_change_increments_revenue_only(self, mock_get_database):
+        """Test that a revenue change leaves the order count untouched."""
+        mock_collection = MagicMock()
+        mock_get_database.return_value = {OrderStats.COLLECTION_NAME: mock_collection}
+
+        OrderStats.record_revenue_change(datetime(2025, 6, 23, 9, 0), 'confirmed', 15.0)
+
+        query, update = mock_collection.update_one.call_args[0]
+        assert query == {'day': datetime(2025, 6, 23), 'status': 'confirmed'}
+        assert update['$inc'] == {'revenue': 15.0}
+
+
+class TestOrderCancellationRollups:
+    """Test that cancellations are guarded like status updates."""
+
+    def setup_method(self):
+        """Build a service on a mocked database."""
+        self.db = MagicMock()
+        with patch('app.services.order_service.get_database', return_value=self.db):
+            self.service = OrderService()
+        self.order = Order({
+            '_id': 'order-1', 'order_number': 'ORD-1', 'status': 'pending',
+            'total_bani': 4000, 'created_at': datetime(2025, 6, 23, 9, 0),
+            'items': [{'product_id': '507f1f77bcf86cd799439030', 'quantity': 2}]
+        })
+
+    @patch('app.models.order_stats.OrderStats.record_status_change')
+    def test_cancel_is_guarded_on_loaded_status(self, mock_record):
+        """Test that a cancel restores stock and moves rollups from the returned document."""
+        self.db.orders.find_one_and_update.return_value = {
+            'status': 'confirmed', 'created_at': datetime(2025, 6, 23, 9, 0), 'total_bani': 4000,
+            'items': [{'product_id': '507f1f77bcf86cd799439030', 'quantity': 2}]
+        }
+
+        with patch.object(Order, 'find_by_order_number', return_value=self.order):
+            result = self.service.cancel_order('ORD-1')
+
+        assert result['success'] is True
+        query = self.db.orders.find_one_and_update.call_args[0][0]
+        assert query == {'order_number': 'ORD-1', 'status': 'pending'}
+        self.db.products.update_one.assert_called_once()
+        mock_record.assert_called_once_with(datetime(2025, 6, 23, 9, 0), 'confirmed', 'cancelled', 40.0)
+
+    @patch('app.models.order_stats.OrderStats.record_status_change')
+    def test_concurrent_cancel_restores_nothing(self, mock_record):
+        """Test that losing a concurrent cancel leaves stock and rollups alone."""
+        self.db.orders.find_one_and_update.return_value = None
+
+        with patch.object(Order, 'find_by_order_number', return_value=self.order):
+            with pytest.raises(OrderValidationError):
+                self.service.cancel_order('ORD-1')
+
+        self.db.products.update_one.assert_not_called()
+        mock_record.assert_not_called()
@@ -0,0 +1,165 @@
+"""
+Unit tests for the bounded password hashing service.
+
+This module tests admission control (load shedding when the queue is
+full, a worker is too slow or the pool broke), non-forking worker
+startup, bcrypt cost detection and rehash-on-login when
+BCRYPT_LOG_ROUNDS changes.
+"""
+
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch, Mock
+
+from app.models.user import User
+from app.services.auth_service import AuthService
+from app.services.password_hasher import PasswordHasher, PasswordHasherBusy, hash_rounds
+from app.utils.error_handlers import AuthenticationError
+
+
+class TestPasswordHasher:
+    """Test inline hashing behind the admission limit."""
+
+    def test_hash_and_verify_inline(self):
+        """Test that inline mode hashes with the configured rounds."""
+        hasher = PasswordHasher(rounds=4, workers=0)
+
+        hashed = hasher.hash('parola-sigura')
+
+        assert hash_rounds(hashed) == 4
+        assert hasher.verify('parola-sigura', hashed) is True
+        assert hasher.verify('parola-gresita', hashed) is False
+
+    def test_full_queue_sheds_load(self):
+        """Test that work is rejected immediately once every slot is taken."""
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow_hash(password, rounds):
+            started.set()
+            release.wait(5)
+            return b'$2b$04$hash'
+
+        hasher = PasswordHasher(rounds=4, workers=0, max_pending=1)
+        with patch('app.services.password_hasher._hash_password', side_effect=slow_hash):
+            worker = threading.Thread(target=hasher.hash, args=('parola-sigura',))
+            worker.start()
+            started.wait(5)
+
+            with pytest.raises(PasswordHasherBusy):
+                hasher.hash('parola-sigura')
+
+            release.set()
+            worker.join(5)
+
+        assert hasher.get_stats()['rejected'] == 1
+        assert hasher.get_stats()['completed'] == 1
+
+    def test_timeout_is_busy_and_keeps_slot_until_done(self):
+        """Test that a slow worker raises PasswordHasherBusy and holds its slot until it finishes."""
+        release = threading.Event()
+
+        def slow_check(password, hashed):
+            release.wait(5)
+            return True
+
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=1, timeout=0.05)
+        hasher._pool = ThreadPoolExecutor(max_workers=1)
+        with patch('app.services.password_hasher._check_password', side_effect=slow_check):
+            with pytest.raises(PasswordHasherBusy):
+                hasher.verify('parola-sigura', '$2b$04$hash')
+
+            # The worker is still hashing, so its slot is still taken
+            with pytest.raises(PasswordHasherBusy):
+                hasher.verify('parola-sigura', '$2b$04$hash')
+
+            release.set()
+            hasher._pool.shutdown(wait=True)
+            hasher._pool = ThreadPoolExecutor(max_workers=1)
+            assert hasher.verify('parola-sigura', '$2b$04$hash') is True
+
+        hasher.shutdown()
+        stats = hasher.get_stats()
+        assert stats['timeouts'] == 1
+        assert stats['rejected'] == 1
+        assert stats['completed'] == 1
+
+    def test_worker_pool_does_not_fork(self):
+        """Test that hashing workers start from a clean process, not a fork of the app."""
+        hasher = PasswordHasher(rounds=4, workers=1)
+        try:
+            hashed = hasher.hash('parola-sigura')
+
+            assert hasher._pool._mp_context.get_start_method() in ('forkserver', 'spawn')
+            assert hasher.verify('parola-sigura', hashed) is True
+        finally:
+            hasher.shutdown()
+
+    def test_broken_pool_is_busy_not_inline(self):
+        """Test that a dead worker restarts the pool and sheds the call instead of hashing inline."""
+        hasher = PasswordHasher(rounds=4, workers=1)
+        broken_pool = Mock()
+        broken_pool.submit.side_effect = BrokenProcessPool("worker died")
+        hasher._pool = broken_pool
+
+        with patch('app.services.password_hasher._check_password') as mock_check:
+            with pytest.raises(PasswordHasherBusy):
+                hasher.verify('parola-sigura', '$2b$04$hash')
+
+        mock_check.assert_not_called()
+        assert hasher._pool is None
+        assert hasher.get_stats()['pool_restarts'] == 1
+        assert hasher._slots.acquire(blocking=False)
+
+    def test_needs_rehash_on_cost_change(self):
+        """Test that hashes with a different cost factor need rehashing."""
+        hasher = PasswordHasher(rounds=12, workers=0)
+
+        assert hasher.needs_rehash('$2b$10$abcdefghijklmnopqrstuv') is True
+        assert hasher.needs_rehash('$2b$12$abcdefghijklmnopqrstuv') is False
+        assert hasher.needs_rehash(None) is False
+
+
+class TestLoginHashing:
+    """Test AuthService integration with the password hasher."""
+
+    def setup_method(self):
+        """Setup admin user mock."""
+        self.auth_service = AuthService()
+        self.auth_service.secret_key = 'test-secret-key'
+        self.admin = Mock()
+        self.admin._id = '507f1f77bcf86cd799439011'
+        self.admin.phone_number = '+40722123456'
+        self.admin.name = 'Test Admin'
+        self.admin.role = User.ROLE_ADMIN
+        self.admin.is_verified = True
+        self.admin.last_login = None
+        self.admin.password_hash = '$2b$04$abcdefghijklmnopqrstuv'
+
+    @patch('app.services.auth_service.User.find_by_phone')
+    def test_busy_hasher_rejects_login(self, mock_find_by_phone):
+        """Test that a full hashing queue fails login with AUTH_019."""
+        self.admin.verify_password.side_effect = PasswordHasherBusy()
+        mock_find_by_phone.return_value = self.admin
+
+        with pytest.raises(AuthenticationError) as exc_info:
+            self.auth_service.authenticate_admin('+40722123456', 'parola-sigura')
+
+        assert exc_info.value.error_code == "AUTH_019"
+        assert self.auth_service.login_attempts == {}
+
+    @patch('app.services.auth_service.get_password_hasher')
+    @patch('app.services.auth_service.User.find_by_phone')
+    def test_login_rehashes_outdated_hash(self, mock_find_by_phone, mock_get_hasher):
+        """Test that a successful login upgrades a hash made with old rounds."""
+        hasher = PasswordHasher(rounds=5, workers=0)
+        mock_get_hasher.return_value = hasher
+        self.admin.verify_password.return_value = True
+        mock_find_by_phone.return_value = self.admin
+
+        self.auth_service.authenticate_admin('+40722123456', 'parola-sigura')
+
+        rehashed = self.admin.update.call_args_list[0][0][0]['password_hash']
+        assert hash_rounds(rehashed) == 5
@@ -0,0 +1,93 @@
+"""
+Unit tests for the shared rate limit engine.
+
+This module tests GCRA limiting (burst, refill, peek without counting),
+idle-key eviction in the lock-striped memory storage, and the call sites
+that delegate to the engine.
+"""
+
+import time
+import pytest
+from unittest.mock import patch
+
+from app.utils.rate_limit_engine import RateLimitEngine, MemoryStorage
+from app.utils.security import RateLimiter as SecurityRateLimiter
+
+
+class TestRateLimitEngine:
+    """Test GCRA decisions."""
+
+    def setup_method(self):
+        """Create an engine with fresh memory storage."""
+        self.storage = MemoryStorage()
+        self.engine = RateLimitEngine(self.storage)
+
+    def test_burst_then_limit(self):
+        """Test that a limit of N allows a burst of N and then rejects."""
+        decisions = [self.engine.acquire('k', 3, 60) for _ in range(4)]
+
+        assert [d.allowed for d in decisions] == [True, True, True, False]
+        assert [d.remaining for d in decisions[:3]] == [2, 1, 0]
+        assert decisions[3].retry_after == pytest.approx(20, abs=0.5)
+
+    def test_refills_at_limit_per_window(self):
+        """Test that one request becomes available every window/limit seconds."""
+        now = time.time()
+        with patch('app.utils.rate_limit_engine.time.time', return_value=now):
+            for _ in range(3):
+                self.engine.acquire('k', 3, 60)
+        with patch('app.utils.rate_limit_engine.time.time', return_value=now + 20.5):
+            assert self.engine.acquire('k', 3, 60).allowed is True
+            assert self.engine.acquire('k', 3, 60).allowed is False
+
+    def test_peek_does_not_count(self):
+        """Test that peeking never consumes capacity."""
+        for _ in range(5):
+            assert self.engine.peek('k', 1, 60).allowed is True
+
+        assert self.engine.acquire('k', 1, 60).allowed is True
+        assert self.engine.peek('k', 1, 60).allowed is False
+
+    def test_state_is_one_entry_per_key(self):
+        """Test that storage holds a single timestamp per key regardless of traffic."""
+        for _ in range(100):
+            self.engine.acquire('k', 1000, 60)
+
+        assert len(self.storage) == 1
+
+    def test_idle_keys_evicted(self):
+        """Test that keys whose bucket has refilled are swept."""
+        storage = MemoryStorage(sweep_interval=0)
+        engine = RateLimitEngine(storage)
+        now = time.time()
+        with patch('app.utils.rate_limit_engine.time.time', return_value=now):
+            engine.acquire('idle', 1, 1)
+        with patch('app.utils.rate_limit_engine.time.time', return_value=now + 5):
+            engine.acquire('active', 1, 60)
+
+        assert len(storage) == 1
+
+    def test_non_expiring_limit(self):
+        """Test that a limit without a window counts usage as a plain quota."""
+        decision = self.engine.acquire('addresses', 50, None, cost=49)
+
+        assert decision.used == 49
+        assert self.engine.peek('addresses', 50, None).allowed is True
+        assert self.engine.peek('addresses', 50, None, cost=2).allowed is False
+
+
+class TestSecurityRateLimiter:
+    """Test the security middleware limiter on top of the engine."""
+
+    def test_is_allowed_reports_retry_after(self):
+        """Test that the legacy result shape is kept."""
+        limiter = SecurityRateLimiter(RateLimitEngine(MemoryStorage()))
+
+        first = limiter.is_allowed('1.2.3.4', limit=1, window=60)
+        second = limiter.is_allowed('1.2.3.4', limit=1, window=60)
+
+        assert first['allowed'] is True
+        assert first['remaining'] == 0
+        assert second['allowed'] is False
+        assert second['requests_made'] == 1
+        assert 1 <= second['retry_after'] <= 60
@@ -2,8 +2,8 @@
 Unit tests for rate limiting middleware.
 
 This module tests the rate limiting functionality including different
-rate limits for different endpoints, proper error responses, and
-MongoDB integration with TTL cleanup.
+rate limits for different endpoints, proper error responses, the
+sliding-window counter math, and MongoDB integration with TTL cleanup.
 """
 
 import pytest
@@ -38,16 +38,12 @@ class TestRateLimiter:
             assert limiter.db == mock_db
             assert limiter.rate_limit_collection == mock_collection
             
-            # Verify indexes were created
+            # Verify TTL index was created
             mock_collection.create_index.assert_any_call(
                 "expires_at", 
                 expireAfterSeconds=0,
                 background=True
             )
-            mock_collection.create_index.assert_any_call(
-                [("key", 1), ("endpoint", 1)],
-                background=True
-            )
     
     def test_initialization_database_error(self):
         """Test RateLimiter initialization with database error."""
@@ -150,10 +146,20 @@ class TestRateLimiter:
             assert config['limit'] == 15
             assert config['window_seconds'] == 7200
     
+    def window_doc(self, count, prev_count=0, window_seconds=3600, now=None, counted=True):
+        """Build a counter document for the window containing now."""
+        now = now or time.time()
+        return {
+            'window': int(now // window_seconds) * window_seconds,
+            'count': count,
+            'prev_count': prev_count,
+            'counted': counted
+        }
+    
     def test_check_rate_limit_allowed(self):
         """Test rate limit check when request is allowed."""
-        # Mock database collection to return count below limit
-        self.rate_limiter.rate_limit_collection.count_documents.return_value = 5
+        # Counter after this request was counted
+        self.rate_limiter.rate_limit_collection.find_one_and_update.return_value = self.window_doc(6)
         
         result = self.rate_limiter.check_rate_limit(
             'phone:+1234567890', 
@@ -165,18 +171,34 @@ class TestRateLimiter:
         assert result['allowed'] is True
         assert result['current_count'] == 5
         assert result['limit'] == 10
-        assert result['remaining'] == 5
+        assert result['remaining'] == 4
+        self.rate_limiter.rate_limit_collection.update_one.assert_not_called()
+    
+    def test_check_rate_limit_single_atomic_upsert(self):
+        """Test that a check is one findOneAndUpdate upsert on one counter document."""
+        self.rate_limiter.rate_limit_collection.find_one_and_update.return_value = self.window_doc(1)
+        
+        self.rate_limiter.check_rate_limit('phone:+1234567890', 'sms_verify', 10, 3600)
+        
+        collection = self.rate_limiter.rate_limit_collection
+        collection.count_documents.assert_not_called()
+        collection.find_one.assert_not_called()
+        collection.insert_one.assert_not_called()
+        
+        query, pipeline = collection.find_one_and_update.call_args[0]
+        assert query == {'_id': 'sms_verify|phone:+1234567890'}
+        assert 'expires_at' in pipeline[0]['$set']
+        assert collection.find_one_and_update.call_args[1]['upsert'] is True
+        
+        # The limit is checked inside the pipeline and only a passing request is counted
+        assert pipeline[1]['$set']['counted']['$lte'][1] == 10
+        assert pipeline[2]['$set']['count']['$cond'][0] == '$counted'
     
     def test_check_rate_limit_exceeded(self):
         """Test rate limit check when limit is exceeded."""
-        # Mock database collection to return count at limit
-        self.rate_limiter.rate_limit_collection.count_documents.return_value = 10
-        
-        # Mock oldest request for reset time calculation
-        oldest_request = {
-            'created_at': datetime.utcnow() - timedelta(minutes=30)
-        }
-        self.rate_limiter.rate_limit_collection.find_one.return_value = oldest_request
+        # Counter left unchanged by the rejected request
+        self.rate_limiter.rate_limit_collection.find_one_and_update.return_value = \
+            self.window_doc(10, counted=False)
         
         result = self.rate_limiter.check_rate_limit(
             'phone:+1234567890', 
@@ -189,8 +211,39 @@ class TestRateLimiter:
         assert result['current_count'] == 10
         assert result['limit'] == 10
         assert 'reset_at' in result
-        assert 'reset_in_seconds' in result
+        assert result['reset_in_seconds'] > 0
         assert result['reason'] == 'rate_limit_exceeded'
+        
+        # Rejected request was never counted, so nothing is undone
+        self.rate_limiter.rate_limit_collection.update_one.assert_not_called()
+    
+    def test_previous_window_is_weighted(self):
+        """Test that the previous window counts in proportion to its overlap."""
+        now = time.time()
+        window_start = int(now // 3600) * 3600
+        elapsed = now - window_start
+        
+        # Previous window was full, current window empty before this request
+        previous_weight = 10 * (1 - elapsed / 3600)
+        expected_allowed = previous_weight + 1 <= 10
+        self.rate_limiter.rate_limit_collection.find_one_and_update.return_value = self.window_doc(
+            1 if expected_allowed else 0, prev_count=10, now=now, counted=expected_allowed
+        )
+        
+        with patch('app.utils.rate_limiter.time.time', return_value=now):
+            result = self.rate_limiter.check_rate_limit('phone:+1234567890', 'sms_verify', 10, 3600)
+        
+        assert result['allowed'] is expected_allowed
+    
+    def test_retry_after_decays_previous_window(self):
+        """Test the wait until one more request fits the sliding window."""
+        # Previous window full, current window empty, 6 minutes into the window:
+        # the next request fits once the previous weight drops to 9
+        assert RateLimiter._retry_after(10, 0, 360, 10, 3600) == 0.0
+        assert RateLimiter._retry_after(10, 0, 0, 10, 3600) == pytest.approx(360)
+        
+        # Current window already at the limit: wait into the next window
+        assert RateLimiter._retry_after(0, 10, 600, 10, 3600) == pytest.approx(3000 + 360)
     
     def test_check_rate_limit_database_unavailable(self):
         """Test rate limit check when database is unavailable."""
@@ -206,10 +259,26 @@ class TestRateLimiter:
         assert result['allowed'] is True
         assert result['reason'] == 'rate_limiter_unavailable'
     
+    def test_check_rate_limit_database_unavailable_still_enforced(self):
+        """Test that without MongoDB the limit falls back to the in-process engine."""
+        self.rate_limiter.rate_limit_collection = None
+        
+        with patch('app.utils.rate_limiter.get_rate_limit_engine') as mock_get_engine:
+            from app.utils.rate_limit_engine import RateLimitEngine
+            mock_get_engine.return_value = RateLimitEngine()
+            results = [
+                self.rate_limiter.check_rate_limit('phone:+1234567890', 'sms_verify', 2, 3600)
+                for _ in range(3)
+            ]
+        
+        assert [r['allowed'] for r in results] == [True, True, False]
+        assert results[2]['reason'] == 'rate_limit_exceeded'
+        assert results[2]['reset_in_seconds'] > 0
+    
     def test_check_rate_limit_database_error(self):
         """Test rate limit check with database error."""
         # Mock database to raise exception
-        self.rate_limiter.rate_limit_collection.count_documents.side_effect = Exception("DB Error")
+        self.rate_limiter.rate_limit_collection.find_one_and_update.side_effect = Exception("DB Error")
         
         result = self.rate_limiter.check_rate_limit(
             'phone:+1234567890', 
@@ -229,15 +298,15 @@ class TestRateLimiter:
             3600
         )
         
-        # Verify insert_one was called with correct data
-        self.rate_limiter.rate_limit_collection.insert_one.assert_called_once()
+        # One upsert on the counter document, no per-request documents
+        self.rate_limiter.rate_limit_collection.insert_one.assert_not_called()
+        self.rate_limiter.rate_limit_collection.update_one.assert_called_once()
         
-        # Check the inserted record structure
-        call_args = self.rate_limiter.rate_limit_collection.insert_one.call_args[0][0]
-        assert call_args['key'] == 'phone:+1234567890'
-        assert call_args['endpoint'] == 'sms_verify'
-        assert 'created_at' in call_args
-        assert 'expires_at' in call_args
+        query, pipeline = self.rate_limiter.rate_limit_collection.update_one.call_args[0]
+        assert query == {'_id': 'sms_verify|phone:+1234567890'}
+        assert pipeline[0]['$set']['key'] == {'$literal': 'phone:+1234567890'}
+        assert pipeline[0]['$set']['endpoint'] == {'$literal': 'sms_verify'}
+        assert 'expires_at' in pipeline[0]['$set']
     
     def test_record_request_database_unavailable(self):
         """Test request recording when database is unavailable."""
@@ -252,7 +321,7 @@ class TestRateLimiter:
     
     def test_record_request_database_error(self):
         """Test request recording with database error."""
-        self.rate_limiter.rate_limit_collection.insert_one.side_effect = Exception("DB Error")
+        self.rate_limiter.rate_limit_collection.update_one.side_effect = Exception("DB Error")
         
         # Should not raise exception
         self.rate_limiter.record_request(
@@ -263,16 +332,7 @@ class TestRateLimiter:
     
     def test_get_rate_limit_info_with_requests(self):
         """Test getting rate limit info when requests exist."""
-        # Mock database to return request history
-        mock_requests = [
-            {'created_at': datetime.utcnow() - timedelta(minutes=45)},
-            {'created_at': datetime.utcnow() - timedelta(minutes=30)},
-            {'created_at': datetime.utcnow() - timedelta(minutes=15)}
-        ]
-        
-        mock_cursor = MagicMock()
-        mock_cursor.sort.return_value = mock_requests
-        self.rate_limiter.rate_limit_collection.find.return_value = mock_cursor
+        self.rate_limiter.rate_limit_collection.find_one.return_value = self.window_doc(3)
         
         result = self.rate_limiter.get_rate_limit_info(
             'phone:+1234567890',
@@ -291,10 +351,7 @@ class TestRateLimiter:
     
     def test_get_rate_limit_info_no_requests(self):
         """Test getting rate limit info when no requests exist."""
-        # Mock database to return empty list
-        mock_cursor = MagicMock()
-        mock_cursor.sort.return_value = []
-        self.rate_limiter.rate_limit_collection.find.return_value = mock_cursor
+        self.rate_limiter.rate_limit_collection.find_one.return_value = None
         
         result = self.rate_limiter.get_rate_limit_info(
             'phone:+1234567890',
@@ -365,9 +422,9 @@ class TestRateLimitDecorator:
                 assert response.status_code == 200
                 assert response.get_json()['success'] is True
                 
-                # Verify rate limit was checked and recorded
+                # Verify rate limit was checked; the check itself counts the request
                 mock_limiter.check_rate_limit.assert_called_once()
-                mock_limiter.record_request.assert_called_once()
+                mock_limiter.record_request.assert_not_called()
     
     def test_rate_limit_decorator_exceeded_request(self):
         """Test rate limit decorator blocking exceeded requests."""
@@ -385,13 +442,10 @@ class TestRateLimitDecorator:
                 'allowed': False,
                 'current_count': 2,
                 'limit': 2,
-                'reason': 'rate_limit_exceeded'
-            }
-            mock_limiter.get_rate_limit_info.return_value = {
-                'attempts_count': 2,
                 'reset_in_minutes': 5,
                 'reset_in_seconds': 300,
-                'reset_at': '2025-01-13T15:00:00Z'
+                'reset_at': '2025-01-13T15:00:00Z',
+                'reason': 'rate_limit_exceeded'
             }
             
             with self.app.test_request_context('/test', method='POST', json={}):
@@ -408,7 +462,10 @@ class TestRateLimitDecorator:
                 # Verify rate limit headers
                 assert response.headers['X-RateLimit-Limit'] == '2'
                 assert response.headers['X-RateLimit-Remaining'] == '0'
-                assert 'Retry-After' in response.headers
+                assert response.headers['Retry-After'] == '300'
+                
+                # Denial details come from the check itself
+                mock_limiter.get_rate_limit_info.assert_not_called()
     
     def test_rate_limit_decorator_phone_masking(self):
         """Test phone number masking in rate limit logs."""
@@ -425,12 +482,10 @@ class TestRateLimitDecorator:
                 mock_limiter._get_rate_limit_key.return_value = 'phone:+1234567890'
                 mock_limiter.check_rate_limit.return_value = {
                     'allowed': False,
-                    'reason': 'rate_limit_exceeded'
-                }
-                mock_limiter.get_rate_limit_info.return_value = {
                     'reset_in_minutes': 5,
                     'reset_in_seconds': 300,
-                    'reset_at': '2025-01-13T15:00:00Z'
+                    'reset_at': '2025-01-13T15:00:00Z',
+                    'reason': 'rate_limit_exceeded'
                 }
                 
                 with self.app.test_request_context('/test', method='POST', json={'phone_number': '+1234567890'}):
@@ -0,0 +1,517 @@
+"""
+Unit tests for the SMS manager.
+
+This module tests provider selection from the background health table:
+sends do no provider health checks or provider-metadata reads, unhealthy
+or failing providers fail over to a backup, provider documents and
+instances come from the in-memory registry, the circuit breaker trips on
+error rates and slow calls, and slow OTP sends are hedged. It also tests
+the telemetry sink that writes each log once and coalesces provider
+counters into $inc updates, bulk sends against MockProvider, and the async
+send path used by the SMS dispatcher.
+"""
+
+import time
+import asyncio
+from datetime import datetime
+import pytest
+from unittest.mock import patch, Mock, AsyncMock
+
+from app.models.sms_log import SmsLog
+from app.models.sms_provider import SmsProvider
+from app.services.sms.sms_manager import SmsManager
+from app.services.sms.telemetry import SmsTelemetry
+from app.services.sms.circuit_breaker import (
+    CircuitBreaker, CIRCUIT_CLOSED, CIRCUIT_OPEN, CIRCUIT_HALF_OPEN
+)
+from app.services.sms.provider_interface import SmsMessage, SmsResponse, SmsStatus
+from app.services.sms.providers.mock_provider import MockProvider
+from app.utils.rate_limit_engine import RateLimitEngine, MemoryStorage
+
+
+def make_provider(name, healthy=True):
+    """Create a provider mock with a health check and a successful send."""
+    provider = Mock()
+    provider.get_provider_name.return_value = name
+    provider.health_check.return_value = (healthy, None if healthy else 'No credit balance')
+    provider.send_sms.return_value = SmsResponse(success=True, message_id=f'{name}-1', cost=3.5)
+    return provider
+
+
+class TestProviderSelection:
+    """Test SmsManager provider selection through the health monitor."""
+
+    def setup_method(self):
+        """Setup a manager with a primary and a backup provider."""
+        self.models = [
+            SmsProvider({'_id': 'p1', 'name': 'SMSO', 'slug': 'smso', 'is_active': True,
+                         'is_default': True, 'priority': 10}),
+            SmsProvider({'_id': 'p2', 'name': 'Backup', 'slug': 'backup', 'is_active': True,
+                         'priority': 20})
+        ]
+        self.primary = make_provider('smso')
+        self.backup = make_provider('backup')
+        instances = {'smso': self.primary, 'backup': self.backup}
+
+        patchers = [
+            patch.object(SmsManager, '_ensure_indexes'),
+            patch.object(SmsManager, '_check_development_mode', return_value=False),
+            patch('app.services.sms.telemetry.SmsLog'),
+            patch('app.services.sms.telemetry.SmsProvider'),
+            patch('app.services.sms.health_monitor.SmsProvider'),
+            patch('app.services.sms.telemetry.SmsStats'),
+            patch('app.services.sms.provider_registry.SmsProvider'),
+            patch('app.services.sms.sms_manager.SmsProvider'),
+            patch('app.services.sms.webhook_queue.SmsLog')
+        ]
+        mocks = [patcher.start() for patcher in patchers]
+        self._patchers = patchers
+        self.log_model = mocks[2]
+        self.stats_model = mocks[3]
+        self.stats_rollups = mocks[5]
+        self.provider_model = mocks[6]
+        self.provider_model.get_all_providers.return_value = self.models
+        self.manager_provider_model = mocks[7]
+        self.report_log_model = mocks[8]
+
+        self.manager = SmsManager()
+        self.manager.health_monitor.interval = 0
+        self.manager.telemetry.flush_interval = 0
+        self.manager.webhook_queue.flush_interval = 0
+        self.manager._create_provider_instance = Mock(side_effect=lambda model: instances[model.slug])
+        self.message = SmsMessage(to='+40722123456', body='Codul dvs. este 123456', message_type='otp')
+
+    def teardown_method(self):
+        """Stop patchers."""
+        for patcher in self._patchers:
+            patcher.stop()
+
+    def test_sends_do_not_health_check(self):
+        """Test that repeated sends reuse one health check per provider."""
+        with patch.object(SmsProvider, 'get_active_provider') as mock_get_active:
+            for _ in range(3):
+                assert self.manager.send_sms(self.message).success is True
+
+        mock_get_active.assert_not_called()
+        assert self.primary.send_sms.call_count == 3
+        assert self.primary.health_check.call_count == 1
+        assert self.provider_model.get_all_providers.call_count == 1
+
+    def test_send_logs_once_with_final_status(self):
+        """Test that a send writes one log document and no provider lookups."""
+        response = self.manager.send_sms(self.message)
+
+        documents = self.log_model.insert_many.call_args[0][0]
+        assert self.log_model.insert_many.call_count == 1
+        assert len(documents) == 1
+        assert documents[0]['status'] == 'sent'
+        assert documents[0]['provider'] == 'smso'
+        assert response.provider_response['log_id'] == str(documents[0]['_id'])
+        self.stats_model.find_by_slug.assert_not_called()
+        self.stats_model.increment_usage_stats.assert_called_once()
+
+    def test_unhealthy_primary_fails_over(self):
+        """Test that an unhealthy default provider is skipped for the backup."""
+        self.primary.health_check.return_value = (False, 'No credit balance')
+
+        response = self.manager.send_sms(self.message)
+
+        assert response.message_id == 'backup-1'
+        self.primary.send_sms.assert_not_called()
+
+    def test_provider_failure_fails_over(self):
+        """Test that a failed send is retried once on the backup provider."""
+        self.primary.send_sms.return_value = SmsResponse(success=False, error_code='SMS_API_ERROR')
+
+        response = self.manager.send_sms(self.message)
+
+        assert response.success is True
+        assert response.message_id == 'backup-1'
+
+    def test_async_send_fails_over(self):
+        """Test that the async send path fails over and logs like send_sms."""
+        self.primary.send_sms_async = AsyncMock(
+            return_value=SmsResponse(success=False, error_code='SMS_API_ERROR')
+        )
+        self.backup.send_sms_async = AsyncMock(
+            return_value=SmsResponse(success=True, message_id='backup-1', cost=3.5)
+        )
+
+        response = asyncio.run(self.manager.send_sms_async(self.message))
+
+        assert response.success is True
+        assert response.message_id == 'backup-1'
+        self.primary.send_sms.assert_not_called()
+        self.log_model.insert_many.assert_called_once()
+
+    def test_async_slow_otp_is_hedged(self):
+        """Test that a slow async OTP send is hedged and the first success wins."""
+        breaker = self.manager.health_monitor.refresh()['smso'].breaker
+        for _ in range(breaker.min_calls):
+            breaker.record(True, 0.01)
+        self.manager.hedge_min_delay = 0.05
+
+        async def slow_send(message):
+            await asyncio.sleep(0.5)
+            return SmsResponse(success=True, message_id='smso-1')
+
+        self.primary.send_sms_async = slow_send
+        self.backup.send_sms_async = AsyncMock(
+            return_value=SmsResponse(success=True, message_id='backup-1')
+        )
+
+        started = time.monotonic()
+        response = asyncio.run(self.manager.send_sms_async(self.message))
+
+        assert response.message_id == 'backup-1'
+        assert time.monotonic() - started < 0.4
+
+    def test_send_failures_open_circuit(self):
+        """Test that consecutive failures divert traffic until the circuit half-opens."""
+        self.primary.send_sms.side_effect = Exception('Connection error')
+        for _ in range(3):
+            self.manager.send_sms(self.message)
+
+        entry = self.manager.health_monitor.get('smso')
+        assert entry.circuit_state == CIRCUIT_OPEN
+        self.manager.send_sms(self.message)
+        assert self.primary.send_sms.call_count == 3
+
+        entry.breaker.opened_at -= entry.breaker.open_seconds
+        assert self.manager.get_active_provider() is self.primary
+        # Asking which provider is active must not take the probe slot
+        assert self.manager.get_active_provider() is self.primary
+
+        self.primary.send_sms.side_effect = None
+        self.primary.send_sms.return_value = SmsResponse(success=True, message_id='probe')
+        self.manager.send_sms(self.message)
+        assert self.primary.send_sms.call_count == 4
+        assert entry.circuit_state == CIRCUIT_CLOSED
+
+    def test_client_errors_keep_circuit_closed(self):
+        """Test that invalid messages do not count against the provider."""
+        self.primary.send_sms.return_value = SmsResponse(success=False, error_code='INVALID_PHONE')
+        for _ in range(5):
+            self.manager.send_sms(self.message)
+
+        assert self.manager.health_monitor.get('smso').breaker.consecutive_failures == 0
+        self.backup.send_sms.assert_not_called()
+
+    def test_clear_cache_rebuilds_table(self):
+        """Test that a configuration change triggers a new health check."""
+        self.manager.send_sms(self.message)
+        self.manager.clear_cache()
+        self.manager.send_sms(self.message)
+
+        assert self.provider_model.get_all_providers.call_count == 2
+
+    def test_first_send_uses_untested_table(self):
+        """Test that with a background monitor the first send does not wait for health checks."""
+        monitor = self.manager.health_monitor
+        monitor.interval = 60
+        monitor.start = Mock()
+
+        assert self.manager.send_sms(self.message).success is True
+
+        self.primary.health_check.assert_not_called()
+        assert monitor.get('smso').last_check is None
+        monitor.start.assert_called()
+
+    def test_invalidate_keeps_table_and_circuits(self):
+        """Test that a configuration change neither empties the table nor resets circuits."""
+        monitor = self.manager.health_monitor
+        monitor.interval = 60
+        monitor.start = Mock()
+        breaker = monitor.refresh()['smso'].breaker
+
+        monitor.invalidate()
+
+        assert monitor.select() is not None
+        assert monitor.get('smso').breaker is breaker
+        assert monitor.refresh()['smso'].breaker is breaker
+
+    def test_verify_webhook_delegates_to_provider(self):
+        """Test that webhook tokens are checked by the addressed provider."""
+        self.backup.verify_webhook.return_value = False
+
+        assert self.manager.verify_webhook('backup', 'guess') is False
+        assert self.manager.verify_webhook('unknown', 'guess') is False
+        self.backup.verify_webhook.assert_called_once_with('guess')
+
+    def test_status_and_webhooks_use_registry(self):
+        """Test that status checks and webhooks do no provider-metadata reads."""
+        log = Mock(provider='smso', status='sent', cost=3.5, delivery_time=None,
+                   created_at=datetime(2026, 10, 18, 9, 30))
+        self.primary.get_status.return_value = SmsStatus(message_id='smso-1', status='sent')
+        self.backup.handle_webhook.return_value = SmsStatus(message_id='backup-1', status='delivered')
+
+        self.report_log_model.find_by_response_tokens.return_value = []
+
+        self.manager.send_sms(self.message)
+        with patch.object(SmsLog, 'find_by_response_token', return_value=log):
+            self.manager.get_message_status('smso-1')
+            assert self.manager.handle_webhook('backup', {'responseToken': 'backup-1'}) is True
+            assert self.manager.handle_webhook('unknown', {}) is False
+            self.backup.handle_webhook.return_value = SmsStatus(message_id='backup-1', status='owned')
+            assert self.manager.handle_webhook('backup', {'responseToken': 'backup-1'}) is False
+
+        self.report_log_model.find_by_response_tokens.assert_called_once_with(['backup-1'])
+
+        self.primary.get_status.assert_called_once_with('smso-1')
+        self.manager_provider_model.find_by_slug.assert_not_called()
+        self.manager_provider_model.get_active_provider.assert_not_called()
+        assert self.provider_model.get_all_providers.call_count == 1
+
+    def test_registry_reuses_instances_until_config_changes(self):
+        """Test that reloads only rebuild (and decrypt) providers whose config changed."""
+        registry = self.manager.registry
+        registry.reload()
+        registry.reload()
+        assert self.manager._create_provider_instance.call_count == 2
+
+        self.models[0] = SmsProvider({'_id': 'p1', 'name': 'SMSO', 'slug': 'smso', 'is_active': True,
+                                      'is_default': True, 'priority': 10,
+                                      'config': {'sender_id': 'Nou'}})
+        registry.reload()
+        assert self.manager._create_provider_instance.call_count == 3
+        assert [entry.slug for entry in registry.get_active()] == ['smso', 'backup']
+        assert registry.get_default().slug == 'smso'
+
+    def test_fault_injection_only_loads_when_registered(self):
+        """Test that the load-test provider is not in the production provider map."""
+        from app.services.sms.providers.fault_injection_provider import FaultInjectionProvider
+
+        assert self.manager._load_provider_class(SmsProvider.PROVIDER_FAULT_INJECTION) is None
+
+        self.manager.register_provider_class(
+            SmsProvider.PROVIDER_FAULT_INJECTION,
+            'app.services.sms.providers.fault_injection_provider.FaultInjectionProvider'
+        )
+
+        assert self.manager._load_provider_class(SmsProvider.PROVIDER_FAULT_INJECTION) is FaultInjectionProvider
+        assert SmsProvider.PROVIDER_FAULT_INJECTION not in SmsManager.PROVIDER_CLASSES
+
+    def test_no_provider_available(self):
+        """Test that sends fail cleanly when every provider is unhealthy."""
+        self.primary.health_check.return_value = (False, 'down')
+        self.backup.health_check.side_effect = Exception('timeout')
+
+        response = self.manager.send_sms(self.message)
+
+        assert response.success is False
+        assert response.error_code == 'NO_PROVIDER'
+
+    def test_slow_otp_is_hedged_to_backup(self):
+        """Test that an OTP send slower than the primary p95 is raced on the backup."""
+        self.manager.hedge_min_delay = 0.05
+        breaker = self.manager.health_monitor.refresh()['smso'].breaker
+        for _ in range(breaker.min_calls):
+            breaker.record(True, 0.01)
+
+        def slow_send(message):
+            time.sleep(0.5)
+            return SmsResponse(success=True, message_id='smso-slow', cost=3.5)
+
+        self.primary.send_sms.side_effect = slow_send
+        with patch.object(self.manager, '_update_provider_stats') as mock_stats:
+            started = time.monotonic()
+            response = self.manager.send_sms(self.message)
+            elapsed = time.monotonic() - started
+
+            assert response.message_id == 'backup-1'
+            assert elapsed < 0.4
+            time.sleep(0.6)
+
+        # The late primary success only counts as provider usage, not a second message
+        assert mock_stats.call_count == 2
+        assert self.manager.health_monitor.get('smso').breaker.get_stats()['calls'] == breaker.min_calls + 1
+
+    def test_bulk_retries_provider_failures_on_backup(self):
+        """Test that only provider-side bulk failures are resent through the backup."""
+        messages = [SmsMessage(to=f'+4072212345{i}', body='Comanda dvs. ajunge azi') for i in range(3)]
+        self.primary.send_bulk.return_value = [
+            SmsResponse(success=True, message_id='smso-1'),
+            SmsResponse(success=False, error_code='SMS_API_ERROR'),
+            SmsResponse(success=False, error_code='INVALID_PHONE')
+        ]
+        self.backup.send_bulk.return_value = [SmsResponse(success=True, message_id='backup-2')]
+
+        responses = self.manager.send_bulk(messages)
+
+        assert [r.message_id for r in responses] == ['smso-1', 'backup-2', None]
+        self.backup.send_bulk.assert_called_once_with([messages[1]])
+        assert all('log_id' in r.provider_response for r in responses)
+        assert self.log_model.insert_many.call_count == 3
+
+    def test_transactional_messages_not_hedged(self):
+        """Test that non-OTP messages never go to two providers."""
+        breaker = self.manager.health_monitor.refresh()['smso'].breaker
+        for _ in range(breaker.min_calls):
+            breaker.record(True, 0.01)
+        message = SmsMessage(to='+40722123456', body='Comanda a fost livrată')
+
+        assert self.manager._get_hedge_delay('smso', message) is None
+        assert self.manager._get_hedge_delay('smso', self.message) == self.manager.hedge_min_delay
+
+
+class TestBulkSend:
+    """Test the default provider send_bulk against MockProvider."""
+
+    def setup_method(self):
+        """Use a fresh rate limit engine for provider pacing."""
+        self.engine = RateLimitEngine(MemoryStorage())
+        self._patcher = patch('app.services.sms.provider_interface.get_rate_limit_engine',
+                              return_value=self.engine)
+        self._patcher.start()
+        MockProvider.clear_sent_messages()
+
+    def teardown_method(self):
+        """Stop patchers."""
+        self._patcher.stop()
+
+    def test_results_in_input_order(self):
+        """Test that per-message results line up with the input messages."""
+        provider = MockProvider({'log_messages': False, 'bulk_concurrency': 4})
+        messages = [SmsMessage(to=f'+4072212345{i}', body=f'Mesaj {i}') for i in range(8)]
+        messages[3] = SmsMessage(to='0722123453', body='Mesaj 3')
+
+        responses = provider.send_bulk(messages)
+
+        assert len(responses) == 8
+        assert responses[3].error_code == 'INVALID_MESSAGE'
+        sent = MockProvider.get_sent_messages()
+        for message, response in zip(messages, responses):
+            if response.success:
+                assert sent[response.message_id]['message'].to == message.to
+        assert len(sent) == 7
+
+    def test_paced_to_provider_rate_limit(self):
+        """Test that a burst of per_second is followed by sends at the limit rate."""
+        provider = MockProvider({'log_messages': False, 'bulk_concurrency': 8,
+                                 'rate_limit_per_second': 10})
+        messages = [SmsMessage(to='+40722123456', body='Livrare azi') for _ in range(15)]
+
+        started = time.monotonic()
+        responses = provider.send_bulk(messages)
+        elapsed = time.monotonic() - started
+
+        assert all(r.success for r in responses)
+        assert elapsed >= 0.4
+
+
+class TestSmsTelemetry:
+    """Test buffering and coalescing in the telemetry sink."""
+
+    def setup_method(self):
+        """Create a sink that only flushes when asked."""
+        self.telemetry = SmsTelemetry(flush_interval=60, batch_size=100)
+        self.telemetry._start = Mock()
+        self._stats_patcher = patch('app.services.sms.telemetry.SmsStats')
+        self.stats_rollups = self._stats_patcher.start()
+
+    def teardown_method(self):
+        """Stop patchers."""
+        self._stats_patcher.stop()
+
+    @patch('app.services.sms.telemetry.SmsProvider')
+    def test_counters_coalesced_into_one_flush(self, mock_provider):
+        """Test that many usage updates become one $inc per provider."""
+        for _ in range(3):
+            self.telemetry.record_usage('smso', sent=1, cost=3.5)
+        self.telemetry.record_usage('smso', failed=1)
+        self.telemetry.record_usage('backup', delivered=1)
+
+        mock_provider.increment_usage_stats.assert_not_called()
+        self.telemetry.flush()
+
+        counters = mock_provider.increment_usage_stats.call_args[0][0]
+        assert mock_provider.increment_usage_stats.call_count == 1
+        assert counters['smso']['sent'] == 3
+        assert counters['smso']['failed'] == 1
+        assert counters['smso']['cost'] == pytest.approx(10.5)
+        assert counters['backup']['delivered'] == 1
+
+    @patch('app.services.sms.telemetry.SmsLog')
+    def test_logs_written_in_one_batch(self, mock_log):
+        """Test that buffered logs are inserted with a single insert_many."""
+        logs = [Mock(_id=None, **{'to_document.return_value': {'response_token': f't{i}'}}) for i in range(5)]
+        for log in logs:
+            self.telemetry.record_log(log)
+
+        assert all(log._id is not None for log in logs)
+        self.telemetry.flush()
+        self.telemetry.flush()
+
+        assert mock_log.insert_many.call_count == 1
+        assert len(mock_log.insert_many.call_args[0][0]) == 5
+
+    @patch('app.services.sms.telemetry.SmsLog')
+    def test_delivery_report_flushes_pending_log(self, mock_log):
+        """Test that a report for a buffered log writes the buffer first."""
+        log = Mock(_id=None, **{'to_document.return_value': {'response_token': 'abc'}})
+        self.telemetry.record_log(log)
+
+        self.telemetry.flush_pending_log('other')
+        mock_log.insert_many.assert_not_called()
+
+        self.telemetry.flush_pending_log('abc')
+        mock_log.insert_many.assert_called_once()
+
+    @patch('app.models.sms_provider.UpdateOne')
+    @patch.object(SmsProvider, 'get_collection')
+    def test_increment_usage_stats_uses_inc(self, mock_collection, mock_update_one):
+        """Test that provider counters are applied with $inc in one bulk_write."""
+        SmsProvider.increment_usage_stats({
+            'smso': {'sent': 2, 'delivered': 1, 'failed': 0, 'cost': 7.0, 'last_used': None}
+        })
+
+        query, update = mock_update_one.call_args[0]
+        assert query == {'slug': 'smso'}
+        assert update['$inc']['usage_stats.total_sent'] == 2
+        assert update['$inc']['usage_stats.total_cost'] == 7.0
+        mock_collection.return_value.bulk_write.assert_called_once()
+
+
+class TestCircuitBreaker:
+    """Test CircuitBreaker trip conditions and recovery."""
+
+    def test_error_rate_opens_circuit(self):
+        """Test that a failure rate over the window trips without consecutive failures."""
+        breaker = CircuitBreaker(failure_threshold=100, min_calls=10, error_rate_threshold=0.5)
+        for i in range(10):
+            breaker.record(i % 2 == 0, 0.1)
+
+        assert breaker.state == CIRCUIT_OPEN
+        assert breaker.allow_request() is False
+
+    def test_slow_calls_open_circuit(self):
+        """Test that successful but slow sends trip the breaker."""
+        breaker = CircuitBreaker(min_calls=4, slow_call_seconds=1.0, slow_rate_threshold=0.5)
+        for latency in (0.1, 2.0, 3.0, 0.2):
+            breaker.record(True, latency)
+
+        assert breaker.state == CIRCUIT_OPEN
+
+    def test_half_open_admits_single_probe(self):
+        """Test that one probe is admitted after the cool-down and closes the circuit."""
+        breaker = CircuitBreaker(failure_threshold=1, open_seconds=10)
+        breaker.record(False, 0.1)
+        breaker.opened_at -= 10
+
+        assert breaker.allow_request() is True
+        assert breaker.state == CIRCUIT_HALF_OPEN
+        assert breaker.allow_request() is False
+
+        breaker.record(True, 0.1)
+        assert breaker.state == CIRCUIT_CLOSED
+
+    def test_latency_percentile(self):
+        """Test p95 over successful sends once enough samples exist."""
+        breaker = CircuitBreaker(min_calls=20)
+        for i in range(1, 20):
+            breaker.record(True, i / 100)
+        assert breaker.latency_percentile(95) is None
+
+        breaker.record(True, 0.20)
+        breaker.record(False, 9.0)
+        assert breaker.latency_percentile(95) == pytest.approx(0.19)
@@ -13,6 +13,7 @@ from datetime import datetime, timedelta
 from pymongo.errors import PyMongoError
 from twilio.base.exceptions import TwilioException
 
+from app.models.verification_code import VerificationCode
 from app.services.sms_service import SMSService, get_sms_service
 from app.utils.error_handlers import SMSError, ValidationError
 
@@ -88,7 +89,7 @@ class TestSMSServiceInitialization:
             "expires_at", expireAfterSeconds=0, background=True
         )
         mock_verification_collection.create_index.assert_any_call(
-            "phone_number", unique=True, background=True
+            [("phone_number", 1), ("purpose", 1)], unique=True, background=True
         )
         mock_rate_limit_collection.create_index.assert_any_call(
             "expires_at", expireAfterSeconds=0, background=True
@@ -247,47 +248,22 @@ class TestSMSServiceCodeValidation:
             mock_app.config = {'SMS_MOCK_MODE': True}
             self.service = SMSService()
     
-    def test_validate_recent_code_success(self):
+    @patch('app.services.sms_service.VerificationCode.verify')
+    def test_validate_recent_code_success(self, mock_verify):
         """Test successful verification code validation."""
-        # Setup verification record
-        verification_record = {
-            'phone_number': '+1234567890',
-            'code': '123456',
-            'created_at': datetime.utcnow(),
-            'expires_at': datetime.utcnow() + timedelta(minutes=5),
-            'verified': False
-        }
-        
-        # Mock database operations
-        self.service.verification_collection = MagicMock()
-        self.service.verification_collection.find_one.return_value = verification_record
+        mock_verify.return_value = VerificationCode.VERIFIED
         
         # Test validation
         result = self.service.validate_recent_code('+1234567890', '123456')
         
-        # Assertions
+        # Code is checked and consumed by the store in one call
         assert result is True
-        self.service.verification_collection.update_one.assert_called_once()
-        
-        # Check that verified flag was set
-        update_call = self.service.verification_collection.update_one.call_args
-        assert update_call[0][0] == {'phone_number': '+1234567890'}
-        assert update_call[0][1]['$set']['verified'] is True
+        mock_verify.assert_called_once_with('+1234567890', '123456')
     
-    def test_validate_recent_code_expired(self):
+    @patch('app.services.sms_service.VerificationCode.verify')
+    def test_validate_recent_code_expired(self, mock_verify):
         """Test validation of expired verification code."""
-        # Setup expired verification record
-        verification_record = {
-            'phone_number': '+1234567890',
-            'code': '123456',
-            'created_at': datetime.utcnow() - timedelta(minutes=15),
-            'expires_at': datetime.utcnow() - timedelta(minutes=5),  # Expired
-            'verified': False
-        }
-        
-        # Mock database operations
-        self.service.verification_collection = MagicMock()
-        self.service.verification_collection.find_one.return_value = verification_record
+        mock_verify.return_value = VerificationCode.EXPIRED
         
         # Test validation of expired code
         with pytest.raises(SMSError) as exc_info:
@@ -296,20 +272,10 @@ class TestSMSServiceCodeValidation:
         assert exc_info.value.error_code == "SMS_003"
         assert "expired" in str(exc_info.value)
     
-    def test_validate_recent_code_invalid_code(self):
+    @patch('app.services.sms_service.VerificationCode.verify')
+    def test_validate_recent_code_invalid_code(self, mock_verify):
         """Test validation with incorrect verification code."""
-        # Setup verification record
-        verification_record = {
-            'phone_number': '+1234567890',
-            'code': '123456',
-            'created_at': datetime.utcnow(),
-            'expires_at': datetime.utcnow() + timedelta(minutes=5),
-            'verified': False
-        }
-        
-        # Mock database operations
-        self.service.verification_collection = MagicMock()
-        self.service.verification_collection.find_one.return_value = verification_record
+        mock_verify.return_value = VerificationCode.INVALID
         
         # Test validation with wrong code
         with pytest.raises(SMSError) as exc_info:
@@ -318,11 +284,10 @@ class TestSMSServiceCodeValidation:
         assert exc_info.value.error_code == "SMS_002"
         assert "Invalid verification code" in str(exc_info.value)
     
-    def test_validate_recent_code_not_found(self):
+    @patch('app.services.sms_service.VerificationCode.verify')
+    def test_validate_recent_code_not_found(self, mock_verify):
         """Test validation when no verification code exists."""
-        # Mock database operations - no record found
-        self.service.verification_collection = MagicMock()
-        self.service.verification_collection.find_one.return_value = None
+        mock_verify.return_value = VerificationCode.NOT_FOUND
         
         # Test validation with no existing code
         with pytest.raises(SMSError) as exc_info:
@@ -331,6 +296,17 @@ class TestSMSServiceCodeValidation:
         assert exc_info.value.error_code == "SMS_002"
         assert "No verification code found" in str(exc_info.value)
     
+    @patch('app.services.sms_service.VerificationCode.verify')
+    def test_validate_recent_code_too_many_attempts(self, mock_verify):
+        """Test validation after the attempt limit for the code is reached."""
+        mock_verify.return_value = VerificationCode.TOO_MANY_ATTEMPTS
+        
+        with pytest.raises(SMSError) as exc_info:
+            self.service.validate_recent_code('+1234567890', '123456')
+        
+        assert exc_info.value.error_code == "SMS_002"
+        assert "Too many verification attempts" in str(exc_info.value)
+    
     def test_validate_recent_code_invalid_format(self):
         """Test validation with invalid code format."""
         # Test various invalid code formats
@@ -612,12 +588,12 @@ class TestSMSServiceErrorHandling:
     def test_store_verification_code_database_error(self):
         """Test error handling when storing verification code fails."""
         # Mock database operation to raise exception
-        self.service.verification_collection = MagicMock()
-        self.service.verification_collection.replace_one.side_effect = PyMongoError("Insert failed")
-        
-        # Test storage error handling
-        with pytest.raises(SMSError) as exc_info:
-            self.service._store_verification_code('+1234567890', '123456')
+        with patch('app.services.sms_service.VerificationCode.issue') as mock_issue:
+            mock_issue.side_effect = PyMongoError("Insert failed")
+            
+            # Test storage error handling
+            with pytest.raises(SMSError) as exc_info:
+                self.service._store_verification_code('+1234567890', '123456')
         
         assert exc_info.value.error_code == "SMS_DB_001"
         assert "Failed to store verification code" in str(exc_info.value)
@@ -0,0 +1,292 @@
+"""
+Unit tests for SMS statistics rollups.
+
+This module tests the SmsStats model including incremental hourly rollup
+deltas for new logs and status changes, statistics read from rollups
+merged with the current hour's raw logs, the rebuild marker and lock,
+and the telemetry sink that coalesces rollup updates and keeps them for
+retry when a write fails.
+"""
+
+import pytest
+from datetime import datetime
+from unittest.mock import patch, MagicMock, Mock
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.models.sms_stats import SmsStats
+from app.services.sms.telemetry import SmsTelemetry
+
+
+class TestSmsStatsRollupUpdates:
+    """Test incremental rollup maintenance."""
+
+    def test_add_delta_buckets_by_hour(self):
+        """Test that messages in one hour and status coalesce into one delta."""
+        deltas = {}
+        SmsStats.add_delta(deltas, 'smso', datetime(2026, 10, 18, 9, 5), 'sent', 3.5)
+        SmsStats.add_delta(deltas, 'smso', datetime(2026, 10, 18, 9, 55), 'sent', 3.5)
+        SmsStats.add_delta(deltas, 'smso', datetime(2026, 10, 18, 10, 0), 'sent', 3.5)
+
+        assert deltas[('smso', datetime(2026, 10, 18, 9), 'sent')] == {
+            'count': 2, 'cost': 7.0, 'delivery_time': 0.0, 'delivery_count': 0
+        }
+        assert ('smso', datetime(2026, 10, 18, 10), 'sent') in deltas
+
+    @patch('app.models.sms_stats.get_database')
+    def test_apply_deltas_uses_inc_upserts(self, mock_get_database):
+        """Test that deltas become one bulk_write of $inc upserts."""
+        mock_collection = MagicMock()
+        mock_get_database.return_value = {SmsStats.COLLECTION_NAME: mock_collection}
+        deltas = {}
+        SmsStats.add_delta(deltas, 'smso', datetime(2026, 10, 18, 9, 5), 'sent', 3.5, sign=-1)
+        SmsStats.add_delta(deltas, 'smso', datetime(2026, 10, 18, 9, 5), 'delivered', 3.5, 12.0)
+
+        assert SmsStats.apply_deltas(deltas) == 2
+
+        operations = mock_collection.bulk_write.call_args[0][0]
+        assert operations[0]._filter == {'provider': 'smso', 'hour': datetime(2026, 10, 18, 9), 'status': 'sent'}
+        assert operations[0]._doc['$inc'] == {'count': -1, 'cost': -3.5, 'delivery_time': 0.0, 'delivery_count': 0}
+        assert operations[1]._doc['$inc'] == {'count': 1, 'cost': 3.5, 'delivery_time': 12.0, 'delivery_count': 1}
+        assert operations[1]._upsert is True
+
+    @patch('app.models.sms_stats.get_database')
+    def test_cancelled_deltas_are_skipped(self, mock_get_database):
+        """Test that a delta that nets to zero does not touch the database."""
+        deltas = {}
+        SmsStats.add_delta(deltas, 'smso', datetime(2026, 10, 18, 9), 'sent', 3.5)
+        SmsStats.add_delta(deltas, 'smso', datetime(2026, 10, 18, 9), 'sent', 3.5, sign=-1)
+
+        assert SmsStats.apply_deltas(deltas) == 0
+        mock_get_database.assert_not_called()
+
+
+class TestSmsStatsTelemetry:
+    """Test that the telemetry sink maintains rollups."""
+
+    def setup_method(self):
+        """Create a sink that only flushes when asked."""
+        self.telemetry = SmsTelemetry(flush_interval=60, batch_size=100)
+        self.telemetry._start = Mock()
+
+    @patch('app.services.sms.telemetry.SmsLog')
+    @patch('app.services.sms.telemetry.SmsStats.apply_deltas')
+    def test_logs_and_status_changes_coalesced(self, mock_apply, mock_log):
+        """Test that a send and its delivery report net out in one flush."""
+        created_at = datetime(2026, 10, 18, 9, 30)
+        log = Mock(_id=None, provider='smso', status='delivered', cost=3.5,
+                   delivery_time=4.0, created_at=created_at)
+        log.to_document.return_value = {
+            'provider': 'smso', 'status': 'sent', 'cost': 3.5,
+            'delivery_time': None, 'created_at': created_at, 'response_token': 't1'
+        }
+
+        self.telemetry.record_log(log)
+        self.telemetry.record_status_change(log, 'sent')
+        self.telemetry.flush()
+
+        deltas = mock_apply.call_args[0][0]
+        assert mock_apply.call_count == 1
+        assert deltas[('smso', datetime(2026, 10, 18, 9), 'sent')]['count'] == 0
+        assert deltas[('smso', datetime(2026, 10, 18, 9), 'delivered')] == {
+            'count': 1, 'cost': 3.5, 'delivery_time': 4.0, 'delivery_count': 1
+        }
+
+    @patch('app.services.sms.telemetry.SmsStats.apply_deltas')
+    def test_unchanged_status_is_noop(self, mock_apply):
+        """Test that a repeated delivery report does not move the log."""
+        log = Mock(provider='smso', status='delivered', cost=3.5, delivery_time=4.0,
+                   created_at=datetime(2026, 10, 18, 9, 30))
+
+        self.telemetry.record_status_change(log, 'delivered', 4.0)
+        self.telemetry.flush()
+
+        mock_apply.assert_not_called()
+
+    @patch('app.services.sms.telemetry.SmsProvider')
+    @patch('app.services.sms.telemetry.SmsLog')
+    @patch('app.services.sms.telemetry.SmsStats.apply_deltas')
+    def test_failed_flush_keeps_buffers(self, mock_apply, mock_log, mock_provider):
+        """Test that logs, counters and deltas survive a failed write and go out on the next flush."""
+        mock_log.insert_many.side_effect = [Exception('connection reset'), 1]
+        mock_provider.increment_usage_stats.side_effect = [Exception('connection reset'), None]
+        mock_apply.side_effect = [Exception('connection reset'), 1]
+        log = Mock(_id=None)
+        log.to_document.return_value = {
+            'provider': 'smso', 'status': 'sent', 'cost': 3.5,
+            'created_at': datetime(2026, 10, 18, 9, 30), 'response_token': 't1'
+        }
+
+        self.telemetry.record_log(log)
+        self.telemetry.record_usage('smso', sent=1, cost=3.5)
+        self.telemetry.flush()
+
+        assert self.telemetry.get_stats()['buffered_logs'] == 1
+        self.telemetry.record_usage('smso', sent=1, cost=3.5)
+        self.telemetry.flush()
+
+        assert mock_log.insert_many.call_args[0][0][0]['response_token'] == 't1'
+        counters = mock_provider.increment_usage_stats.call_args[0][0]
+        assert counters['smso']['sent'] == 2
+        assert mock_apply.call_args[0][0][('smso', datetime(2026, 10, 18, 9), 'sent')]['count'] == 1
+        assert self.telemetry.get_stats()['buffered_logs'] == 0
+
+    @patch('app.services.sms.telemetry.SmsLog')
+    def test_partial_insert_requeues_only_missing_logs(self, mock_log):
+        """Test that logs already stored are not retried after a partial insert."""
+        mock_log.insert_many.side_effect = BulkWriteError({'nInserted': 1, 'writeErrors': [
+            {'index': 1, 'code': 11000, 'errmsg': 'duplicate key'},
+            {'index': 2, 'code': 91, 'errmsg': 'shutdown in progress'}
+        ]})
+        for token in ('t1', 't2', 't3'):
+            log = Mock(_id=None)
+            log.to_document.return_value = {'provider': 'smso', 'status': 'sent', 'response_token': token}
+            self.telemetry.record_log(log)
+
+        with patch('app.services.sms.telemetry.SmsStats'):
+            self.telemetry.flush()
+
+        assert [document['response_token'] for document in self.telemetry._logs] == ['t3']
+
+    @patch('app.services.sms.telemetry.SmsStats')
+    @patch('app.services.sms.telemetry.SmsLog')
+    def test_requeued_logs_are_capped(self, mock_log, mock_stats):
+        """Test that the retry buffer drops the oldest logs beyond its cap."""
+        mock_log.insert_many.side_effect = Exception('connection reset')
+        self.telemetry.max_buffered_logs = 2
+        for token in ('t1', 't2', 't3'):
+            log = Mock(_id=None)
+            log.to_document.return_value = {'provider': 'smso', 'status': 'sent', 'response_token': token}
+            self.telemetry.record_log(log)
+
+        self.telemetry.flush()
+
+        assert [document['response_token'] for document in self.telemetry._logs] == ['t2', 't3']
+        assert self.telemetry.get_stats()['logs_dropped'] == 1
+
+
+class TestSmsStatsSummary:
+    """Test dashboard statistics read from rollups."""
+
+    @patch('app.models.sms_stats.datetime')
+    @patch('app.models.sms_stats.get_database')
+    def test_merges_rollups_with_current_hour(self, mock_get_database, mock_datetime):
+        """Test that completed hours come from rollups and the current hour from logs."""
+        mock_datetime.utcnow.return_value = datetime(2026, 10, 18, 12, 20)
+        mock_db = MagicMock()
+        mock_rollups = MagicMock()
+        mock_rollups.find.return_value = [
+            {'provider': 'smso', 'status': 'delivered', 'count': 4, 'cost': 14.0,
+             'delivery_time': 20.0, 'delivery_count': 4},
+            {'provider': 'smso', 'status': 'failed', 'count': 1, 'cost': 0.0,
+             'delivery_time': 0.0, 'delivery_count': 0},
+            {'provider': 'smso', 'status': 'sent', 'count': 0, 'cost': 0.0,
+             'delivery_time': 0.0, 'delivery_count': 0}
+        ]
+        mock_db.__getitem__.return_value = mock_rollups
+        mock_db.sms_logs.aggregate.return_value = [
+            {'provider': 'smso', 'status': 'delivered', 'count': 1, 'cost': 3.5,
+             'delivery_time': 10.0, 'delivery_count': 1}
+        ]
+        mock_get_database.return_value = mock_db
+
+        statistics = SmsStats.get_statistics(provider='smso', start_date=datetime(2026, 10, 11, 12, 20))
+
+        query = mock_rollups.find.call_args[0][0]
+        assert query == {
+            'hour': {'$lt': datetime(2026, 10, 18, 12), '$gte': datetime(2026, 10, 11, 12)},
+            'provider': 'smso'
+        }
+        match = mock_db.sms_logs.aggregate.call_args[0][0][0]['$match']
+        assert match == {'created_at': {'$gte': datetime(2026, 10, 18, 12)}, 'provider': 'smso'}
+
+        smso = statistics['smso']
+        assert smso['total_count'] == 6
+        assert smso['total_cost'] == pytest.approx(17.5)
+        assert smso['by_status']['delivered']['count'] == 5
+        assert smso['by_status']['delivered']['avg_delivery_time'] == pytest.approx(6.0)
+        assert smso['by_status']['failed']['avg_delivery_time'] is None
+        assert 'sent' not in smso['by_status']
+
+    @patch('app.models.sms_stats.datetime')
+    @patch('app.models.sms_stats.get_database')
+    def test_past_range_skips_raw_logs(self, mock_get_database, mock_datetime):
+        """Test that a range ending before the current hour reads only rollups."""
+        mock_datetime.utcnow.return_value = datetime(2026, 10, 18, 12, 20)
+        mock_db = MagicMock()
+        mock_db.__getitem__.return_value.find.return_value = []
+        mock_get_database.return_value = mock_db
+
+        statistics = SmsStats.get_statistics(end_date=datetime(2026, 10, 17))
+
+        assert statistics == {}
+        mock_db.sms_logs.aggregate.assert_not_called()
+
+
+
+class TestSmsStatsRebuild:
+    """Test that rollups are trusted only after a full, exclusive rebuild."""
+
+    def setup_method(self):
+        """Patch the database with mocked rollups and logs."""
+        self.rollups = MagicMock()
+        self.db = MagicMock()
+        self.db.__getitem__.return_value = self.rollups
+        self.db.sms_logs.aggregate.return_value = [{
+            '_id': {'provider': 'smso', 'hour': datetime(2026, 10, 18, 9), 'status': 'delivered'},
+            'count': 3, 'cost': 10.5, 'delivery_time': 18.0, 'delivery_count': 3
+        }]
+        self.patcher = patch('app.models.sms_stats.get_database', return_value=self.db)
+        self.patcher.start()
+
+    def teardown_method(self):
+        """Stop the database patcher."""
+        self.patcher.stop()
+
+    def test_rollups_without_marker_are_not_trusted(self):
+        """Test that a rollup created by a post-deploy flush does not count as built."""
+        self.rollups.find_one.return_value = None
+
+        assert SmsStats.has_rollups() is False
+        assert self.rollups.find_one.call_args[0][0]['_id'] == SmsStats.REBUILD_STATE_ID
+
+    def test_rebuild_sets_keys_without_deleting(self):
+        """Test that a full rebuild overwrites per key, keeps concurrent deltas and marks completion."""
+        assert SmsStats.rebuild() == 1
+
+        self.rollups.delete_many.assert_not_called()
+        operation = self.rollups.bulk_write.call_args[0][0][0]
+        assert '$inc' not in operation._doc
+        assert operation._doc['$set']['count'] == 3
+
+        # Only rollups untouched since the rebuild started are zeroed
+        stale_query = self.rollups.update_many.call_args[0][0]
+        started = operation._doc['$set']['updated_at']
+        assert stale_query['updated_at'] == {'$lt': started}
+
+        release = self.rollups.update_one.call_args[0][1]
+        assert release['$unset'] == {'locked_until': ''}
+        assert release['$set'] == {'rebuilt_at': started}
+
+    def test_partial_rebuild_does_not_mark(self):
+        """Test that rebuilding a recent range leaves the completion marker alone."""
+        SmsStats.rebuild(since=datetime(2026, 10, 18))
+
+        release = self.rollups.update_one.call_args[0][1]
+        assert '$set' not in release
+
+    def test_rebuild_skipped_while_locked(self):
+        """Test that a second worker does not rebuild while the lock is held."""
+        self.rollups.update_one.side_effect = DuplicateKeyError('locked')
+
+        assert SmsStats.rebuild() == 0
+        self.db.sms_logs.aggregate.assert_not_called()
+
+    def test_failed_rebuild_releases_lock_without_marker(self):
+        """Test that an interrupted rebuild can be retried and is not trusted."""
+        self.rollups.bulk_write.side_effect = RuntimeError('connection reset')
+
+        with pytest.raises(RuntimeError):
+            SmsStats.rebuild()
+
+        release = self.rollups.update_one.call_args[0][1]
+        assert release == {'$unset': {'locked_until': ''}}
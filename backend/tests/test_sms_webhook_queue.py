@@ -0,0 +1,297 @@
+"""
+Unit tests for the SMS delivery report webhook queue.
+
+This module tests that reports are acknowledged without database work,
+coalesced per response token, applied with one read and one bulk_write,
+kept for a retry when the write fails or the log is not there yet, not
+counted twice when a status repeats or another worker applied it first,
+and that processing lag is reported,
+plus SMSO delivery report authentication and status parsing, and that the
+webhook route only throttles failed authentications.
+"""
+
+import time
+from datetime import datetime
+from unittest.mock import patch, Mock
+from flask import Flask
+
+from app.models.sms_log import SmsLog
+from app.services.sms.provider_interface import SmsStatus
+from app.services.sms.providers.smso_provider import SmsoProvider
+from app.services.sms.webhook_queue import WebhookQueue
+from app.routes.sms import sms_bp, WEBHOOK_AUTH_FAILURE_LIMIT
+from app.utils.rate_limit_engine import RateLimitEngine, MemoryStorage
+
+
+def make_log(token, status='sent'):
+    """Build a stored log for a sent message."""
+    return SmsLog({'provider': 'smso', 'status': status, 'response_token': token, 'cost': 3.5,
+                   'created_at': datetime(2026, 10, 18, 9, 30),
+                   'sent_at': datetime(2026, 10, 18, 9, 30)})
+
+
+class TestWebhookQueue:
+    """Test WebhookQueue batching."""
+
+    def setup_method(self):
+        """Create a queue that only flushes when asked."""
+        self.manager = Mock()
+        self.queue = WebhookQueue(self.manager, flush_interval=60, batch_size=100)
+        self.queue._start = Mock()
+        self._patcher = patch('app.services.sms.webhook_queue.SmsLog')
+        self.log_model = self._patcher.start()
+        self.log_model.STATUS_DELIVERED = SmsLog.STATUS_DELIVERED
+        self.log_model.STATUS_FAILED = SmsLog.STATUS_FAILED
+        # Every guarded update wins unless a test says otherwise
+        self.log_model.update_by_response_tokens.side_effect = lambda updates: set(updates)
+
+    def teardown_method(self):
+        """Stop the SmsLog patcher."""
+        self._patcher.stop()
+
+    def test_enqueue_does_no_database_work(self):
+        """Test that accepting a report only buffers it."""
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered'))
+
+        self.log_model.find_by_response_tokens.assert_not_called()
+        assert self.queue.get_stats()['pending'] == 1
+
+    def test_flush_applies_batch_in_one_write(self):
+        """Test that a batch of reports is one $in read and one keyed bulk update."""
+        delivered_at = datetime(2026, 10, 18, 9, 30, 12)
+        self.log_model.find_by_response_tokens.return_value = [make_log('t1'), make_log('t2')]
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='sent'))
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered', delivered_at=delivered_at))
+        self.queue.enqueue('smso', SmsStatus(message_id='t2', status='failed'))
+        self.queue.enqueue('smso', SmsStatus(message_id='t3', status='delivered'))
+
+        assert self.queue.flush() == 2
+
+        self.log_model.find_by_response_tokens.assert_called_once_with(['t1', 't2', 't3'])
+        updates = self.log_model.update_by_response_tokens.call_args[0][0]
+        assert updates['t1'] == ('sent', updates['t1'][1])
+        assert updates['t1'][1]['status'] == 'delivered'
+        assert updates['t1'][1]['delivery_time'] == 12.0
+        assert updates['t2'][1]['status'] == 'failed'
+        self.manager._update_provider_stats.assert_any_call('smso', delivered=1)
+        self.manager._update_provider_stats.assert_any_call('smso', failed=1)
+        assert self.manager.telemetry.record_status_change.call_count == 2
+
+        stats = self.queue.get_stats()
+        assert stats['received'] == 4
+        assert stats['coalesced'] == 1
+        assert stats['applied'] == 2
+        assert stats['batches'] == 1
+        # t3 has no log yet and waits for a retry
+        assert stats['unmatched'] == 0
+        assert stats['pending'] == 1
+
+    def test_unmatched_reports_retried_then_dropped(self):
+        """Test that a report is retried until its log appears, within the retry window."""
+        self.log_model.find_by_response_tokens.return_value = []
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered'))
+        self.queue.enqueue('smso', SmsStatus(message_id='t2', status='delivered'))
+
+        self.queue.flush()
+        assert self.queue.get_stats()['pending'] == 2
+
+        # The log of t1 was flushed by another worker in the meantime
+        self.log_model.find_by_response_tokens.return_value = [make_log('t1')]
+        assert self.queue.flush() == 1
+        assert self.queue.get_stats()['pending'] == 1
+
+        self.log_model.find_by_response_tokens.return_value = []
+        self.queue.unmatched_retry_seconds = 0
+        self.queue.flush()
+        stats = self.queue.get_stats()
+        assert stats['pending'] == 0
+        assert stats['unmatched'] == 1
+
+    def test_repeated_status_not_counted_twice(self):
+        """Test that a resent report for an unchanged status writes and counts nothing."""
+        self.log_model.find_by_response_tokens.return_value = [make_log('t1', status='delivered')]
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered'))
+
+        assert self.queue.flush() == 0
+
+        assert self.log_model.update_by_response_tokens.call_args[0][0] == {}
+        self.manager._update_provider_stats.assert_not_called()
+        self.manager.telemetry.record_status_change.assert_not_called()
+        assert self.queue.get_stats()['unchanged'] == 1
+
+    def test_report_applied_by_another_worker_not_counted(self):
+        """Test that losing the guarded write to a concurrent worker moves no stats."""
+        self.log_model.find_by_response_tokens.return_value = [make_log('t1'), make_log('t2')]
+        self.log_model.update_by_response_tokens.side_effect = lambda updates: {'t2'}
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered'))
+        self.queue.enqueue('smso', SmsStatus(message_id='t2', status='failed'))
+
+        assert self.queue.flush() == 1
+
+        self.manager._update_provider_stats.assert_called_once_with('smso', failed=1)
+        assert self.manager.telemetry.record_status_change.call_count == 1
+        stats = self.queue.get_stats()
+        assert stats['applied'] == 1
+        assert stats['unchanged'] == 1
+
+    def test_failed_report_records_error(self):
+        """Test that a failure report stores the provider's error on the log."""
+        self.log_model.find_by_response_tokens.return_value = [make_log('t1')]
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='failed', error_message='SMSO status: undelivered'))
+
+        self.queue.flush()
+
+        updates = self.log_model.update_by_response_tokens.call_args[0][0]
+        assert updates['t1'][1]['error'] == 'SMSO status: undelivered'
+
+    def test_failed_write_keeps_reports(self):
+        """Test that reports stay queued when the batch cannot be written."""
+        self.log_model.find_by_response_tokens.return_value = [make_log('t1')]
+        self.log_model.update_by_response_tokens.side_effect = Exception('connection reset')
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered'))
+
+        assert self.queue.flush() == 0
+
+        stats = self.queue.get_stats()
+        assert stats['flush_errors'] == 1
+        assert stats['pending'] == 1
+
+    def test_lag_is_measured(self):
+        """Test that processing lag is measured from a report's arrival."""
+        self.log_model.find_by_response_tokens.return_value = [make_log('t1')]
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered'))
+        time.sleep(0.05)
+
+        assert self.queue.get_stats()['oldest_pending_seconds'] >= 0.05
+        self.queue.flush()
+
+        lag = self.queue.get_stats()['lag_seconds']
+        assert lag['last_batch_max'] >= 0.05
+        assert lag['avg'] >= 0.05
+        assert lag['max'] == lag['last_batch_max']
+
+    def test_batch_size_wakes_flusher(self):
+        """Test that a full batch triggers an early flush."""
+        self.queue.batch_size = 2
+        self.queue.enqueue('smso', SmsStatus(message_id='t1', status='delivered'))
+        assert not self.queue._wakeup.is_set()
+
+        self.queue.enqueue('smso', SmsStatus(message_id='t2', status='delivered'))
+        assert self.queue._wakeup.is_set()
+
+
+class TestGuardedLogUpdates:
+    """Test SmsLog.update_by_response_tokens."""
+
+    @patch('app.models.sms_log.get_database')
+    def test_updates_guarded_on_previous_status(self, mock_get_database):
+        """Test that each update matches the status it was read with."""
+        db = mock_get_database.return_value
+        db.sms_logs.bulk_write.return_value = Mock(matched_count=1)
+
+        assert SmsLog.update_by_response_tokens({'t1': ('sent', {'status': 'delivered'})}) == {'t1'}
+
+        operation = db.sms_logs.bulk_write.call_args[0][0][0]
+        assert operation._filter == {'response_token': 't1', 'status': 'sent'}
+        assert operation._doc['$set']['status'] == 'delivered'
+        db.sms_logs.find.assert_not_called()
+
+    @patch('app.models.sms_log.get_database')
+    def test_partial_match_reads_back_written_logs(self, mock_get_database):
+        """Test that a partial match is resolved by the batch id stamped on written logs."""
+        db = mock_get_database.return_value
+        db.sms_logs.bulk_write.return_value = Mock(matched_count=1)
+        db.sms_logs.find.return_value = [{'response_token': 't2'}]
+
+        written = SmsLog.update_by_response_tokens({
+            't1': ('sent', {'status': 'delivered'}),
+            't2': ('sent', {'status': 'failed'})
+        })
+
+        assert written == {'t2'}
+        batch_id = db.sms_logs.bulk_write.call_args[0][0][0]._doc['$set']['status_batch']
+        assert db.sms_logs.find.call_args[0][0]['status_batch'] == batch_id
+
+
+class TestSmsoWebhook:
+    """Test SMSO delivery report authentication and parsing."""
+
+    def setup_method(self):
+        """Create a provider whose webhook URL carries a secret."""
+        self.provider = SmsoProvider({
+            'api_key': 'key',
+            'webhook_url': 'https://shop.example/api/sms/webhook/smso?token=s3cret'
+        })
+
+    def test_token_must_match_webhook_url(self):
+        """Test that only the secret from webhook_url is accepted."""
+        assert self.provider.verify_webhook('s3cret') is True
+        assert self.provider.verify_webhook('guess') is False
+        assert self.provider.verify_webhook(None) is False
+
+    def test_no_secret_rejects_everything(self):
+        """Test that a webhook URL without a token accepts no reports."""
+        provider = SmsoProvider({'api_key': 'key', 'webhook_url': 'https://shop.example/api/sms/webhook/smso'})
+
+        assert provider.verify_webhook('') is False
+        assert provider.verify_webhook('anything') is False
+
+    def test_webhook_url_from_environment_without_app_context(self):
+        """Test that providers built off the request path (health monitor) still get the URL."""
+        url = 'https://shop.example/api/sms/webhook/smso?token=env-secret'
+        with patch.dict('os.environ', {'SMSO_WEBHOOK_URL': url}):
+            provider = SmsoProvider({'api_key': 'key'})
+
+        assert provider.webhook_url == url
+        assert provider.verify_webhook('env-secret') is True
+
+    def test_unknown_status_rejected(self):
+        """Test that statuses outside the SMSO set are not passed through."""
+        assert self.provider.handle_webhook({'responseToken': 't1', 'status': 'hacked'}) is None
+        assert self.provider.handle_webhook({'responseToken': 't1', 'status': 'undelivered'}).status == 'failed'
+
+
+class TestWebhookRoute:
+    """Test the delivery report endpoint."""
+
+    def setup_method(self):
+        """Mount the SMS blueprint with a mocked manager and fresh limiter."""
+        app = Flask(__name__)
+        app.register_blueprint(sms_bp, url_prefix='/api/sms')
+        self.client = app.test_client()
+        self.manager = Mock()
+        self.manager.handle_webhook.return_value = True
+        self._patchers = [
+            patch('app.routes.sms.get_sms_manager', return_value=self.manager),
+            patch('app.routes.sms.get_rate_limit_engine', return_value=RateLimitEngine(MemoryStorage()))
+        ]
+        for patcher in self._patchers:
+            patcher.start()
+
+    def teardown_method(self):
+        """Stop the patchers."""
+        for patcher in self._patchers:
+            patcher.stop()
+
+    def test_authenticated_burst_not_throttled(self):
+        """Test that a burst of authenticated reports from one IP is accepted in full."""
+        self.manager.verify_webhook.return_value = True
+
+        codes = {self.client.post('/api/sms/webhook/smso?token=s3cret',
+                                  json={'responseToken': f't{i}', 'status': 'delivered'}).status_code
+                 for i in range(WEBHOOK_AUTH_FAILURE_LIMIT * 5)}
+
+        assert codes == {200}
+        assert self.manager.handle_webhook.call_count == WEBHOOK_AUTH_FAILURE_LIMIT * 5
+
+    def test_failed_authentications_throttled(self):
+        """Test that an IP guessing tokens is cut off with 429 before verification."""
+        self.manager.verify_webhook.return_value = False
+
+        for _ in range(WEBHOOK_AUTH_FAILURE_LIMIT):
+            assert self.client.post('/api/sms/webhook/smso?token=guess', json={}).status_code == 403
+
+        response = self.client.post('/api/sms/webhook/smso?token=guess', json={})
+        assert response.status_code == 429
+        assert 'Retry-After' in response.headers
+        assert self.manager.verify_webhook.call_count == WEBHOOK_AUTH_FAILURE_LIMIT
@@ -0,0 +1,225 @@
+"""
+Unit tests for the async SMSO client and the SMS dispatcher.
+
+The client is exercised against a local stub HTTP/1.1 server that plays
+back scripted responses, covering retries with backoff, deadlines,
+keep-alive connection reuse, and the async send path of SmsoProvider.
+"""
+
+import json
+import time
+import asyncio
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+from app.services.sms.dispatcher import SmsDispatcher
+from app.services.sms.provider_interface import SmsMessage
+from app.services.sms.providers.smso_client import SmsoApiError
+from app.services.sms.providers.smso_async_client import AsyncSmsoClient
+from app.services.sms.providers.smso_provider import SmsoProvider
+from app.utils.rate_limit_engine import RateLimitEngine, MemoryStorage
+
+
+class StubSmsoServer:
+    """Local SMSO stand-in that answers with scripted (status, body, delay) tuples."""
+
+    def __init__(self):
+        self.script = []
+        self.requests = []
+        self.client_ports = set()
+        self.default = (200, {'status': 200, 'responseToken': 'token-1', 'transaction_cost': 3.5}, 0)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _reply(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                stub.requests.append((self.command, self.path, self.headers.get('X-Authorization'),
+                                      json.loads(body) if body else None))
+                stub.client_ports.add(self.client_address[1])
+                status, data, delay = stub.script.pop(0) if stub.script else stub.default
+                if delay:
+                    time.sleep(delay)
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_GET = _reply
+            do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        class Server(ThreadingHTTPServer):
+            # Concurrent tests open many connections at once
+            request_queue_size = 128
+
+        self.server = Server(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/api/v1/'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestAsyncSmsoClient:
+    """Test AsyncSmsoClient against the stub server."""
+
+    def setup_method(self):
+        """Start a stub server and build a client with short backoffs."""
+        self.stub = StubSmsoServer()
+        self.client = AsyncSmsoClient('test-key', base_url=self.stub.url, timeout=2.0,
+                                      retries=2, backoff_base=0.01, backoff_max=0.05)
+
+    def teardown_method(self):
+        """Stop the stub server."""
+        self.stub.close()
+
+    def run(self, coro_fn):
+        """Run a client coroutine and close the client on the same loop."""
+        async def main():
+            async with self.client:
+                return await coro_fn()
+        return asyncio.run(main())
+
+    def test_send_sms(self):
+        """Test that a send posts the shared payload and parses the response."""
+        result = self.run(lambda: self.client.send_sms('+40722123456', 'Salut', sender_id='PeFocLemne'))
+
+        assert result['success'] is True
+        assert result['message_id'] == 'token-1'
+        assert result['cost'] == 3.5
+        method, path, api_key, body = self.stub.requests[0]
+        assert (method, path, api_key) == ('POST', '/api/v1/send', 'test-key')
+        assert body['to'] == '+40722123456'
+        assert body['sender'] == 'PeFocLemne'
+
+    def test_retries_transient_errors(self):
+        """Test that 503 responses are retried until a success."""
+        self.stub.script = [(503, {'error': 'busy'}, 0), (503, {'error': 'busy'}, 0)]
+
+        result = self.run(lambda: self.client.send_sms('+40722123456', 'Salut'))
+
+        assert result['success'] is True
+        assert len(self.stub.requests) == 3
+
+    def test_retries_exhausted(self):
+        """Test that the last transient error is raised after all retries."""
+        self.stub.script = [(503, {'error': 'busy'}, 0)] * 3
+
+        with pytest.raises(SmsoApiError) as excinfo:
+            self.run(lambda: self.client.check_balance())
+
+        assert excinfo.value.status_code == 503
+        assert len(self.stub.requests) == 3
+
+    def test_client_errors_not_retried(self):
+        """Test that an invalid API key fails on the first attempt."""
+        self.stub.script = [(401, {'message': 'Invalid API key'}, 0)]
+
+        with pytest.raises(SmsoApiError) as excinfo:
+            self.run(lambda: self.client.send_sms('+40722123456', 'Salut'))
+
+        assert excinfo.value.status_code == 401
+        assert len(self.stub.requests) == 1
+
+    def test_deadline(self):
+        """Test that a call gives up at its deadline instead of the default timeout."""
+        self.stub.script = [(200, {'status': 200}, 1.0)]
+
+        started = time.monotonic()
+        with pytest.raises(SmsoApiError) as excinfo:
+            self.run(lambda: self.client.send_sms('+40722123456', 'Salut', deadline=0.2))
+
+        assert excinfo.value.status_code == 408
+        assert time.monotonic() - started < 0.8
+        # A send that may have reached SMSO is never repeated
+        assert len(self.stub.requests) == 1
+
+    def test_keep_alive_reuses_connections(self):
+        """Test that concurrent sends share a small pool of keep-alive connections."""
+        self.client.max_keepalive = 5
+        self.client.max_connections = 5
+
+        async def send_many():
+            return await asyncio.gather(*(
+                self.client.send_sms('+40722123456', f'Mesaj {i}') for i in range(50)
+            ))
+
+        results = self.run(send_many)
+
+        assert all(result['success'] for result in results)
+        assert len(self.stub.requests) == 50
+        assert len(self.stub.client_ports) <= 5
+
+
+class TestSmsoProviderAsync:
+    """Test SmsoProvider's async send path and the dispatcher."""
+
+    def setup_method(self):
+        """Start a stub server, a dispatcher and a provider pointed at the stub."""
+        self.stub = StubSmsoServer()
+        self.dispatcher = SmsDispatcher()
+        self.provider = SmsoProvider({'api_key': 'test-key', 'api_base_url': self.stub.url,
+                                      'retries': 0})
+        self.engine = RateLimitEngine(MemoryStorage())
+        self._patchers = [
+            patch('app.services.sms.providers.smso_provider.get_sms_dispatcher',
+                  return_value=self.dispatcher),
+            patch('app.services.sms.provider_interface.get_rate_limit_engine',
+                  return_value=self.engine)
+        ]
+        for patcher in self._patchers:
+            patcher.start()
+
+    def teardown_method(self):
+        """Stop patchers, the dispatcher and the stub server."""
+        for patcher in self._patchers:
+            patcher.stop()
+        self.dispatcher.shutdown()
+        self.stub.close()
+
+    def test_send_sms_async_on_dispatcher(self):
+        """Test that a send submitted to the dispatcher resolves to a response."""
+        message = SmsMessage(to='+40722123456', body='Codul dvs. este 123456', message_type='otp')
+
+        response = self.dispatcher.run(self.provider.send_sms_async(message), timeout=5)
+
+        assert response.success is True
+        assert response.message_id == 'token-1'
+
+    def test_send_sms_async_maps_api_errors(self):
+        """Test that SMSO errors map to the same codes as the blocking path."""
+        self.stub.script = [(402, {'message': 'Insufficient credit'}, 0)]
+        message = SmsMessage(to='+40722123456', body='Salut')
+
+        response = self.dispatcher.run(self.provider.send_sms_async(message), timeout=5)
+
+        assert response.success is False
+        assert response.error_code == 'INSUFFICIENT_CREDIT'
+
+    def test_send_bulk_on_dispatcher(self):
+        """Test that bulk sends run concurrently on the dispatcher in input order."""
+        self.stub.script = [(200, {'status': 200, 'responseToken': f'token-{i}'}, 0.05)
+                            for i in range(20)]
+        messages = [SmsMessage(to='+40722123456', body=f'Mesaj {i}') for i in range(20)]
+
+        with patch.object(SmsoProvider, 'get_rate_limits', return_value={'per_second': 100}):
+            started = time.monotonic()
+            responses = self.provider.send_bulk(messages)
+            elapsed = time.monotonic() - started
+
+        assert all(response.success for response in responses)
+        assert sorted(response.message_id for response in responses) == \
+            sorted(f'token-{i}' for i in range(20))
+        assert elapsed < 20 * 0.05
@@ -0,0 +1,240 @@
+"""
+Unit tests for the verification code (OTP) store.
+
+This module tests the VerificationCode model including hashed storage,
+attempts counted atomically under the guard (including parallel guesses),
+verify-and-consume, and the outcomes reported for wrong, expired,
+exhausted and missing codes.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from unittest.mock import patch, MagicMock
+
+from app.models.verification_code import VerificationCode
+
+
+class TestVerificationCodeIssue:
+    """Test storing verification codes."""
+
+    def test_hash_is_keyed_and_bound_to_phone(self):
+        """Test that the same code hashes differently per phone and never equals a plain digest."""
+        first = VerificationCode.hash_code('+40722123456', '123456')
+
+        assert first == VerificationCode.hash_code('+40722123456', '123456')
+        assert first != VerificationCode.hash_code('+40722123457', '123456')
+        assert '123456' not in first
+
+    @patch('app.models.verification_code.get_database')
+    def test_issue_replaces_with_hashed_code(self, mock_get_database):
+        """Test that issuing upserts one document per phone without the plain code."""
+        mock_collection = MagicMock()
+        mock_get_database.return_value = {VerificationCode.COLLECTION_NAME: mock_collection}
+
+        expires_at = VerificationCode.issue('+40722123456', '123456', 300)
+
+        query, document = mock_collection.replace_one.call_args[0]
+        assert query == {'phone_number': '+40722123456', 'purpose': VerificationCode.ACCOUNT}
+        assert document['purpose'] == VerificationCode.ACCOUNT
+        assert mock_collection.replace_one.call_args[1] == {'upsert': True}
+        assert document['code_hash'] == VerificationCode.hash_code('+40722123456', '123456')
+        assert '123456' not in document.values()
+        assert document['attempts'] == 0
+        assert document['expires_at'] == expires_at
+        assert expires_at - document['created_at'] == timedelta(seconds=300)
+
+
+class TestVerificationCodeVerify:
+    """Test atomic attempt counting and verify-and-consume."""
+
+    def setup_method(self):
+        """Patch the database with a mock collection."""
+        self.collection = MagicMock()
+        self.patcher = patch('app.models.verification_code.get_database',
+                             return_value={VerificationCode.COLLECTION_NAME: self.collection})
+        self.patcher.start()
+
+    def teardown_method(self):
+        """Stop the database patcher."""
+        self.patcher.stop()
+
+    def _pending(self, code='123456', expires_in=300):
+        """Build the document returned once an attempt is counted."""
+        return {
+            '_id': 'doc',
+            'code_hash': VerificationCode.hash_code('+40722123456', code),
+            'expires_at': datetime.utcnow() + timedelta(seconds=expires_in)
+        }
+
+    def test_attempt_counted_under_guard(self):
+        """Test that the attempt is incremented in the same update that checks the limit."""
+        self.collection.find_one_and_update.return_value = self._pending()
+
+        VerificationCode.verify('+40722123456', '123456')
+
+        query, update = self.collection.find_one_and_update.call_args[0]
+        assert query == {'phone_number': '+40722123456', 'purpose': VerificationCode.ACCOUNT,
+                         'code_hash': {'$exists': True},
+                         'attempts': {'$lt': VerificationCode.MAX_ATTEMPTS}}
+        assert update == {'$inc': {'attempts': 1}}
+
+    def test_correct_code_is_consumed(self):
+        """Test that a correct code is consumed by an update matching its hash."""
+        self.collection.find_one_and_update.return_value = self._pending()
+        self.collection.update_one.return_value.modified_count = 1
+
+        outcome = VerificationCode.verify('+40722123456', '123456')
+
+        assert outcome == VerificationCode.VERIFIED
+        query, update = self.collection.update_one.call_args[0]
+        assert query == {'_id': 'doc',
+                         'code_hash': VerificationCode.hash_code('+40722123456', '123456')}
+        assert update['$set']['verified'] is True
+        assert update['$unset'] == {'code_hash': ''}
+
+    def test_code_consumed_concurrently(self):
+        """Test that a correct code already consumed by another verify is not accepted twice."""
+        self.collection.find_one_and_update.return_value = self._pending()
+        self.collection.update_one.return_value.modified_count = 0
+
+        assert VerificationCode.verify('+40722123456', '123456') == VerificationCode.NOT_FOUND
+
+    def test_wrong_code(self):
+        """Test that a wrong code reports INVALID without consuming the code."""
+        self.collection.find_one_and_update.return_value = self._pending()
+
+        outcome = VerificationCode.verify('+40722123456', '654321')
+
+        assert outcome == VerificationCode.INVALID
+        self.collection.update_one.assert_not_called()
+
+    def test_expired_code(self):
+        """Test that a code past its expiry reports EXPIRED."""
+        self.collection.find_one_and_update.return_value = self._pending(expires_in=-1)
+
+        assert VerificationCode.verify('+40722123456', '123456') == VerificationCode.EXPIRED
+        self.collection.update_one.assert_not_called()
+
+    def test_attempts_exhausted(self):
+        """Test that a pending code past the attempt limit reports TOO_MANY_ATTEMPTS."""
+        self.collection.find_one_and_update.return_value = None
+        self.collection.find_one.return_value = {
+            'expires_at': datetime.utcnow() + timedelta(minutes=5)
+        }
+
+        assert VerificationCode.verify('+40722123456', '123456') == VerificationCode.TOO_MANY_ATTEMPTS
+
+    def test_consumed_or_missing_code(self):
+        """Test that a phone without a pending code (or an already used one) reports NOT_FOUND."""
+        self.collection.find_one_and_update.return_value = None
+        self.collection.find_one.return_value = None
+
+        assert VerificationCode.verify('+40722123456', '123456') == VerificationCode.NOT_FOUND
+
+    def test_purposes_are_separate(self):
+        """Test that checkout codes are matched and counted apart from account codes."""
+        self.collection.find_one_and_update.return_value = None
+        self.collection.find_one.return_value = None
+
+        VerificationCode.verify('+40722123456', '123456', VerificationCode.CHECKOUT)
+
+        assert self.collection.find_one_and_update.call_args[0][0]['purpose'] == VerificationCode.CHECKOUT
+        assert self.collection.find_one.call_args[0][0]['purpose'] == VerificationCode.CHECKOUT
+
+
+class _LockedCollection:
+    """Single-document collection whose updates are atomic, like MongoDB's."""
+
+    def __init__(self, document):
+        self.document = document
+        self.lock = threading.Lock()
+
+    def _matches(self, query):
+        for field, condition in query.items():
+            value = self.document.get(field)
+            if isinstance(condition, dict):
+                if '$exists' in condition and (field in self.document) != condition['$exists']:
+                    return False
+                if '$lt' in condition and not value < condition['$lt']:
+                    return False
+            elif value != condition:
+                return False
+        return True
+
+    def find_one_and_update(self, query, update, projection=None, return_document=None):
+        with self.lock:
+            if not self._matches(query):
+                return None
+            # Widen the window between the guard and the increment
+            time.sleep(0.001)
+            for field, amount in update['$inc'].items():
+                self.document[field] += amount
+            return dict(self.document)
+
+    def find_one(self, query, projection=None):
+        with self.lock:
+            return dict(self.document) if self._matches(query) else None
+
+    def update_one(self, query, update):
+        with self.lock:
+            if not self._matches(query):
+                return MagicMock(modified_count=0)
+            self.document.update(update['$set'])
+            for field in update['$unset']:
+                self.document.pop(field, None)
+            return MagicMock(modified_count=1)
+
+
+class TestVerificationCodeConcurrency:
+    """Test that parallel guesses cannot get past the attempt limit."""
+
+    def test_parallel_guesses_capped(self):
+        """Test that only MAX_ATTEMPTS of many parallel guesses are compared, even the right one."""
+        phone = '+40722123456'
+        collection = _LockedCollection({
+            '_id': 'doc',
+            'phone_number': phone,
+            'purpose': VerificationCode.CHECKOUT,
+            'code_hash': VerificationCode.hash_code(phone, '123456'),
+            'attempts': 0,
+            'expires_at': datetime.utcnow() + timedelta(minutes=5),
+            'verified': False
+        })
+        guesses = 40
+        barrier = threading.Barrier(guesses)
+
+        def guess(n):
+            barrier.wait()
+            return VerificationCode.verify(phone, f"{n:06d}", VerificationCode.CHECKOUT)
+
+        with patch('app.models.verification_code.get_database',
+                   return_value={VerificationCode.COLLECTION_NAME: collection}):
+            with ThreadPoolExecutor(max_workers=guesses) as pool:
+                outcomes = list(pool.map(guess, range(guesses)))
+
+            assert outcomes.count(VerificationCode.INVALID) == VerificationCode.MAX_ATTEMPTS
+            assert outcomes.count(VerificationCode.TOO_MANY_ATTEMPTS) == guesses - VerificationCode.MAX_ATTEMPTS
+            assert collection.document['attempts'] == VerificationCode.MAX_ATTEMPTS
+
+            # The right code no longer works once the attempts are spent
+            assert VerificationCode.verify(phone, '123456', VerificationCode.CHECKOUT) == \
+                VerificationCode.TOO_MANY_ATTEMPTS
+            assert collection.document['verified'] is False
+
+
+class TestVerificationCodeIndexes:
+    """Test index setup."""
+
+    @patch('app.models.verification_code.get_database')
+    def test_legacy_phone_index_replaced(self, mock_get_database):
+        """Test that the per-phone unique index gives way to one per phone and purpose."""
+        mock_collection = MagicMock()
+        mock_collection.index_information.return_value = {'_id_': {}, 'phone_number_1': {}}
+        mock_get_database.return_value = {VerificationCode.COLLECTION_NAME: mock_collection}
+
+        VerificationCode.create_indexes()
+
+        mock_collection.drop_index.assert_called_once_with('phone_number_1')
+        mock_collection.create_index.assert_any_call([('phone_number', 1), ('purpose', 1)], unique=True)